@@ -15,6 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
 from intervaltree import (Interval, IntervalTree)
 import logging
 
@@ -24,14 +25,35 @@ from ..core.exceptions import TransferFaultError
 
 LOG = logging.getLogger(__name__)
 
+class _CachedPage(object):
+    """@brief Bookkeeping for one page of the memory cache."""
+
+    __slots__ = ('size', 'is_persistent', 'is_dirty')
+
+    def __init__(self, is_persistent):
+        ## Number of bytes cached within the page.
+        self.size = 0
+        ## Whether the page may be kept across a resume of the core.
+        self.is_persistent = is_persistent
+        ## Set when the page has been written through the cache since the core last ran.
+        self.is_dirty = False
+
 class MemoryCache(object):
     """@brief Memory cache.
 
     Maintains a cache of target memory. The constructor is passed a backing DebugContext object that
     will be used to fill the cache.
 
+    Cached data is tracked in pages of #PAGE_SIZE bytes. Contiguous cached intervals are merged, but an
+    interval never crosses a page or memory region boundary. Pages are kept in least recently used order,
+    and if a size limit is set the oldest pages are evicted once the total cached data exceeds it.
+
     The cache is invalidated whenever the target has run since the last cache operation (based on run
-    tokens). If the target is currently running, all accesses cause the cache to be invalidated.
+    tokens). If the target is currently running, all accesses cause the cache to be invalidated. Pages
+    within regions whose `invalidate_cache_on_run` attribute is false, as well as flash and ROM regions
+    when persistence of flash is enabled, survive this invalidation unless they were written through the
+    cache while the core was halted (they are "dirty"). Persistent pages are otherwise only dropped by
+    invalidate(), which is called when flash is programmed or the target is reset.
 
     The target's memory map is referenced. All memory accesses must be fully contained within a single
     memory region, or a TransferFaultError will be raised. However, if an access is outside of all regions,
@@ -39,25 +61,53 @@ class MemoryCache(object):
     region's cacheability flag is honoured.
     """
 
-    def __init__(self, context, core):
+    ## Size in bytes of cache pages. Must be a power of two.
+    PAGE_SIZE = 1024
+
+    def __init__(self, context, core, persist_flash=False, size_limit=0):
+        """@brief Constructor.
+        @param self
+        @param context The DebugContext used to fill the cache.
+        @param core The core that owns the cached memory.
+        @param persist_flash Whether cached flash and ROM contents are kept when the core resumes.
+        @param size_limit Maximum number of bytes to cache. Zero means there is no limit.
+        """
         self._context = context
         self._core = core
+        self._persist_flash = persist_flash
+        self._size_limit = size_limit
         self._run_token = -1
+        self._generation = 0
         self._reset_cache()
 
     def _reset_cache(self):
+        self._generation += 1
         self._cache = IntervalTree()
+        self._pages = OrderedDict()
+        self._cached_size = 0
+        self._metrics = CacheMetrics()
+
+    def _invalidate_volatile(self):
+        """@brief Drop all pages that must not be kept after the core has run."""
+        if not any(page.is_persistent for page in self._pages.values()):
+            self._reset_cache()
+            return
+
+        self._generation += 1
         self._metrics = CacheMetrics()
+        for page_number, page in list(self._pages.items()):
+            if not page.is_persistent or page.is_dirty:
+                self._remove_page(page_number)
 
     def _check_cache(self):
         """@brief Invalidates the cache if appropriate."""
         if self._core.is_running():
             LOG.debug("core is running; invalidating cache")
-            self._reset_cache()
+            self._invalidate_volatile()
         elif self._run_token != self._core.run_token:
             self._dump_metrics()
             LOG.debug("out of date run token; invalidating cache")
-            self._reset_cache()
+            self._invalidate_volatile()
             self._run_token = self._core.run_token
 
     def _get_ranges(self, addr, count):
@@ -87,18 +137,98 @@ class MemoryCache(object):
             uncached = newUncachedSet
         return cached, uncached
 
-    def _read_uncached(self, uncached):
-        """"@brief Reads uncached memory ranges and updates the cache.
-        @return A list of Interval objects is returned. Each Interval has its @a data attribute set
-          to a bytearray of the data read from target memory.
+    def _remove_page(self, page_number):
+        """@brief Remove all cached data within a page."""
+        page = self._pages.pop(page_number)
+        start = page_number * self.PAGE_SIZE
+        self._cache.remove_envelop(start, start + self.PAGE_SIZE)
+        self._cached_size -= page.size
+
+    def _touch_pages(self, addr, size):
+        """@brief Mark the pages covering an address range as most recently used."""
+        for page_number in range(addr // self.PAGE_SIZE, (addr + size - 1) // self.PAGE_SIZE + 1):
+            if page_number in self._pages:
+                self._pages.move_to_end(page_number)
+
+    def _evict(self):
+        """@brief Evict least recently used pages until the cache is within its size limit."""
+        if not self._size_limit:
+            return
+        while self._cached_size > self._size_limit and self._pages:
+            self._remove_page(next(iter(self._pages)))
+
+    def _is_persistent_region(self, region):
+        if not region.invalidate_cache_on_run:
+            return True
+        return self._persist_flash and (region.is_flash or region.is_rom)
+
+    def _add_data(self, addr, data, region, is_write=False):
+        """@brief Insert data into the cache, splitting it at page boundaries.
+        @param self
+        @param addr Start address of the data.
+        @param data Bytearray of data.
+        @param region The memory region containing the whole address range.
+        @param is_write Whether the data is being written through the cache.
         """
-        uncachedData = []
-        for uncachedIv in uncached:
-            data = self._context.read_memory_block8(uncachedIv.begin, uncachedIv.end - uncachedIv.begin)
-            iv = Interval(uncachedIv.begin, uncachedIv.end, bytearray(data))
-            self._cache.add(iv) # TODO merge contiguous cached intervals
-            uncachedData.append(iv)
-        return uncachedData
+        is_persistent = self._is_persistent_region(region)
+        # Slice a memoryview so each page's chunk is copied only once, by _add_to_page().
+        view = memoryview(data)
+        start = addr
+        end = addr + len(data)
+        while addr < end:
+            page_number = addr // self.PAGE_SIZE
+            page_start = page_number * self.PAGE_SIZE
+            page_end = page_start + self.PAGE_SIZE
+            chunk_end = min(end, page_end)
+            self._add_to_page(page_number, addr, view[addr - start:chunk_end - start],
+                    max(page_start, region.start), min(page_end, region.end + 1),
+                    is_persistent, is_write)
+            addr = chunk_end
+
+    def _add_to_page(self, page_number, addr, data, lower, upper, is_persistent, is_write):
+        """@brief Insert data into the cache, merging it with overlapping or adjacent intervals.
+
+        Only intervals within the [@a lower, @a upper) bounds are merged with, so that the resulting
+        interval stays within both its page and its memory region.
+        """
+        end = addr + len(data)
+        neighbours = sorted(self._cache.overlap(max(addr - 1, lower), min(end + 1, upper)),
+                key=lambda x: x.begin)
+        oldSize = sum((iv.end - iv.begin) for iv in neighbours)
+
+        # Data is entirely within a single cached interval, so update it in place.
+        if len(neighbours) == 1 and neighbours[0].begin <= addr and neighbours[0].end >= end:
+            beginOffset = addr - neighbours[0].begin
+            neighbours[0].data[beginOffset:beginOffset + len(data)] = data
+            newSize = oldSize
+        else:
+            begin = addr
+            merged = bytearray(data)
+            if neighbours:
+                first = neighbours[0]
+                last = neighbours[-1]
+                if first.begin < addr:
+                    merged[0:0] = first.data[:addr - first.begin]
+                    begin = first.begin
+                if last.end > end:
+                    merged += last.data[end - last.begin:]
+                    end = last.end
+                for iv in neighbours:
+                    self._cache.remove(iv)
+            self._cache.addi(begin, end, merged)
+            newSize = end - begin
+
+        page = self._pages.get(page_number)
+        if page is None:
+            page = _CachedPage(is_persistent)
+            self._pages[page_number] = page
+        else:
+            page.is_persistent = page.is_persistent and is_persistent
+            self._pages.move_to_end(page_number)
+        if is_write:
+            page.is_dirty = True
+        page.size += newSize - oldSize
+        self._cached_size += newSize - oldSize
 
     def _update_metrics(self, cached, uncached, addr, size):
         cachedSize = 0
@@ -125,7 +255,7 @@ class MemoryCache(object):
         else:
             LOG.debug("no reads")
 
-    def _read(self, addr, size):
+    def _read(self, addr, size, region):
         """@brief Performs a cached read operation of an address range.
         @return A list of Interval objects sorted by address.
         """
@@ -134,12 +264,16 @@ class MemoryCache(object):
         self._update_metrics(cached, uncached, addr, size)
 
         # Read any uncached ranges.
-        uncachedData = self._read_uncached(uncached)
+        for uncachedIv in uncached:
+            data = self._context.read_memory_block8(uncachedIv.begin, uncachedIv.end - uncachedIv.begin)
+            self._add_data(uncachedIv.begin, bytearray(data), region)
 
-        # Merged cached with data we just read
-        combined = list(cached) + uncachedData
-        combined.sort(key=lambda x: x.begin)
-        return combined
+        self._touch_pages(addr, size)
+
+        # The cache now holds the full range, possibly in one interval per page.
+        if uncached:
+            cached = self._cache.overlap(addr, addr + size)
+        return sorted(cached, key=lambda x: x.begin)
 
     def _merge_data(self, combined, addr, size):
         """@brief Extracts data from the intersection of an address range across a list of interval objects.
@@ -184,47 +318,30 @@ class MemoryCache(object):
 
         return result
 
-    def _update_contiguous(self, cached, addr, value):
-        size = len(value)
-        end = addr + size
-        leadBegin = addr
-        leadData = bytearray()
-        trailData = bytearray()
-        trailEnd = end
-
-        if cached[0].begin < addr and cached[0].end > addr:
-            offset = addr - cached[0].begin
-            leadData = cached[0].data[:offset]
-            leadBegin = cached[0].begin
-        if cached[-1].begin < end and cached[-1].end > end:
-            offset = end - cached[-1].begin
-            trailData = cached[-1].data[offset:]
-            trailEnd = cached[-1].end
-
-        self._cache.remove_overlap(addr, end)
-
-        data = leadData + value + trailData
-        self._cache.addi(leadBegin, trailEnd, data)
-
-    def _check_regions(self, addr, count):
-        """@return A bool indicating whether the given address range is fully contained within
-              one known memory region, and that region is cacheable.
+    def _get_cacheable_region(self, addr, count):
+        """@return The memory region containing the given address range if that region is cacheable,
+              otherwise None.
         @exception TransferFaultError Raised if the access is not entirely contained within a single region.
         """
         regions = self._core.memory_map.get_intersecting_regions(addr, length=count)
 
         # If no regions matched, then allow an uncached operation.
         if len(regions) == 0:
-            return False
+            return None
 
         # Raise if not fully contained within one region.
         if len(regions) > 1 or not regions[0].contains_range(addr, length=count):
             raise TransferFaultError("individual memory accesses must not cross memory region boundaries")
 
-        # Otherwise return whether the region is cacheable.
-        return regions[0].is_cacheable
+        # Otherwise return the region if it is cacheable.
+        return regions[0] if regions[0].is_cacheable else None
 
     def read_memory(self, addr, transfer_size=32, now=True):
+        if not now and transfer_size == 32 and (addr & 3) == 0:
+            result_cb = self._read_word_deferred(addr)
+            if result_cb is not None:
+                return result_cb
+
         # TODO use more optimal underlying read_memory calls
         if transfer_size == 8:
             data = self.read_memory_block8(addr, 1)[0]
@@ -239,6 +356,37 @@ class MemoryCache(object):
                 return data
             return read_cb
 
+    def _read_word_deferred(self, addr):
+        """@brief Start a deferred read of a word that is not cached.
+
+        The read is passed to the underlying context with now=False, so that several misses can be
+        queued before the first of them is resolved. The word is added to the cache when the returned
+        callback is called, unless the cache was invalidated or the word was cached by another access
+        in the meantime.
+
+        @return Callback returning the word, or None if any part of the word is already cached.
+        """
+        self._check_cache()
+
+        region = self._get_cacheable_region(addr, 4)
+        if region is None:
+            return self._context.read_memory(addr, 32, now=False)
+        if self._cache.overlaps(addr, addr + 4):
+            return None
+
+        self._metrics.reads += 1
+        self._metrics.misses += 4
+        result_cb = self._context.read_memory(addr, 32, now=False)
+        generation = self._generation
+
+        def read_cb():
+            value = result_cb()
+            if self._generation == generation and not self._cache.overlaps(addr, addr + 4):
+                self._add_data(addr, bytearray(conversion.u32le_list_to_byte_list([value])), region)
+                self._evict()
+            return value
+        return read_cb
+
     def read_memory_block8(self, addr, size):
         if size <= 0:
             return []
@@ -246,16 +394,18 @@ class MemoryCache(object):
         self._check_cache()
 
         # Validate memory regions.
-        if not self._check_regions(addr, size):
+        region = self._get_cacheable_region(addr, size)
+        if region is None:
             LOG.debug("range [%x:%x] is not cacheable", addr, addr+size)
             return self._context.read_memory_block8(addr, size)
 
         # Get the cached and uncached subranges of the requested read.
-        combined = self._read(addr, size)
+        combined = self._read(addr, size, region)
 
         # Extract data out of combined intervals.
         result = list(self._merge_data(combined, addr, size))
         assert len(result) == size, "result size ({}) != requested size ({})".format(len(result), size)
+        self._evict()
         return result
 
     def read_memory_block32(self, addr, size):
@@ -274,29 +424,15 @@ class MemoryCache(object):
         self._check_cache()
 
         # Validate memory regions.
-        cacheable = self._check_regions(addr, len(value))
+        region = self._get_cacheable_region(addr, len(value))
 
         # Write to the target first, so if it fails we don't update the cache.
         result = self._context.write_memory_block8(addr, value)
 
-        if cacheable:
-            size = len(value)
-            end = addr + size
-            cached = sorted(self._cache.overlap(addr, end), key=lambda x:x.begin)
-            self._metrics.writes += size
-
-            if len(cached):
-                # Write data is entirely within a single cached interval.
-                if addr >= cached[0].begin and end <= cached[0].end:
-                    beginOffset = addr - cached[0].begin
-                    endOffset = beginOffset + size
-                    cached[0].data[beginOffset:endOffset] = value
-
-                else:
-                    self._update_contiguous(cached, addr, bytearray(value))
-            else:
-                # No cached data in this range, so just add the entire interval.
-                self._cache.addi(addr, end, bytearray(value))
+        if region is not None:
+            self._metrics.writes += len(value)
+            self._add_data(addr, bytearray(value), region, is_write=True)
+            self._evict()
 
         return result
 
@@ -33,6 +33,11 @@ class RegisterCache(object):
     invalidate all five.
 
     Same logic applies for XPSR submasks.
+
+    The first read that misses the cache after the core halts reads a snapshot of all of the core's
+    registers in one batch, so later reads of other registers, such as for a gdb 'g' packet following
+    a stop reply, don't need any transfers. While a snapshot for the current run token is cached, the
+    core is known to have stayed halted, so the DHCSR check for a running core is skipped as well.
     """
 
     CFBP_INDEX = index_for_reg('cfbp')
@@ -60,10 +65,13 @@ class RegisterCache(object):
         self._context = context
         self._core = core
         self._run_token = -1
+        self._snapshot_list = None
         self._reset_cache()
 
     def _reset_cache(self):
         self._cache = {}
+        self._has_snapshot = False
+        self._snapshot_failed = False
         self._metrics = CacheMetrics()
 
     def _dump_metrics(self):
@@ -74,6 +82,8 @@ class RegisterCache(object):
 
     def _check_cache(self):
         """@brief Invalidates the cache if needed and returns whether the core is running."""
+        if self._has_snapshot and (self._run_token == self._core.run_token):
+            return False
         if self._core.is_running():
             LOG.debug("core is running; invalidating cache")
             self._reset_cache()
@@ -97,6 +107,8 @@ class RegisterCache(object):
             return self._context.read_core_registers_raw(reg_list)
 
         reg_list = self._convert_and_check_registers(reg_list)
+        if not (self._has_snapshot or self._snapshot_failed) and any(r not in self._cache for r in reg_list):
+            self._read_snapshot()
         reg_set = set(reg_list)
 
         # Get list of values we have cached.
@@ -130,21 +142,11 @@ class RegisterCache(object):
 
         # Update all CFBP based registers.
         if reading_cfbp:
-            v = values[cfbp_index]
-            self._cache[self.CFBP_INDEX] = v
-            for r in self.CFBP_REGS:
-                if r == self.CFBP_INDEX:
-                    continue
-                self._cache[r] = (v >> ((-r - 1) * 8)) & 0xff
+            self._cache_cfbp(values[cfbp_index])
 
         # Update all XPSR based registers.
         if reading_xpsr:
-            v = values[xpsr_index]
-            self._cache[self.XPSR_INDEX] = v
-            for r in self.XPSR_REGS:
-                if r == self.XPSR_INDEX:
-                    continue
-                self._cache[r] = v & CortexMCoreRegisterInfo.get(r).psr_mask
+            self._cache_xpsr(values[xpsr_index])
 
         # Build the results list in the same order as requested registers.
         results = []
@@ -159,6 +161,55 @@ class RegisterCache(object):
 
         return results
 
+    def _cache_cfbp(self, v):
+        self._cache[self.CFBP_INDEX] = v
+        for r in self.CFBP_REGS:
+            if r == self.CFBP_INDEX:
+                continue
+            self._cache[r] = (v >> ((-r - 1) * 8)) & 0xff
+
+    def _cache_xpsr(self, v):
+        self._cache[self.XPSR_INDEX] = v
+        for r in self.XPSR_REGS:
+            if r == self.XPSR_INDEX:
+                continue
+            self._cache[r] = v & CortexMCoreRegisterInfo.get(r).psr_mask
+
+    def _get_snapshot_list(self):
+        """@brief List of the registers read for a snapshot.
+
+        All of the core's registers are included except the CFBP and XPSR subregisters, which are
+        extracted from the full registers.
+        """
+        if self._snapshot_list is None:
+            self._snapshot_list = [r for r, info in self._core.core_registers.by_index.items()
+                    if not (info.is_cfbp_subregister or info.is_psr_subregister)]
+        return self._snapshot_list
+
+    def _read_snapshot(self):
+        """@brief Read all of the core's registers into the cache in a single batch.
+
+        If the snapshot fails, for instance because some register is not accessible, registers are read as
+        requested until the cache is next invalidated.
+        """
+        reg_list = self._get_snapshot_list()
+        try:
+            values = self._context.read_core_registers_raw(reg_list)
+        except exceptions.CoreRegisterAccessError as err:
+            LOG.debug("register snapshot failed (%s); reading registers individually", err)
+            self._snapshot_failed = True
+            return
+        self._metrics.misses += len(reg_list)
+
+        for r, v in zip(reg_list, values):
+            if r == self.CFBP_INDEX:
+                self._cache_cfbp(v)
+            elif r == self.XPSR_INDEX:
+                self._cache_xpsr(v)
+            else:
+                self._cache[r] = v
+        self._has_snapshot = True
+
     # TODO only write dirty registers to target right before running.
     def write_core_registers_raw(self, reg_list, data_list):
         # Check and invalidate the cache. If the core is still running, just pass the writes
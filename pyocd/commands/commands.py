@@ -33,6 +33,7 @@ from ..core.helpers import ConnectHelper
 from ..core import exceptions
 from ..probe.tcp_probe_server import DebugProbeServer
 from ..core.target import Target
+from ..flash.checksum import compare_memory
 from ..flash.loader import FlashLoader
 from ..flash.eraser import FlashEraser
 from ..flash.file_programmer import FileProgrammer
@@ -696,7 +697,9 @@ class CompareCommand(CommandBase):
             'nargs': [2, 3],
             'usage': "ADDR [LEN] FILENAME",
             'help': "Compare a memory range against a binary file.",
-            'extra_help': "If the length is not provided, then the length of the file is used.",
+            'extra_help': "If the length is not provided, then the length of the file is used. If the target "
+                          "is halted and its flash algorithm supports the CRC analyzer, memory is checked "
+                          "with CRCs computed on the target, and only differing blocks are read back.",
             }
 
     def parse(self, args):
@@ -731,36 +734,16 @@ class CompareCommand(CommandBase):
         else:
             length = self.length
 
-        # Divide into 32 kB chunks.
-        CHUNK_SIZE = 32 * 1024
-        chunk_count = (length + CHUNK_SIZE - 1) // CHUNK_SIZE
-
-        addr = self.addr
-        end_addr = addr + length
-        offset = 0
-        mismatch = False
-
-        for chunk in range(chunk_count):
-            # Get this chunk's size.
-            chunk_size = min(end_addr - addr, CHUNK_SIZE)
-            self.context.writei("Comparing %d bytes @ 0x%08x", chunk_size, addr)
-
-            data = bytearray(self.context.selected_ap.read_memory_block8(addr, chunk_size))
-
-            for i in range(chunk_size):
-                if data[i] != file_data[offset+i]:
-                    mismatch = True
-                    self.context.writei("Mismatched byte at 0x%08x (offset 0x%x): 0x%02x (memory) != 0x%02x (file)",
-                        addr + i, offset + i, data[i], file_data[offset+i])
-                    break
-
-            if mismatch:
-                break
-
-            offset += chunk_size
-            addr += chunk_size
-
-        if not mismatch:
+        self.context.writei("Comparing %d bytes @ 0x%08x", length, self.addr)
+        # The data is hashed on the target if possible, otherwise read back and compared here.
+        offset = compare_memory(self.context.session.target, self.addr, memoryview(file_data)[:length],
+                self.context.selected_ap)
+        if offset is not None:
+            addr = self.addr + offset
+            value = self.context.selected_ap.read_memory_block8(addr, 1)[0]
+            self.context.writei("Mismatched byte at 0x%08x (offset 0x%x): 0x%02x (memory) != 0x%02x (file)",
+                addr, offset, value, file_data[offset])
+        else:
             self.context.writei("All %d bytes match.", length)
 
         if flash_init_required:
@@ -39,6 +39,12 @@ BUILTIN_OPTIONS = [
         "Enable the memory read cache. Default is enabled."),
     OptionInfo('cache.enable_register', bool, True,
         "Enable the core register cache. Default is enabled."),
+    OptionInfo('cache.memory_size_limit', int, 1024 * 1024,
+        "Maximum number of bytes held by the memory cache per core. Least recently used pages are evicted "
+        "once the limit is reached. Set to 0 for no limit. Default is 1 MiB."),
+    OptionInfo('cache.persist_flash', bool, False,
+        "Keep cached flash and ROM contents when the target resumes. Must be left disabled if the firmware "
+        "writes its own flash. Default is disabled."),
     OptionInfo('cache.read_code_from_elf', bool, True,
         "Controls whether reads of code sections will be taken from an attached ELF file instead of the "
         "target memory."),
@@ -72,6 +78,12 @@ BUILTIN_OPTIONS = [
     OptionInfo('fast_program', bool, False,
         "Setting this option to True will use CRC checks of existing flash sector contents to "
         "determine whether pages need to be programmed."),
+    OptionInfo('flash.adaptive_polling', bool, True,
+        "Learn the duration of each flash algorithm operation and use it to reduce how often the target is "
+        "polled for completion."),
+    OptionInfo('flash.image_cache', str, None,
+        "Path to a directory holding a record of the pages last programmed into each flash region. When set, "
+        "smart flash uses the record to skip analysis of unchanged pages. Disabled by default."),
     OptionInfo('flash.timeout.init', float, 5.0,
         "Flash algorithm init and uninit timeout in seconds."),
     OptionInfo('flash.timeout.analyzer', float, 30.0,
@@ -110,6 +122,13 @@ BUILTIN_OPTIONS = [
         "will control system reset when 'enable_multicore' is set."),
     OptionInfo('probeserver.port', int, 5555,
         "TCP port for the debug probe server."),
+    OptionInfo('probeserver.priority', str, 'normal',
+        "Scheduling class requested from a remote probe server when connecting to it, one of 'low', "
+        "'normal', or 'high'. Clients in a higher class get a larger share of the probe when several "
+        "clients are busy."),
+    OptionInfo('probeserver.time_slice', float, 0.02,
+        "Seconds a probe server client may keep using the probe while other clients are waiting. "
+        "Default is 0.02 s (20 ms)."),
     OptionInfo('project_dir', str, None,
         "Path to the session's project directory. Defaults to the working directory when the pyocd "
         "tool was executed."),
@@ -156,10 +175,19 @@ BUILTIN_OPTIONS = [
         "Whether to enable SWV printf output over the semihosting console. Requires the "
         "swv_system_clock option to be set. The SWO baud rate can be controlled with the "
         "swv_clock option."),
+    OptionInfo('debug.state_poll_max_interval', float, 0.05,
+        "Longest period in seconds between target state polls while waiting for a running target to halt. "
+        "Default is 0.05."),
+    OptionInfo('debug.state_poll_min_interval', float, 0.001,
+        "Initial period in seconds between target state polls after the target is resumed. The period doubles "
+        "after each poll, up to debug.state_poll_max_interval. Default is 0.001."),
     OptionInfo('debug.status_fault_retry_timeout', float, 1.0,
         "Duration in seconds that a failed target status check will be retried before an error is raised. "
         "Only applies while the target is running after a resume operation in the debugger and pyOCD is waiting "
         "for it to halt again."),
+    OptionInfo('gdbserver.read_ahead', int, 1024,
+        "Maximum number of bytes the gdbserver reads ahead of sequential memory reads. Set to 0 to disable "
+        "read-ahead. Default is 1024."),
     OptionInfo('gdbserver_port', int, 3333,
         "Base TCP port for the gdbserver."),
     OptionInfo('persist', bool, False,
@@ -180,6 +208,9 @@ BUILTIN_OPTIONS = [
         "Program command line string, used for the SYS_GET_CMDLINE semihosting request."),
     OptionInfo('step_into_interrupt', bool, False,
         "Enable interrupts when performing step operations."),
+    OptionInfo('swv_buffer_size', int, 16 * 1024 * 1024,
+        "Size in bytes of the buffer between capture and decoding of SWV data. If decoding falls behind "
+        "by more than this, further data is dropped until it catches up. Default is 16 MiB."),
     OptionInfo('swv_clock', int, 1000000,
         "Frequency in Hertz of the SWO baud rate. Default is 1 MHz."),
     OptionInfo('swv_system_clock', int, None,
@@ -189,6 +220,9 @@ BUILTIN_OPTIONS = [
         "Enable flag for the raw SWV stream server."),
     OptionInfo('swv_raw_port', int, 3443,
         "TCP port number for the raw SWV stream server."),
+    OptionInfo('swv_recording', str, None,
+        "Path of a file to which SWV data is recorded in the indexed pyOCD trace recording format. "
+        "No default."),
     OptionInfo('telnet_port', int, 4444,
         "Base TCP port number for the semihosting telnet server."),
     OptionInfo('vector_catch', str, 'h',
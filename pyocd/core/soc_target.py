@@ -144,7 +144,11 @@ class SoCTarget(TargetGraphNode):
                 core,
                 enable_memory=self.session.options['cache.enable_memory'],
                 enable_register=self.session.options['cache.enable_register'],
+                persist_flash=self.session.options['cache.persist_flash'],
+                memory_size_limit=self.session.options['cache.memory_size_limit'],
                 )
+        self.session.subscribe(ctx.event_handler,
+                (Target.Event.PRE_FLASH_PROGRAM, Target.Event.POST_FLASH_PROGRAM, Target.Event.POST_RESET))
         core.set_target_context(ctx)
         self.cores[core.core_number] = core
         self.add_child(core)
@@ -1212,6 +1212,43 @@ class MEM_AP(AccessPort, memory_interface.MemoryInterface):
             addr += n
         return resp
 
+    @locked
+    def read_repeated32(self, addr: int, count: int) -> Sequence[int]:
+        """@brief Read the same word of memory several times.
+
+        This is intended for sampling a register that changes on its own, such as DWT_PCSR. Address
+        auto-increment is disabled in CSW so that all the reads can be issued as a single multiple
+        AP register read, which the probe can send as one block transfer.
+
+        @param self
+        @param addr Word aligned address to read.
+        @param count Number of reads.
+        @return A list of word values, one per read.
+        """
+        assert (addr & 0x3) == 0
+        addr &= self._address_mask
+        if self._accelerated_memory_interface is not None:
+            results = [self._accelerated_memory_interface.read_memory(addr, 32, now=False, csw=self._csw)
+                    for _ in range(count)]
+            return [result() for result in results]
+
+        num = self.dp.next_access_number
+        TRACE.debug("read_repeated32:%06d (ap=0x%x; addr=0x%08x, count=%d)",
+            num, self.address.nominal_address, addr, count)
+        self.write_reg(self._reg_offset + MEM_AP_CSW, (self._csw & ~CSW_ADDRINC) | CSW_NADDRINC | CSW_SIZE32)
+        self.write_reg(self._reg_offset + MEM_AP_TAR, addr)
+        try:
+            return self.dp.read_ap_multiple(self.address.address + self._reg_offset + MEM_AP_DRW, count)
+        except exceptions.TransferFaultError as error:
+            # Annotate error with target address.
+            self._handle_error(error, num)
+            error.fault_address = addr
+            error.fault_length = 4
+            raise
+        except exceptions.Error as error:
+            self._handle_error(error, num)
+            raise
+
     @locked
     def _accelerated_write_memory(self, addr: int, data: int, transfer_size: int=32) -> None:
         """@brief Write one memory location using the probe's accelerated memory interface.
@@ -17,7 +17,7 @@
 
 import logging
 from time import sleep
-from typing import (Any, Callable, List, Optional, Set, overload, Sequence, TYPE_CHECKING, Union, cast)
+from typing import (Any, Callable, Dict, List, Optional, Set, overload, Sequence, TYPE_CHECKING, Union, cast)
 from typing_extensions import Literal
 
 from ..core.target import Target
@@ -1199,34 +1199,30 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
                     ", ".join(CortexMCoreRegisterInfo.get(r).name for r in reg_list),
                     self.core_number))
 
-        # Handle doubles.
-        doubles = [reg for reg in reg_list if CortexMCoreRegisterInfo.get(reg).is_double_float_register]
-        hasDoubles = len(doubles) > 0
-        originalRegList = []
-        singleValues = []
-        if hasDoubles:
-            originalRegList = reg_list
-
-            # Strip doubles from reg_list.
-            reg_list = [reg for reg in reg_list if not CortexMCoreRegisterInfo.get(reg).is_double_float_register]
-
-            # Read float regs required to build doubles.
-            singleRegList = []
-            for reg in doubles:
-                singleRegList += (-reg, -reg + 1)
-            singleValues = self._base_read_core_registers_raw(singleRegList)
+        # Collect the DCRSR register selectors to read, each only once. Double-precision registers are
+        # composed from their two single-precision halves, and the CFBP and XPSR subregisters are extracted
+        # from the full register, so a read of every register is a single batch of transfers.
+        cfbp_index = CortexMCoreRegisterInfo.get('cfbp').index
+        xpsr_index = CortexMCoreRegisterInfo.get('xpsr').index
+        selectors: Dict[int, None] = {}
+        for reg in reg_list:
+            info = CortexMCoreRegisterInfo.get(reg)
+            if info.is_double_float_register:
+                selectors[-reg] = None
+                selectors[-reg + 1] = None
+            elif info.is_cfbp_subregister:
+                selectors[cfbp_index] = None
+            elif info.is_psr_subregister:
+                selectors[xpsr_index] = None
+            else:
+                selectors[reg] = None
 
         # Begin all reads and writes
         dhcsr_cb_list = []
         reg_cb_list = []
-        for reg in reg_list:
-            if CortexMCoreRegisterInfo.get(reg).is_cfbp_subregister:
-                reg = CortexMCoreRegisterInfo.get('cfbp').index
-            elif CortexMCoreRegisterInfo.get(reg).is_psr_subregister:
-                reg = CortexMCoreRegisterInfo.get('xpsr').index
-
+        for selector in selectors:
             # write id in DCRSR
-            self.write_memory(CortexM.DCRSR, reg)
+            self.write_memory(CortexM.DCRSR, selector)
 
             # Technically, we need to poll S_REGRDY in DHCSR here before reading DCRDR. But
             # we're running so slow compared to the target that it's not necessary.
@@ -1237,43 +1233,33 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
             dhcsr_cb_list.append(dhcsr_cb)
             reg_cb_list.append(reg_cb)
 
-        # Read all results
-        reg_vals = []
+        # Read all results, checking S_REGRDY for each.
+        values = {}
         fail_list = []
-        for reg, reg_cb, dhcsr_cb in zip(reg_list, reg_cb_list, dhcsr_cb_list):
+        for selector, reg_cb, dhcsr_cb in zip(selectors, reg_cb_list, dhcsr_cb_list):
             dhcsr_val = dhcsr_cb()
             if (dhcsr_val & CortexM.S_REGRDY) == 0:
-                fail_list.append(reg)
-            val = reg_cb()
-
-            # Special handling for registers that are combined into a single DCRSR number.
-            if CortexMCoreRegisterInfo.get(reg).is_cfbp_subregister:
-                val = (val >> ((-reg - 1) * 8)) & 0xff
-            elif CortexMCoreRegisterInfo.get(reg).is_psr_subregister:
-                val &= CortexMCoreRegisterInfo.get(reg).psr_mask
-
-            reg_vals.append(val)
+                fail_list.append(selector)
+            values[selector] = reg_cb()
 
         if fail_list:
             raise exceptions.CoreRegisterAccessError("failed to read register{0} {1}".format(
                     "s" if (len(fail_list) > 1) else "",
                     ", ".join(CortexMCoreRegisterInfo.get(r).name for r in fail_list)))
 
-        # Merge double regs back into result list.
-        if hasDoubles:
-            results = []
-            for reg in originalRegList:
-                # Double
-                if CortexMCoreRegisterInfo.get(reg).is_double_float_register:
-                    doubleIndex = doubles.index(reg)
-                    singleLow = singleValues[doubleIndex * 2]
-                    singleHigh = singleValues[doubleIndex * 2 + 1]
-                    double = (singleHigh << 32) | singleLow
-                    results.append(double)
-                # Other register
-                else:
-                    results.append(reg_vals[reg_list.index(reg)])
-            reg_vals = results
+        # Build the result list in the requested order.
+        reg_vals = []
+        for reg in reg_list:
+            info = CortexMCoreRegisterInfo.get(reg)
+            if info.is_double_float_register:
+                val = (values[-reg + 1] << 32) | values[-reg]
+            elif info.is_cfbp_subregister:
+                val = (values[cfbp_index] >> ((-reg - 1) * 8)) & 0xff
+            elif info.is_psr_subregister:
+                val = values[xpsr_index] & info.psr_mask
+            else:
+                val = values[reg]
+            reg_vals.append(val)
 
         return reg_vals
 
@@ -184,6 +184,67 @@ class DWT(CoreSightComponent):
     def get_watchpoints(self):
         return [watch for watch in self.watchpoints if watch.func != 0]
 
+    def enable_pc_sampling(self, interval):
+        """@brief Enable periodic PC sample packets.
+
+        The sampling interval is derived from the cycle counter, and must be a multiple of 64 cycles
+        from 64 to 1024, or a multiple of 1024 cycles from 1024 to 16384. The requested interval is
+        rounded down to the nearest supported value, and to no less than 64 cycles.
+
+        For the samples to be output, the ITM must be enabled with DWT packet forwarding.
+
+        @param self
+        @param interval Requested number of CPU cycles between samples.
+        @return The actual number of cycles between samples.
+        """
+        if self.dwt_configured is False:
+            self.init()
+
+        if interval >= 2048:
+            cyctap = self.DWT_CTRL_CYCTAP_MASK
+            tap = 1024
+        else:
+            cyctap = 0
+            tap = 64
+        postpreset = min(max(interval // tap, 1), 16) - 1
+
+        # Sampling is disabled while changing the interval, which also resets the post counter.
+        ctrl = self.ap.read32(self.address + self.DWT_CTRL)
+        ctrl &= ~(self.DWT_CTRL_PCSAMPLENA_MASK | self.DWT_CTRL_CYCTAP_MASK | self.DWT_CTRL_POSTINIT_MASK
+                | self.DWT_CTRL_POSTRESET_MASK)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl)
+        ctrl |= (cyctap
+                | (postpreset << self.DWT_CTRL_POSTRESET_SHIFT)
+                | (postpreset << self.DWT_CTRL_POSTINIT_SHIFT)
+                | self.DWT_CTRL_CYCCNTENA_MASK)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl | self.DWT_CTRL_PCSAMPLENA_MASK)
+        return tap * (postpreset + 1)
+
+    def disable_pc_sampling(self):
+        """@brief Disable periodic PC sample packets."""
+        ctrl = self.ap.read32(self.address + self.DWT_CTRL)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl & ~self.DWT_CTRL_PCSAMPLENA_MASK)
+
+    def read_pc_samples(self, count=1):
+        """@brief Sample the PC by reading DWT_PCSR.
+
+        DWT_PCSR can be read while the core is running, without halting it. The reads are issued as a
+        single block of repeated reads of the register when the AP supports it.
+
+        Each value is the address of a recently executed instruction, or 0xFFFFFFFF if no sample was
+        available, for instance because the core was halted.
+
+        @param self
+        @param count Number of samples to take.
+        @return List of PC sample values.
+        """
+        addr = self.address + self.DWT_PCSR
+        read_repeated32 = getattr(self.ap, 'read_repeated32', None)
+        if read_repeated32 is not None:
+            return read_repeated32(addr, count)
+        return [self.ap.read32(addr) for _ in range(count)]
+
     @property
     def cycle_count(self):
         return self.ap.read32(self.address + self.DWT_CYCCNT)
@@ -22,12 +22,14 @@ from ..cache.register import RegisterCache
 class CachingDebugContext(DebugContext):
     """@brief Debug context combining register and memory caches."""
 
-    def __init__(self, parent, enable_memory: bool = True, enable_register: bool = True) -> None:
+    def __init__(self, parent, enable_memory: bool = True, enable_register: bool = True,
+            persist_flash: bool = False, memory_size_limit: int = 0) -> None:
         super().__init__(parent)
         self._enable_memory = enable_memory
         self._enable_register = enable_register
         self._regcache = RegisterCache(parent, self.core) if enable_register else parent
-        self._memcache = MemoryCache(parent, self.core) if enable_memory else parent
+        self._memcache = MemoryCache(parent, self.core, persist_flash=persist_flash,
+                size_limit=memory_size_limit) if enable_memory else parent
 
     def write_memory(self, addr, value, transfer_size=32):
         return self._memcache.write_memory(addr, value, transfer_size)
@@ -53,6 +55,14 @@ class CachingDebugContext(DebugContext):
     def write_core_registers_raw(self, reg_list, data_list):
         return self._regcache.write_core_registers_raw(reg_list, data_list)
 
+    def event_handler(self, notification):
+        """@brief Drop all cached memory, including persistent flash contents.
+
+        Intended to be subscribed to flash programming and reset notifications.
+        """
+        if self._enable_memory:
+            self._memcache.invalidate()
+
     def invalidate(self):
         if self._enable_register:
             self._regcache.invalidate()
@@ -0,0 +1,194 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+from enum import Enum
+from typing import (Callable, List, Optional, TYPE_CHECKING)
+
+from ..core import exceptions
+from ..core.target import Target
+
+if TYPE_CHECKING:
+    from ..core.session import Session
+
+LOG = logging.getLogger(__name__)
+
+TRACE = LOG.getChild("trace")
+TRACE.setLevel(logging.CRITICAL)
+
+class TargetStateMonitor(threading.Thread):
+    """@brief Background thread that watches a running target and reports when it stops.
+
+    While watching, the target's state is polled from this thread. The poll period starts at the
+    `debug.state_poll_min_interval` option and doubles after each poll that finds the target still running,
+    up to `debug.state_poll_max_interval`. This keeps halt detection fast after a resume that quickly hits
+    a breakpoint, while a target that runs for a long time only costs a few probe transactions a second.
+
+    When the target is found to be halted, watching stops, waiters are woken, and a `Target.Event.POST_HALT`
+    notification is sent through the session with the target as source. Waiters are also woken when a status
+    check starts or stops failing, and when wake() is called.
+
+    Poll hooks are called from the monitor thread just before each status check, so periodic work such as
+    draining RTT buffers shares the poll's cadence.
+
+    If a lock is provided, it is held while the target's state and halt reason are read, so the monitor's
+    probe accesses are serialized with those of other threads sharing the lock.
+    """
+
+    class _Status(Enum):
+        RUNNING = 1
+        STOPPED = 2
+        ERROR = 3
+
+    def __init__(self, session: "Session", target: Target, lock: Optional[threading.Lock] = None) -> None:
+        """@brief Constructor.
+        @param self
+        @param session The session, used for options and to send notifications.
+        @param target The target to watch.
+        @param lock Optional lock to hold while accessing the target.
+        """
+        super().__init__(name="state-monitor", daemon=True)
+        self._session = session
+        self._target = target
+        self._lock = lock if (lock is not None) else threading.Lock()
+        self._condition = threading.Condition()
+        self._wake_event = threading.Event()
+        self._is_watching = False
+        self._generation = 0
+        self._status = self._Status.RUNNING
+        self._interval = 0.0
+        self._max_interval = 0.0
+        self._poll_hooks: List[Callable[[], None]] = []
+        self._shutdown = False
+
+    def add_poll_hook(self, hook: Callable[[], None]) -> None:
+        """@brief Add a callable invoked before each status check while watching."""
+        self._poll_hooks.append(hook)
+
+    def start_watching(self, max_interval: Optional[float] = None) -> None:
+        """@brief Begin watching the target, which is expected to be running.
+
+        @param self
+        @param max_interval Optional limit on the poll period, overriding the `debug.state_poll_max_interval`
+            option if lower.
+        """
+        with self._condition:
+            self._generation += 1
+            self._is_watching = True
+            self._status = self._Status.RUNNING
+            self._interval = self._session.options.get('debug.state_poll_min_interval')
+            self._max_interval = self._session.options.get('debug.state_poll_max_interval')
+            if max_interval is not None:
+                self._max_interval = min(self._max_interval, max_interval)
+            self._condition.notify_all()
+
+    def stop_watching(self) -> None:
+        """@brief Stop polling the target.
+
+        A status check already in progress completes, but its result is discarded.
+        """
+        with self._condition:
+            self._generation += 1
+            self._is_watching = False
+            self._condition.notify_all()
+
+    @property
+    def is_watching(self) -> bool:
+        return self._is_watching
+
+    def wake(self) -> None:
+        """@brief Wake a thread blocked in wait()."""
+        self._wake_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """@brief Block until the target stops, its status check starts or stops failing, or wake() is called.
+
+        Wakeups are not queued beyond the first, so the caller should check the target state and any other
+        wake conditions after this method returns.
+
+        @param self
+        @param timeout Optional timeout in seconds.
+        @return Whether the wait was woken before the timeout.
+        """
+        did_wake = self._wake_event.wait(timeout)
+        self._wake_event.clear()
+        return did_wake
+
+    def stop(self) -> None:
+        """@brief Stop the monitor thread and wait for it to exit."""
+        with self._condition:
+            self._shutdown = True
+            self._is_watching = False
+            self._condition.notify_all()
+        if self.is_alive():
+            self.join()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not (self._is_watching or self._shutdown):
+                    self._condition.wait()
+                if self._shutdown:
+                    break
+
+                # Sleep for the poll period, returning early if watching is restarted or stopped.
+                generation = self._generation
+                interval = self._interval
+                self._condition.wait_for(lambda: self._generation != generation or self._shutdown, interval)
+                if self._generation != generation or self._shutdown:
+                    continue
+
+            self._poll(generation, interval)
+
+    def _poll(self, generation: int, interval: float) -> None:
+        for hook in self._poll_hooks:
+            try:
+                hook()
+            except exceptions.Error as err:
+                LOG.debug("Error from state monitor poll hook: %s", err)
+
+        state: Optional[Target.State] = None
+        try:
+            with self._lock:
+                state = self._target.get_state()
+            # Other states such as lockup are polled like running, since only a halt is reported to the debugger.
+            status = self._Status.STOPPED if (state == Target.State.HALTED) else self._Status.RUNNING
+        except exceptions.TransferError as err:
+            TRACE.debug("Error while polling target state: %s", err)
+            status = self._Status.ERROR
+
+        with self._condition:
+            # Discard the result if watching was restarted or stopped while polling.
+            if self._generation != generation:
+                return
+            did_change = (status != self._status)
+            self._status = status
+            if status == self._Status.STOPPED:
+                self._is_watching = False
+            else:
+                self._interval = min(interval * 2, self._max_interval)
+
+        if did_change:
+            TRACE.debug("Target status changed to %s (state %s)", status.name, state)
+            self._wake_event.set()
+            if state == Target.State.HALTED:
+                try:
+                    with self._lock:
+                        reason = self._target.get_halt_reason()
+                except exceptions.Error:
+                    reason = Target.HaltReason.DEBUG
+                self._session.notify(Target.Event.POST_HALT, self._target, reason)
@@ -17,18 +17,24 @@
 
 import logging
 import abc
-from dataclasses import dataclass
-from time import time
+import bisect
+from collections import deque
+from dataclasses import (dataclass, field)
+from time import (sleep, time)
 from binascii import crc32
-from typing import (Any, List, Optional, Union)
+from typing import (Any, Dict, List, Optional, Union)
 
 from ..core.target import Target
 from ..core.exceptions import (FlashFailure, FlashProgramFailure)
 from ..core.memory_map import MemoryRegion
 from ..utility.mask import same
+from ..utility.timeout import Timeout
+from .image_cache import (FlashImageCache, PageRecord)
 
 # Number of bytes in a page to read to quickly determine if the page has the same data
 PAGE_ESTIMATE_SIZE = 32
+# Maximum number of pages checked against the target before trusting a flash image cache record
+IMAGE_CACHE_SAMPLE_COUNT = 4
 DATA_TRANSFER_B_PER_S = 40 * 1000 # ~40KB/s, depends on clock speed, theoretical limit for HID is 56,000 B/s
 
 LOG = logging.getLogger(__name__)
@@ -60,6 +66,8 @@ class ProgrammingInfo:
     erase_sector_count: int = 0
     skipped_byte_count: int = 0
     skipped_page_count: int = 0
+    program_idle_time: float = 0.0          # Time the flash algorithm was halted waiting for the next page buffer
+    operation_timings: Dict[str, Dict[str, Any]] = field(default_factory=dict) # Flash algorithm durations learned by adaptive polling
 
 class MemoryBuilder(abc.ABC):
     """@brief Abstract class for memory builders."""
@@ -130,7 +138,7 @@ class _FlashPage:
     def __init__(self, page_info):
         self.addr: int = page_info.base_addr
         self.size: int = page_info.size
-        self.data: List[int] = []
+        self.data: Union[bytearray, memoryview] = bytearray()
         self.program_weight: float = page_info.program_weight
         self.erased: Optional[bool] = None # Whether the data all matches the erased value.
         self.same: Optional[bool] = None
@@ -181,12 +189,14 @@ class FlashBuilder(MemoryBuilder):
     # Type of flash analysis
     FLASH_ANALYSIS_CRC32 = "CRC32"
     FLASH_ANALYSIS_PARTIAL_PAGE_READ = "PAGE_READ"
+    FLASH_ANALYSIS_IMAGE_CACHE = "IMAGE_CACHE"
 
     def __init__(self, flash):
         super().__init__()
         self.flash = flash
         self.flash_start = flash.region.start
         self.flash_operation_list = []
+        self._flash_operation_addrs = [] # Sorted start addresses of flash_operation_list entries.
         self.sector_list = []
         self.page_list = []
         self.perf = ProgrammingInfo()
@@ -200,6 +210,7 @@ class FlashBuilder(MemoryBuilder):
         self.sector_erase_count = 0 # Number of pages to program using sector erase method.
         self.sector_erase_weight = 0 # Erase/program weight using sector erase method.
         self.algo_inited_for_read = False
+        self._image_cache: Optional[FlashImageCache] = None
 
     @property
     def region(self) -> MemoryRegion:
@@ -216,7 +227,8 @@ class FlashBuilder(MemoryBuilder):
         @param self
         @param addr Base address of the block of data passed to this method. The entire block of
             data must be contained within the flash memory region associated with this instance.
-        @param data Data to be programmed. Should be a list of byte values.
+        @param data Data to be programmed. Either a list of byte values or a bytes-like object. A
+            memoryview is kept without copying until the data is split into pages.
 
         @exception ValueError Attempt to add overlapping data, or address range of added data is
             outside the address range of the flash region associated with the builder.
@@ -230,23 +242,25 @@ class FlashBuilder(MemoryBuilder):
             raise ValueError("Flash address range 0x%x-0x%x is not contained within region '%s'" %
                 (addr, addr + len(data) - 1, self.flash.region.name))
 
-        # Add operation to list
-        self.flash_operation_list.append(_FlashOperation(addr, data))
+        # Find where the operation goes in the sorted list, and verify it does not overlap its neighbours.
+        new_operation = _FlashOperation(addr, data)
+        index = bisect.bisect_right(self._flash_operation_addrs, addr)
+        neighbours = ((self.flash_operation_list[index - 1], new_operation) if index > 0 else None,
+                    (new_operation, self.flash_operation_list[index]) if index < len(self.flash_operation_list) else None)
+        for pair in neighbours:
+            if pair is None:
+                continue
+            prev_flash_operation, operation = pair
+            if prev_flash_operation.addr + len(prev_flash_operation.data) > operation.addr:
+                raise ValueError("Error adding data - Data at 0x%x..0x%x overlaps with 0x%x..0x%x"
+                        % (prev_flash_operation.addr, prev_flash_operation.addr + len(prev_flash_operation.data),
+                           operation.addr, operation.addr + len(operation.data)))
+
+        # Add operation to list, keeping it sorted
+        self.flash_operation_list.insert(index, new_operation)
+        self._flash_operation_addrs.insert(index, addr)
         self._buffered_data_size += len(data)
 
-        # Keep list sorted
-        self.flash_operation_list = sorted(self.flash_operation_list, key=lambda operation: operation.addr)
-
-        # Verify this does not overlap
-        prev_flash_operation = None
-        for operation in self.flash_operation_list:
-            if prev_flash_operation is not None:
-                if prev_flash_operation.addr + len(prev_flash_operation.data) > operation.addr:
-                    raise ValueError("Error adding data - Data at 0x%x..0x%x overlaps with 0x%x..0x%x"
-                            % (prev_flash_operation.addr, prev_flash_operation.addr + len(prev_flash_operation.data),
-                               operation.addr, operation.addr + len(operation.data)))
-            prev_flash_operation = operation
-
     def _enable_read_access(self):
         """@brief Ensure flash is accessible by initing the algo for verify.
 
@@ -346,7 +360,11 @@ class FlashBuilder(MemoryBuilder):
                 space_left_in_page = page_info.size - len(current_page.data)
                 space_left_in_data = len(flash_operation.data) - pos
                 amount = min(space_left_in_page, space_left_in_data)
-                current_page.data.extend(flash_operation.data[pos:pos + amount])
+                if (amount == current_page.size) and isinstance(flash_operation.data, memoryview):
+                    # Whole page from a view, so reference it instead of copying.
+                    current_page.data = flash_operation.data[pos:pos + amount]
+                else:
+                    current_page.data.extend(flash_operation.data[pos:pos + amount])
                 self.program_byte_count += amount
 
                 #increment position
@@ -371,7 +389,7 @@ class FlashBuilder(MemoryBuilder):
                     raise FlashFailure("attempt to program invalid flash address", address=sector_page_addr)
                 new_page = _FlashPage(page_info)
                 self._enable_read_access()
-                new_page.data = self.flash.target.read_memory_block8(new_page.addr, new_page.size)
+                new_page.data = bytearray(self.flash.target.read_memory_block8(new_page.addr, new_page.size))
                 new_page.same = True
                 sector.add_page(new_page)
                 self.page_list.append(new_page)
@@ -460,6 +478,10 @@ class FlashBuilder(MemoryBuilder):
         self._build_sectors_and_pages(keep_unwritten)
         assert len(self.sector_list) != 0 and len(self.sector_list[0].page_list) != 0
         self.flash_operation_list = [] # Don't need this data in memory anymore.
+        self._flash_operation_addrs = []
+
+        # Load the image cache. Its record is written again only once programming succeeds.
+        self._image_cache = FlashImageCache.for_flash(self.flash)
 
         # If smart flash was set to false then mark all pages
         # as requiring programming
@@ -499,15 +521,18 @@ class FlashBuilder(MemoryBuilder):
             LOG.debug("Chip erase weight %f, sector erase weight %f" % (chip_erase_program_time, page_program_time))
             chip_erase = chip_erase_program_time < page_program_time
 
+        if self._image_cache is not None:
+            self._image_cache.invalidate()
+
         if chip_erase:
             if self.flash.is_double_buffering_supported and self.enable_double_buffering:
-                LOG.debug("Using double buffer chip erase program")
+                LOG.debug("Using %d page buffer chip erase program", self.flash.page_buffer_count)
                 flash_operation = self._chip_erase_program_double_buffer(progress_cb)
             else:
                 flash_operation = self._chip_erase_program(progress_cb)
         else:
             if self.flash.is_double_buffering_supported and self.enable_double_buffering:
-                LOG.debug("Using double buffer sector erase program")
+                LOG.debug("Using %d page buffer sector erase program", self.flash.page_buffer_count)
                 flash_operation = self._sector_erase_program_double_buffer(progress_cb)
             else:
                 flash_operation = self._sector_erase_program(progress_cb)
@@ -547,6 +572,7 @@ class FlashBuilder(MemoryBuilder):
         self.perf.erase_sector_count = erase_sector_count
         self.perf.skipped_byte_count = skipped_byte_count
         self.perf.skipped_page_count = skipped_page_count
+        self.perf.operation_timings = self.flash.get_operation_metrics()
 
         if self.log_performance:
             if chip_erase:
@@ -560,6 +586,13 @@ class FlashBuilder(MemoryBuilder):
                     actual_program_byte_count, get_page_count(actual_program_page_count),
                     skipped_byte_count, get_page_count(skipped_page_count),
                     ((self.program_byte_count/1024) / self.perf.program_time))
+            for name, timing in self.perf.operation_timings.items():
+                LOG.debug("Flash algorithm %s: %d calls, %.06f s average, %d polls",
+                    name, timing['count'], timing['average_time'], timing['polls'])
+
+        if self._image_cache is not None:
+            self._image_cache.save({page.addr: PageRecord.for_data(page.data, page.size)
+                    for page in self.page_list})
 
         # Send notification that we're done programming flash.
         self.flash.target.session.notify(Target.Event.POST_FLASH_PROGRAM, self)
@@ -638,11 +671,11 @@ class FlashBuilder(MemoryBuilder):
                 sector_list.append((page.addr, page.size))
                 page_list.append(page)
                 # Compute CRC of data (Padded with 0xFF)
-                data = list(page.data)
+                data = bytearray(page.data)
                 pad_size = page.size - len(page.data)
                 if pad_size > 0:
-                    data.extend([0xFF] * pad_size)
-                page.crc = crc32(bytearray(data)) & 0xFFFFFFFF
+                    data.extend(b'\xff' * pad_size)
+                page.crc = crc32(data) & 0xFFFFFFFF
 
         # Analyze pages
         if len(page_list) > 0:
@@ -655,6 +688,57 @@ class FlashBuilder(MemoryBuilder):
                 elif page_same is False:
                     page.same = False
 
+    def _analyze_pages_with_image_cache(self):
+        """@brief Classify pages using the record of the last image programmed into this region.
+
+        Pages whose new data matches the record are marked as the same, and pages whose data differs
+        are marked as not the same. Before the record is trusted, a sample of the classified pages is
+        checked against the target, using the CRC32 analyzer if supported or by reading flash. If
+        any sampled page differs from the record, flash was modified by something else and the
+        record is ignored.
+        """
+        assert self._image_cache is not None
+        records = self._image_cache.load()
+        if not records:
+            return
+
+        matched = []
+        changed = []
+        for page in self.page_list:
+            record = records.get(page.addr)
+            if (page.same is not None) or (record is None) or (record.size != page.size):
+                continue
+            if record.digest == PageRecord.for_data(page.data, page.size).digest:
+                matched.append(page)
+            else:
+                changed.append(page)
+        classified = matched + changed
+        if not classified:
+            return
+
+        # Check an evenly spaced sample of the recorded pages against the target.
+        sample_count = min(len(classified), IMAGE_CACHE_SAMPLE_COUNT)
+        sample = [classified[i * len(classified) // sample_count] for i in range(sample_count)]
+        if self.flash.get_flash_info().crc_supported:
+            self._enable_read_access()
+            crc_list = self.flash.compute_crcs([(page.addr, page.size) for page in sample])
+        elif self.flash.region.is_readable:
+            self._enable_read_access()
+            crc_list = [crc32(bytearray(self.flash.target.read_memory_block8(page.addr, page.size))) & 0xFFFFFFFF
+                    for page in sample]
+        else:
+            return
+        if any(crc != records[page.addr].crc for page, crc in zip(sample, crc_list)):
+            LOG.info("Flash contents differ from the image cache record; analyzing flash")
+            return
+
+        for page in matched:
+            page.same = True
+        for page in changed:
+            page.same = False
+        self.perf.analyze_type = FlashBuilder.FLASH_ANALYSIS_IMAGE_CACHE
+        LOG.debug("Image cache: %d pages unchanged, %d pages changed", len(matched), len(changed))
+
     def _compute_sector_erase_pages_and_weight(self, fast_verify):
         """@brief Quickly analyze flash contents and compute weights for sector erase.
 
@@ -664,6 +748,10 @@ class FlashBuilder(MemoryBuilder):
         """
         analyze_start = time()
 
+        # Classify pages recorded by the image cache, then analyze the rest.
+        if (self._image_cache is not None) and any(page.same is None for page in self.page_list):
+            self._analyze_pages_with_image_cache()
+
         # Analyze unknown pages using either CRC32 analyzer or partial reads.
         if any(page.same is None for page in self.page_list):
             if self.flash.get_flash_info().crc_supported:
@@ -728,25 +816,12 @@ class FlashBuilder(MemoryBuilder):
         progress_cb(1.0)
         return FlashBuilder.FLASH_CHIP_ERASE
 
-    def _next_unerased_page(self, i):
-        if i >= len(self.page_list):
-            return None, i
-        page = self.page_list[i]
-        while page.erased:
-            i += 1
-            if i >= len(self.page_list):
-                return None, i
-            page = self.page_list[i]
-        return page, i + 1
-
     def _chip_erase_program_double_buffer(self, progress_cb=_stub_progress):
-        """@brief Double-buffered program by first performing an erase all."""
+        """@brief Program using all page buffers by first performing an erase all."""
         LOG.debug("%i of %i pages have erased data", len(self.page_list) - self.chip_erase_count, len(self.page_list))
         progress_cb(0.0)
         progress = 0
 
-        program_timeout = self.flash.target.session.options.get('flash.timeout.program')
-
         self.flash.init(self.flash.Operation.ERASE)
         self.flash.erase_all()
         self.flash.uninit()
@@ -754,41 +829,11 @@ class FlashBuilder(MemoryBuilder):
         progress += self.flash.get_flash_info().erase_weight
         progress_cb(float(progress) / float(self.chip_erase_weight))
 
-        # Set up page and buffer info.
-        current_buf = 0
-        next_buf = 1
-        page, i = self._next_unerased_page(0)
-        assert page is not None
-
-        # Load first page buffer
-        self.flash.load_page_buffer(current_buf, page.addr, page.data)
+        pages = [page for page in self.page_list if not page.erased]
+        assert pages
 
         self.flash.init(self.flash.Operation.PROGRAM)
-        while page is not None:
-            # Kick off this page program.
-            current_addr = page.addr
-            current_weight = page.get_program_weight()
-            self.flash.start_program_page_with_buffer(current_buf, current_addr)
-
-            # Get next page and load it.
-            page, i = self._next_unerased_page(i)
-            if page is not None:
-                self.flash.load_page_buffer(next_buf, page.addr, page.data)
-
-            # Wait for the program to complete.
-            result = self.flash.wait_for_completion(timeout=program_timeout)
-            if result == self.flash.TIMEOUT_ERROR:
-                raise FlashProgramFailure('flash program page timeout', address=current_addr, result_code=result)
-            elif result != 0:
-                raise FlashProgramFailure('flash program page failure', address=current_addr, result_code=result)
-
-            # Swap buffers.
-            current_buf, next_buf = next_buf, current_buf
-
-            # Update progress.
-            progress += current_weight
-            progress_cb(float(progress) / float(self.chip_erase_weight))
-
+        self._program_pages_with_buffers(pages, progress, self.chip_erase_weight, progress_cb)
         self.flash.uninit()
         progress_cb(1.0)
         return FlashBuilder.FLASH_CHIP_ERASE
@@ -888,27 +933,13 @@ class FlashBuilder(MemoryBuilder):
 
         return progress
 
-    def _next_nonsame_page(self, i):
-        if i >= len(self.page_list):
-            return None, i
-        page = self.page_list[i]
-        while page.same:
-            i += 1
-            if i >= len(self.page_list):
-                return None, i
-            page = self.page_list[i]
-        return page, i + 1
-
     def _sector_erase_program_double_buffer(self, progress_cb=_stub_progress):
-        """@brief Double-buffered program by performing sector erases."""
+        """@brief Program using all page buffers by performing sector erases."""
         actual_sector_erase_count = 0
-        actual_sector_erase_weight = 0
         progress = 0
 
         progress_cb(0.0)
 
-        program_timeout = self.flash.target.session.options.get('flash.timeout.program')
-
         # Fill in same flag for all pages. This is done up front so we're not trying
         # to read from flash while simultaneously programming it.
         progress = self._scan_pages_for_same(progress_cb)
@@ -935,55 +966,93 @@ class FlashBuilder(MemoryBuilder):
 
             self.flash.uninit()
 
-        # Set up page and buffer info.
-        current_buf = 0
-        next_buf = 1
-        page, i = self._next_nonsame_page(0)
-
         # Make sure there are actually pages to program differently from current flash contents.
-        if page is not None:
+        pages = [page for page in self.page_list if not page.same]
+        if pages:
             self.flash.init(self.flash.Operation.PROGRAM)
+            self._program_pages_with_buffers(pages, progress, self.sector_erase_weight, progress_cb)
+            actual_sector_erase_count = len(pages)
+            self.flash.uninit()
 
-            # Load first page buffer
-            self.flash.load_page_buffer(current_buf, page.addr, page.data)
-
-            while page is not None:
-                assert page.same is not None
-
-                # Kick off this page program.
-                current_addr = page.addr
-                current_weight = page.get_program_weight()
+        progress_cb(1.0)
 
-                self.flash.start_program_page_with_buffer(current_buf, current_addr)
+        LOG.debug("Estimated sector erase programmed page count: %i", self.sector_erase_count)
+        LOG.debug("Actual sector erase programmed page count: %i", actual_sector_erase_count)
 
-                actual_sector_erase_count += 1
-                actual_sector_erase_weight += page.get_program_weight()
+        return FlashBuilder.FLASH_SECTOR_ERASE
 
-                # Get next page and load it.
-                page, i = self._next_nonsame_page(i)
-                if page is not None:
-                    self.flash.load_page_buffer(next_buf, page.addr, page.data)
+    def _program_pages_with_buffers(self, pages, progress, total_weight, progress_cb=_stub_progress):
+        """@brief Program pages, using every page buffer of the flash algorithm as a queue.
 
-                # Wait for the program to complete.
-                result = self.flash.wait_for_completion(timeout=program_timeout)
-                if result == self.flash.TIMEOUT_ERROR:
-                    raise FlashProgramFailure('flash program page timeout', address=current_addr, result_code=result)
-                elif result != 0:
-                    raise FlashProgramFailure('flash program page failure', address=current_addr, result_code=result)
+        While the algorithm programs one buffer, the next pending page is loaded into a free buffer.
+        Buffer loads are queued by the probe, so each is sent in the same transfer batch as the core
+        state read that polls for completion. As soon as a page is done, the algorithm is started on
+        the next loaded buffer before any more data is sent.
 
-                # Swap buffers.
-                current_buf, next_buf = next_buf, current_buf
+        The flash algorithm must already be initialized for programming.
 
-                # Update progress
-                progress += current_weight
-                if self.sector_erase_weight > 0:
-                    progress_cb(float(progress) / float(self.sector_erase_weight))
+        @param self
+        @param pages List of pages to program, in order.
+        @param progress Progress value when programming starts.
+        @param total_weight The progress value that corresponds to 100%.
+        @param progress_cb Progress callback.
+        @return Progress value after all pages are programmed.
+        """
+        program_timeout = self.flash.target.session.options.get('flash.timeout.program')
+        free_buffers = deque(range(self.flash.page_buffer_count))
+        loaded_pages = deque() # Pairs of (buffer number, page) ready to be programmed.
+        remaining_pages = iter(pages)
+        next_page = next(remaining_pages, None)
+        idle_start = None
+
+        def load_next_page():
+            nonlocal next_page
+            buffer_number = free_buffers.popleft()
+            self.flash.load_page_buffer(buffer_number, next_page.addr, next_page.data)
+            loaded_pages.append((buffer_number, next_page))
+            next_page = next(remaining_pages, None)
+
+        while True:
+            # If loading has fallen behind, the algorithm has to wait for the next page.
+            if not loaded_pages and (next_page is not None):
+                load_next_page()
+            if not loaded_pages:
+                break
 
-            self.flash.uninit()
+            # Kick off this page program.
+            buffer_number, page = loaded_pages.popleft()
+            self.flash.start_program_page_with_buffer(buffer_number, page.addr)
+            if idle_start is not None:
+                self.perf.program_idle_time += time() - idle_start
+
+            # Fill free buffers while waiting for the program to complete.
+            with Timeout(program_timeout) as time_out:
+                while True:
+                    if free_buffers and (next_page is not None):
+                        load_next_page()
+                    else:
+                        delay = self.flash.poll_delay()
+                        if delay:
+                            sleep(delay)
+                    result = self.flash.poll_completion()
+                    if result is not None:
+                        break
+                    if not time_out.check():
+                        self.flash.halt_operation()
+                        result = self.flash.TIMEOUT_ERROR
+                        break
+            idle_start = time()
 
-        progress_cb(1.0)
+            if result == self.flash.TIMEOUT_ERROR:
+                raise FlashProgramFailure('flash program page timeout', address=page.addr, result_code=result)
+            elif result != 0:
+                raise FlashProgramFailure('flash program page failure', address=page.addr, result_code=result)
+            free_buffers.append(buffer_number)
 
-        LOG.debug("Estimated sector erase programmed page count: %i", self.sector_erase_count)
-        LOG.debug("Actual sector erase programmed page count: %i", actual_sector_erase_count)
+            # Update progress.
+            progress += page.get_program_weight()
+            if total_weight > 0:
+                progress_cb(float(progress) / float(total_weight))
 
-        return FlashBuilder.FLASH_SECTOR_ERASE
+        LOG.debug("Flash algorithm idle time between pages: %f", self.perf.program_idle_time)
+        return progress
@@ -0,0 +1,279 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from typing import (Callable, List, Optional, Sequence, Tuple, TYPE_CHECKING, Union)
+from zlib import crc32
+
+from ..core import exceptions
+from ..core.target import Target
+from ..utility.mask import (align_down, align_up)
+
+if TYPE_CHECKING:
+    from ..core.memory_interface import MemoryInterface
+    from .flash import Flash
+
+LOG = logging.getLogger(__name__)
+
+ByteData = Union[bytes, bytearray, memoryview]
+
+## Size of the chunks that memory is read in when comparing on the host.
+COMPARE_CHUNK_SIZE = 32 * 1024
+
+class TargetChecksumError(exceptions.TargetError):
+    """@brief The CRC analyzer did not run to completion on the target."""
+    pass
+
+def find_mismatch(a: ByteData, b: ByteData) -> Optional[int]:
+    """@brief Find the first byte that differs between two byte sequences of the same length.
+
+    Equal sequences are detected with a single comparison. Otherwise the mismatch is located by
+    comparing ever smaller halves of the data as memoryview slices, so no per-byte Python loop is run
+    over more than a few bytes.
+
+    @return Offset of the first differing byte, or None if the sequences are equal.
+    """
+    a = memoryview(a).cast('B')
+    b = memoryview(b).cast('B')
+    assert len(a) == len(b)
+    if a == b:
+        return None
+    lo = 0
+    hi = len(a)
+    while hi - lo > 64:
+        mid = (lo + hi) // 2
+        if a[lo:mid] != b[lo:mid]:
+            hi = mid
+        else:
+            lo = mid
+    for i in range(lo, hi):
+        if a[i] != b[i]:
+            return i
+    return None
+
+def compare_by_reading(memory: "MemoryInterface", addr: int, data: ByteData,
+        progress: Optional[Callable[[int, int], None]] = None) -> Optional[int]:
+    """@brief Compare memory against data by reading the memory back.
+    @param memory Memory interface used to read the memory.
+    @param addr Start address.
+    @param data Expected contents of memory.
+    @param progress Optional callable, passed the address and size of each chunk before it is read.
+    @return Offset of the first mismatched byte, or None if all bytes match.
+    """
+    data = memoryview(data).cast('B')
+    for offset in range(0, len(data), COMPARE_CHUNK_SIZE):
+        expected = data[offset:offset + COMPARE_CHUNK_SIZE]
+        if progress is not None:
+            progress(addr + offset, len(expected))
+        actual = bytes(memory.read_memory_block8(addr + offset, len(expected)))
+        mismatch = find_mismatch(actual, expected)
+        if mismatch is not None:
+            return offset + mismatch
+    return None
+
+class TargetChecksum:
+    """@brief Computes CRC32 checksums of target memory on the target itself.
+
+    The CRC32 analyzer program shipped with the flash algorithms is loaded into target RAM and run on
+    the core, so only the checksums are transferred instead of the memory contents. The analyzer can
+    hash any memory the core can read, not only flash.
+
+    The RAM used by the analyzer and the core registers are saved before the analyzer is run and
+    restored afterwards, so a halted program can still be resumed. Interrupts are masked with PRIMASK
+    while the analyzer runs, so pending interrupts cannot run the program's handlers.
+    """
+
+    ## Number of bytes of RAM used by the analyzer code and its CRC table.
+    ANALYZER_SIZE = 0x600
+
+    ## Number of bytes of stack saved below the flash algo's initial stack pointer.
+    STACK_SIZE = 64
+
+    ## Smallest block size hashed by the analyzer. Smaller blocks are compared on the host.
+    MIN_BLOCK_SIZE = 1024
+
+    ## Registers modified by running the analyzer.
+    #
+    # CFBP holds CONTROL, FAULTMASK, BASEPRI and PRIMASK. Both stack pointers are saved since CONTROL.SPSEL
+    # is cleared for the run, which selects MSP as the stack pointer.
+    SAVED_REGISTERS = ['r0', 'r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9', 'r10', 'r11', 'r12',
+            'lr', 'pc', 'xpsr', 'msp', 'psp', 'cfbp']
+
+    ## CFBP value for running the analyzer: privileged, using MSP, with PRIMASK set to mask interrupts.
+    ANALYZER_CFBP = 0x00000001
+
+    def __init__(self, target: Target, flash: Optional["Flash"] = None) -> None:
+        """@brief Constructor.
+        @param self
+        @param target The target whose memory is hashed.
+        @param flash Flash object providing the analyzer's RAM locations. If not provided, the first
+            flash region with an analyzer-capable flash algo is used.
+        """
+        self._target = target
+        self._flash = flash if (flash is not None) else self._find_flash(target)
+
+    @staticmethod
+    def _find_flash(target: Target) -> Optional["Flash"]:
+        for region in target.memory_map.iter_matching_regions(is_flash=True):
+            flash = region.flash
+            if (flash is not None) and flash.is_valid and flash.use_analyzer \
+                    and ('analyzer_address' in flash.flash_algo):
+                return flash
+        return None
+
+    @property
+    def is_available(self) -> bool:
+        """@brief Whether an analyzer is available for this target."""
+        return self._flash is not None
+
+    @property
+    def _max_blocks(self) -> int:
+        """@brief Number of blocks that fit in the analyzer's data buffer."""
+        region = self._flash.region
+        page_size = region.page_size if (region is not None) else self.MIN_BLOCK_SIZE
+        return max(page_size // 4, 1)
+
+    def block_size_for(self, end: int) -> int:
+        """@brief Choose the block size for hashing memory below an end address.
+
+        The analyzer takes each block's address as a 16-bit multiple of the block size, so blocks
+        must grow for higher addresses.
+        """
+        size = self.MIN_BLOCK_SIZE
+        while (end - 1) // size >= 0x10000:
+            size *= 2
+        return size
+
+    def _save_state(self) -> Tuple[List[int], List[Tuple[int, List[int]]]]:
+        flash = self._flash
+        ranges = [
+            (flash.flash_algo['load_address'], 4),
+            (flash.flash_algo['analyzer_address'], self.ANALYZER_SIZE),
+            (flash.begin_data, self._max_blocks * 4),
+            (flash.begin_stack - self.STACK_SIZE, self.STACK_SIZE),
+            ]
+        registers = self._target.read_core_registers_raw(self.SAVED_REGISTERS)
+        memory = [(addr, self._target.read_memory_block32(addr, size // 4)) for addr, size in ranges]
+        return registers, memory
+
+    def _restore_state(self, state: Tuple[List[int], List[Tuple[int, List[int]]]]) -> None:
+        registers, memory = state
+        for addr, words in memory:
+            self._target.write_memory_block32(addr, words)
+        self._target.write_core_registers_raw(self.SAVED_REGISTERS, registers)
+
+    def crc32_blocks(self, blocks: Sequence[Tuple[int, int]]) -> List[int]:
+        """@brief Compute the CRC32 of memory blocks on the target.
+
+        The target must be halted.
+
+        @param self
+        @param blocks Sequence of (address, size) tuples. Each size must be a power of two, and each
+            address a multiple of its size that is less than 0x10000 times the size.
+        @return List of the CRC32 of each block, as computed by zlib.crc32().
+        @exception TargetChecksumError The analyzer did not complete.
+        """
+        assert self.is_available
+        flash = self._flash
+        breakpoint_addr = flash.flash_algo['load_address']
+        crcs: List[int] = []
+
+        state = self._save_state()
+        try:
+            # The analyzer returns to the flash algo's breakpoint instruction at the load address.
+            self._target.write32(breakpoint_addr, flash.flash_algo['instructions'][0])
+            for start in range(0, len(blocks), self._max_blocks):
+                batch = blocks[start:start + self._max_blocks]
+                self._target.write_core_registers_raw(['cfbp', 'sp', 'xpsr'],
+                        [self.ANALYZER_CFBP, flash.begin_stack, 1 << 24])
+                batch_crcs = flash.compute_crcs(batch)
+                if (self._target.read_core_register('pc') & ~1) != breakpoint_addr:
+                    raise TargetChecksumError("CRC analyzer did not complete")
+                crcs.extend(batch_crcs)
+        finally:
+            self._restore_state(state)
+        return crcs
+
+    def compare(self, addr: int, data: ByteData, memory: Optional["MemoryInterface"] = None) -> Optional[int]:
+        """@brief Compare target memory against data.
+
+        The part of the range made of whole blocks is checked with the analyzer. Unaligned edges of
+        the range and blocks whose CRC differs are read back and compared on the host. The target
+        must be halted.
+
+        @param self
+        @param addr Start address.
+        @param data Expected contents of memory.
+        @param memory Memory interface used for reads. Defaults to the target.
+        @return Offset of the first mismatched byte, or None if all bytes match.
+        @exception TargetChecksumError The analyzer did not complete.
+        """
+        if memory is None:
+            memory = self._target
+        data = memoryview(data).cast('B')
+        end = addr + len(data)
+        block_size = self.block_size_for(end)
+        blocks_start = align_up(addr, block_size)
+        blocks_end = align_down(end, block_size)
+        if blocks_start >= blocks_end:
+            return compare_by_reading(memory, addr, data)
+
+        # Leading partial block.
+        head = blocks_start - addr
+        mismatch = compare_by_reading(memory, addr, data[:head])
+        if mismatch is not None:
+            return mismatch
+
+        blocks = [(block, block_size) for block in range(blocks_start, blocks_end, block_size)]
+        crcs = self.crc32_blocks(blocks)
+        for (block, _), crc in zip(blocks, crcs):
+            offset = block - addr
+            expected = data[offset:offset + block_size]
+            if crc32(expected) & 0xffffffff != crc:
+                mismatch = compare_by_reading(memory, block, expected)
+                # A CRC mismatch means the data differs, unless memory changed since it was hashed.
+                if mismatch is not None:
+                    return offset + mismatch
+
+        # Trailing partial block.
+        tail = blocks_end - addr
+        mismatch = compare_by_reading(memory, blocks_end, data[tail:])
+        if mismatch is not None:
+            return tail + mismatch
+        return None
+
+def compare_memory(target: Target, addr: int, data: ByteData,
+        memory: Optional["MemoryInterface"] = None) -> Optional[int]:
+    """@brief Compare target memory against data, hashing it on the target when possible.
+
+    The CRC32 analyzer is used if the target has one and is halted. Otherwise, or if the analyzer
+    fails, the memory is read back and compared on the host.
+
+    @param target The target.
+    @param addr Start address.
+    @param data Expected contents of memory.
+    @param memory Memory interface used for reads. Defaults to the target.
+    @return Offset of the first mismatched byte, or None if all bytes match.
+    """
+    if memory is None:
+        memory = target
+    checksum = TargetChecksum(target)
+    if checksum.is_available and target.get_state() == Target.State.HALTED:
+        try:
+            return checksum.compare(addr, data, memory)
+        except (TargetChecksumError, exceptions.TransferError) as err:
+            LOG.debug("On-target CRC failed (%s); comparing on the host", err)
+    return compare_by_reading(memory, addr, data)
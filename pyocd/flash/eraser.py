@@ -19,6 +19,7 @@ import logging
 from enum import Enum
 
 from ..core.memory_map import MemoryType
+from ..core.target import Target
 
 LOG = logging.getLogger(__name__)
 
@@ -73,14 +74,21 @@ class FlashEraser(object):
         @param self
         @param addresses List of addresses or address ranges of the sectors to erase.
         """
-        if self._mode == self.Mode.MASS:
-            self._mass_erase()
-        elif self._mode == self.Mode.CHIP:
-            self._chip_erase()
-        elif self._mode == self.Mode.SECTOR and addresses:
-            self._sector_erase(addresses)
-        else:
+        if self._mode == self.Mode.SECTOR and not addresses:
             LOG.warning("No operation performed")
+            return
+
+        # Send the flash programming notifications so cached flash contents are invalidated.
+        self._session.notify(Target.Event.PRE_FLASH_PROGRAM, self)
+        try:
+            if self._mode == self.Mode.MASS:
+                self._mass_erase()
+            elif self._mode == self.Mode.CHIP:
+                self._chip_erase()
+            else:
+                self._sector_erase(addresses)
+        finally:
+            self._session.notify(Target.Event.POST_FLASH_PROGRAM, self)
 
     def _mass_erase(self):
         LOG.info("Mass erasing device...")
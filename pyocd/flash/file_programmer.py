@@ -15,16 +15,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from contextlib import contextmanager
 import errno
-import itertools
 import logging
+import mmap
 import os
-from typing import (IO, TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union)
+from typing import (IO, TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence,
+        Tuple, Union)
 
 from elftools.elf.elffile import ELFFile
-from intelhex import IntelHex
+from intervaltree import IntervalTree
 
 from ..core import exceptions
+from .builder import ProgrammingInfo
+from .checksum import compare_memory
 from .loader import (FlashLoader, ProgressCallback)
 
 if TYPE_CHECKING:
@@ -32,17 +36,6 @@ if TYPE_CHECKING:
 
 LOG = logging.getLogger(__name__)
 
-def ranges(i: List[int]) -> Iterator[Tuple[int, int]]:
-    """Accepts a sorted list of byte addresses. Breaks the addresses into contiguous ranges.
-    Yields 2-tuples of the start and end address for each contiguous range.
-
-    For instance, the input [0, 1, 2, 3, 32, 33, 34, 35] will yield the following 2-tuples:
-    (0, 3) and (32, 35).
-    """
-    for a, b in itertools.groupby(enumerate(i), lambda x: x[1] - x[0]):
-        b = list(b)
-        yield b[0][1], b[-1][1]
-
 class FileProgrammer(object):
     """@brief Class to manage programming a file in any supported format with many options.
 
@@ -96,28 +89,16 @@ class FileProgrammer(object):
         self._progress = progress
         self._loader = None
 
-        self._format_handlers: Dict[str, Callable[..., None]] = {
-            'axf': self._program_elf,
-            'bin': self._program_bin,
-            'elf': self._program_elf,
-            'hex': self._program_hex,
-            }
+    @classmethod
+    def parse(cls, file_or_path: Union[str, IO[bytes]], file_format: Optional[str] = None,
+            **kwargs: Any) -> "ParsedImage":
+        """@brief Extract the data to be programmed from a file, without accessing any target.
 
-    def program(self, file_or_path: Union[str, IO[bytes]], file_format: Optional[str] = None, **kwargs: Any):
-        """@brief Program a file into flash.
+        The returned image can be passed to program() in place of the file, any number of times and
+        for any number of sessions. This avoids parsing the same file again when programming
+        several targets.
 
-        @param self
-        @param file_or_path Either a string that is a path to a file, or a file-like object.
-        @param file_format Optional file format name, one of "bin", "hex", "elf", "axf". If not provided,
-            the file's extension will be used. If a file object is passed for _file_or_path_ then
-            this parameter must be used to set the format.
-        @param kwargs Optional keyword arguments for format-specific parameters.
-
-        The only current format-specific keyword parameters are for the binary format:
-        - `base_address`: Memory address at which to program the binary data. If not set, the base
-            of the boot memory will be used.
-        - `skip`: Number of bytes to skip at the start of the binary file. Does not affect the
-            base address.
+        The parameters are the same as for program().
 
         @exception FileNotFoundError Provided file_or_path string does not reference a file.
         @exception ValueError Invalid argument value, for instance providing a file object but
@@ -142,18 +123,17 @@ class FileProgrammer(object):
             else:
                 raise ValueError("file object provided but no format is set")
 
+        format_parsers: Dict[str, Callable[..., ParsedImage]] = {
+            'axf': cls._parse_elf,
+            'bin': cls._parse_bin,
+            'elf': cls._parse_elf,
+            'hex': cls._parse_hex,
+            }
+
         # Check the format is one we understand.
-        if file_format is None or file_format not in self._format_handlers:
+        if file_format is None or file_format not in format_parsers:
             raise ValueError("unknown file format '%s'" % file_format)
 
-        self._loader = FlashLoader(self._session,
-                                    progress=self._progress,
-                                    chip_erase=self._chip_erase,
-                                    smart_flash=self._smart_flash,
-                                    trust_crc=self._trust_crc,
-                                    keep_unwritten=self._keep_unwritten,
-                                    no_reset=self._no_reset)
-
         # file_obj = None
         # Open the file if a path was provided.
         if is_path:
@@ -167,71 +147,319 @@ class FileProgrammer(object):
             assert not isinstance(file_or_path, str)
             file_obj = file_or_path
         try:
-
-            # Pass to the format-specific programmer.
-            self._format_handlers[file_format](file_obj, **kwargs)
-            self._loader.commit()
+            # Pass to the format-specific parser.
+            return format_parsers[file_format](file_obj, path=(file_or_path if is_path else None), **kwargs)
         finally:
             if is_path and file_obj is not None:
                 file_obj.close()
 
-    def _program_bin(self, file_obj: IO[bytes], **kwargs: Any) -> None:
-        """@brief Binary file format loader"""
-        assert self._loader
+    def program(self, file_or_path: Union[str, IO[bytes], "ParsedImage"], file_format: Optional[str] = None,
+            **kwargs: Any) -> List[ProgrammingInfo]:
+        """@brief Program a file into flash.
 
-        # If no base address is specified use the start of the boot memory.
-        address = kwargs.get('base_address', None)
+        @param self
+        @param file_or_path Either a string that is a path to a file, a file-like object, or a
+            ParsedImage previously returned by parse().
+        @param file_format Optional file format name, one of "bin", "hex", "elf", "axf". If not provided,
+            the file's extension will be used. If a file object is passed for _file_or_path_ then
+            this parameter must be used to set the format. Ignored for a ParsedImage.
+        @param kwargs Optional keyword arguments for format-specific parameters. Ignored for a
+            ParsedImage.
+
+        The only current format-specific keyword parameters are for the binary format:
+        - `base_address`: Memory address at which to program the binary data. If not set, the base
+            of the boot memory will be used.
+        - `skip`: Number of bytes to skip at the start of the binary file. Does not affect the
+            base address.
+
+        @return List of ProgrammingInfo objects, one for each memory region that was written.
+
+        @exception FileNotFoundError Provided file_or_path string does not reference a file.
+        @exception ValueError Invalid argument value, for instance providing a file object but
+            not setting file_format.
+        """
+        if isinstance(file_or_path, ParsedImage):
+            image = file_or_path
+        else:
+            image = self.parse(file_or_path, file_format, **kwargs)
+
+        self._loader = FlashLoader(self._session,
+                                    progress=self._progress,
+                                    chip_erase=self._chip_erase,
+                                    smart_flash=self._smart_flash,
+                                    trust_crc=self._trust_crc,
+                                    keep_unwritten=self._keep_unwritten,
+                                    no_reset=self._no_reset)
+
+        # Mapped images must stay open until the data has been programmed.
+        with image.open() as chunks:
+            for address, data in chunks:
+                address = self._resolve_address(address)
+
+                if not image.ignore_invalid_addresses:
+                    self._loader.add_data(address, data)
+                    continue
+                try:
+                    self._loader.add_data(address, data)
+                except ValueError as e:
+                    LOG.warning("Failed to add data chunk: %s", e)
+
+            return self._loader.commit()
+
+    def verify(self, file_or_path: Union[str, IO[bytes], "ParsedImage"], file_format: Optional[str] = None,
+            **kwargs: Any) -> Optional[int]:
+        """@brief Check that target memory contains an image.
+
+        Memory is hashed on the target with the CRC32 analyzer if it is available and the target is
+        halted. Otherwise it is read back and compared on the host.
+
+        For images whose invalid addresses are ignored when programming, such as hex files, data outside
+        of flash and writable memory regions is likewise not compared.
+
+        @param self
+        @param file_or_path Either a string that is a path to a file, a file-like object, or a
+            ParsedImage previously returned by parse().
+        @param file_format Optional file format name, as for program().
+        @param kwargs Optional format-specific keyword arguments, as for program().
+
+        @return The address of the first byte that differs from the image, or None if all match.
+        """
+        if isinstance(file_or_path, ParsedImage):
+            image = file_or_path
+        else:
+            image = self.parse(file_or_path, file_format, **kwargs)
+
+        assert self._session.target
+        with image.open() as chunks:
+            for address, data in chunks:
+                address = self._resolve_address(address)
+                if not isinstance(data, (bytes, bytearray, memoryview)):
+                    data = bytes(data)
+                if image.ignore_invalid_addresses:
+                    data = data[:self._get_writable_length(address, len(data))]
+                    if not data:
+                        continue
+                offset = compare_memory(self._session.target, address, data)
+                if offset is not None:
+                    return address + offset
+        return None
+
+    def _resolve_address(self, address: Optional[int]) -> int:
+        """@brief Return the address of a chunk, using the start of boot memory if it is None."""
         if address is None:
             assert self._session.target
             boot_memory = self._session.target.memory_map.get_boot_memory()
             if boot_memory is None:
                 raise exceptions.TargetSupportError("No boot memory is defined for this device")
             address = boot_memory.start
-        assert isinstance(address, int)
+        return address
+
+    def _get_writable_length(self, address: int, length: int) -> int:
+        """@brief Return the number of bytes from an address that are within contiguous writable regions.
+
+        This matches the amount of a chunk that FlashLoader.add_data() accepts before an invalid address.
+        """
+        assert self._session.target
+        memory_map = self._session.target.memory_map
+        end = address
+        while end < address + length:
+            region = memory_map.get_region_for_address(end)
+            if (region is None) or not (region.is_flash or region.is_writable):
+                break
+            end = region.end + 1
+        return min(end, address + length) - address
+
+    @staticmethod
+    def _parse_bin(file_obj: IO[bytes], path: Optional[str] = None, **kwargs: Any) -> "ParsedImage":
+        """@brief Binary file format loader"""
+        address = kwargs.get('base_address', None)
+        assert (address is None) or isinstance(address, int)
 
         skip_offset = kwargs.get('skip', 0)
         if not isinstance(skip_offset, int):
             raise TypeError("skip argument must be an integer")
+
+        # Files are mapped rather than read.
+        if path is not None:
+            size = max(os.path.getsize(path) - skip_offset, 0)
+            return MappedImage('bin', path, [(address, skip_offset, size)], ignore_invalid_addresses=False)
+
         file_obj.seek(skip_offset, os.SEEK_SET)
-        data = list(bytearray(file_obj.read()))
-
-        self._loader.add_data(address, data)
-
-    def _program_hex(self, file_obj: IO[bytes], **kwargs: Any) -> None:
-        """Intel hex file format loader"""
-        assert self._loader
-
-        hexfile = IntelHex(file_obj)
-        addresses = hexfile.addresses()
-        addresses.sort()
-
-        data_list = list(ranges(addresses))
-        for start, end in data_list:
-            size = end - start + 1
-            data = list(hexfile.tobinarray(start=start, size=size))
-            # Ignore invalid addresses for HEX files only
-            # Binary files (obviously) don't contain addresses
-            # For ELF files, any metadata that's not part of the application code
-            # will be held in a section that doesn't have the SHF_WRITE flag set
-            try:
-                self._loader.add_data(start, data)
-            except ValueError as e:
-                LOG.warning("Failed to add data chunk: %s", e)
+        return ParsedImage('bin', [(address, file_obj.read())], ignore_invalid_addresses=False)
 
-    def _program_elf(self, file_obj: IO[bytes], **kwargs: Any) -> None:
-        assert self._loader
+    @staticmethod
+    def _parse_hex(file_obj: IO[bytes], **kwargs: Any) -> "ParsedImage":
+        """Intel hex file format loader
 
+        Records are decoded one line at a time. Data from consecutive records is appended to one
+        bytearray for as long as the addresses are contiguous, so memory use is about the size of the
+        binary data. A record that overlaps data from an earlier record is an error.
+        """
+        chunks: List[Tuple[Optional[int], Sequence[int]]] = []
+        # Address ranges of the completed chunks, for detecting overlapping records.
+        chunk_ranges = IntervalTree()
+        chunk_start = 0
+        chunk = bytearray()
+        base = 0
+        for line_number, line in enumerate(file_obj, 1):
+            if isinstance(line, bytes):
+                line = line.decode('ascii')
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith(':'):
+                raise ValueError(f"line {line_number} of hex file is not a record")
+            try:
+                record = bytes.fromhex(line[1:])
+            except ValueError:
+                raise ValueError(f"line {line_number} of hex file has invalid hex digits") from None
+            if (len(record) < 5) or (len(record) != record[0] + 5):
+                raise ValueError(f"line {line_number} of hex file has an invalid record length")
+            if sum(record) & 0xff:
+                raise ValueError(f"line {line_number} of hex file has an invalid checksum")
+
+            record_type = record[3]
+            payload = record[4:-1]
+            if record_type == 0x00: # Data
+                address = base + ((record[1] << 8) | record[2])
+                if not payload:
+                    continue
+                if not (chunk and (address == chunk_start + len(chunk))):
+                    if chunk:
+                        chunks.append((chunk_start, chunk))
+                        chunk_ranges.addi(chunk_start, chunk_start + len(chunk))
+                    chunk_start = address
+                    chunk = bytearray()
+                if chunk_ranges.overlaps(address, address + len(payload)):
+                    raise ValueError(f"line {line_number} of hex file overlaps earlier data at address {address:#010x}")
+                chunk += payload
+            elif record_type == 0x01: # End of file
+                break
+            elif record_type == 0x02: # Extended segment address
+                base = int.from_bytes(payload, 'big') << 4
+            elif record_type == 0x04: # Extended linear address
+                base = int.from_bytes(payload, 'big') << 16
+            elif record_type in (0x03, 0x05): # Start segment/linear address
+                pass
+            else:
+                raise ValueError(f"line {line_number} of hex file has unknown record type {record_type:#04x}")
+        if chunk:
+            chunks.append((chunk_start, chunk))
+
+        # Ignore invalid addresses for HEX files only
+        # Binary files (obviously) don't contain addresses
+        # For ELF files, any metadata that's not part of the application code
+        # will be held in a section that doesn't have the SHF_WRITE flag set
+        return ParsedImage('hex', sorted(chunks, key=lambda c: c[0]), ignore_invalid_addresses=True)
+
+    @staticmethod
+    def _parse_elf(file_obj: IO[bytes], path: Optional[str] = None, **kwargs: Any) -> "ParsedImage":
+        # Segments are described by file offset; the data is read when programming.
+        segments: List[Tuple[Optional[int], int, int]] = []
         elf = ELFFile(file_obj)
         for segment in elf.iter_segments():
             addr = segment['p_paddr']
             if segment.header.p_type == 'PT_LOAD' and segment.header.p_filesz != 0:
-                data = bytearray(segment.data())
                 LOG.debug("Writing segment LMA:0x%08x, VMA:0x%08x, size %d", addr,
                           segment['p_vaddr'], segment.header.p_filesz)
-                try:
-                    self._loader.add_data(addr, data)
-                except ValueError as e:
-                    LOG.warning("Failed to add data chunk: %s", e)
+                segments.append((addr, segment['p_offset'], segment.header.p_filesz))
             else:
                 LOG.debug("Skipping segment LMA:0x%08x, VMA:0x%08x, size %d", addr,
                           segment['p_vaddr'], segment.header.p_filesz)
+
+        if path is not None:
+            return MappedImage('elf', path, segments, ignore_invalid_addresses=True)
+
+        # A file object may not be mappable, so read the segments now.
+        chunks: List[Tuple[Optional[int], Sequence[int]]] = []
+        for addr, offset, size in segments:
+            file_obj.seek(offset, os.SEEK_SET)
+            chunks.append((addr, file_obj.read(size)))
+        return ParsedImage('elf', chunks, ignore_invalid_addresses=True)
+
+class ParsedImage:
+    """@brief Data extracted from an image file by FileProgrammer.parse().
+
+    An image holds no reference to a session or target, so one instance can be programmed into
+    several targets.
+    """
+
+    def __init__(self, file_format: str, chunks: List[Tuple[Optional[int], Sequence[int]]],
+            ignore_invalid_addresses: bool) -> None:
+        """@brief Constructor.
+        @param self
+        @param file_format Name of the format the image was parsed from.
+        @param chunks List of (address, data) tuples. An address of None means the start of the
+            target's boot memory.
+        @param ignore_invalid_addresses Whether chunks at addresses that cannot be programmed are
+            skipped with a warning rather than raising an error.
+        """
+        self.file_format = file_format
+        self.ignore_invalid_addresses = ignore_invalid_addresses
+        self._chunks = chunks
+
+    @property
+    def total_size(self) -> int:
+        """@brief Total number of data bytes in the image."""
+        return sum(len(data) for _, data in self._chunks)
+
+    @contextmanager
+    def open(self) -> Iterator[Iterable[Tuple[Optional[int], Sequence[int]]]]:
+        """@brief Context manager providing the (address, data) chunks of the image.
+
+        The data is only valid until the context exits.
+        """
+        yield self._chunks
+
+class MappedImage(ParsedImage):
+    """@brief Image whose data stays in the file and is memory mapped while being programmed.
+
+    Chunks are memoryview slices of the mapped file, so no copy of the data is made until it is
+    split into flash pages. This keeps memory use bounded for large external flash images.
+    """
+
+    def __init__(self, file_format: str, path: str, segments: List[Tuple[Optional[int], int, int]],
+            ignore_invalid_addresses: bool) -> None:
+        """@brief Constructor.
+        @param self
+        @param file_format Name of the format the image was parsed from.
+        @param path Path to the image file.
+        @param segments List of (address, file offset, size) tuples. An address of None means the
+            start of the target's boot memory.
+        @param ignore_invalid_addresses Whether chunks at addresses that cannot be programmed are
+            skipped with a warning rather than raising an error.
+        """
+        super().__init__(file_format, [], ignore_invalid_addresses)
+        self._path = path
+        self._segments = segments
+
+    @property
+    def total_size(self) -> int:
+        return sum(size for _, _, size in self._segments)
+
+    @contextmanager
+    def open(self) -> Iterator[Iterable[Tuple[Optional[int], Sequence[int]]]]:
+        if self.total_size == 0:
+            yield []
+            return
+        with open(self._path, 'rb') as file_obj:
+            mapping = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+            view: Optional[memoryview] = None
+            chunks: List[Tuple[Optional[int], memoryview]] = []
+            try:
+                view = memoryview(mapping)
+                chunks = [(address, view[offset:offset + size]) for address, offset, size in self._segments]
+                yield chunks
+            finally:
+                # The mapping can only be closed once every view of it is released.
+                for _, chunk in chunks:
+                    chunk.release()
+                if view is not None:
+                    view.release()
+                try:
+                    mapping.close()
+                except BufferError:
+                    # Slices of the chunks are still referenced, for instance by the flash builder
+                    # of an operation that raised an exception. The mapping is closed when they
+                    # are garbage collected.
+                    LOG.debug("Mapped image %s is still referenced after use", self._path)
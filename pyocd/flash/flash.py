@@ -19,6 +19,7 @@
 from dataclasses import dataclass
 import logging
 from enum import Enum
+from time import sleep
 
 from ..core import exceptions
 from ..core.target import Target
@@ -26,6 +27,7 @@ from ..core.exceptions import (FlashFailure, FlashEraseFailure, FlashProgramFail
 from ..utility.mask import (align_down, msb)
 from ..utility.timeout import Timeout
 from .builder import FlashBuilder
+from .poller import CompletionPoller
 
 LOG = logging.getLogger(__name__)
 TRACE = LOG.getChild("trace")
@@ -134,6 +136,7 @@ class Flash:
         self._region = None
         self._did_prepare_target = False
         self._active_operation = None
+        self._poller = CompletionPoller()
         if flash_algo is not None:
             self.is_valid = True
             self.use_analyzer = flash_algo['analyzer_supported']
@@ -156,6 +159,11 @@ class Flash:
 
             self.double_buffer_supported = len(self.page_buffers) > 1
 
+            # Names of entry points, for learning their durations.
+            self._entry_point_names = {flash_algo[key]: key[3:] for key in flash_algo if key.startswith('pc_')}
+            if 'analyzer_address' in flash_algo:
+                self._entry_point_names[flash_algo['analyzer_address']] = 'analyzer'
+
         else:
             self.is_valid = False
             self.use_analyzer = False
@@ -166,6 +174,7 @@ class Flash:
             self.min_program_length = 0
             self.page_buffers = []
             self.double_buffer_supported = False
+            self._entry_point_names = {}
 
     def _is_api_valid(self, api_name):
         return (api_name in self.flash_algo) \
@@ -587,6 +596,9 @@ class Flash:
         # resume target
         self.target.resume()
 
+        if self.target.session.options.get('flash.adaptive_polling'):
+            self._poller.start(self._entry_point_names.get(pc, f"{pc:#010x}"))
+
     def _flash_algo_debug_setup(self):
         # Save vector catch state for use in wait_for_completion()
         self._saved_vector_catch = self.target.get_vector_catch()
@@ -645,30 +657,45 @@ class Flash:
         - The target is halted after executing the flash operation.
         - Stack overflow.
         """
-        # TODO Commonise the method to report timeout, halted, and stack canary errors resulting from here.
-
-        # This setting of state isn't strictly necessary, but pyright sees it as possibly unbound when used
-        # below. Otoh, lgtm sees it as unnecessary! So we disable the lgtm warning.
-        state = Target.State.RUNNING # lgtm[py/multiple-definition]
         with Timeout(timeout) as time_out:
             while time_out.check():
-                try:
-                    state = self.target.get_state()
-                    if state != Target.State.RUNNING:
-                        break
-                except exceptions.TransferTimeoutError:
-                    LOG.debug("target.get_state probe timeout")
-                    return self.TIMEOUT_ERROR
-                except exceptions.TransferFaultError:
-                    LOG.debug("target.get_state probe fault")
-                    raise exceptions.FlashFailure("SWD transfer failed")
+                delay = self._poller.delay()
+                if delay:
+                    sleep(delay)
+                result = self.poll_completion()
+                if result is not None:
+                    return result
             else:
                 # Operation timed out.
-                self.target.halt()
-                ipsr = self.target.read_core_register('ipsr')
-                LOG.debug("flash operation timed out; IPSR=%d", ipsr)
+                self.halt_operation()
                 return self.TIMEOUT_ERROR
 
+    def poll_completion(self):
+        """@brief Check once whether the flash algorithm routine has returned.
+
+        This is the non-blocking form of wait_for_completion(). It performs a single read of the
+        core state, so any memory writes queued by the probe, such as loading another page buffer,
+        are sent in the same transfer batch.
+
+        @return None if the routine is still running. Otherwise, the routine's result from r0 or
+            TIMEOUT_ERROR if the probe timed out.
+        """
+        # TODO Commonise the method to report timeout, halted, and stack canary errors resulting from here.
+        try:
+            state = self.target.get_state()
+        except exceptions.TransferTimeoutError:
+            LOG.debug("target.get_state probe timeout")
+            self._poller.cancel()
+            return self.TIMEOUT_ERROR
+        except exceptions.TransferFaultError:
+            LOG.debug("target.get_state probe fault")
+            self._poller.cancel()
+            raise exceptions.FlashFailure("SWD transfer failed")
+        self._poller.polled()
+        if state == Target.State.RUNNING:
+            return None
+        self._poller.finish()
+
         if self.flash_algo_debug:
             self._flash_algo_debug_check()
 
@@ -686,6 +713,30 @@ class Flash:
 
         return self.target.read_core_register('r0')
 
+    def poll_delay(self):
+        """@brief Seconds to wait before the next call to poll_completion().
+
+        The delay is zero unless the `flash.adaptive_polling` option is enabled. Otherwise it is
+        based on the learned duration of the running flash algorithm routine.
+        """
+        return self._poller.delay()
+
+    def get_operation_metrics(self):
+        """@brief Durations of flash algorithm routines learned by adaptive polling.
+
+        @return Dict keyed by entry point name, such as "program_page" or "eraseAll". Each value is
+            a dict with the count, total, min, max, average, and expected durations in seconds, and
+            the number of polls used to detect completion.
+        """
+        return self._poller.get_metrics()
+
+    def halt_operation(self):
+        """@brief Stop a flash algorithm routine that did not complete in time."""
+        self._poller.cancel()
+        self.target.halt()
+        ipsr = self.target.read_core_register('ipsr')
+        LOG.debug("flash operation timed out; IPSR=%d", ipsr)
+
     def _call_function_and_wait(self, pc, r0=None, r1=None, r2=None, r3=None, init=False, timeout=None):
         self._call_function(pc, r0, r1, r2, r3, init)
         return self.wait_for_completion(timeout=timeout)
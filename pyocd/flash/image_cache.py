@@ -0,0 +1,130 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+from binascii import crc32
+from typing import (Dict, Iterable, NamedTuple, Optional, TYPE_CHECKING)
+
+if TYPE_CHECKING:
+    from .flash import Flash
+
+LOG = logging.getLogger(__name__)
+
+class PageRecord(NamedTuple):
+    """@brief What was programmed into one flash page."""
+    size: int
+    ## CRC32 of the page contents padded with 0xFF to the page size, as computed by the CRC analyzer.
+    crc: int
+    ## SHA-1 hex digest of the page contents.
+    digest: str
+
+    @classmethod
+    def for_data(cls, data: Iterable[int], size: int) -> "PageRecord":
+        data = bytes(data)
+        return cls(size, crc32(data + b'\xff' * (size - len(data))) & 0xFFFFFFFF,
+                hashlib.sha1(data).hexdigest())
+
+class FlashImageCache:
+    """@brief On-disk record of the pages last programmed into a flash region.
+
+    One JSON file is kept per combination of debug probe unique ID, target type, and flash region.
+    It maps the address of each page written by the last successful programming operation to a
+    PageRecord. When the same target is programmed again, pages whose new contents match the
+    record are known to be unchanged and pages that differ are known to need programming, without
+    reading flash. The CRC32 in each record allows a few pages to be checked against the target
+    with the CRC analyzer before the record is trusted.
+
+    The record is deleted before flash is modified and written again once programming completes,
+    so an interrupted operation never leaves a stale record behind.
+    """
+
+    ## Version of the record file format.
+    VERSION = 1
+
+    def __init__(self, directory: str, unique_id: str, target_type: str, region_start: int) -> None:
+        self._unique_id = unique_id
+        self._target_type = target_type
+        self._region_start = region_start
+        key = f"{unique_id}:{target_type}:{region_start:#010x}"
+        name = hashlib.sha1(key.encode()).hexdigest() + ".json"
+        self._path = os.path.join(os.path.expanduser(directory), name)
+
+    @classmethod
+    def for_flash(cls, flash: "Flash") -> Optional["FlashImageCache"]:
+        """@brief Create the image cache for a flash region if enabled by the session options."""
+        session = flash.target.session
+        directory = session.options.get('flash.image_cache')
+        if not directory or (session.board is None):
+            return None
+        assert flash.region
+        return cls(directory, session.board.unique_id, session.board.target_type, flash.region.start)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self) -> Optional[Dict[int, PageRecord]]:
+        """@brief Read the record of the last programmed pages.
+        @return Dict mapping page address to PageRecord, or None if there is no usable record.
+        """
+        try:
+            with open(self._path, 'r') as record_file:
+                record = json.load(record_file)
+            if (record.get('version') != self.VERSION) \
+                    or (record.get('unique_id') != self._unique_id) \
+                    or (record.get('target_type') != self._target_type) \
+                    or (record.get('region_start') != self._region_start):
+                return None
+            return {addr: PageRecord(size, crc, digest) for addr, size, crc, digest in record['pages']}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            LOG.debug("ignoring unreadable flash image cache record %s: %s", self._path, err)
+            return None
+
+    def save(self, pages: Dict[int, PageRecord]) -> None:
+        """@brief Replace the record with the given pages."""
+        image_hash = hashlib.sha1()
+        for addr in sorted(pages):
+            image_hash.update(f"{addr:x}:{pages[addr].digest}".encode())
+        record = {
+            'version': self.VERSION,
+            'unique_id': self._unique_id,
+            'target_type': self._target_type,
+            'region_start': self._region_start,
+            'image_hash': image_hash.hexdigest(),
+            'pages': [[addr, page.size, page.crc, page.digest] for addr, page in sorted(pages.items())],
+            }
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            temp_path = self._path + ".tmp"
+            with open(temp_path, 'w') as record_file:
+                json.dump(record, record_file)
+            os.replace(temp_path, self._path)
+        except OSError as err:
+            LOG.warning("Failed to write flash image cache record %s: %s", self._path, err)
+
+    def invalidate(self) -> None:
+        """@brief Delete the record."""
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
+        except OSError as err:
+            LOG.warning("Failed to remove flash image cache record %s: %s", self._path, err)
@@ -214,7 +214,7 @@ class MemoryLoader:
 
         @param self
         @param address Integer address for where the first byte of _data_ should be written.
-        @param data A list of byte values to be programmed at the given address.
+        @param data A list of byte values, or a bytes-like object, to be programmed at the given address.
 
         @return The MemoryLoader instance is returned, to allow chaining further add_data()
             calls or a call to commit().
@@ -224,6 +224,10 @@ class MemoryLoader:
             instance associated with it, which indicates that the target connect sequence did
             not run successfully.
         """
+        # Slice bytes-like data without copying it.
+        if isinstance(data, (bytes, bytearray)):
+            data = memoryview(data)
+
         while len(data):
             # Look up the memory region for this address.
             region = self._map.get_region_for_address(address)
@@ -277,6 +281,8 @@ class MemoryLoader:
         algorithm for the first region doesn't actually erase the entire chip (all regions).
 
         After calling this method, the loader instance can be reused to program more data.
+
+        @return List of ProgrammingInfo objects, one for each memory region that was written.
         """
         didChipErase = False
         perfList = []
@@ -305,6 +311,8 @@ class MemoryLoader:
         # Clear state to allow reuse.
         self._reset_state()
 
+        return perfList
+
     def _log_performance(self, perf_list):
         """@brief Log a report of programming performance numbers."""
         # Compute overall performance numbers.
@@ -0,0 +1,137 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dataclasses import (asdict, dataclass)
+from time import perf_counter
+from typing import (Any, Dict, Optional)
+
+@dataclass
+class OperationTiming:
+    """@brief Durations learned for one flash algorithm entry point."""
+    count: int = 0                          # Number of completed calls
+    polls: int = 0                          # Number of core state reads used to detect completion
+    total_time: float = 0.0                 # Sum of call durations
+    min_time: Optional[float] = None        # Shortest call duration
+    max_time: float = 0.0                   # Longest call duration
+    expected_time: Optional[float] = None   # Smoothed duration used to predict the next call
+
+    @property
+    def average_time(self) -> float:
+        return (self.total_time / self.count) if self.count else 0.0
+
+class CompletionPoller:
+    """@brief Chooses when to poll for completion of flash algorithm calls.
+
+    Each poll is a probe round trip, so polling as fast as possible wastes transactions on long
+    operations such as erase all, while polling slowly adds latency to every short program page
+    call. This class learns how long each flash algorithm entry point takes during the session.
+
+    When a call with a learned duration is started, the first poll is delayed until shortly before
+    the call is expected to complete. After that, or when nothing has been learned yet, the delay
+    between polls backs off exponentially. The backoff is capped in proportion to the expected
+    duration, so a late call is still detected promptly.
+
+    Usage: start() when the algorithm is resumed, delay() before each poll, polled() after each
+    poll, and finish() when the call is seen to have completed.
+    """
+
+    ## Delay before the second poll of a call when backing off.
+    INITIAL_INTERVAL = 0.0002
+    ## Longest delay between polls.
+    MAX_INTERVAL = 0.05
+    ## Fraction of the expected duration to wait before the first poll.
+    WAKE_FRACTION = 0.8
+    ## Fraction of the expected duration that caps the backoff interval.
+    INTERVAL_FRACTION = 0.25
+    ## Weight of a new duration in the smoothed expected duration.
+    SMOOTHING = 0.25
+
+    def __init__(self) -> None:
+        self._timings: Dict[str, OperationTiming] = {}
+        self._operation: Optional[str] = None
+        self._start = 0.0
+        self._polls = 0
+        self._interval = 0.0
+        self._previous_poll_time = 0.0
+        self._poll_time = 0.0
+
+    @property
+    def timings(self) -> Dict[str, OperationTiming]:
+        """@brief Dict of learned timings, keyed by operation name."""
+        return self._timings
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """@brief Learned timings as a dict of plain dicts, suitable for logging or JSON."""
+        metrics = {}
+        for operation, timing in self._timings.items():
+            metrics[operation] = asdict(timing)
+            metrics[operation]['average_time'] = timing.average_time
+        return metrics
+
+    def start(self, operation: str) -> None:
+        """@brief Note that a flash algorithm call has been started."""
+        self._operation = operation
+        self._start = perf_counter()
+        self._polls = 0
+        self._interval = 0.0
+        self._previous_poll_time = self._poll_time = self._start
+
+    def delay(self) -> float:
+        """@brief Seconds to wait before the next poll of the current call."""
+        if self._operation is None:
+            return 0.0
+        timing = self._timings.get(self._operation)
+        expected = timing.expected_time if (timing is not None) else None
+
+        if self._polls == 0:
+            # Sleep until the call is expected to be nearly done, or poll right away if unknown.
+            if expected is None:
+                return 0.0
+            return max(0.0, expected * self.WAKE_FRACTION - (perf_counter() - self._start))
+
+        max_interval = self.MAX_INTERVAL
+        if expected is not None:
+            max_interval = min(max_interval, max(self.INITIAL_INTERVAL, expected * self.INTERVAL_FRACTION))
+        self._interval = min(max_interval, (self._interval * 2) or self.INITIAL_INTERVAL)
+        return self._interval
+
+    def polled(self) -> None:
+        """@brief Count one poll of the current call."""
+        self._polls += 1
+        self._previous_poll_time = self._poll_time
+        self._poll_time = perf_counter()
+
+    def finish(self) -> None:
+        """@brief Record the duration of the current call, which has completed."""
+        if self._operation is None:
+            return
+        # The call completed some time between the last two polls.
+        duration = (self._previous_poll_time + self._poll_time) / 2 - self._start
+        timing = self._timings.setdefault(self._operation, OperationTiming())
+        timing.count += 1
+        timing.polls += self._polls
+        timing.total_time += duration
+        timing.min_time = duration if (timing.min_time is None) else min(timing.min_time, duration)
+        timing.max_time = max(timing.max_time, duration)
+        if timing.expected_time is None:
+            timing.expected_time = duration
+        else:
+            timing.expected_time += self.SMOOTHING * (duration - timing.expected_time)
+        self._operation = None
+
+    def cancel(self) -> None:
+        """@brief Forget the current call without recording it, for instance after a timeout."""
+        self._operation = None
@@ -95,21 +95,20 @@ class GDBDebugContextFacade(object):
         @exception CoreRegisterAccessError
         """
         LOG.debug("GDB getting register context")
-        resp = b''
         try:
             vals = self._context.read_core_registers_raw(self._full_reg_num_list)
         except exceptions.CoreRegisterAccessError:
             vals = [None] * len(self._full_reg_num_list)
 
+        parts = []
         for reg, reg_value in zip(self._register_list, vals):
             # Return x's to indicate unavailable register value.
             if reg_value is None:
-                r = b"xx" * round_up_div(reg.bitsize, 8)
+                parts.append("xx" * round_up_div(reg.bitsize, 8))
             else:
-                r = conversion.uint_to_hex_le(reg_value, reg.bitsize).encode()
-            resp += r
-            LOG.debug("GDB get_reg_context: %s = %s -> %s", reg.name,
-                    "None" if (reg_value is None) else ("0x%08X" % reg_value), r)
+                parts.append(conversion.uint_to_hex_le(reg_value, reg.bitsize))
+        resp = ''.join(parts).encode()
+        LOG.debug("GDB get_reg_context: %s", resp)
 
         return resp
 
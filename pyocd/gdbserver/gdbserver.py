@@ -21,14 +21,17 @@ import threading
 from time import sleep
 import sys
 import io
+import re
+import zlib
 from xml.etree.ElementTree import (Element, SubElement, tostring)
 from typing import (Dict, List, Optional, Tuple)
 
 from ..core import exceptions
 from ..core.target import Target
+from ..flash.checksum import (COMPARE_CHUNK_SIZE, TargetChecksum, TargetChecksumError)
 from ..flash.loader import FlashLoader
 from ..utility.cmdline import convert_vector_catch
-from ..utility.conversion import (hex_to_byte_list, hex_encode, hex_decode, hex8_to_u32le)
+from ..utility.conversion import (hex_encode, hex_decode, hex8_to_u32le)
 from ..utility.compatibility import (to_bytes_safe, to_str_safe)
 from ..utility.server import StreamServer
 from ..utility.timeout import Timeout
@@ -37,7 +40,9 @@ from ..utility.rtt_server import RTTServer
 from ..utility.sockets import ListenerSocket
 from .syscall import GDBSyscallIOHandler
 from ..debug import semihost
+from ..debug.state_monitor import TargetStateMonitor
 from .context_facade import GDBDebugContextFacade
+from .read_ahead import ReadAheadPrefetcher
 from .symbols import GDBSymbolProvider
 from ..rtos import RTOS
 from . import signals
@@ -57,43 +62,67 @@ LOG = logging.getLogger(__name__)
 TRACE_MEM = LOG.getChild("trace.mem")
 TRACE_MEM.setLevel(logging.CRITICAL)
 
+## Map of each escape sequence to the byte it represents.
+_GDB_UNESCAPE_TABLE = {bytes((0x7d, c)): bytes((c ^ 0x20,)) for c in range(256)}
+
+## Regex matching an escape sequence.
+_GDB_ESCAPE_SEQUENCE_RE = re.compile(rb'}.', re.DOTALL)
+
+def unescape_bytes(data: bytes) -> bytes:
+    """@brief De-escapes binary data from Gdb.
+
+    @param data Bytes-like object with possibly escaped values.
+    @return Bytes object with all escaped bytes de-escaped.
+    """
+    data = bytes(data)
+    if b'}' not in data:
+        return data
+    return _GDB_ESCAPE_SEQUENCE_RE.sub(lambda m: _GDB_UNESCAPE_TABLE[m.group()], data)
+
 def unescape(data: bytes) -> List[int]:
     """@brief De-escapes binary data from Gdb.
 
     @param data Bytes-like object with possibly escaped values.
     @return List of integers in the range 0-255, with all escaped bytes de-escaped.
     """
-    data_idx = 0
+    return list(unescape_bytes(data))
 
-    # unpack the data into binary array
-    result = list(data)
+## Pairs of characters that must be escaped and their escape sequences. '}' must be first, so the
+# escape character inserted for the other characters is not itself escaped.
+_GDB_ESCAPE_TABLE = tuple((bytes((c,)), bytes((0x7d, c ^ 0x20))) for c in b'}#$*')
 
-    # check for escaped characters
-    while data_idx < len(result):
-        if result[data_idx] == 0x7d:
-            result.pop(data_idx)
-            result[data_idx] = result[data_idx] ^ 0x20
-        data_idx += 1
+def escape(data: bytes) -> bytes:
+    """@brief Escape binary data to be sent to Gdb.
 
+    @param data Bytes-like object containing raw binary.
+    @return Bytes object with the characters in '#$}*' escaped as required by Gdb.
+    """
+    result = bytes(data)
+    for c, sequence in _GDB_ESCAPE_TABLE:
+        if c in result:
+            result = result.replace(c, sequence)
     return result
 
-## Tuple of int values of characters that must be escaped.
-_GDB_ESCAPED_CHARS = tuple(b'#$}*')
+## Translation table that reverses the bit order of each byte.
+_BIT_REVERSE_TABLE = bytes(int('{:08b}'.format(i)[::-1], 2) for i in range(256))
 
-def escape(data):
-    """@brief Escape binary data to be sent to Gdb.
+def _reverse32(value: int) -> int:
+    return int('{:032b}'.format(value)[::-1], 2)
 
-    @param data Bytes-like object containing raw binary.
-    @return Bytes object with the characters in '#$}*' escaped as required by Gdb.
+def gdb_crc32(data: bytes, crc: int = 0xffffffff) -> int:
+    """@brief Compute the CRC used by gdb's qCRC packet.
+
+    gdb uses a non-reflected CRC-32 (polynomial 0x04c11db7, initial value 0xffffffff, no final xor),
+    which differs from the reflected CRC-32 computed by zlib. The non-reflected CRC of some data is the
+    bit reversal of the reflected CRC of the data with the bits of each byte reversed, which lets zlib
+    do the work.
+
+    @param data Bytes-like object to checksum.
+    @param crc CRC of the preceding data, to continue a checksum across several calls.
+    @return The CRC as an int.
     """
-    result: List[int] = []
-    for c in data:
-        if c in _GDB_ESCAPED_CHARS:
-            # Escape by prefixing with '}' and xor'ing the char with 0x20.
-            result += [0x7d, c ^ 0x20]
-        else:
-            result.append(c)
-    return bytes(result)
+    reflected = zlib.crc32(bytes(data).translate(_BIT_REVERSE_TABLE), _reverse32(crc) ^ 0xffffffff)
+    return _reverse32(reflected ^ 0xffffffff)
 
 class GDBServer(threading.Thread):
     """@brief GDB remote server thread.
@@ -108,6 +137,15 @@ class GDBServer(threading.Thread):
     ## Timer delay for sending the notification that the server is listening.
     START_LISTENING_NOTIFY_DELAY = 0.03 # 30 ms
 
+    ## Maximum packet size advertised to gdb. Large packets let gdb transfer memory in fewer round trips.
+    PACKET_SIZE = 0x4000
+
+    ## Longest target state poll period while RTT is active, since RTT buffers are drained on each poll.
+    RTT_POLL_INTERVAL = 0.01 # 10 ms
+
+    ## Period for checking the retry timeout while target status checks are failing.
+    FAULT_RETRY_CHECK_INTERVAL = 0.1 # 100 ms
+
     def __init__(self, session, core=None):
         super().__init__()
         self.session = session
@@ -145,7 +183,7 @@ class GDBServer(threading.Thread):
                 'report_core_number',
                 ])
 
-        self.packet_size = 2048
+        self.packet_size = self.PACKET_SIZE
         self.packet_io = None
         self.gdb_features = []
         self.non_stop = False
@@ -159,6 +197,9 @@ class GDBServer(threading.Thread):
         else:
             self.target_context = self.board.target.get_target_context(core=core)
         self.target_facade = GDBDebugContextFacade(self.target_context)
+        # Read-ahead relies on the memory cache to hold prefetched data.
+        self.read_ahead = ReadAheadPrefetcher(self.target_context,
+                session.options.get('gdbserver.read_ahead') if session.options.get('cache.enable_memory') else 0)
         self.thread_provider = None
         self.did_init_thread_providers = False
         self.current_thread_id = 0
@@ -174,6 +215,8 @@ class GDBServer(threading.Thread):
 
         # Coarse grain lock to synchronize SWO with other activity
         self.lock = threading.Lock()
+        self._state_monitor = TargetStateMonitor(self.session, self.target, self.lock)
+        self._state_monitor.add_poll_hook(self._poll_rtt)
 
         self.session.subscribe(self.event_handler, Target.Event.POST_RESET)
 
@@ -253,6 +296,7 @@ class GDBServer(threading.Thread):
                 b'S' : (self.step,               1   ), # Step with signal.
                 b'T' : (self.is_thread_alive,    1   ), # Thread liveness query.
                 b'v' : (self.v_command,          2   ), # v command.
+                b'x' : (self.get_memory_binary,  2   ), # Read memory (binary).
                 b'X' : (self.write_memory,       2   ), # Write memory (binary).
                 b'z' : (self.breakpoint,         1   ), # Insert breakpoint/watchpoint.
                 b'Z' : (self.breakpoint,         1   ), # Remove breakpoint/watchpoint.
@@ -278,6 +322,7 @@ class GDBServer(threading.Thread):
     def stop(self, wait=True):
         if self.is_alive():
             self.shutdown_event.set()
+            self._state_monitor.wake()
             if wait:
                 LOG.debug("gdbserver shutdown event set; waiting for exit")
                 self.join()
@@ -302,6 +347,7 @@ class GDBServer(threading.Thread):
         if self.rtt_server:
             self.rtt_server.stop()
             self.rtt_server = None
+        self._state_monitor.stop()
         self.abstract_socket.cleanup()
 
     def _cleanup_for_next_connection(self):
@@ -312,6 +358,7 @@ class GDBServer(threading.Thread):
 
     def run(self):
         LOG.info('GDB server started on port %d (core %d)', self.port, self.core)
+        self._state_monitor.start()
 
         while not self.shutdown_event.is_set():
             try:
@@ -326,7 +373,8 @@ class GDBServer(threading.Thread):
                 while not self.shutdown_event.is_set():
                     connected = self.abstract_socket.connect()
                     if connected != None:
-                        self.packet_io = GDBServerPacketIOThread(self.abstract_socket)
+                        self.packet_io = GDBServerPacketIOThread(self.abstract_socket,
+                                interrupt_callback=self._state_monitor.wake)
                         break
 
                 if self.shutdown_event.is_set():
@@ -593,76 +641,83 @@ class GDBServer(threading.Thread):
         # also serves as a flag that a fault occurred and we're attempting to retry.
         fault_retry_timeout = Timeout(self.session.options.get('debug.status_fault_retry_timeout'))
 
-        while fault_retry_timeout.check():
-            if self.shutdown_event.is_set():
-                self.packet_io.interrupt_event.clear()
-                return self.create_rsp_packet(val)
-
-            self.lock.release()
+        # The state monitor thread polls the target and wakes us when it halts. A ctrl-c also wakes us.
+        self._start_watching()
+        try:
+            while fault_retry_timeout.check():
+                if self.shutdown_event.is_set():
+                    self.packet_io.interrupt_event.clear()
+                    return self.create_rsp_packet(val)
 
-            # Wait for a ctrl-c to be received.
-            if self.packet_io.interrupt_event.wait(0.01):
+                self.lock.release()
+                self._state_monitor.wait(self.FAULT_RETRY_CHECK_INTERVAL if fault_retry_timeout.is_running else None)
                 self.lock.acquire()
-                LOG.debug("receive CTRL-C")
-                self.packet_io.interrupt_event.clear()
-
-                # Be careful about reading the target state. If we previously got a fault (the timeout
-                # is running) then ignore the error. In all cases we still return SIGINT.
-                try:
-                    self.target.halt()
-                    val = self.get_t_response(forceSignal=signals.SIGINT)
-                except exceptions.TransferError as e:
-                    # Note: if the target is not actually halted, gdb can get confused from this point on.
-                    # But there's not much we can do if we're getting faults attempting to control it.
-                    if not fault_retry_timeout.is_running:
-                        LOG.error('Error reading target status: %s', e, exc_info=self.session.log_tracebacks)
-                    val = ('S%02x' % signals.SIGINT).encode()
-                break
-
-            self.lock.acquire()
-
-            try:
-                state = self.target.get_state()
 
-                if self.rtt_server:
-                    self.rtt_server.poll()
-
-                # If we were able to successfully read the target state after previously receiving a fault,
-                # then clear the timeout.
-                if fault_retry_timeout.is_running:
-                    LOG.info("Target control reestablished.")
-                    fault_retry_timeout.clear()
+                # Check for a ctrl-c.
+                if self.packet_io.interrupt_event.is_set():
+                    LOG.debug("receive CTRL-C")
+                    self.packet_io.interrupt_event.clear()
 
-                if state == Target.State.HALTED:
-                    # Handle semihosting
-                    if self.enable_semihosting:
-                        was_semihost = self.semihost.check_and_handle_semihost_request()
+                    # Be careful about reading the target state. If we previously got a fault (the timeout
+                    # is running) then ignore the error. In all cases we still return SIGINT.
+                    try:
+                        self.target.halt()
+                        val = self.get_t_response(forceSignal=signals.SIGINT)
+                    except exceptions.TransferError as e:
+                        # Note: if the target is not actually halted, gdb can get confused from this point on.
+                        # But there's not much we can do if we're getting faults attempting to control it.
+                        if not fault_retry_timeout.is_running:
+                            LOG.error('Error reading target status: %s', e, exc_info=self.session.log_tracebacks)
+                        val = ('S%02x' % signals.SIGINT).encode()
+                    break
 
-                        if was_semihost:
-                            self.target.resume()
-                            continue
+                if self.shutdown_event.is_set():
+                    continue
 
-                    pc = self.target_context.read_core_register('pc')
-                    LOG.debug("state halted; pc=0x%08x", pc)
-                    val = self.get_t_response()
-                    break
-            except exceptions.TransferError as e:
-                # If we get any sort of transfer error or fault while checking target status, then start
-                # a timeout running. Upon a later successful status check, the timeout is cleared. In the event
-                # that the timeout expires, this loop is exited and an error raised to gdb.
-                if not fault_retry_timeout.is_running:
-                    LOG.warning("Transfer error while checking target status; retrying: %s", e,
-                            exc_info=self.session.log_tracebacks)
-                fault_retry_timeout.start()
-            except exceptions.Error as e:
                 try:
-                    self.target.halt()
-                except exceptions.Error:
-                    pass
-                LOG.warning('Error while target was running: %s', e, exc_info=self.session.log_tracebacks)
-                # This exception was not a transfer error, so reading the target state should be ok.
-                val = ('S%02x' % self.target_facade.get_signal_value()).encode()
-                break
+                    state = self.target.get_state()
+
+                    # If we were able to successfully read the target state after previously receiving a fault,
+                    # then clear the timeout.
+                    if fault_retry_timeout.is_running:
+                        LOG.info("Target control reestablished.")
+                        fault_retry_timeout.clear()
+
+                    if state == Target.State.HALTED:
+                        # Handle semihosting
+                        if self.enable_semihosting:
+                            was_semihost = self.semihost.check_and_handle_semihost_request()
+
+                            if was_semihost:
+                                self.target.resume()
+                                self._start_watching()
+                                continue
+
+                        pc = self.target_context.read_core_register('pc')
+                        LOG.debug("state halted; pc=0x%08x", pc)
+                        val = self.get_t_response()
+                        break
+                    elif not self._state_monitor.is_watching:
+                        self._start_watching()
+                except exceptions.TransferError as e:
+                    # If we get any sort of transfer error or fault while checking target status, then start
+                    # a timeout running. Upon a later successful status check, the timeout is cleared. In the event
+                    # that the timeout expires, this loop is exited and an error raised to gdb.
+                    if not fault_retry_timeout.is_running:
+                        LOG.warning("Transfer error while checking target status; retrying: %s", e,
+                                exc_info=self.session.log_tracebacks)
+                    fault_retry_timeout.start()
+                except exceptions.Error as e:
+                    try:
+                        self.target.halt()
+                    except exceptions.Error:
+                        pass
+                    LOG.warning('Error while target was running: %s', e, exc_info=self.session.log_tracebacks)
+                    # This exception was not a transfer error, so reading the target state should be ok.
+                    val = ('S%02x' % self.target_facade.get_signal_value()).encode()
+                    break
+        finally:
+            self._state_monitor.stop_watching()
 
         # Check if we exited the above loop due to a timeout after a fault.
         if fault_retry_timeout.did_time_out:
@@ -671,6 +726,15 @@ class GDBServer(threading.Thread):
 
         return self.create_rsp_packet(val)
 
+    def _start_watching(self):
+        self._state_monitor.start_watching(self.RTT_POLL_INTERVAL if self.rtt_server else None)
+
+    def _poll_rtt(self):
+        # Called from the state monitor thread while the target is running.
+        with self.lock:
+            if self.rtt_server:
+                self.rtt_server.poll()
+
     def step(self, data, start=0, end=0):
         #addr = self._get_resume_step_addr(data)
         LOG.debug("GDB step: %s (start=0x%x, end=0x%x)", data, start, end)
@@ -814,7 +878,7 @@ class GDBServer(threading.Thread):
                 self.flash_loader = FlashLoader(self.session)
 
             # Add data to flash loader
-            self.flash_loader.add_data(write_addr, unescape(data[idx_begin:len(data) - 3]))
+            self.flash_loader.add_data(write_addr, unescape_bytes(data[idx_begin:len(data) - 3]))
 
             return self.create_rsp_packet(b"OK")
 
@@ -838,24 +902,74 @@ class GDBServer(threading.Thread):
 
         return None
 
-    def get_memory(self, data):
+    def _read_memory(self, data: bytes) -> Optional[bytes]:
         split = data.split(b',')
         addr = int(split[0], 16)
-        length = split[1].split(b'#')[0]
-        length = int(length, 16)
+        length = int(split[1].split(b'#')[0], 16)
 
         TRACE_MEM.debug("GDB getMem: addr=%x len=%x", addr, length)
 
         try:
-            mem = self.target_context.read_memory_block8(addr, length)
+            mem = self.read_ahead.read_memory_block8(addr, length)
             # Flush so an exception is thrown now if invalid memory was accesses
             self.target_context.flush()
-            val = hex_encode(bytearray(mem))
+            return bytes(mem)
         except exceptions.TransferError as e:
             LOG.debug("get_memory failed at 0x%x: %s", addr, str(e))
+            return None
+
+    def get_memory(self, data):
+        mem = self._read_memory(data)
+        val = hex_encode(mem) if (mem is not None) else b'E01' #EPERM
+        return self.create_rsp_packet(val)
+
+    def get_memory_binary(self, data):
+        # x addr,length; the reply is 'b' followed by the escaped binary data.
+        mem = self._read_memory(data)
+        val = (b'b' + escape(mem)) if (mem is not None) else b'E01' #EPERM
+        return self.create_rsp_packet(val)
+
+    def get_memory_crc(self, data):
+        # qCRC:addr,length
+        split = data.split(b',')
+        addr = int(split[0], 16)
+        length = int(split[1].split(b'#')[0], 16)
+
+        TRACE_MEM.debug("GDB getMemCRC: addr=%x len=%x", addr, length)
+
+        try:
+            val = b"C%08x" % self._compute_memory_crc(addr, length)
+        except exceptions.TransferError as e:
+            LOG.debug("get_memory_crc failed at 0x%x: %s", addr, str(e))
             val = b'E01' #EPERM
         return self.create_rsp_packet(val)
 
+    def _compute_memory_crc(self, addr: int, length: int) -> int:
+        """@brief Compute gdb's CRC of a range of target memory.
+
+        gdb sends qCRC to compare the sections of the loaded file with target memory. If the range is
+        contained in the target's ELF file, the memory is compared with the ELF data using the on-target
+        CRC32 analyzer, and when they match the CRC is computed from the ELF data without reading memory.
+        Otherwise the memory is read in large blocks and the CRC computed on the host.
+        """
+        elf = self.board.target.elf
+        expected = elf.read(addr, length) if (elf is not None) else None
+        if (expected is not None) and (len(expected) == length) \
+                and (self.target.get_state() == Target.State.HALTED):
+            checksum = TargetChecksum(self.target)
+            if checksum.is_available:
+                try:
+                    if checksum.compare(addr, expected, self.target_context) is None:
+                        return gdb_crc32(expected)
+                except (TargetChecksumError, exceptions.TransferError) as err:
+                    LOG.debug("On-target CRC failed (%s); computing CRC on the host", err)
+
+        crc = 0xffffffff
+        for offset in range(0, length, COMPARE_CHUNK_SIZE):
+            chunk_size = min(COMPARE_CHUNK_SIZE, length - offset)
+            crc = gdb_crc32(bytes(self.target_context.read_memory_block8(addr + offset, chunk_size)), crc)
+        return crc
+
     def write_memory_hex(self, data):
         split = data.split(b',')
         addr = int(split[0], 16)
@@ -864,7 +978,7 @@ class GDBServer(threading.Thread):
         length = int(split[0], 16)
 
         split = split[1].split(b'#')
-        data = hex_to_byte_list(split[0])
+        data = hex_decode(split[0])
 
         TRACE_MEM.debug("GDB writeMemHex: addr=%x len=%x", addr, length)
 
@@ -888,8 +1002,7 @@ class GDBServer(threading.Thread):
         TRACE_MEM.debug("GDB writeMem: addr=%x len=%x", addr, length)
 
         idx_begin = data.index(b':') + 1
-        data = data[idx_begin:len(data) - 3]
-        data = unescape(data)
+        data = unescape_bytes(data[idx_begin:len(data) - 3])
 
         try:
             if length > 0:
@@ -950,6 +1063,10 @@ class GDBServer(threading.Thread):
                 # Must return an empty packet for an unrecognized qXfer.
                 return self.create_rsp_packet(b"")
 
+        elif query[0] == b'CRC':
+            # Must be checked before qC.
+            return self.get_memory_crc(query[1])
+
         elif query[0].startswith(b'C'):
             if not self.is_threading_enabled():
                 return self.create_rsp_packet(b"QC1")
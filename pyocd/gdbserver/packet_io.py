@@ -49,13 +49,14 @@ class GDBServerPacketIOThread(threading.Thread):
     ## 100 ms timeout for socket and receive queue reads.
     RECEIVE_TIMEOUT = 0.1
 
-    def __init__(self, abstract_socket):
+    def __init__(self, abstract_socket, interrupt_callback=None):
         super().__init__()
         self.name = "gdb-packet-thread-port%d" % abstract_socket.port
         self._abstract_socket = abstract_socket
         self._receive_queue = queue.Queue()
         self._shutdown_event = threading.Event()
         self.interrupt_event = threading.Event()
+        self._interrupt_callback = interrupt_callback
         self.send_acks = True
         self._clear_send_acks = False
         self._buffer = b''
@@ -183,6 +184,8 @@ class GDBServerPacketIOThread(threading.Thread):
             if len(self._buffer) and self._buffer[0:1] == CTRL_C:
                 self.interrupt_event.set()
                 self._buffer = self._buffer[1:]
+                if self._interrupt_callback is not None:
+                    self._interrupt_callback()
 
             try:
                 # Look for complete packet and extract from buffer.
@@ -0,0 +1,127 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from typing import (Optional, Sequence, Tuple, TYPE_CHECKING)
+
+from ..core import exceptions
+from ..utility.mask import (align_down, align_up)
+
+if TYPE_CHECKING:
+    from ..debug.context import DebugContext
+
+LOG = logging.getLogger(__name__)
+
+class ReadAheadPrefetcher:
+    """@brief Adaptive read-ahead for memory reads requested by gdb.
+
+    gdb tends to read memory in many small packets when disassembling, unwinding the stack, or
+    printing structures. This class sits in front of a caching debug context and watches the
+    sequence of read requests. When a request continues the previous one, either directly following it
+    or at the same stride as the last two requests, an aligned chunk around the request is read in a
+    single block transfer. The chunk lands in the context's memory cache, so the requested bytes and
+    the following requests are served from the cache.
+
+    The read-ahead window starts at #MIN_SIZE bytes and doubles with each consecutive hit up to the
+    configured maximum. A non-sequential access resets it.
+
+    Only readable and cacheable memory regions are prefetched from, and chunks are clipped to the
+    region containing the request. Device memory is never read ahead, so registers with read side
+    effects are only accessed when gdb asks for them.
+    """
+
+    ## Smallest read-ahead window in bytes.
+    MIN_SIZE = 64
+
+    def __init__(self, context: "DebugContext", max_size: int) -> None:
+        """@brief Constructor.
+        @param self
+        @param context The debug context used for all reads. Should have a memory cache.
+        @param max_size Maximum read-ahead window in bytes. If less than #MIN_SIZE, read-ahead is disabled.
+        """
+        self._context = context
+        self._max_size = max_size
+        self._run_token = -1
+        self.reset()
+
+    def reset(self) -> None:
+        """@brief Forget the access history."""
+        self._last_addr: Optional[int] = None
+        self._last_end: Optional[int] = None
+        self._stride = 0
+        self._window = 0
+        self._prefetched: Optional[Tuple[int, int]] = None
+
+    def read_memory_block8(self, addr: int, size: int) -> Sequence[int]:
+        """@brief Read a block of memory, prefetching ahead of the request when appropriate."""
+        if self._max_size >= self.MIN_SIZE and 0 < size < self._max_size:
+            self._prefetch(addr, size)
+        return self._context.read_memory_block8(addr, size)
+
+    def _prefetch(self, addr: int, size: int) -> None:
+        end = addr + size
+
+        # Anything prefetched before the core last ran has been dropped from the cache.
+        run_token = self._context.core.run_token
+        if run_token != self._run_token:
+            self.reset()
+            self._run_token = run_token
+
+        # Classify the access.
+        if self._last_addr is None:
+            stride = 0
+            is_sequential = False
+        else:
+            stride = addr - self._last_addr
+            is_sequential = (addr == self._last_end) \
+                    or (stride != 0 and stride == self._stride and abs(stride) <= self._max_size)
+        self._last_addr = addr
+        self._last_end = end
+        self._stride = stride
+
+        if not is_sequential:
+            self._window = 0
+            return
+
+        # Nothing to do if this request was covered by the last prefetch.
+        if (self._prefetched is not None) and (self._prefetched[0] <= addr) and (end <= self._prefetched[1]):
+            return
+
+        region = self._context.core.memory_map.get_region_for_address(addr)
+        if (region is None) or not (region.is_readable and region.is_cacheable) \
+                or not region.contains_address(end - 1):
+            return
+
+        self._window = min(max(self._window * 2, self.MIN_SIZE), self._max_size)
+
+        # Extend the chunk in the direction of travel, keeping it aligned to the minimum window size.
+        if stride < 0:
+            chunk_end = align_up(end, self.MIN_SIZE)
+            chunk_start = min(addr, chunk_end - self._window)
+        else:
+            chunk_start = align_down(addr, self.MIN_SIZE)
+            chunk_end = max(end, chunk_start + self._window)
+        chunk_start = max(chunk_start, region.start)
+        chunk_end = min(chunk_end, region.end + 1)
+
+        try:
+            self._context.read_memory_block8(chunk_start, chunk_end - chunk_start)
+        except exceptions.TransferError as e:
+            LOG.debug("read-ahead of [%#010x:%#010x) failed: %s", chunk_start, chunk_end, e)
+            self._window = 0
+            self._prefetched = None
+        else:
+            self._prefetched = (chunk_start, chunk_end)
@@ -745,6 +745,9 @@ class CMSISDAPProbePlugin(Plugin):
         return [
             OptionInfo('cmsis_dap.deferred_transfers', bool, True,
                 "Whether the CMSIS-DAP probe backend will use deferred transfers for improved performance."),
+            OptionInfo('cmsis_dap.execute_commands', bool, True,
+                "Whether to combine transfer commands into one packet with DAP_ExecuteCommands, if supported "
+                "by the probe."),
             OptionInfo('cmsis_dap.limit_packets', bool, False,
                 "Restrict CMSIS-DAP backend to using a single in-flight command at a time."),
             ]
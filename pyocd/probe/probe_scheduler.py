@@ -0,0 +1,221 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from time import perf_counter
+from typing import (Any, Dict, List, Optional)
+
+from ..core import exceptions
+
+class ClientPriority(Enum):
+    """@brief Scheduling classes for probe server clients.
+
+    The value is the relative share of probe time a client of the class receives when all clients
+    are busy.
+    """
+    LOW = 1
+    NORMAL = 2
+    HIGH = 4
+
+    @classmethod
+    def from_name(cls, name: str) -> "ClientPriority":
+        """@brief Look up a priority by case-insensitive name.
+        @exception Error The name is not a valid priority.
+        """
+        try:
+            return cls[name.upper()]
+        except (KeyError, AttributeError):
+            raise exceptions.Error("invalid client priority '%s' (expected %s)" %
+                    (name, ", ".join(p.name.lower() for p in cls)))
+
+@dataclass
+class ClientStats:
+    """@brief Usage statistics for one probe server client."""
+    name: str                       # Client address
+    priority: str                   # Name of the client's priority class
+    connect_time: float             # Value of perf_counter() when the client connected
+    requests: int = 0               # Number of requests executed
+    busy_time: float = 0.0          # Total time the client had access to the probe
+    waits: int = 0                  # Number of times the client queued for access
+    total_wait: float = 0.0         # Total time spent queued
+    max_wait: float = 0.0           # Longest time spent queued
+
+    def to_dict(self) -> Dict[str, Any]:
+        """@brief Statistics including derived values, suitable for logging or JSON."""
+        elapsed = perf_counter() - self.connect_time
+        return {
+                'name': self.name,
+                'priority': self.priority,
+                'connected_time': elapsed,
+                'requests': self.requests,
+                'requests_per_second': (self.requests / elapsed) if elapsed > 0 else 0.0,
+                'busy_time': self.busy_time,
+                'waits': self.waits,
+                'average_wait': (self.total_wait / self.waits) if self.waits else 0.0,
+                'max_wait': self.max_wait,
+            }
+
+class ProbeClient:
+    """@brief Scheduler state for one client."""
+
+    def __init__(self, name: str, priority: ClientPriority, sequence: int) -> None:
+        self.priority = priority
+        self.stats = ClientStats(name, priority.name.lower(), perf_counter())
+        ## Probe time used, divided by the priority weight.
+        self.virtual_time = 0.0
+        ## Number of nested probe locks held by the client.
+        self.lock_depth = 0
+        ## Order of arrival in the wait queue, to break ties.
+        self.sequence = sequence
+        ## When the client was given access to the probe.
+        self.grant_time = 0.0
+
+class ProbeScheduler:
+    """@brief Arbitrates access to a shared probe between probe server clients.
+
+    Each client connection is registered with the scheduler and must acquire() access before
+    executing requests on the probe. Only one client has access at a time. A client keeps access
+    while it has requests to execute, until its time slice has expired and another client is
+    waiting, at which point it should release() at the next request boundary. It also releases
+    access whenever it is idle.
+
+    Waiting clients are served in order of their virtual time, the probe time they have used so far
+    divided by the weight of their priority class. Clients in a higher class therefore receive a
+    proportionally larger share of the probe when several are busy, but no client is starved. A
+    lightly loaded client, such as an RTT monitor, has a low virtual time and so gets access
+    quickly even while a flash job is running. A client returning from idle is given no more than
+    the current minimum virtual time, so it can't save up credit while idle.
+
+    A client holding the probe lock keeps access until it unlocks, so requests from other clients
+    can't interleave with the locked sequence.
+    """
+
+    def __init__(self, time_slice: float) -> None:
+        """@brief Constructor.
+        @param self
+        @param time_slice Seconds a client may keep access while other clients are waiting.
+        """
+        self._time_slice = time_slice
+        self._condition = threading.Condition()
+        self._clients: List[ProbeClient] = []
+        self._waiting: List[ProbeClient] = []
+        self._owner: Optional[ProbeClient] = None
+        self._sequence = 0
+
+    @property
+    def time_slice(self) -> float:
+        return self._time_slice
+
+    @property
+    def owner(self) -> Optional[ProbeClient]:
+        """@brief The client that currently has access to the probe, or None."""
+        return self._owner
+
+    def register(self, name: str, priority: ClientPriority = ClientPriority.NORMAL) -> ProbeClient:
+        """@brief Add a new client."""
+        with self._condition:
+            client = ProbeClient(name, priority, self._next_sequence())
+            client.virtual_time = self._min_virtual_time()
+            self._clients.append(client)
+            return client
+
+    def unregister(self, client: ProbeClient) -> None:
+        """@brief Remove a disconnected client, releasing access if it has it."""
+        with self._condition:
+            client.lock_depth = 0
+            self._release(client)
+            if client in self._waiting:
+                self._waiting.remove(client)
+            if client in self._clients:
+                self._clients.remove(client)
+            self._condition.notify_all()
+
+    def set_priority(self, client: ProbeClient, priority: ClientPriority) -> None:
+        """@brief Change the scheduling class of a client."""
+        with self._condition:
+            client.priority = priority
+            client.stats.priority = priority.name.lower()
+
+    def acquire(self, client: ProbeClient) -> None:
+        """@brief Wait until the client has access to the probe.
+
+        Returns immediately if the client already has access.
+        """
+        with self._condition:
+            if self._owner is client:
+                return
+            start = perf_counter()
+            client.virtual_time = max(client.virtual_time, self._min_virtual_time())
+            client.sequence = self._next_sequence()
+            self._waiting.append(client)
+            while not ((self._owner is None) and (self._next_client() is client)):
+                self._condition.wait()
+            self._waiting.remove(client)
+            self._owner = client
+            client.grant_time = perf_counter()
+
+            wait = client.grant_time - start
+            client.stats.waits += 1
+            client.stats.total_wait += wait
+            client.stats.max_wait = max(client.stats.max_wait, wait)
+
+    def release(self, client: ProbeClient) -> None:
+        """@brief Give up access to the probe, unless the client holds the probe lock."""
+        with self._condition:
+            if client.lock_depth == 0:
+                self._release(client)
+
+    def should_yield(self, client: ProbeClient) -> bool:
+        """@brief Whether the client should release access before its next request.
+
+        True if the client's time slice has expired while other clients are waiting, and the
+        client doesn't hold the probe lock.
+        """
+        return ((self._owner is client)
+                and bool(self._waiting)
+                and (client.lock_depth == 0)
+                and (perf_counter() - client.grant_time >= self._time_slice))
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """@brief Statistics for all connected clients."""
+        with self._condition:
+            return [client.stats.to_dict() for client in self._clients]
+
+    def _release(self, client: ProbeClient) -> None:
+        if self._owner is not client:
+            return
+        held = perf_counter() - client.grant_time
+        client.stats.busy_time += held
+        client.virtual_time += held / client.priority.value
+        self._owner = None
+        self._condition.notify_all()
+
+    def _next_client(self) -> Optional[ProbeClient]:
+        if not self._waiting:
+            return None
+        return min(self._waiting, key=lambda c: (c.virtual_time, c.sequence))
+
+    def _min_virtual_time(self) -> float:
+        active = self._waiting + ([self._owner] if self._owner is not None else [])
+        if not active:
+            active = self._clients
+        return min((c.virtual_time for c in active), default=0.0)
+
+    def _next_sequence(self) -> int:
+        self._sequence += 1
+        return self._sequence
@@ -19,6 +19,7 @@
 import re
 import logging
 import collections
+import struct
 import threading
 from typing import (Any, Dict, Optional, Tuple, Union)
 
@@ -53,6 +54,9 @@ WRITE = 0 << 1
 VALUE_MATCH = 1 << 4
 MATCH_MASK = 1 << 5
 
+# Packed DAP_Transfer request byte followed by its write data word.
+_REQUEST_WORD = struct.Struct('<BI')
+
 # SWO statuses.
 class SWOStatus:
     DISABLED = 1
@@ -130,15 +134,11 @@ class _Transfer(object):
         """@brief Add data read from the remote device to this object.
 
         The size of data added must match exactly the size
-        that get_data_size returns.
+        that get_data_size returns. Any bytes-like object may be passed, including a memoryview
+        of the response packet; the data is not referenced after this method returns.
         """
         assert len(data) == self._size_bytes
-        result = []
-        for i in range(0, self._size_bytes, 4):
-            word = ((data[0 + i] << 0) | (data[1 + i] << 8) |
-                    (data[2 + i] << 16) | (data[3 + i] << 24))
-            result.append(word)
-        self._result = result
+        self._result = list(struct.unpack(f'<{self.transfer_count}I', data))
 
     def add_error(self, error):
         """@brief Attach an exception to this transfer rather than data.
@@ -149,7 +149,9 @@ class _Transfer(object):
     def get_result(self):
         """@brief Get the result of this transfer.
         """
-        while self._result is None:
+        # Responses may be decoded early, while sending later commands, so the transfer can already
+        # have failed by the time its result is requested.
+        while self._result is None and self._error is None:
             if len(self.daplink._commands_to_read) > 0:
                 self.daplink._read_packet()
             else:
@@ -166,6 +168,38 @@ class _Transfer(object):
         assert self._result is not None
         return self._result
 
+class _TransferSegment(object):
+    """@brief One DAP_Transfer or DAP_TransferBlock command within a _Command packet."""
+
+    __slots__ = ('read_count', 'write_count', 'block_allowed', 'block_request', 'data')
+
+    def __init__(self):
+        self.read_count = 0
+        self.write_count = 0
+        self.block_allowed = True
+        self.block_request = None
+        self.data = []
+
+    @property
+    def transfer_count(self):
+        return self.read_count + self.write_count
+
+    @property
+    def request_size(self):
+        """@brief Number of bytes used by this segment's command."""
+        if self.block_allowed:
+            return 5 + 4 * self.write_count
+        else:
+            return 3 + self.read_count + 5 * self.write_count
+
+    @property
+    def response_size(self):
+        """@brief Number of bytes used by this segment's response."""
+        if self.block_allowed:
+            return 4 + 4 * self.read_count
+        else:
+            return 3 + 4 * self.read_count
+
 class _Command(object):
     """@brief Wrapper object representing a command sent to the layer below (ex. USB).
 
@@ -176,21 +210,31 @@ class _Command(object):
     decides if it is more efficient to use DAP_Transfer or DAP_TransferBlock.
     The payload to send over the layer below is constructed with
     encode_data.  The response to the command is decoded with decode_data.
+
+    If the probe supports DAP_ExecuteCommands, a packet can hold a sequence of transfer
+    commands, called segments. A run of transfers to the same register is then kept in its
+    own DAP_TransferBlock segment instead of forcing the whole packet to use the less compact
+    DAP_Transfer command. Segments are always executed in the order the transfers were added,
+    so the ordering of TAR, CSW, and DRW accesses is never changed.
     """
 
     _command_counter = 0
 
     _UNSET_DAP_INDEX: int = -1
 
-    def __init__(self, size):
+    ## Maximum number of commands in a DAP_ExecuteCommands packet.
+    _MAX_SEGMENTS = 255
+
+    def __init__(self, size, allow_segments=False):
         self._id = _Command._command_counter
         _Command._command_counter += 1
         self._size = size
-        self._read_count = 0
-        self._write_count = 0
-        self._block_allowed = True
-        self._block_request = None
-        self._data = []
+        self._allow_segments = allow_segments
+        self._segments = []
+        self._closed_request_size = 0
+        self._closed_response_size = 0
+        self._segment = _TransferSegment()
+        self._start_segment_on_add = False
         self._dap_index = self._UNSET_DAP_INDEX
         self._data_encoded = False
         TRACE.debug("[cmd:%d] New _Command", self._id)
@@ -199,23 +243,53 @@ class _Command(object):
     def uid(self) -> int:
         return self._id
 
-    def _get_free_transfers(self, blockAllowed, isRead):
+    def _get_available(self, starting_segment=False):
+        """@brief Return the number of free request and response bytes for the open segment.
+
+        @param self
+        @param starting_segment If True, the result is for a new segment that would follow the
+            current open segment.
+        """
+        send = self._size - self._closed_request_size
+        recv = self._size - self._closed_response_size
+        if starting_segment:
+            send -= self._segment.request_size
+            recv -= self._segment.response_size
+        # A DAP_ExecuteCommands packet has 2 header bytes in both directions.
+        if self._segments or starting_segment:
+            send -= 2
+            recv -= 2
+        return send, recv
+
+    def _get_free_transfers(self, blockAllowed, isRead, starting_segment=False):
         """@brief Return the number of available read or write transfers.
+
+        The segment's command and response must both fit, so 0 is returned if either direction
+        has no room left for the segment's fixed size.
         """
+        send, recv = self._get_available(starting_segment)
+        if starting_segment:
+            read_count = write_count = 0
+        else:
+            read_count = self._segment.read_count
+            write_count = self._segment.write_count
+
         if blockAllowed:
             # DAP_TransferBlock request packet:
             #   BYTE | BYTE *****| SHORT**********| BYTE *************| WORD *********|
             # > 0x06 | DAP Index | Transfer Count | Transfer Request  | Transfer Data |
             #  ******|***********|****************|*******************|+++++++++++++++|
-            send = self._size - 5 - 4 * self._write_count
+            send = send - 5 - 4 * write_count
 
             # DAP_TransferBlock response packet:
             #   BYTE | SHORT *********| BYTE *************| WORD *********|
             # < 0x06 | Transfer Count | Transfer Response | Transfer Data |
             #  ******|****************|*******************|+++++++++++++++|
-            recv = self._size - 4 - 4 * self._read_count
+            recv = recv - 4 - 4 * read_count
 
-            if isRead:
+            if (send < 0) or (recv < 0):
+                return 0
+            elif isRead:
                 return recv // 4
             else:
                 return send // 4
@@ -224,21 +298,71 @@ class _Command(object):
             #   BYTE | BYTE *****| BYTE **********| BYTE *************| WORD *********|
             # > 0x05 | DAP Index | Transfer Count | Transfer Request  | Transfer Data |
             #  ******|***********|****************|+++++++++++++++++++++++++++++++++++|
-            send = self._size - 3 - 1 * self._read_count - 5 * self._write_count
+            send = send - 3 - 1 * read_count - 5 * write_count
 
             # DAP_Transfer response packet:
             #   BYTE | BYTE **********| BYTE *************| WORD *********|
             # < 0x05 | Transfer Count | Transfer Response | Transfer Data |
             #  ******|****************|*******************|+++++++++++++++|
-            recv = self._size - 3 - 4 * self._read_count
+            recv = recv - 3 - 4 * read_count
 
-            if isRead:
+            if (send < 0) or (recv < 0):
+                return 0
+            elif isRead:
                 # 1 request byte in request packet, 4 data bytes in response packet
                 return min(send, recv // 4)
             else:
                 # 1 request byte + 4 data bytes
                 return send // 5
 
+    def _get_free_transfers_in_new_segment(self, request):
+        """@brief Return the number of transfers of a request that would fit in a new segment.
+
+        Returns 0 if a new segment cannot be started.
+        """
+        seg = self._segment
+        if (not self._allow_segments) or (seg.transfer_count == 0) \
+                or (seg.block_allowed and request == seg.block_request) \
+                or (len(self._segments) + 1 >= self._MAX_SEGMENTS):
+            return 0
+        return self._get_free_transfers(True, request & READ, starting_segment=True)
+
+    def _should_start_segment(self, count, request):
+        """@brief Decide whether a request should be placed in a new segment of this packet.
+
+        The alternative is adding the request to the open segment, converting it to DAP_Transfer
+        if necessary. The packet size used by both choices is computed for the same number of
+        transfers, and the choice that uses the least space in the more full direction (command or
+        response) wins. In practice, runs of writes to the same register are put into their own
+        DAP_TransferBlock segments since DAP_Transfer needs an extra request byte for each write,
+        while reads, which are limited by response space, are merged.
+        """
+        free_in_new = self._get_free_transfers_in_new_segment(request)
+        if free_in_new == 0:
+            return False
+        seg = self._segment
+        is_read = request & READ
+        # DAP_Transfer has only 1 byte for transfer count.
+        free_in_open = min(self._get_free_transfers(False, is_read), 255 - seg.transfer_count)
+        if free_in_open <= 0:
+            return True
+
+        n = min(count, free_in_new, free_in_open)
+        reads = n if is_read else 0
+        writes = 0 if is_read else n
+        header = 2 if self._segments else 0
+
+        # Sizes if the open segment is converted to DAP_Transfer and the request added to it.
+        merged_send = self._closed_request_size + header + 3 + seg.read_count + reads \
+                + 5 * (seg.write_count + writes)
+        merged_recv = self._closed_response_size + header + 3 + 4 * (seg.read_count + reads)
+
+        # Sizes if the request is put in a new DAP_TransferBlock segment.
+        split_send = self._closed_request_size + 2 + seg.request_size + 5 + 4 * writes
+        split_recv = self._closed_response_size + 2 + seg.response_size + 4 + 4 * reads
+
+        return max(split_send, split_recv) < max(merged_send, merged_recv)
+
     def get_request_space(self, count, request, dap_index):
         assert self._data_encoded is False
 
@@ -246,28 +370,40 @@ class _Command(object):
         if self._dap_index != self._UNSET_DAP_INDEX and dap_index != self._dap_index:
             return 0
 
+        is_read = request & READ
+
+        # Check whether the request would be better placed in a new segment.
+        self._start_segment_on_add = False
+        if self._should_start_segment(count, request):
+            free = self._get_free_transfers(True, is_read, starting_segment=True)
+            size = min(count, free)
+            TRACE.debug("[cmd:%d] get_request_space(%d, %02x:%s)[wc=%d, rc=%d, seg=%d] -> new segment (sz=%d, free=%d)",
+                    self.uid, count, request, 'r' if is_read else 'w', self._segment.write_count,
+                    self._segment.read_count, len(self._segments), size, free)
+            self._start_segment_on_add = True
+            return size
+
         # Block transfers must use the same request.
-        blockAllowed = self._block_allowed
-        if self._block_request is not None and request != self._block_request:
+        blockAllowed = self._segment.block_allowed
+        if self._segment.block_request is not None and request != self._segment.block_request:
             blockAllowed = False
 
         # Compute the portion of the request that will fit in this packet.
-        is_read = request & READ
         free = self._get_free_transfers(blockAllowed, is_read)
         size = min(count, free)
 
         # Non-block transfers only have 1 byte for request count.
         if not blockAllowed:
-            max_count = self._write_count + self._read_count + size
+            max_count = self._segment.transfer_count + size
             delta = max_count - 255
             size = min(size - delta, size)
             TRACE.debug("[cmd:%d] get_request_space(%d, %02x:%s)[wc=%d, rc=%d, ba=%d->%d] -> (sz=%d, free=%d, delta=%d)",
-                    self.uid, count, request, 'r' if is_read else 'w', self._write_count, self._read_count,
-                    self._block_allowed, blockAllowed, size, free, delta)
+                    self.uid, count, request, 'r' if is_read else 'w', self._segment.write_count,
+                    self._segment.read_count, self._segment.block_allowed, blockAllowed, size, free, delta)
         else:
             TRACE.debug("[cmd:%d] get_request_space(%d, %02x:%s)[wc=%d, rc=%d, ba=%d->%d] -> (sz=%d, free=%d)",
-                    self.uid, count, request, 'r' if is_read else 'w', self._write_count, self._read_count,
-                    self._block_allowed, blockAllowed, size, free)
+                    self.uid, count, request, 'r' if is_read else 'w', self._segment.write_count,
+                    self._segment.read_count, self._segment.block_allowed, blockAllowed, size, free)
 
         # We can get a negative free count if the packet already contains more data than can be
         # sent by a DAP_Transfer command, but the new request forces DAP_Transfer. In this case,
@@ -275,71 +411,73 @@ class _Command(object):
         return max(size, 0)
 
     def get_full(self):
-        return (self._get_free_transfers(self._block_allowed, True) == 0) or \
-            (self._get_free_transfers(self._block_allowed, False) == 0)
+        return (self._get_free_transfers(self._segment.block_allowed, True) <= 0) or \
+            (self._get_free_transfers(self._segment.block_allowed, False) <= 0)
 
     def get_empty(self):
         """@brief Return True if no transfers have been added to this packet
         """
-        return len(self._data) == 0
+        return (len(self._segment.data) == 0) and (len(self._segments) == 0)
+
+    def _close_segment(self):
+        """@brief Finish the open segment and start a new one."""
+        seg = self._segment
+        self._closed_request_size += seg.request_size
+        self._closed_response_size += seg.response_size
+        self._segments.append(seg)
+        self._segment = _TransferSegment()
 
     def add(self, count, request, data, dap_index):
         """@brief Add a single or block register transfer operation to this command
+
+        Must be preceded by a call to get_request_space() for the same request.
         """
         assert self._data_encoded is False
         if self._dap_index == self._UNSET_DAP_INDEX:
             self._dap_index = dap_index
         assert self._dap_index == dap_index
 
-        if self._block_request is None:
-            self._block_request = request
-        elif request != self._block_request:
-            self._block_allowed = False
-        assert not self._block_allowed or self._block_request == request
+        if self._start_segment_on_add:
+            self._start_segment_on_add = False
+            self._close_segment()
+
+        seg = self._segment
+        if seg.block_request is None:
+            seg.block_request = request
+        elif request != seg.block_request:
+            seg.block_allowed = False
+        assert not seg.block_allowed or seg.block_request == request
 
         if request & READ:
-            self._read_count += count
+            seg.read_count += count
         else:
-            self._write_count += count
-        self._data.append((count, request, data))
+            seg.write_count += count
+        seg.data.append((count, request, data))
 
-        TRACE.debug("[cmd:%d] add(%d, %02x:%s) -> [wc=%d, rc=%d, ba=%d]",
-                self.uid, count, request, 'r' if (request & READ) else 'w', self._write_count, self._read_count,
-                self._block_allowed)
+        TRACE.debug("[cmd:%d] add(%d, %02x:%s) -> [wc=%d, rc=%d, ba=%d, seg=%d]",
+                self.uid, count, request, 'r' if (request & READ) else 'w', seg.write_count, seg.read_count,
+                seg.block_allowed, len(self._segments))
 
-    def _encode_transfer_data(self):
-        """@brief Encode this command into a byte array that can be sent
+    def _encode_transfer_data(self, buf, pos, seg):
+        """@brief Encode a segment into a byte array that can be sent
 
-        The data returned by this function is a bytearray in
-        the format that of a DAP_Transfer CMSIS-DAP command.
+        The segment is written into `buf` at offset `pos` in the format of a DAP_Transfer
+        CMSIS-DAP command. The offset following the command is returned.
         """
-        assert self.get_empty() is False
-        buf = bytearray(self._size)
-        transfer_count = self._read_count + self._write_count
-        pos = 0
         buf[pos] = Command.DAP_TRANSFER
-        pos += 1
-        buf[pos] = self._dap_index
-        pos += 1
-        buf[pos] = transfer_count
-        pos += 1
-        for count, request, write_list in self._data:
+        buf[pos + 1] = self._dap_index
+        buf[pos + 2] = seg.transfer_count
+        pos += 3
+        for count, request, write_list in seg.data:
             assert write_list is None or len(write_list) <= count
-            write_pos = 0
-            for _ in range(count):
-                buf[pos] = request
-                pos += 1
-                if not request & READ:
-                    buf[pos] = (write_list[write_pos] >> (8 * 0)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 1)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 2)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 3)) & 0xff
-                    pos += 1
-                    write_pos += 1
-        return buf[:pos]
+            if request & READ:
+                buf[pos:pos + count] = bytes((request,)) * count
+                pos += count
+            else:
+                for value in write_list:
+                    _REQUEST_WORD.pack_into(buf, pos, request, value & 0xffffffff)
+                    pos += 5
+        return pos
 
     def _check_response(self, response):
         """@brief Check the response status byte from CMSIS-DAP transfer commands.
@@ -371,89 +509,76 @@ class _Command(object):
         elif (response & DAPTransferResponse.PROTOCOL_ERROR_MASK) != 0:
             raise DAPAccessIntf.TransferError("SWD protocol error")
 
-    def _decode_transfer_data(self, data):
+    def _decode_transfer_data(self, data, pos, seg):
         """@brief Take a byte array and extract the data from it
 
-        Decode the response returned by a DAP_Transfer CMSIS-DAP command
-        and return it as an array of bytes.
+        Decode the response returned by a DAP_Transfer CMSIS-DAP command at offset `pos` of
+        `data`. A tuple of the read data and the offset following the response is returned.
+        If `data` is a memoryview, the returned data is a view into the same buffer.
         """
-        assert self.get_empty() is False
-        if data[0] != Command.DAP_TRANSFER:
+        if data[pos] != Command.DAP_TRANSFER:
             TRACE.debug("[cmd:%d] response not DAP_TRANSFER", self.uid)
-            raise DAPAccessIntf.TransferError(f'DAP_TRANSFER response error: response is for command {data[0]:02x}')
+            raise DAPAccessIntf.TransferError(f'DAP_TRANSFER response error: response is for command {data[pos]:02x}')
 
         # Check response and raise an exception on errors.
-        self._check_response(data[2])
+        self._check_response(data[pos + 2])
 
         # Check for count mismatch after checking for DAP_TRANSFER_FAULT
         # This allows TransferFaultError or TransferTimeoutError to get
         # thrown instead of TransferFaultError
-        if data[1] != self._read_count + self._write_count:
+        if data[pos + 1] != seg.transfer_count:
             raise DAPAccessIntf.TransferError()
 
-        return data[3:3 + 4 * self._read_count]
+        end = pos + 3 + 4 * seg.read_count
+        return data[pos + 3:end], end
 
-    def _encode_transfer_block_data(self):
-        """@brief Encode this command into a byte array that can be sent
+    def _encode_transfer_block_data(self, buf, pos, seg):
+        """@brief Encode a segment into a byte array that can be sent
 
-        The data returned by this function is a bytearray in
-        the format that of a DAP_TransferBlock CMSIS-DAP command.
+        The segment is written into `buf` at offset `pos` in the format of a DAP_TransferBlock
+        CMSIS-DAP command. The offset following the command is returned.
         """
-        assert self.get_empty() is False
-        buf = bytearray(self._size)
-        transfer_count = self._read_count + self._write_count
-        assert not (self._read_count != 0 and self._write_count != 0)
-        assert self._block_request is not None
-        pos = 0
+        transfer_count = seg.transfer_count
+        assert not (seg.read_count != 0 and seg.write_count != 0)
+        assert seg.block_request is not None
         buf[pos] = Command.DAP_TRANSFER_BLOCK
-        pos += 1
-        buf[pos] = self._dap_index
-        pos += 1
-        buf[pos] = transfer_count & 0xff
-        pos += 1
-        buf[pos] = (transfer_count >> 8) & 0xff
-        pos += 1
-        buf[pos] = self._block_request
-        pos += 1
-        for count, request, write_list in self._data:
+        buf[pos + 1] = self._dap_index
+        buf[pos + 2] = transfer_count & 0xff
+        buf[pos + 3] = (transfer_count >> 8) & 0xff
+        buf[pos + 4] = seg.block_request
+        pos += 5
+        for count, request, write_list in seg.data:
             assert write_list is None or len(write_list) <= count
-            assert request == self._block_request
-            write_pos = 0
+            assert request == seg.block_request
             if not request & READ:
-                for _ in range(count):
-                    buf[pos] = (write_list[write_pos] >> (8 * 0)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 1)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 2)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 3)) & 0xff
-                    pos += 1
-                    write_pos += 1
-        return buf[:pos]
-
-    def _decode_transfer_block_data(self, data):
+                count = len(write_list)
+                struct.pack_into(f'<{count}I', buf, pos, *(v & 0xffffffff for v in write_list))
+                pos += 4 * count
+        return pos
+
+    def _decode_transfer_block_data(self, data, pos, seg):
         """@brief Take a byte array and extract the data from it
 
-        Decode the response returned by a DAP_TransferBlock CMSIS-DAP command
-        and return it as an array of bytes.
+        Decode the response returned by a DAP_TransferBlock CMSIS-DAP command at offset `pos` of
+        `data`. A tuple of the read data and the offset following the response is returned.
+        If `data` is a memoryview, the returned data is a view into the same buffer.
         """
-        assert self.get_empty() is False
-        if data[0] != Command.DAP_TRANSFER_BLOCK:
+        if data[pos] != Command.DAP_TRANSFER_BLOCK:
             TRACE.debug("[cmd:%d] response not DAP_TRANSFER_BLOCK", self.uid)
-            raise DAPAccessIntf.TransferError(f'DAP_TRANSFER_BLOCK response error: response is for command {data[0]:02x}')
+            raise DAPAccessIntf.TransferError(f'DAP_TRANSFER_BLOCK response error: response is for command {data[pos]:02x}')
 
         # Check response and raise an exception on errors.
-        self._check_response(data[3])
+        self._check_response(data[pos + 3])
 
         # Check for count mismatch after checking for DAP_TRANSFER_FAULT
         # This allows TransferFaultError or TransferTimeoutError to get
         # thrown instead of TransferFaultError
-        transfer_count = data[1] | (data[2] << 8)
-        if transfer_count != self._read_count + self._write_count:
+        transfer_count = data[pos + 1] | (data[pos + 2] << 8)
+        if transfer_count != seg.transfer_count:
             raise DAPAccessIntf.TransferError()
 
-        return data[4:4 + 4 * self._read_count]
+        end = pos + 4 + 4 * seg.read_count
+        return data[pos + 4:end], end
 
     def encode_data(self):
         """@brief Encode this command into a byte array that can be sent
@@ -463,22 +588,55 @@ class _Command(object):
         """
         assert self.get_empty() is False
         self._data_encoded = True
-        if self._block_allowed:
-            data = self._encode_transfer_block_data()
+        if self._segment.transfer_count:
+            self._close_segment()
+
+        buf = bytearray(self._size)
+        if len(self._segments) > 1:
+            buf[0] = Command.DAP_EXECUTE_COMMANDS
+            buf[1] = len(self._segments)
+            pos = 2
         else:
-            data = self._encode_transfer_data()
-        return data
+            pos = 0
+        for seg in self._segments:
+            if seg.block_allowed:
+                pos = self._encode_transfer_block_data(buf, pos, seg)
+            else:
+                pos = self._encode_transfer_data(buf, pos, seg)
+
+        # Truncate in place rather than copying with a slice.
+        del buf[pos:]
+        return buf
 
     def decode_data(self, data):
         """@brief Decode the response data
         """
         assert self.get_empty() is False
         assert self._data_encoded is True
-        if self._block_allowed:
-            data = self._decode_transfer_block_data(data)
+        if len(self._segments) > 1:
+            if data[0] != Command.DAP_EXECUTE_COMMANDS:
+                TRACE.debug("[cmd:%d] response not DAP_EXECUTE_COMMANDS", self.uid)
+                raise DAPAccessIntf.TransferError("DAP_EXECUTE_COMMANDS response error: "
+                        f"response is for command {data[0]:02x}")
+            if data[1] != len(self._segments):
+                raise DAPAccessIntf.TransferError()
+            pos = 2
         else:
-            data = self._decode_transfer_data(data)
-        return data
+            pos = 0
+
+        # Responses are checked in order, so the first failed command raises its error.
+        results = []
+        for seg in self._segments:
+            if seg.block_allowed:
+                result, pos = self._decode_transfer_block_data(data, pos, seg)
+            else:
+                result, pos = self._decode_transfer_data(data, pos, seg)
+            if seg.read_count:
+                results.append(result)
+
+        if len(results) == 1:
+            return results[0]
+        return b''.join(results)
 
 class DAPAccessCMSISDAP(DAPAccessIntf):
     """@brief An implementation of the DAPAccessIntf layer for DAPLink boards
@@ -585,8 +743,10 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         self._transfer_list = collections.deque()
         self._crnt_cmd = _Command(0)
         self._packet_size = None
+        self._use_execute_commands = False
         self._commands_to_read = collections.deque()
-        self._command_response_buf = bytearray()
+        self._response_buf = bytearray()
+        self._response_len = 0
         self._swo_status = None
         self._cmsis_dap_version: VersionTuple = CMSISDAPVersion.V1_0_0
         self._fw_version: Optional[str] = None
@@ -790,6 +950,12 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         self._capabilities = self.identify(self.ID.CAPABILITIES)
         assert isinstance(self._capabilities, int)
         self._has_swo_uart = (self._capabilities & Capabilities.SWO_UART) != 0
+
+        # Combine transfer commands into DAP_ExecuteCommands packets if the probe supports atomic commands.
+        self._use_execute_commands = ((self._capabilities & Capabilities.ATOMIC_COMMANDS) != 0) \
+                and session.Session.get_current().options['cmsis_dap.execute_commands']
+        LOG.debug("CMSIS-DAP probe %s: %s DAP_ExecuteCommands", self._unique_id,
+                "using" if self._use_execute_commands else "not using")
         if self._has_swo_uart:
             swo_buffer_size_value = self.identify(self.ID.SWO_BUFFER_SIZE)
             if isinstance(swo_buffer_size_value, int) and swo_buffer_size_value > 0:
@@ -1133,12 +1299,13 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         self._transfer_list.clear()
         # The current packet - this can contain multiple
         # different transfers
-        self._crnt_cmd = _Command(self._packet_size)
+        self._crnt_cmd = _Command(self._packet_size, self._use_execute_commands)
         # Packets that have been sent but not read
         self._commands_to_read.clear()
-        # Buffer for data returned for completed commands.
-        # This data will be added to transfers
-        self._command_response_buf = bytearray()
+        # Buffer used to assemble the data for a transfer that spans more
+        # than one response packet, and the number of bytes it holds
+        self._response_buf = bytearray()
+        self._response_len = 0
 
     @locked
     def _read_packet(self):
@@ -1152,38 +1319,55 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         cmd = self._commands_to_read.popleft()
         TRACE.debug("[cmd:%d] _read_packet: reading", cmd.uid)
         try:
-            raw_data = self._interface.read()
-            raw_data = bytearray(raw_data)
+            # The decoded data is a view into the received packet, so no copies are made.
+            raw_data = memoryview(self._interface.read())
             decoded_data = cmd.decode_data(raw_data)
         except Exception as exception:
             TRACE.debug("[cmd:%d] _read_packet: got exception %r; aborting all transfers!", cmd.uid, exception)
             self._abort_all_transfers(exception)
             raise
 
-        decoded_data = bytearray(decoded_data)
-        self._command_response_buf.extend(decoded_data)
-
         # Attach data to transfers
         pos = 0
-        while True:
-            size_left = len(self._command_response_buf) - pos
-            if size_left == 0:
-                # If size left is 0 then the transfer list might
-                # be empty, so don't try to access element 0
-                break
+        size_left = len(decoded_data)
+        while size_left > 0:
             transfer = self._transfer_list[0]
             size = transfer.get_data_size()
-            if size > size_left:
-                break
+            received = self._response_len
+
+            # The common case is that the transfer's data is entirely within this packet.
+            if received == 0 and size <= size_left:
+                self._transfer_list.popleft()
+                transfer.add_response(decoded_data[pos:pos + size])
+                pos += size
+                size_left -= size
+                continue
+
+            # Otherwise accumulate the data into the response buffer until the transfer is complete.
+            if received == 0 and len(self._response_buf) < size:
+                self._response_buf = bytearray(size)
+            count = min(size - received, size_left)
+            self._response_buf[received:received + count] = decoded_data[pos:pos + count]
+            received += count
+            pos += count
+            size_left -= count
+            if received == size:
+                self._transfer_list.popleft()
+                transfer.add_response(memoryview(self._response_buf)[:size])
+                received = 0
+            self._response_len = received
 
-            self._transfer_list.popleft()
-            data = self._command_response_buf[pos:pos + size]
-            pos += size
-            transfer.add_response(data)
+    @locked
+    def _read_completed_packets(self):
+        """@brief Decode all outstanding responses that can be read without blocking.
 
-        # Remove used data from _command_response_buf
-        if pos > 0:
-            self._command_response_buf = self._command_response_buf[pos:]
+        The USB backends receive responses asynchronously, so by the time another command is ready
+        to send some of the commands in flight may have already completed. Processing those responses
+        here keeps the probe's packet buffers filled instead of waiting until every slot is in use and
+        then stalling on a single blocking read.
+        """
+        while self._commands_to_read and self._interface.has_received_data():
+            self._read_packet()
 
     @locked
     def _send_packet(self):
@@ -1198,6 +1382,10 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         if cmd.get_empty():
             return
 
+        # Decode any responses that have already arrived. This frees up packet slots on the probe
+        # without blocking, and completes transfers while the probe works on later commands.
+        self._read_completed_packets()
+
         max_packets = self._interface.get_packet_count()
         if len(self._commands_to_read) >= max_packets:
             TRACE.debug("[cmd:%d] _send_packet: reading packet; outstanding=%d >= max=%d",
@@ -1206,12 +1394,12 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         TRACE.debug("[cmd:%d] _send_packet: sending", cmd.uid)
         data = cmd.encode_data()
         try:
-            self._interface.write(list(data))
+            self._interface.write(data)
         except Exception as exception:
             self._abort_all_transfers(exception)
             raise
         self._commands_to_read.append(cmd)
-        self._crnt_cmd = _Command(self._packet_size)
+        self._crnt_cmd = _Command(self._packet_size, self._use_execute_commands)
 
     @locked
     def _write(self, dap_index, transfer_count,
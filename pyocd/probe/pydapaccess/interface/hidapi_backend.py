@@ -169,7 +169,8 @@ class HidApiUSB(Interface):
         data.extend([0] * (self.packet_size - len(data)))
         if not _IS_WINDOWS:
             self.read_sem.release()
-        self.device.write([0] + data)
+        # Prepend the report ID. The data may be either a list or a bytearray.
+        self.device.write(bytes(1) + bytes(data))
 
     def read(self):
         """@brief Read data on the IN endpoint associated to the HID interface"""
@@ -203,6 +204,13 @@ class HidApiUSB(Interface):
 
         return read_data
 
+    def has_received_data(self):
+        """@brief Whether the read thread has queued a response packet."""
+        # Windows doesn't use the read thread, so there is never any data waiting.
+        if _IS_WINDOWS:
+            return False
+        return not self.received_data.empty()
+
     def close(self):
         """@brief Close the interface"""
         assert not self.closed_event.is_set()
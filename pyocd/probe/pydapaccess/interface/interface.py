@@ -58,6 +58,15 @@ class Interface:
     def read_swo(self):
         raise NotImplementedError()
 
+    def has_received_data(self):
+        """@brief Whether a response packet has already been received and can be read without blocking.
+
+        Backends that receive packets asynchronously (using a read thread or callback) override this
+        method so the CMSIS-DAP layer can decode completed responses while other commands are still in
+        flight. The default returns False, which means only blocking reads are performed.
+        """
+        return False
+
     def get_info(self):
         return self.vendor_name + " " + \
                self.product_name + " (" + \
@@ -238,6 +238,10 @@ class PyUSB(Interface):
 
         return data
 
+    def has_received_data(self):
+        """@brief Whether the read thread has queued a response packet."""
+        return not self.rcv_data.empty()
+
     def close(self):
         """@brief Close the interface"""
         assert self.closed is False
@@ -262,6 +262,10 @@ class PyUSBv2(Interface):
 
         return data
 
+    def has_received_data(self):
+        """@brief Whether the read thread has queued a response packet."""
+        return not self.rcv_data.empty()
+
     def close(self):
         """@brief Close the USB interface."""
         assert self.closed is False
@@ -71,7 +71,7 @@ class PyWinUSB(Interface):
             # Strip off trailing zero bytes to reduce clutter.
             TRACE.debug("  USB IN < (%d) %s", len(data), ' '.join([f'{i:02x}' for i in bytes(data).rstrip(b'\x00')]))
 
-        self.rcv_data.append(data[1:])
+        self.rcv_data.append(bytes(data[1:]))
 
     def open(self):
         self.device.set_raw_data_handler(self.rx_handler)
@@ -148,7 +148,8 @@ class PyWinUSB(Interface):
             TRACE.debug("  USB OUT> (%d) %s", len(data), ' '.join([f'{i:02x}' for i in data]))
 
         data.extend([0] * (self.packet_size - len(data)))
-        self.report.send([0] + data)
+        # Prepend the report ID. The data may be either a list or a bytearray.
+        self.report.send([0] + list(data))
 
     def read(self):
         """@brief Read data on the IN endpoint associated to the HID interface"""
@@ -175,6 +176,10 @@ class PyWinUSB(Interface):
 
         return self.rcv_data.popleft()
 
+    def has_received_data(self):
+        """@brief Whether the report handler has received a response packet."""
+        return len(self.rcv_data) > 0
+
     def close(self):
         """@brief Close the interface"""
         LOG.debug("closing interface")
@@ -17,10 +17,20 @@
 
 import logging
 import json
+import socket
 import threading
-from typing import (Any, Optional, Tuple)
+from typing import (Any, Dict, List, Optional, Tuple)
 
 from .debug_probe import DebugProbe
+from .tcp_probe_protocol import (
+    BATCH_REQUESTS,
+    BINARY_PROTOCOL_VERSION,
+    BLOCK_ARGUMENT_CODECS,
+    BLOCK_RESULT_CODECS,
+    FrameReader,
+    encode_frame,
+    encode_json,
+)
 from ..core import exceptions
 from ..core.memory_interface import MemoryInterface
 from ..core.plugin import Plugin
@@ -56,11 +66,32 @@ class TCPClientProbe(DebugProbe):
         ["result": <value>]
     }
     ````
+
+    When the server supports it, version 2 of the protocol is negotiated in the `hello` request.
+    It uses binary frames with raw block data, as described in
+    @ref pyocd.probe.tcp_probe_protocol "tcp_probe_protocol". Requests are pipelined: writes are
+    sent without waiting for a response, and deferred reads (`now=False`) return a callback that
+    only waits for the response when called. Errors reported for writes are raised from the next
+    request that waits for a response, similar to deferred transfers with a local probe.
+
+    DP, AP, and single memory transfers are also batched. They are held locally until a result is
+    needed, another kind of request is made, or flush() is called, and then sent in a single
+    `batch` request that the server executes in order.
     """
 
     DEFAULT_PORT = 5555
 
-    PROTOCOL_VERSION = 1
+    ## Preferred protocol version. Version 1 is used if the server doesn't support it.
+    PROTOCOL_VERSION = BINARY_PROTOCOL_VERSION
+
+    ## Maximum number of requests awaiting responses with protocol version 2.
+    MAX_OUTSTANDING_REQUESTS = 256
+
+    ## Queued request frames are sent once this many bytes are buffered.
+    SEND_BUFFER_SIZE = 65536
+
+    ## Maximum number of requests combined into one batch request.
+    MAX_BATCH_SIZE = 256
 
     class StatusCode:
         """@brief Constants for errors reported from the server."""
@@ -111,6 +142,23 @@ class TCPClientProbe(DebugProbe):
         self._request_id = 0
         self._lock_count = 0
         self._lock_count_lock = threading.RLock()
+        self._reset_protocol()
+
+    def _reset_protocol(self):
+        """@brief Return to protocol version 1 and discard binary protocol state."""
+        self._protocol_version = 1
+        self._frame_reader = FrameReader()
+        self._send_buffer = bytearray()
+        # Requests awaiting a response, mapped to the request name and whether the response is kept.
+        self._outstanding: Dict[int, Tuple[str, bool]] = {}
+        # Kept responses that have been received but not yet claimed.
+        self._responses: Dict[int, Tuple[Any, Optional[BaseException]]] = {}
+        # First error received for a request whose response isn't kept.
+        self._deferred_error: Optional[BaseException] = None
+        # Requests waiting to be sent in a batch, as (request ID, request, arguments, keep response).
+        self._batch: List[Tuple[int, str, Tuple[Any, ...], bool]] = []
+        # Sent batches, mapped to the (request ID, request, keep response) of each request they contain.
+        self._sent_batches: Dict[int, List[Tuple[int, str, bool]]] = {}
 
     @property
     def vendor_name(self):
@@ -156,13 +204,16 @@ class TCPClientProbe(DebugProbe):
         """
         # Protect requests with the local lock.
         with self._lock:
+            if self._protocol_version >= BINARY_PROTOCOL_VERSION:
+                return self._wait_for_response(self._queue_request(request, args, True))
+
             rq = {
                     "id": self.request_id,
                     "request": request,
                 }
             if len(args):
                 rq["arguments"] = args
-            formatted_request = json.dumps(rq)
+            formatted_request = encode_json(rq)
             TRACE.debug("Request: %s", formatted_request)
 
             # Send request to server.
@@ -177,25 +228,184 @@ class TCPClientProbe(DebugProbe):
             if ('id' not in decoded_response) or ('status' not in decoded_response):
                 raise exceptions.ProbeError("malformed response from server; missing required field")
 
-            # Check response status.
-            exc = None
-            status = decoded_response['status']
-            if status != 0:
-                # Get the error message.
-                error = decoded_response.get('error', "(missing error message key)")
-                LOG.debug("error received from server for command %s (status code %i): %s",
-                        request, status, error)
+            return self._decode_response(request, decoded_response)
+
+    def _decode_response(self, request: str, response: Dict[str, Any]) -> Tuple[Any, Optional[BaseException]]:
+        """@brief Extract the result and error from a response."""
+        # Check response status.
+        exc = None
+        status = response.get('status')
+        if status != 0:
+            # Get the error message.
+            error = response.get('error', "(missing error message key)")
+            LOG.debug("error received from server for command %s (status code %s): %s",
+                    request, status, error)
+
+            # Create an appropriate local exception based on the status code.
+            exc = self.STATUS_CODE_CLASS_MAP.get(status, exceptions.ProbeError)(
+                    "error received from server for command %s (status code %s): %s"
+                    % (request, status, error))
+
+        # Get response value. If not present then there was no return value from the command
+        result = response.get('result', None)
+
+        return result, exc
 
-                # Create an appropriate local exception based on the status code.
-                exc = self.STATUS_CODE_CLASS_MAP.get(status, exceptions.ProbeError)(
-                        "error received from server for command %s (status code %i): %s"
-                        % (request, status, error))
+    def _queue_request(self, request: str, args: Tuple[Any, ...], keep_response: bool) -> int:
+        """@brief Queue a request for the binary protocol.
 
-            # Get response value. If not present then there was no return value from the command
-            result = decoded_response.get('result', None)
+        Must be called with the lock held. Requests that can be batched are held until the batch is
+        flushed. Other requests flush the batch first, to preserve ordering, and are then queued as
+        a frame. Frames are sent once enough are buffered, or when a response is waited for.
 
+        @param keep_response Whether the response will be claimed with _wait_for_response(). If
+            False, only an error in the response is recorded.
+        @return The request ID.
+        """
+        request_id = self.request_id
+        if request in BATCH_REQUESTS:
+            self._batch.append((request_id, request, args, keep_response))
+            if len(self._batch) >= self.MAX_BATCH_SIZE:
+                self._flush_batch()
+        else:
+            self._flush_batch()
+            self._queue_frame(request_id, request, args, keep_response)
+        return request_id
+
+    def _queue_frame(self, request_id: int, request: str, args: Tuple[Any, ...], keep_response: bool) -> None:
+        header: Dict[str, Any] = {"request": request}
+        data = b''
+        if request in BLOCK_ARGUMENT_CODECS:
+            data = BLOCK_ARGUMENT_CODECS[request][0](args[-1])
+            args = args[:-1]
+        if len(args):
+            header["arguments"] = args
+        TRACE.debug("Request: id=%i %s (%i data bytes)", request_id, header, len(data))
+        self._send_buffer += encode_frame(request_id, header, data)
+        self._outstanding[request_id] = (request, keep_response)
+
+        if len(self._send_buffer) >= self.SEND_BUFFER_SIZE:
+            self._flush_send_buffer()
+
+        # Don't let unread responses build up, or the server could block on sending them.
+        if len(self._outstanding) >= self.MAX_OUTSTANDING_REQUESTS:
+            self._flush_send_buffer()
+            while len(self._outstanding) > self.MAX_OUTSTANDING_REQUESTS // 2:
+                self._receive_response()
+
+    def _flush_batch(self) -> None:
+        """@brief Queue held requests as a frame, combined into a batch request if there are several."""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        if len(batch) == 1:
+            self._queue_frame(*batch[0])
+            return
+        batch_id = self.request_id
+        self._sent_batches[batch_id] = [(request_id, request, keep) for request_id, request, _, keep in batch]
+        self._queue_frame(batch_id, 'batch', ([[request, args] for _, request, args, _ in batch],), False)
+
+    def _flush_send_buffer(self) -> None:
+        self._flush_batch()
+        if self._send_buffer:
+            self._socket.write(self._send_buffer)
+            self._send_buffer = bytearray()
+
+    def _receive_response(self) -> None:
+        """@brief Read one response frame from the server and file it by request ID."""
+        frame = self._frame_reader.next_frame()
+        while frame is None:
+            try:
+                data = self._socket.read()
+            except socket.timeout:
+                continue
+            if len(data) == 0:
+                raise exceptions.ProbeDisconnected("remote probe server closed the connection")
+            self._frame_reader.feed(data)
+            frame = self._frame_reader.next_frame()
+
+        request_id, header, data = frame
+        TRACE.debug("Response: id=%i %s (%i data bytes)", request_id, header, len(data))
+        if request_id not in self._outstanding:
+            raise exceptions.ProbeError(f"response from server has unexpected request ID {request_id}")
+        request, keep_response = self._outstanding.pop(request_id)
+        result, exc = self._decode_response(request, header)
+
+        if request == 'batch':
+            requests = self._sent_batches.pop(request_id)
+            if (exc is None) and (not isinstance(result, list) or (len(result) != len(requests))):
+                exc = exceptions.ProbeError("malformed batch response from server")
+            for i, (sub_id, sub_request, sub_keep) in enumerate(requests):
+                if exc is not None:
+                    self._file_response(sub_id, sub_keep, None, exc)
+                else:
+                    self._file_response(sub_id, sub_keep, *self._decode_response(sub_request, result[i]))
+            return
+
+        if (exc is None) and (request in BLOCK_RESULT_CODECS):
+            result = BLOCK_RESULT_CODECS[request][1](data)
+        self._file_response(request_id, keep_response, result, exc)
+
+    def _file_response(self, request_id: int, keep_response: bool, result: Any,
+            exc: Optional[BaseException]) -> None:
+        if keep_response:
+            self._responses[request_id] = (result, exc)
+        elif (exc is not None) and (self._deferred_error is None):
+            self._deferred_error = exc
+
+    def _wait_for_response(self, request_id: int) -> Tuple[Any, Optional[BaseException]]:
+        """@brief Wait for the response to a request queued with its response kept.
+
+        If an earlier request that isn't waited for failed, its error is returned instead of
+        any error for this request.
+        """
+        with self._lock:
+            self._flush_send_buffer()
+            while request_id not in self._responses:
+                self._receive_response()
+            result, exc = self._responses.pop(request_id)
+            if self._deferred_error is not None:
+                exc, self._deferred_error = self._deferred_error, None
             return result, exc
 
+    def _perform_write(self, request: str, *args: Any) -> None:
+        """@brief Perform a request that has no result.
+
+        With the binary protocol the request is only queued, and an error is raised by a later
+        request.
+        """
+        if self._protocol_version < BINARY_PROTOCOL_VERSION:
+            self._perform_request(request, *args)
+            return
+        with self._lock:
+            self._queue_request(request, args, False)
+
+    def _perform_read(self, request: str, *args: Any, now: bool = True) -> Any:
+        """@brief Perform a request whose result may be deferred.
+
+        @return The result if _now_ is True, otherwise a callback that returns the result.
+        """
+        if self._protocol_version < BINARY_PROTOCOL_VERSION:
+            result, exc = self._perform_request_without_raise(request, *args)
+
+            def read_cb():
+                # Raise any exception here so the traceback includes the actual caller.
+                if exc is not None:
+                    raise exc
+                return result
+        else:
+            with self._lock:
+                request_id = self._queue_request(request, args, True)
+
+            def read_cb():
+                result, exc = self._wait_for_response(request_id)
+                # Raise any exception here so the traceback includes the actual caller.
+                if exc is not None:
+                    raise exc
+                return result
+
+        return read_cb() if now else read_cb
+
     def _perform_request(self, request: str, *args: Any) -> Any:
         """@brief Perform the request and immediately raise any errors."""
         result, exc = self._perform_request_without_raise(request, *args)
@@ -223,8 +433,21 @@ class TCPClientProbe(DebugProbe):
             self._is_open = True
             self._socket.set_timeout(0.1)
 
-        # Send hello message.
-        self._perform_request('hello', self.PROTOCOL_VERSION)
+        # Send hello message, falling back to version 1 if the server doesn't support the binary protocol.
+        _, exc = self._perform_request_without_raise('hello', self.PROTOCOL_VERSION)
+        if exc is None:
+            self._protocol_version = self.PROTOCOL_VERSION
+        else:
+            LOG.debug("remote probe server doesn't support protocol version %i; using version 1",
+                    self.PROTOCOL_VERSION)
+            self._perform_request('hello', 1)
+
+        # Ask for a scheduling class other than the server's default.
+        priority = self.session.options.get('probeserver.priority') if (self.session is not None) else 'normal'
+        if priority != 'normal':
+            _, exc = self._perform_request_without_raise('set_priority', priority)
+            if exc is not None:
+                LOG.warning("remote probe server did not accept priority '%s': %s", priority, exc)
 
         self._perform_request('open')
 
@@ -233,6 +456,7 @@ class TCPClientProbe(DebugProbe):
             self._perform_request('close')
             self._socket.close()
             self._is_open = False
+            self._reset_protocol()
 
     def lock(self):
         # The lock count is then used to only send the remote lock request once.
@@ -290,46 +514,22 @@ class TCPClientProbe(DebugProbe):
     ##@{
 
     def read_dp(self, addr, now=True):
-        result, exc = self._perform_request_without_raise('read_dp', addr)
-
-        def read_dp_cb():
-            # Raise any exception here so the traceback includes the actual caller.
-            if exc is not None:
-                raise exc
-            return result
-
-        return read_dp_cb() if now else read_dp_cb
+        return self._perform_read('read_dp', addr, now=now)
 
     def write_dp(self, addr, data):
-        self._perform_request('write_dp', addr, data)
+        self._perform_write('write_dp', addr, data)
 
     def read_ap(self, addr, now=True):
-        result, exc = self._perform_request_without_raise('read_ap', addr)
-
-        def read_ap_cb():
-            # Raise any exception here so the traceback includes the actual caller.
-            if exc is not None:
-                raise exc
-            return result
-
-        return read_ap_cb() if now else read_ap_cb
+        return self._perform_read('read_ap', addr, now=now)
 
     def write_ap(self, addr, data):
-        self._perform_request('write_ap', addr, data)
+        self._perform_write('write_ap', addr, data)
 
     def read_ap_multiple(self, addr, count=1, now=True):
-        results, exc = self._perform_request_without_raise('read_ap_multiple', addr, count)
-
-        def read_ap_multiple_cb():
-            # Raise any exception here so the traceback includes the actual caller.
-            if exc is not None:
-                raise exc
-            return results
-
-        return read_ap_multiple_cb() if now else read_ap_multiple_cb
+        return self._perform_read('read_ap_multiple', addr, count, now=now)
 
     def write_ap_multiple(self, addr, values):
-        self._perform_request('write_ap_multiple', addr, values)
+        self._perform_write('write_ap_multiple', addr, values)
 
     def get_memory_interface_for_ap(self, ap_address):
         handle = self._perform_request('get_memory_interface_for_ap',
@@ -366,27 +566,20 @@ class RemoteMemoryInterface(MemoryInterface):
 
     def write_memory(self, addr, data, transfer_size=32, **attrs):
         assert transfer_size in (8, 16, 32)
-        self._remote_probe._perform_request('write_mem', self._handle, addr, data, transfer_size)
+        self._remote_probe._perform_write('write_mem', self._handle, addr, data, transfer_size)
 
     def read_memory(self, addr, transfer_size=32, now=True, **attrs):
         assert transfer_size in (8, 16, 32)
-        result, exc = self._remote_probe._perform_request_without_raise('read_mem', self._handle, addr, transfer_size)
-
-        def read_callback():
-            # Raise any exception here so the traceback includes the actual caller.
-            if exc is not None:
-                raise exc
-            return result
-        return read_callback() if now else read_callback
+        return self._remote_probe._perform_read('read_mem', self._handle, addr, transfer_size, now=now)
 
     def write_memory_block32(self, addr, data, **attrs):
-        self._remote_probe._perform_request('write_block32', self._handle, addr, data)
+        self._remote_probe._perform_write('write_block32', self._handle, addr, data)
 
     def read_memory_block32(self, addr, size, **attrs):
         return self._remote_probe._perform_request('read_block32', self._handle, addr, size)
 
     def write_memory_block8(self, addr, data, **attrs):
-        self._remote_probe._perform_request('write_block8', self._handle, addr, data)
+        self._remote_probe._perform_write('write_block8', self._handle, addr, data)
 
     def read_memory_block8(self, addr, size, **attrs):
         return self._remote_probe._perform_request('read_block8', self._handle, addr, size)
@@ -0,0 +1,140 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Framing for version 2 of the remote probe protocol.
+
+Version 1 of the protocol sends one line of JSON per request and per response. Version 2 is
+negotiated with a version 1 `hello` request; once the server responds successfully, both sides
+switch to binary frames for the rest of the connection.
+
+Each frame is:
+
+- uint32 length of the header and data that follow
+- uint32 request ID
+- uint32 header length
+- header: UTF-8 JSON object, with the same fields as version 1 except for "id"
+- data: raw block data, possibly empty
+
+All integers are little endian. For requests that carry a block of data, the data is removed from
+the JSON arguments and sent raw. Likewise for responses whose result is a block of data.
+
+Requests are pipelined. The client may send any number of requests before reading responses, and
+the server may return responses in a different order than the requests, for instance when it
+completes deferred probe reads after answering later writes. Responses are matched to requests by
+ID.
+
+Several DP, AP, and memory transfer requests may be combined into one `batch` request, whose only
+argument is a list of `[request, arguments]` pairs. The server executes them in order and returns
+a list with one response object (without "id") for each.
+"""
+
+import json
+import struct
+from typing import (Any, Callable, Dict, List, Optional, Sequence, Tuple)
+
+from ..core import exceptions
+
+## Protocol version that uses binary frames.
+BINARY_PROTOCOL_VERSION = 2
+
+## Length, request ID, and header length.
+FRAME_HEADER = struct.Struct('<III')
+
+## Frames larger than this are treated as a protocol error.
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+def words_to_bytes(words: Sequence[int]) -> bytes:
+    """@brief Pack a list of 32-bit words as little endian bytes."""
+    return struct.pack(f'<{len(words)}I', *words)
+
+def bytes_to_words(data: bytes) -> List[int]:
+    """@brief Unpack little endian bytes into a list of 32-bit words."""
+    return list(struct.unpack(f'<{len(data) // 4}I', data))
+
+## Requests that may be combined into a `batch` request.
+BATCH_REQUESTS = {
+        'read_dp', 'write_dp', 'read_ap', 'write_ap', 'read_ap_multiple', 'write_ap_multiple',
+        'read_mem', 'write_mem',
+    }
+
+## Requests whose last argument is block data, mapped to (encoder, decoder) for the raw bytes.
+BLOCK_ARGUMENT_CODECS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+        'write_block32':    (words_to_bytes, bytes_to_words),
+        'write_block8':     (bytes, bytes),
+    }
+
+## Requests whose result is block data, mapped to (encoder, decoder) for the raw bytes.
+BLOCK_RESULT_CODECS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+        'read_block32':     (words_to_bytes, bytes_to_words),
+        'read_block8':      (bytes, list),
+        'swo_read':         (bytes, bytearray),
+    }
+
+def _json_default(value: Any) -> Any:
+    # Block data for a version 1 request or a request without a codec.
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return list(value)
+    raise TypeError(f"value of type {type(value).__name__} is not JSON serializable")
+
+def encode_json(value: Any) -> str:
+    """@brief Encode a request or response as compact JSON.
+
+    Bytes-like objects are converted to lists of integers.
+    """
+    return json.dumps(value, separators=(',', ':'), default=_json_default)
+
+def encode_frame(request_id: int, header: Dict[str, Any], data: bytes = b'') -> bytes:
+    """@brief Build one frame."""
+    header_bytes = encode_json(header).encode('utf-8')
+    return FRAME_HEADER.pack(8 + len(header_bytes) + len(data), request_id, len(header_bytes)) \
+            + header_bytes + data
+
+class FrameReader:
+    """@brief Splits a received byte stream into frames."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> None:
+        """@brief Add received bytes."""
+        self._buffer += data
+
+    def next_frame(self) -> Optional[Tuple[int, Dict[str, Any], bytes]]:
+        """@brief Extract the next complete frame.
+        @return Tuple of request ID, decoded header, and data, or None if a complete frame has not
+            been received yet.
+        @exception ProbeError The stream is malformed.
+        """
+        if len(self._buffer) < 4:
+            return None
+        length, = struct.unpack_from('<I', self._buffer)
+        if not (8 <= length <= MAX_FRAME_SIZE):
+            raise exceptions.ProbeError(f"invalid remote probe frame length {length}")
+        if len(self._buffer) < 4 + length:
+            return None
+        _, request_id, header_length = FRAME_HEADER.unpack_from(self._buffer)
+        if header_length > length - 8:
+            raise exceptions.ProbeError(f"invalid remote probe frame header length {header_length}")
+        header_end = FRAME_HEADER.size + header_length
+        try:
+            header = json.loads(self._buffer[FRAME_HEADER.size:header_end].decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as err:
+            raise exceptions.ProbeError(f"invalid remote probe frame header: {err}") from err
+        if not isinstance(header, dict):
+            raise exceptions.ProbeError("invalid remote probe frame header")
+        data = bytes(self._buffer[header_end:4 + length])
+        del self._buffer[:4 + length]
+        return request_id, header, data
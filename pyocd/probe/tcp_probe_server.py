@@ -18,15 +18,25 @@
 import logging
 import threading
 import json
+import select
 import socket
 from socketserver import (ThreadingTCPServer, StreamRequestHandler)
 from time import sleep
-from typing import (Callable, Dict, Optional, TYPE_CHECKING, Tuple, cast)
+from typing import (Any, Callable, Dict, List, Optional, TYPE_CHECKING, Tuple, cast)
 
 from .shared_probe_proxy import SharedDebugProbeProxy
+from .probe_scheduler import (ClientPriority, ProbeScheduler)
 from ..core import exceptions
 from .debug_probe import DebugProbe
 from ..coresight.ap import (APVersion, APv1Address, APv2Address)
+from .tcp_probe_protocol import (
+    BATCH_REQUESTS,
+    BINARY_PROTOCOL_VERSION,
+    BLOCK_ARGUMENT_CODECS,
+    BLOCK_RESULT_CODECS,
+    FrameReader,
+    encode_frame,
+)
 
 if TYPE_CHECKING:
     from ..core.session import Session
@@ -125,6 +135,11 @@ class DebugProbeServer(threading.Thread):
         """@brief Whether the server thread is running."""
         return self._is_running
 
+    @property
+    def client_stats(self) -> List[Dict[str, Any]]:
+        """@brief Throughput and queue latency statistics for each connected client."""
+        return self._server.scheduler.get_stats()
+
     @property
     def port(self) -> int:
         """@brief The server's port.
@@ -149,7 +164,10 @@ class DebugProbeServer(threading.Thread):
         self._is_running = False
 
 class TCPProbeServer(ThreadingTCPServer):
-    """@brief TCP server subclass that carries the session and probe being served."""
+    """@brief TCP server subclass that carries the session and probe being served.
+
+    It also owns the scheduler that arbitrates access to the probe between the client connections.
+    """
 
     # Change the default SO_REUSEADDR setting.
     allow_reuse_address = True
@@ -157,6 +175,7 @@ class TCPProbeServer(ThreadingTCPServer):
     def __init__(self, server_address: Tuple[str, int], session: "Session", probe: DebugProbe):
         self._session = session
         self._probe = probe
+        self._scheduler = ProbeScheduler(session.options.get('probeserver.time_slice'))
         super().__init__(server_address, DebugProbeRequestHandler,
             bind_and_activate=False)
 
@@ -168,6 +187,10 @@ class TCPProbeServer(ThreadingTCPServer):
     def probe(self) -> DebugProbe:
         return self._probe
 
+    @property
+    def scheduler(self) -> ProbeScheduler:
+        return self._scheduler
+
     def handle_error(self, request, client_address):
         LOG.error("Error while handling client request (client address %s):", client_address,
             exc_info=self._session.log_tracebacks)
@@ -195,10 +218,37 @@ class DebugProbeRequestHandler(StreamRequestHandler):
       ["response": <value>]
     }
     ````
+
+    If the client's `hello` request asks for protocol version 2, then after the response is sent the
+    connection switches to the binary framing described in
+    @ref pyocd.probe.tcp_probe_protocol "tcp_probe_protocol". With version 2, reads that the probe
+    can defer are queued with `now=False` while further requests are already waiting on the
+    socket, and are completed as a batch once the client stops sending. Writes are executed and
+    answered immediately, so their responses can overtake those of earlier reads.
+
+    Requests are only executed while the connection has access to the probe from the server's
+    @ref pyocd.probe.probe_scheduler.ProbeScheduler "ProbeScheduler". Access is released when the
+    client is idle, or between requests when the time slice has expired and other clients are
+    waiting. Outstanding deferred reads are always completed before access is released.
     """
 
     ## Current version of the remote probe protocol.
-    PROTOCOL_VERSION = 1
+    PROTOCOL_VERSION = BINARY_PROTOCOL_VERSION
+
+    ## Protocol versions accepted in a `hello` request.
+    SUPPORTED_PROTOCOL_VERSIONS = (1, BINARY_PROTOCOL_VERSION)
+
+    ## Maximum number of deferred reads queued before they are completed.
+    MAX_DEFERRED_READS = 128
+
+    ## Number of bytes to receive at once with the binary protocol.
+    RECEIVE_SIZE = 65536
+
+    ## Requests that are started with `now=False` when using the binary protocol.
+    DEFERRABLE_READS = {'read_dp', 'read_ap', 'read_ap_multiple', 'read_mem'}
+
+    ## Requests that may be executed while deferred reads are outstanding.
+    WRITE_REQUESTS = {'write_dp', 'write_ap', 'write_ap_multiple', 'write_mem', 'write_block32', 'write_block8'}
 
     class StatusCode:
         """@brief Constants for errors reported from the server."""
@@ -217,13 +267,22 @@ class DebugProbeRequestHandler(StreamRequestHandler):
         except socket.herror:
             self._client_domain = self.client_address[0]
 
-        # Get the session and probe we're serving from the server.
+        # Get the session, probe, and scheduler from the server.
         self._session = cast(TCPProbeServer, self.server).session
         self._probe = cast(TCPProbeServer, self.server).probe
+        self._scheduler = cast(TCPProbeServer, self.server).scheduler
+        self._client = self._scheduler.register(f"{self._client_domain}:{self.client_address[1]}")
 
         LOG.info("Client %s (port %i) connected to probe %s",
                 self._client_domain, self.client_address[1], self._probe.unique_id)
 
+        # Requests are small and responses are awaited, so don't delay sending them.
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # Set by a hello request for protocol version 2.
+        self._use_binary_protocol = False
+        self._response_buffer = bytearray()
+
         # Give the probe a session if it doesn't have one, in case it needs to access settings.
         # TODO: create a session proxy so client-side options can be accessed
         if self._probe.session is None:
@@ -240,8 +299,8 @@ class DebugProbeRequestHandler(StreamRequestHandler):
                 'readprop':             (self._request__read_property,      1   ),
                 'open':                 (self._probe.open,                  0   ), # 'open'
                 'close':                (self._probe.close,                 0   ), # 'close'
-                'lock':                 (self._probe.lock,                  0   ), # 'lock'
-                'unlock':               (self._probe.unlock,                0   ), # 'unlock'
+                'lock':                 (self._request__lock,               0   ), # 'lock'
+                'unlock':               (self._request__unlock,             0   ), # 'unlock'
                 'connect':              (self._request__connect,            1   ), # 'connect', protocol:str
                 'disconnect':           (self._probe.disconnect,            0   ), # 'disconnect'
                 'swj_sequence':         (self._probe.swj_sequence,          2   ), # 'swj_sequence', length:int, bits:int
@@ -268,6 +327,9 @@ class DebugProbeRequestHandler(StreamRequestHandler):
                 'write_block32':        (self._request__write_block32,      3   ), # 'write_block32', handle:int, addr:int, data:List[int]
                 'read_block8':          (self._request__read_block8,        3   ), # 'read_block8', handle:int, addr:int, word_count:int -> List[int]
                 'write_block8':         (self._request__write_block8,       3   ), # 'write_block8', handle:int, addr:int, data:List[int]
+                'batch':                (self._request__batch,              1   ), # 'batch', requests:List[[request:str, arguments:List]] -> List[response]
+                'set_priority':         (self._request__set_priority,       1   ), # 'set_priority', priority:str
+                'client_stats':         (self._scheduler.get_stats,         0   ), # 'client_stats' -> List[dict]
             }
 
         # Let superclass do its thing.
@@ -279,9 +341,18 @@ class DebugProbeRequestHandler(StreamRequestHandler):
 
         # Flush the probe and ignore any lingering errors.
         try:
+            self._flush_responses()
+            self._scheduler.acquire(self._client)
             self._probe.flush()
         except exceptions.Error as err:
             LOG.debug("exception while flushing probe on disconnect: %s", err)
+        finally:
+            self._scheduler.unregister(self._client)
+
+        stats = self._client.stats.to_dict()
+        LOG.info("Client %s: %i requests (%.1f/s), average queue latency %.3f ms, maximum %.3f ms",
+                stats['name'], stats['requests'], stats['requests_per_second'],
+                stats['average_wait'] * 1000, stats['max_wait'] * 1000)
 
         super().finish()
 
@@ -317,7 +388,8 @@ class DebugProbeRequestHandler(StreamRequestHandler):
                 request_dict = None
                 self._current_request_id = -1
 
-                # Read request line.
+                # Read request line. The client is idle until the next request arrives.
+                self._scheduler.release(self._client)
                 request = self.rfile.readline()
                 TRACE.debug("request: %s", request)
                 if len(request) == 0:
@@ -356,10 +428,17 @@ class DebugProbeRequestHandler(StreamRequestHandler):
                     continue
                 handler, arg_count = self._REQUEST_HANDLERS[request_type]
                 self._check_args(request_args, arg_count)
+                self._scheduler.acquire(self._client)
+                self._client.stats.requests += 1
                 result = handler(*request_args)
 
                 # Send a success response.
                 self._send_response(result)
+
+                # The client waits for the hello response before sending binary frames.
+                if self._use_binary_protocol:
+                    self._handle_binary()
+                    return
             # Catch all exceptions so that an error response can be returned, to not leave the client hanging.
             except Exception as err:
                 # Only send an error response if we received an request.
@@ -397,11 +476,179 @@ class DebugProbeRequestHandler(StreamRequestHandler):
         if len(args) != count:
             raise exceptions.Error("malformed request; invalid number of arguments")
 
+    def _handle_binary(self):
+        """@brief Process requests using the binary protocol until the connection is closed."""
+        reader = FrameReader()
+        deferred_reads: List[Tuple[int, str, Callable[[], Any]]] = []
+        while True:
+            try:
+                frame = reader.next_frame()
+            except exceptions.ProbeError as err:
+                LOG.error("Closing connection from client %s: %s", self._client_domain, err)
+                return
+
+            if frame is None:
+                # Deferred reads are only completed once no further requests are waiting, so they
+                # are transferred together. Access to the probe is given up while idle.
+                is_idle = not self._is_request_waiting()
+                if is_idle:
+                    self._complete_deferred_reads(deferred_reads)
+                self._flush_responses()
+                if is_idle:
+                    self._scheduler.release(self._client)
+                data = self.request.recv(self.RECEIVE_SIZE)
+                if len(data) == 0:
+                    LOG.debug("connection closed")
+                    return
+                reader.feed(data)
+                continue
+
+            # Let other clients have the probe once the time slice is used up.
+            if self._scheduler.should_yield(self._client):
+                self._complete_deferred_reads(deferred_reads)
+                self._flush_responses()
+                self._scheduler.release(self._client)
+
+            request_id, header, data = frame
+            request_type = header.get('request', "<missing>")
+            try:
+                request_args = header.get('arguments', [])
+                if not isinstance(request_args, list):
+                    raise exceptions.Error("invalid request arguments format")
+                if request_type in BLOCK_ARGUMENT_CODECS:
+                    request_args = request_args + [BLOCK_ARGUMENT_CODECS[request_type][1](data)]
+                if request_type not in self._REQUEST_HANDLERS:
+                    raise exceptions.Error("unknown request type")
+                handler, arg_count = self._REQUEST_HANDLERS[request_type]
+                self._check_args(request_args, arg_count)
+                self._scheduler.acquire(self._client)
+                self._client.stats.requests += 1
+
+                if request_type in self.DEFERRABLE_READS:
+                    deferred_reads.append((request_id, request_type, handler(*request_args, now=False)))
+                    if len(deferred_reads) >= self.MAX_DEFERRED_READS:
+                        self._complete_deferred_reads(deferred_reads)
+                    continue
+
+                # Anything other than a write is ordered after the outstanding reads.
+                if request_type not in self.WRITE_REQUESTS:
+                    self._complete_deferred_reads(deferred_reads)
+                self._queue_frame_response(request_id, request_type, handler(*request_args))
+            # Catch all exceptions so that an error response can be returned, to not leave the client hanging.
+            except Exception as err:
+                self._queue_frame_error(request_id, request_type, err)
+
+    def _is_request_waiting(self):
+        """@brief Whether more request data has been received from the client."""
+        readable, _, _ = select.select([self.request], [], [], 0)
+        return bool(readable)
+
+    def _complete_deferred_reads(self, deferred_reads):
+        """@brief Finish deferred reads and queue their responses."""
+        for request_id, request_type, callback in deferred_reads:
+            try:
+                self._queue_frame_response(request_id, request_type, callback())
+            except Exception as err:
+                self._queue_frame_error(request_id, request_type, err)
+        deferred_reads.clear()
+
+    def _queue_frame_response(self, request_id, request_type, result):
+        header: Dict[str, Any] = {"status": 0}
+        data = b''
+        if request_type in BLOCK_RESULT_CODECS:
+            data = BLOCK_RESULT_CODECS[request_type][0](result)
+        elif result is not None:
+            header["result"] = result
+        TRACE.debug("response: id=%i %s (%i data bytes)", request_id, header, len(data))
+        self._response_buffer += encode_frame(request_id, header, data)
+        if len(self._response_buffer) >= self.RECEIVE_SIZE:
+            self._flush_responses()
+
+    def _queue_frame_error(self, request_id, request_type, err):
+        LOG.error("Error processing '%s' request (ID %i, client %s, probe %s): %s",
+                request_type, request_id, self._client_domain, self._probe.unique_id, err,
+                exc_info=self._session.log_tracebacks)
+        header = {
+                "status": self._get_exception_status_code(err),
+                "error": str(err),
+            }
+        self._response_buffer += encode_frame(request_id, header)
+        # Reraise non-pyocd errors.
+        if not isinstance(err, exceptions.Error):
+            self._flush_responses()
+            raise err
+
+    def _flush_responses(self):
+        if self._response_buffer:
+            self.wfile.write(self._response_buffer)
+            self._response_buffer.clear()
+
+    def _request__batch(self, requests):
+        # 'batch', requests:List[[request:str, arguments:List]] -> List[response]
+        # Reads are deferred so the whole batch is transferred together, then completed in order.
+        if not isinstance(requests, list):
+            raise exceptions.Error("invalid batch request format")
+        # Each batched request is counted, not the batch itself.
+        self._client.stats.requests += len(requests) - 1
+        results = []
+        for entry in requests:
+            request_type = "<missing>"
+            try:
+                if not (isinstance(entry, list) and (len(entry) == 2) and isinstance(entry[1], list)):
+                    raise exceptions.Error("invalid batch entry format")
+                request_type, request_args = entry
+                if request_type not in BATCH_REQUESTS:
+                    raise exceptions.Error("request type '%s' is not allowed in a batch" % request_type)
+                handler, arg_count = self._REQUEST_HANDLERS[request_type]
+                self._check_args(request_args, arg_count)
+                if request_type in self.DEFERRABLE_READS:
+                    results.append((request_type, handler(*request_args, now=False), None))
+                else:
+                    results.append((request_type, None, handler(*request_args)))
+            except Exception as err:
+                results.append((request_type, None, err))
+
+        responses = []
+        for request_type, callback, result in results:
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                if callback is not None:
+                    result = callback()
+                response: Dict[str, Any] = {"status": 0}
+                if result is not None:
+                    response["result"] = result
+            except Exception as err:
+                LOG.error("Error processing batched '%s' request (client %s, probe %s): %s",
+                        request_type, self._client_domain, self._probe.unique_id, err,
+                        exc_info=self._session.log_tracebacks)
+                response = {
+                        "status": self._get_exception_status_code(err),
+                        "error": str(err),
+                    }
+            responses.append(response)
+        return responses
+
+    def _request__lock(self):
+        # 'lock'
+        self._probe.lock()
+        self._client.lock_depth += 1
+
+    def _request__unlock(self):
+        # 'unlock'
+        self._probe.unlock()
+        self._client.lock_depth -= 1
+
+    def _request__set_priority(self, priority_name):
+        # 'set_priority', priority:str
+        self._scheduler.set_priority(self._client, ClientPriority.from_name(priority_name))
+
     def _request__hello(self, version):
         # 'hello', protocol-version:int
-        if version != self.PROTOCOL_VERSION:
-            raise exceptions.Error("client requested unsupported protocol version %i (expected %i)" %
-                    (version, self.PROTOCOL_VERSION))
+        if version not in self.SUPPORTED_PROTOCOL_VERSIONS:
+            raise exceptions.Error("client requested unsupported protocol version %i (expected %s)" %
+                    (version, " or ".join(str(v) for v in self.SUPPORTED_PROTOCOL_VERSIONS)))
+        self._use_binary_protocol = (version >= BINARY_PROTOCOL_VERSION)
 
     def _request__read_property(self, name):
         # 'readprop', name:str
@@ -444,11 +691,11 @@ class DebugProbeRequestHandler(StreamRequestHandler):
     def _request__swo_read(self):
         return list(self._probe.swo_read())
 
-    def _request__read_mem(self, handle, addr, xfer_size):
+    def _request__read_mem(self, handle, addr, xfer_size, now=True):
         # 'read_mem', handle:int, addr:int, xfer_size:int -> int
         if handle not in self._ap_memif_handles:
             raise exceptions.Error("invalid handle received from remote memory access")
-        return self._ap_memif_handles[handle].read_memory(addr, xfer_size, now=True)
+        return self._ap_memif_handles[handle].read_memory(addr, xfer_size, now=now)
 
     def _request__write_mem(self, handle, addr, value, xfer_size):
         # 'write_mem', handle:int, addr:int, value:int, xfer_size:int
@@ -458,28 +705,24 @@ class DebugProbeRequestHandler(StreamRequestHandler):
 
     def _request__read_block32(self, handle, addr, word_count):
         # 'read_block32', handle:int, addr:int, word_count:int -> List[int]
-        # TODO use base64 data
         if handle not in self._ap_memif_handles:
             raise exceptions.Error("invalid handle received from remote memory access")
         return self._ap_memif_handles[handle].read_memory_block32(addr, word_count)
 
     def _request__write_block32(self, handle, addr, data):
         # 'write_block32', handle:int, addr:int, data:List[int]
-        # TODO use base64 data
         if handle not in self._ap_memif_handles:
             raise exceptions.Error("invalid handle received from remote memory access")
         self._ap_memif_handles[handle].write_memory_block32(addr, data)
 
     def _request__read_block8(self, handle, addr, word_count):
         # 'read_block8', handle:int, addr:int, word_count:int -> List[int]
-        # TODO use base64 data
         if handle not in self._ap_memif_handles:
             raise exceptions.Error("invalid handle received from remote memory access")
         return self._ap_memif_handles[handle].read_memory_block8(addr, word_count)
 
     def _request__write_block8(self, handle, addr, data):
         # 'write_block8', handle:int, addr:int, data:List[int]
-        # TODO use base64 data
         if handle not in self._ap_memif_handles:
             raise exceptions.Error("invalid handle received from remote memory access")
         self._ap_memif_handles[handle].write_memory_block8(addr, data)
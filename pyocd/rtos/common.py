@@ -19,6 +19,8 @@ import logging
 
 from .provider import TargetThread
 from ..core import exceptions
+from ..coresight.cortex_m_core_registers import index_for_reg
+from ..debug.context import DebugContext
 
 LOG = logging.getLogger(__name__)
 
@@ -26,41 +28,268 @@ LOG = logging.getLogger(__name__)
 # on the frame. The bit is 0 if the frame is extended.
 EXC_RETURN_EXT_FRAME_MASK = (1 << 4)
 
-def read_c_string(context, ptr):
-    """@brief Reads a null-terminated C string from the target."""
-    if ptr == 0:
-        return ""
+## Maximum number of nodes that walk_lists() follows in a single list.
+MAX_LIST_NODES = 1024
+
+def decode_c_string(data):
+    """@brief Decode a null-terminated C string from bytes read from the target.
+
+    Non-ASCII characters are replaced with '?'. A run of more than 4 of them terminates the string early.
 
+    @return Tuple of the string and a bool that is True if the end of the string was found in @a data.
+    """
     s = ""
-    done = False
-    count = 0
     badCount = 0
+    for c in data:
+        if c == 0:
+            return s, True
+        elif c > 127:
+            # Replace non-ASCII characters. If there is a run of invalid characters longer
+            # than 4, then terminate the string early.
+            badCount += 1
+            if badCount > 4:
+                return s, True
+            s += '?'
+        else:
+            s += chr(c)
+            badCount = 0
+    return s, False
+
+def read_c_string(context, ptr, prefix=""):
+    """@brief Reads a null-terminated C string from the target.
+    @param context Debug context used to read memory.
+    @param ptr Address of the string.
+    @param prefix Start of the string that was already read, that @a ptr points past.
+    """
+    if ptr == 0:
+        return prefix
+
+    s = prefix
+    done = False
+    count = len(prefix)
     try:
         while not done and count < 256:
             data = context.read_memory_block8(ptr, 16)
             ptr += 16
             count += 16
 
-            for c in data:
-                if c == 0:
-                    done = True
-                    break
-                elif c > 127:
-                    # Replace non-ASCII characters. If there is a run of invalid characters longer
-                    # than 4, then terminate the string early.
-                    badCount += 1
-                    if badCount > 4:
-                        done = True
-                        break
-                    s += '?'
-                else:
-                    s += chr(c)
-                    badCount = 0
+            chunk, done = decode_c_string(data)
+            s += chunk
     except exceptions.TransferError:
         LOG.debug("TransferError while trying to read 16 bytes at 0x%08x", ptr)
 
     return s
 
+def read_words(context, addrs):
+    """@brief Read many 32-bit words with deferred reads.
+
+    All reads are queued before any of them is resolved, so a probe that supports deferred transfers
+    can perform them in a single round trip.
+
+    @param context Debug context used to read memory.
+    @param addrs Iterable of word addresses.
+    @return List of the word values, in the same order as @a addrs.
+    @exception TransferError Any of the reads failed.
+    """
+    results = [context.read32(addr, now=False) for addr in addrs]
+    return [result() for result in results]
+
+class ListWalk(object):
+    """@brief A target linked list to be traversed by walk_lists().
+
+    The walk starts at the node at address @a first and follows the pointer at @a next_offset within
+    each node. It stops at a null pointer, at the @a end node, at a node that was already visited, or
+    once @a limit nodes have been visited. For each node the pointer at @a object_offset is collected
+    into the @a objects list, or the node address itself if @a object_offset is None.
+    """
+
+    def __init__(self, first, next_offset, object_offset=None, end=0, limit=MAX_LIST_NODES, name=None):
+        self.next_offset = next_offset
+        self.object_offset = object_offset
+        self.end = end
+        self.limit = limit
+        self.name = name if (name is not None) else ("0x%08x" % first)
+        ## Objects found in the list, in list order.
+        self.objects = []
+        self._node = first
+        self._visited = set()
+
+    @property
+    def is_done(self):
+        return self._node in (0, self.end) or self._node in self._visited or len(self.objects) >= self.limit
+
+    def _issue(self, context):
+        """@brief Queue deferred reads of the current node's pointers."""
+        next_cb = context.read32(self._node + self.next_offset, now=False)
+        if self.object_offset is not None:
+            object_cb = context.read32(self._node + self.object_offset, now=False)
+        else:
+            object_cb = None
+        return next_cb, object_cb
+
+    def _advance(self, next_cb, object_cb):
+        """@brief Resolve the current node's pointers and move to the next node."""
+        node = self._node
+        self._visited.add(node)
+        try:
+            if object_cb is None:
+                self.objects.append(node)
+            else:
+                self.objects.append(object_cb())
+            self._node = next_cb()
+        except exceptions.TransferError as exc:
+            LOG.warning("TransferError while reading list elements (list=%s, node=0x%08x), terminating list: %s",
+                    self.name, node, exc)
+            self._node = 0
+
+def walk_lists(context, walks):
+    """@brief Traverse several target linked lists at the same time.
+
+    Lists are walked in lockstep. Each round queues deferred reads for the current node of every list
+    that isn't finished, and only then resolves them. With a probe that supports deferred transfers,
+    a round costs about one round trip no matter how many lists are being walked.
+
+    @param context Debug context used to read memory.
+    @param walks Sequence of ListWalk objects. Their @a objects lists are filled in.
+    """
+    active = [walk for walk in walks if not walk.is_done]
+    while active:
+        pending = []
+        for walk in active:
+            try:
+                pending.append((walk, walk._issue(context)))
+            except exceptions.TransferError as exc:
+                LOG.warning("TransferError while reading list elements (list=%s, node=0x%08x), terminating list: %s",
+                        walk.name, walk._node, exc)
+                walk._node = 0
+        for walk, (next_cb, object_cb) in pending:
+            walk._advance(next_cb, object_cb)
+        active = [walk for walk, _ in pending if not walk.is_done]
+
+class RTOSStructCache(object):
+    """@brief Cache of RTOS data structures read from the target.
+
+    Each structure, such as a thread control block, is read with a single block read and kept until
+    the target runs again, as indicated by a change of its run token.
+    """
+
+    def __init__(self, context, target):
+        self._context = context
+        self._target = target
+        self._run_token = -1
+        self._structs = {}
+
+    def _check(self):
+        token = self._target.run_token
+        if token != self._run_token:
+            self._structs = {}
+            self._run_token = token
+
+    def read(self, addr, size):
+        """@brief Read a structure.
+        @return Bytes of the structure.
+        @exception TransferError The structure could not be read.
+        """
+        self._check()
+        key = (addr, size)
+        data = self._structs.get(key)
+        if data is None:
+            data = bytes(self._context.read_memory_block8(addr, size))
+            self._structs[key] = data
+        return data
+
+    def read32(self, addr, size, offset):
+        """@brief Read a word from within a cached structure."""
+        return int.from_bytes(self.read(addr, size)[offset:offset + 4], 'little')
+
+    def invalidate(self):
+        self._structs = {}
+
+class ThreadRegisterFrame(object):
+    """@brief Register values of a thread that is not running, as saved in target memory."""
+
+    def __init__(self):
+        self._values = {}
+
+    def set(self, reg, value):
+        """@brief Set the value of a register that is computed rather than read from memory."""
+        self._values[reg] = value
+
+    def add_saved(self, context, base, offsets):
+        """@brief Read registers that are saved in memory.
+
+        All of the registers are read with a single block read. If the read fails, the registers
+        read as 0.
+
+        @param self
+        @param context Debug context used to read memory.
+        @param base Base address of the saved registers.
+        @param offsets Dict of register index to offset from @a base. Registers with a negative offset
+            are not saved, and are skipped.
+        """
+        offsets = {reg: offset for reg, offset in offsets.items() if offset >= 0}
+        if not offsets:
+            return
+        try:
+            data = context.read_memory_block8(base, max(offsets.values()) + 4)
+        except exceptions.TransferError:
+            LOG.debug("Transfer error while reading thread's saved registers @ 0x%08x", base)
+            data = None
+        for reg, offset in offsets.items():
+            if data is None:
+                self._values[reg] = 0
+            else:
+                self._values[reg] = int.from_bytes(bytes(data[offset:offset + 4]), 'little')
+
+    def get(self, reg):
+        """@return The register's value, or None if the live register should be used."""
+        return self._values.get(reg)
+
+class RTOSThreadContext(DebugContext):
+    """@brief Base class for the debug context of an RTOS thread.
+
+    Subclasses implement _read_frame() to locate the registers the thread saved when it was switched
+    out. The frame is read once each time the core halts and every register request is served from
+    it. Registers that are not part of the frame are read from the core.
+    """
+
+    def __init__(self, parent, thread):
+        super(RTOSThreadContext, self).__init__(parent)
+        self._thread = thread
+        self._has_fpu = self.core.has_fpu
+        self._frame = None
+        self._frame_run_token = None
+
+    def _read_frame(self):
+        """@brief Read the thread's saved registers.
+        @return ThreadRegisterFrame, or None if the thread is running and its registers are the live
+            core registers.
+        """
+        raise NotImplementedError()
+
+    def _get_frame(self):
+        token = self.core.run_token
+        if token != self._frame_run_token:
+            self._frame = self._read_frame()
+            self._frame_run_token = token
+        return self._frame
+
+    def read_core_registers_raw(self, reg_list):
+        reg_list = [index_for_reg(reg) for reg in reg_list]
+
+        frame = self._get_frame()
+        if frame is None:
+            return self._parent.read_core_registers_raw(reg_list)
+
+        reg_vals = [frame.get(reg) for reg in reg_list]
+
+        # Read all registers that were not saved from the core in one go.
+        live_regs = [reg for reg, value in zip(reg_list, reg_vals) if value is None]
+        if live_regs:
+            live_vals = iter(self._parent.read_core_registers_raw(live_regs))
+            reg_vals = [next(live_vals) if value is None else value for value in reg_vals]
+        return reg_vals
+
 class HandlerModeThread(TargetThread):
     """@brief Class representing the handler mode."""
 
@@ -15,17 +15,28 @@
 # limitations under the License.
 
 from .provider import (TargetThread, ThreadProvider)
-from .common import (read_c_string, HandlerModeThread, EXC_RETURN_EXT_FRAME_MASK)
+from .common import (
+    decode_c_string,
+    read_c_string,
+    read_words,
+    walk_lists,
+    HandlerModeThread,
+    ListWalk,
+    RTOSStructCache,
+    RTOSThreadContext,
+    ThreadRegisterFrame,
+    EXC_RETURN_EXT_FRAME_MASK,
+    )
 from ..core import exceptions
 from ..core.target import Target
 from ..core.plugin import Plugin
-from ..debug.context import DebugContext
-from ..coresight.cortex_m_core_registers import index_for_reg
 import logging
 
 FREERTOS_MAX_PRIORITIES	= 63
 
 LIST_SIZE = 20
+LIST_END_OFFSET = 8
+LIST_END_NEXT_OFFSET = 12
 LIST_INDEX_OFFSET = 16
 LIST_NODE_NEXT_OFFSET = 8 # 4?
 LIST_NODE_OBJECT_OFFSET = 12
@@ -34,38 +45,13 @@ THREAD_STACK_POINTER_OFFSET = 0
 THREAD_PRIORITY_OFFSET = 44
 THREAD_NAME_OFFSET = 52
 
+## Number of bytes of a TCB read at once, including the start of the inline task name.
+THREAD_READ_SIZE = THREAD_NAME_OFFSET + 16
+
 # Create a logger for this module.
 LOG = logging.getLogger(__name__)
 
-class TargetList(object):
-    def __init__(self, context, ptr):
-        self._context = context
-        self._list = ptr
-
-    def __iter__(self):
-        prev = -1
-        found = 0
-        count = self._context.read32(self._list)
-        if count == 0:
-            return
-
-        node = self._context.read32(self._list + LIST_INDEX_OFFSET)
-
-        while (node != 0) and (node != prev) and (found < count):
-            try:
-                # Read the object from the node.
-                obj = self._context.read32(node + LIST_NODE_OBJECT_OFFSET)
-                yield obj
-                found += 1
-
-                # Read next list node pointer.
-                prev = node
-                node = self._context.read32(node + LIST_NODE_NEXT_OFFSET)
-            except exceptions.TransferError:
-                LOG.warning("TransferError while reading list elements (list=0x%08x, node=0x%08x), terminating list", self._list, node)
-                node = 0
-
-class FreeRTOSThreadContext(DebugContext):
+class FreeRTOSThreadContext(RTOSThreadContext):
     """@brief Thread context for FreeRTOS."""
 
     # SP/PSP are handled specially, so it is not in these dicts.
@@ -153,21 +139,13 @@ class FreeRTOSThreadContext(DebugContext):
             }
     FPU_EXTENDED_REGISTER_OFFSETS.update(COMMON_REGISTER_OFFSETS)
 
-    def __init__(self, parent, thread):
-        super(FreeRTOSThreadContext, self).__init__(parent)
-        self._thread = thread
-        self._has_fpu = self.core.has_fpu
-
-    def read_core_registers_raw(self, reg_list):
-        reg_list = [index_for_reg(reg) for reg in reg_list]
-        reg_vals = []
-
+    def _read_frame(self):
         isCurrent = self._thread.is_current
         inException = isCurrent and self._parent.read_core_register('ipsr') > 0
 
         # If this is the current thread and we're not in an exception, just read the live registers.
         if isCurrent and not inException:
-            return self._parent.read_core_registers_raw(reg_list)
+            return None
 
         # Because of above tests, from now on, inException implies isCurrent;
         # we are generating the thread view for the RTOS thread where the
@@ -204,33 +182,20 @@ class FreeRTOSThreadContext(DebugContext):
             except exceptions.TransferError:
                 LOG.debug("Transfer error while reading thread's saved LR")
 
-        for reg in reg_list:
-            # Must handle stack pointer specially.
-            if reg == 13:
-                if inException:
-                    reg_vals.append(sp + hwStacked)
-                else:
-                    reg_vals.append(sp + swStacked + hwStacked)
-                continue
+        frame = ThreadRegisterFrame()
 
-            # Look up offset for this register on the stack.
-            spOffset = table.get(reg, None)
-            if spOffset is None:
-                reg_vals.append(self._parent.read_core_register_raw(reg))
-                continue
-            if inException:
-                spOffset -= swStacked
-
-            try:
-                if spOffset >= 0:
-                    reg_vals.append(self._parent.read32(sp + spOffset))
-                else:
-                    # Not available - try live one
-                    reg_vals.append(self._parent.read_core_register_raw(reg))
-            except exceptions.TransferError:
-                reg_vals.append(0)
+        # Must handle stack pointer specially.
+        if inException:
+            frame.set(13, sp + hwStacked)
+        else:
+            frame.set(13, sp + swStacked + hwStacked)
 
-        return reg_vals
+        # In an exception the software stacked registers have not been saved, so those registers have
+        # negative offsets and the live values are used instead.
+        if inException:
+            table = {reg: offset - swStacked for reg, offset in table.items()}
+        frame.add_saved(self._parent, sp, table)
+        return frame
 
 class FreeRTOSThread(TargetThread):
     """@brief A FreeRTOS task."""
@@ -257,16 +222,20 @@ class FreeRTOSThread(TargetThread):
         self._state = FreeRTOSThread.READY
         self._thread_context = FreeRTOSThreadContext(self._target_context, self)
 
-        self._priority = self._target_context.read32(self._base + THREAD_PRIORITY_OFFSET)
+        # Read the TCB fields and the start of the name in one go.
+        tcb = self._provider.struct_cache.read(self._base, THREAD_READ_SIZE)
+        self._priority = int.from_bytes(tcb[THREAD_PRIORITY_OFFSET:THREAD_PRIORITY_OFFSET + 4], 'little')
 
-        self._name = read_c_string(self._target_context, self._base + THREAD_NAME_OFFSET)
+        self._name, done = decode_c_string(tcb[THREAD_NAME_OFFSET:])
+        if not done:
+            self._name = read_c_string(self._target_context, self._base + THREAD_READ_SIZE, self._name)
         if len(self._name) == 0:
             self._name = "Unnamed"
 
     def get_stack_pointer(self):
         # Get stack pointer saved in thread struct.
         try:
-            return self._target_context.read32(self._base + THREAD_STACK_POINTER_OFFSET)
+            return self._provider.struct_cache.read32(self._base, THREAD_READ_SIZE, THREAD_STACK_POINTER_OFFSET)
         except exceptions.TransferError:
             LOG.debug("Transfer error while reading thread's stack pointer @ 0x%08x", self._base + THREAD_STACK_POINTER_OFFSET)
             return 0
@@ -283,6 +252,10 @@ class FreeRTOSThread(TargetThread):
     def priority(self):
         return self._priority
 
+    @priority.setter
+    def priority(self, value):
+        self._priority = value
+
     @property
     def unique_id(self):
         return self._base
@@ -329,6 +302,14 @@ class FreeRTOSThreadProvider(ThreadProvider):
         self._symbols = None
         self._total_priorities = 0
         self._threads = {}
+        self._struct_cache = RTOSStructCache(self._target_context, self._target)
+        ## Suspended and deleted task lists from the last walk, as a dict of list address to a
+        # tuple of the list's header words and its thread bases.
+        self._stable_lists = {}
+
+    @property
+    def struct_cache(self):
+        return self._struct_cache
 
     def init(self, symbolProvider):
         # Lookup required symbols.
@@ -381,6 +362,8 @@ class FreeRTOSThreadProvider(ThreadProvider):
 
     def invalidate(self):
         self._threads = {}
+        self._stable_lists = {}
+        self._struct_cache.invalidate()
 
     def event_handler(self, notification):
         # Invalidate threads list if flash is reprogrammed.
@@ -390,11 +373,12 @@ class FreeRTOSThreadProvider(ThreadProvider):
     def _build_thread_list(self):
         newThreads = {}
 
-        # Read the number of threads.
-        threadCount = self._target_context.read32(self._symbols['uxCurrentNumberOfTasks'])
-
-        # Read the current thread.
-        currentThread = self._target_context.read32(self._symbols['pxCurrentTCB'])
+        # Read the number of threads, the current thread, and the top ready priority.
+        threadCount, currentThread, topPriority = read_words(self._target_context, [
+                self._symbols['uxCurrentNumberOfTasks'],
+                self._symbols['pxCurrentTCB'],
+                self._symbols['uxTopReadyPriority'],
+                ])
 
         # We should only be building the thread list if the scheduler is running, so a zero thread
         # count or a null current thread means something is bizarrely wrong.
@@ -402,9 +386,6 @@ class FreeRTOSThreadProvider(ThreadProvider):
             LOG.warning("FreeRTOS: no threads even though the scheduler is running")
             return
 
-        # Read the top ready priority.
-        topPriority = self._target_context.read32(self._symbols['uxTopReadyPriority'])
-
         # Handle an uxTopReadyPriority value larger than the number of lists. This is most likely
         # caused by the configUSE_PORT_OPTIMISED_TASK_SELECTION option being enabled, which treats
         # uxTopReadyPriority as a bitmap instead of integer. This is ok because uxTopReadyPriority
@@ -425,8 +406,11 @@ class FreeRTOSThreadProvider(ThreadProvider):
         if 'xTasksWaitingTermination' in self._symbols:
             listsToRead.append((self._symbols['xTasksWaitingTermination'], FreeRTOSThread.DELETED))
 
-        for listPtr, state in listsToRead:
-            for threadBase in TargetList(self._target_context, listPtr):
+        threadLists = self._read_thread_lists(listsToRead, threadCount)
+
+        existingThreads = []
+        for state, threadBases in threadLists:
+            for threadBase in threadBases:
                 try:
                     # Don't try adding more threads than the number of threads that FreeRTOS says there are.
                     if len(newThreads) >= threadCount:
@@ -435,6 +419,7 @@ class FreeRTOSThreadProvider(ThreadProvider):
                     # Reuse existing thread objects.
                     if threadBase in self._threads:
                         t = self._threads[threadBase]
+                        existingThreads.append(t)
                     else:
                         t = FreeRTOSThread(self._target_context, self, threadBase)
 
@@ -449,6 +434,15 @@ class FreeRTOSThreadProvider(ThreadProvider):
                 except exceptions.TransferError:
                     LOG.debug("TransferError while examining thread 0x%08x", threadBase)
 
+        # Task names don't change, but priorities can, so refresh the priorities of reused threads.
+        try:
+            priorities = read_words(self._target_context,
+                    [t.unique_id + THREAD_PRIORITY_OFFSET for t in existingThreads])
+            for t, priority in zip(existingThreads, priorities):
+                t.priority = priority
+        except exceptions.TransferError:
+            LOG.debug("TransferError while reading thread priorities")
+
         if len(newThreads) != threadCount:
             LOG.warning("FreeRTOS: thread count mismatch")
 
@@ -460,6 +454,60 @@ class FreeRTOSThreadProvider(ThreadProvider):
 
         self._threads = newThreads
 
+    def _read_thread_lists(self, listsToRead, threadCount):
+        """@brief Find the threads in each of the task lists.
+
+        The headers of all lists are read in a single round, and then all lists are walked in
+        parallel. The suspended and deleted task lists are not walked again if their headers are
+        unchanged since the previous walk, unless the resulting thread lists turn out to be
+        inconsistent with the number of threads.
+
+        @param self
+        @param listsToRead List of (list address, thread state) tuples.
+        @param threadCount The number of threads reported by FreeRTOS.
+        @return List of (thread state, list of thread bases) tuples, in the same order as @a listsToRead.
+        """
+        words = read_words(self._target_context, [listPtr + offset
+                for listPtr, _ in listsToRead
+                for offset in (0, LIST_END_NEXT_OFFSET, LIST_INDEX_OFFSET)])
+        headers = [tuple(words[i:i + 3]) for i in range(0, len(words), 3)]
+
+        def make_walk(listPtr, header):
+            return ListWalk(header[2], LIST_NODE_NEXT_OFFSET, LIST_NODE_OBJECT_OFFSET,
+                    end=listPtr + LIST_END_OFFSET, limit=header[0], name="0x%08x" % listPtr)
+
+        walks = []
+        reused = []
+        for (listPtr, state), header in zip(listsToRead, headers):
+            previous = self._stable_lists.get(listPtr)
+            if previous is not None and previous[0] == header:
+                walks.append(None)
+                reused.append(len(walks) - 1)
+            else:
+                walks.append(make_walk(listPtr, header))
+        walk_lists(self._target_context, [w for w in walks if w is not None])
+
+        results = []
+        for (listPtr, state), walk in zip(listsToRead, walks):
+            threadBases = self._stable_lists[listPtr][1] if walk is None else walk.objects
+            results.append((state, threadBases))
+
+        # Check that the lists are consistent with each other. A reused list that a thread has left
+        # will either contain a duplicate thread or give the wrong total.
+        if reused:
+            allBases = [base for _, threadBases in results for base in threadBases]
+            if len(allBases) != threadCount or len(set(allBases)) != len(allBases):
+                LOG.debug("FreeRTOS: cached task lists are out of date")
+                retry = {i: make_walk(listsToRead[i][0], headers[i]) for i in reused}
+                walk_lists(self._target_context, list(retry.values()))
+                for i, walk in retry.items():
+                    results[i] = (listsToRead[i][1], walk.objects)
+
+        self._stable_lists = {listPtr: (header, threadBases)
+                for (listPtr, state), header, (_, threadBases) in zip(listsToRead, headers, results)
+                if state in (FreeRTOSThread.SUSPENDED, FreeRTOSThread.DELETED)}
+        return results
+
     def get_threads(self):
         if not self.is_enabled:
             return []
@@ -14,39 +14,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from .provider import (TargetThread, ThreadProvider)
-from .common import (read_c_string, HandlerModeThread, EXC_RETURN_EXT_FRAME_MASK)
+from .common import (
+    read_c_string,
+    read_words,
+    walk_lists,
+    HandlerModeThread,
+    ListWalk,
+    RTOSStructCache,
+    RTOSThreadContext,
+    ThreadRegisterFrame,
+    EXC_RETURN_EXT_FRAME_MASK,
+    )
 from ..core import exceptions
 from ..core.target import Target
 from ..core.plugin import Plugin
-from ..debug.context import DebugContext
-from ..coresight.cortex_m_core_registers import index_for_reg
 import logging
 
 # Create a logger for this module.
 LOG = logging.getLogger(__name__)
 
-class TargetList(object):
-    def __init__(self, context, ptr, nextOffset):
-        self._context = context
-        self._list = ptr
-        self._offset = nextOffset
-
-    def __iter__(self):
-        # Read first item on list.
-        node = self._context.read32(self._list)
-
-        while node != 0:
-            # Return previously read item.
-            yield node
-
-            try:
-                # Read the next item in the list.
-                node = self._context.read32(node + self._offset)
-            except exceptions.TransferError as exc:
-                LOG.warning("TransferError while reading list elements (list=0x%08x, node=0x%08x), terminating list: %s", self._list, node, exc)
-                break
-
-class RTXThreadContext(DebugContext):
+class RTXThreadContext(RTOSThreadContext):
     """@brief Thread context for RTX5."""
 
     # SP/PSP are handled specially, so it is not in these dicts.
@@ -131,21 +118,13 @@ class RTXThreadContext(DebugContext):
                  # (reserved word: 196)
             }
 
-    def __init__(self, parent, thread):
-        super(RTXThreadContext, self).__init__(parent)
-        self._thread = thread
-        self._has_fpu = self.core.has_fpu
-
-    def read_core_registers_raw(self, reg_list):
-        reg_list = [index_for_reg(reg) for reg in reg_list]
-        reg_vals = []
-
+    def _read_frame(self):
         isCurrent = self._thread.is_current
         inException = isCurrent and self._parent.read_core_register('ipsr') > 0
 
         # If this is the current thread and we're not in an exception, just read the live registers.
         if isCurrent and not inException:
-            return self._parent.read_core_registers_raw(reg_list)
+            return None
 
         # Because of above tests, from now on, inException implies isCurrent;
         # we are generating the thread view for the RTOS thread where the
@@ -180,34 +159,20 @@ class RTXThreadContext(DebugContext):
             except exceptions.TransferError:
                 LOG.debug("Transfer error while reading thread's saved LR")
 
-        for reg in reg_list:
-
-            # Must handle stack pointer specially.
-            if reg == 13:
-                if inException:
-                    reg_vals.append(sp + hwStacked)
-                else:
-                    reg_vals.append(sp + swStacked + hwStacked)
-                continue
-
-            # Look up offset for this register on the stack.
-            spOffset = table.get(reg, None)
-            if spOffset is None:
-                reg_vals.append(self._parent.read_core_register_raw(reg))
-                continue
-            if inException:
-                spOffset -= swStacked
+        frame = ThreadRegisterFrame()
 
-            try:
-                if spOffset >= 0:
-                    reg_vals.append(self._parent.read32(sp + spOffset))
-                else:
-                    # Not available - try live one
-                    reg_vals.append(self._parent.read_core_register_raw(reg))
-            except exceptions.TransferError:
-                reg_vals.append(0)
+        # Must handle stack pointer specially.
+        if inException:
+            frame.set(13, sp + hwStacked)
+        else:
+            frame.set(13, sp + swStacked + hwStacked)
 
-        return reg_vals
+        # In an exception the software stacked registers have not been saved, so those registers have
+        # negative offsets and the live values are used instead.
+        if inException:
+            table = {reg: offset - swStacked for reg, offset in table.items()}
+        frame.add_saved(self._parent, sp, table)
+        return frame
 
 class RTXTargetThread(TargetThread):
     """@brief Represents an RTX5 thread on the target."""
@@ -218,6 +183,9 @@ class RTXTargetThread(TargetThread):
     STACKFRAME_OFFSET = 34
     SP_OFFSET = 56
 
+    ## Number of bytes of osRtxThread_t read at once, covering all of the above fields.
+    READ_SIZE = 60
+
     STATES = {
          0x00: "Inactive",
          0x01: "Ready",
@@ -245,10 +213,11 @@ class RTXTargetThread(TargetThread):
         self._thread_context = RTXThreadContext(self._target_context, self)
         self._has_fpu = self._thread_context.core.has_fpu
         try:
-            name_ptr = self._target_context.read32(self._base + RTXTargetThread.NAME_OFFSET)
+            tcb = self._provider.struct_cache.read(self._base, self.READ_SIZE)
+            name_ptr = int.from_bytes(tcb[self.NAME_OFFSET:self.NAME_OFFSET + 4], 'little')
             self._name = read_c_string(self._target_context, name_ptr)
 
-            self.update_state()
+            self.set_state(tcb[self.STATE_OFFSET], tcb[self.PRIORITY_OFFSET])
         except exceptions.TransferError as exc:
             LOG.debug("Transfer error while reading thread %x name: %s", self._base, exc)
             self._name = "?"
@@ -256,13 +225,15 @@ class RTXTargetThread(TargetThread):
 
     def update_state(self):
         try:
-            state = self._target_context.read8(self._base + RTXTargetThread.STATE_OFFSET)
-            priority = self._target_context.read8(self._base + RTXTargetThread.PRIORITY_OFFSET)
+            tcb = self._provider.struct_cache.read(self._base, self.READ_SIZE)
         except exceptions.TransferError as exc:
             LOG.debug("Transfer error while reading thread %x state: %s", self._base, exc)
         else:
-            self._state = state
-            self._priority = priority
+            self.set_state(tcb[self.STATE_OFFSET], tcb[self.PRIORITY_OFFSET])
+
+    def set_state(self, state, priority):
+        self._state = state
+        self._priority = priority
 
     @property
     def priority(self):
@@ -292,7 +263,7 @@ class RTXTargetThread(TargetThread):
     def get_stack_pointer(self):
         # Get stack pointer saved in thread struct.
         try:
-            return self._target_context.read32(self._base + RTXTargetThread.SP_OFFSET)
+            return self._provider.struct_cache.read32(self._base, self.READ_SIZE, self.SP_OFFSET)
         except exceptions.TransferError:
             LOG.debug("Transfer error while reading thread's stack pointer @ 0x%08x", self._base + RTXTargetThread.SP_OFFSET)
             return 0
@@ -301,7 +272,7 @@ class RTXTargetThread(TargetThread):
         # Get "stack frame" (EXC_RETURN value from LR) saved in thread struct.
         # Note that RTX5 only stores bottom byte - hide that by extending.
         try:
-            return self._target_context.read8(self._base + RTXTargetThread.STACKFRAME_OFFSET) | 0xFFFFFF00
+            return self._provider.struct_cache.read(self._base, self.READ_SIZE)[self.STACKFRAME_OFFSET] | 0xFFFFFF00
         except exceptions.TransferError:
             LOG.debug("Transfer error while reading thread's stack frame @ 0x%08x", self._base + RTXTargetThread.STACKFRAME_OFFSET)
             return 0xFFFFFFFD
@@ -322,6 +293,11 @@ class RTX5ThreadProvider(ThreadProvider):
 
     def __init__(self, target):
         super(RTX5ThreadProvider, self).__init__(target)
+        self._struct_cache = RTOSStructCache(self._target_context, self._target)
+
+    @property
+    def struct_cache(self):
+        return self._struct_cache
 
     def init(self, symbolProvider):
         # Lookup required symbols.
@@ -346,6 +322,7 @@ class RTX5ThreadProvider(ThreadProvider):
 
     def invalidate(self):
         self._threads = {}
+        self._struct_cache.invalidate()
 
     def event_handler(self, notification):
         # Invalidate threads list if flash is reprogrammed.
@@ -353,20 +330,28 @@ class RTX5ThreadProvider(ThreadProvider):
 
     def _build_thread_list(self):
         newThreads = {}
+        existingThreads = []
 
         def create_or_update(thread):
             # Check for and reuse existing thread.
+            if thread in newThreads:
+                return
             if thread in self._threads:
-                # Thread already exists, update its state.
+                # Thread already exists, its state is updated below.
                 t = self._threads[thread]
-                t.update_state()
+                existingThreads.append(t)
             else:
                 # Create a new thread.
                 t = RTXTargetThread(self._target_context, self, thread)
             newThreads[t.unique_id] = t
 
-        # Currently running Thread
-        thread = self._target_context.read32(self._os_rtx_info + RTX5ThreadProvider.CURRENT_OFFSET)
+        # Read the currently running thread and the heads of the thread lists.
+        thread, readyHead, delayHead, waitHead = read_words(self._target_context, [
+                self._os_rtx_info + RTX5ThreadProvider.CURRENT_OFFSET,
+                self._readylist,
+                self._delaylist,
+                self._waitlist,
+                ])
         if thread:
             create_or_update(thread)
             self._current_id = thread
@@ -377,16 +362,30 @@ class RTX5ThreadProvider(ThreadProvider):
 
         # List of target thread lists to examine.
         threadLists = [
-            TargetList(self._target_context, self._readylist, RTX5ThreadProvider.THREADNEXT_OFFSET),
-            TargetList(self._target_context, self._delaylist, RTX5ThreadProvider.DELAYNEXT_OFFSET),
-            TargetList(self._target_context, self._waitlist, RTX5ThreadProvider.DELAYNEXT_OFFSET),
+            ListWalk(readyHead, RTX5ThreadProvider.THREADNEXT_OFFSET, name="ready"),
+            ListWalk(delayHead, RTX5ThreadProvider.DELAYNEXT_OFFSET, name="delay"),
+            ListWalk(waitHead, RTX5ThreadProvider.DELAYNEXT_OFFSET, name="wait"),
             ]
 
         # Scan thread lists.
+        walk_lists(self._target_context, threadLists)
         for theList in threadLists:
-            for thread in theList:
+            for thread in theList.objects:
                 create_or_update(thread)
 
+        # Update the state and priority of reused threads by reading the words containing those
+        # byte fields.
+        stateShift = (RTXTargetThread.STATE_OFFSET & 3) * 8
+        priorityShift = (RTXTargetThread.PRIORITY_OFFSET & 3) * 8
+        try:
+            words = read_words(self._target_context, [t.unique_id + offset
+                    for t in existingThreads
+                    for offset in (RTXTargetThread.STATE_OFFSET & ~3, RTXTargetThread.PRIORITY_OFFSET & ~3)])
+            for i, t in enumerate(existingThreads):
+                t.set_state((words[2 * i] >> stateShift) & 0xff, (words[2 * i + 1] >> priorityShift) & 0xff)
+        except exceptions.TransferError as exc:
+            LOG.debug("Transfer error while reading thread states: %s", exc)
+
         # Create fake handler mode thread.
         if self._target_context.read_core_register('ipsr') > 0:
             newThreads[HandlerModeThread.UNIQUE_ID] = HandlerModeThread(self._target_context, self)
@@ -19,12 +19,10 @@
 import logging
 
 from .provider import (TargetThread, ThreadProvider)
-from .common import (read_c_string, HandlerModeThread)
+from .common import (read_c_string, HandlerModeThread, RTOSThreadContext, ThreadRegisterFrame)
 from ..core import exceptions
 from ..core.target import Target
 from ..core.plugin import Plugin
-from ..debug.context import DebugContext
-from ..coresight.cortex_m_core_registers import index_for_reg
 from ..utility.mask import twos_complement
 
 # Create a logger for this module.
@@ -49,7 +47,7 @@ class TargetList(object):
                 LOG.warning("TransferError while reading list elements (list=0x%08x, node=0x%08x), terminating list", self._list, node)
                 node = 0
 
-class ZephyrThreadContext(DebugContext):
+class ZephyrThreadContext(RTOSThreadContext):
     """@brief Thread context for Zephyr."""
 
     STACK_FRAME_OFFSETS = {
@@ -75,22 +73,14 @@ class ZephyrThreadContext(DebugContext):
                  13: 0, # r13/sp
             }
 
-    def __init__(self, parent, thread):
-        super(ZephyrThreadContext, self).__init__(parent)
-        self._thread = thread
-        self._has_fpu = self.core.has_fpu
-
-    def read_core_registers_raw(self, reg_list):
-        reg_list = [index_for_reg(reg) for reg in reg_list]
-        reg_vals = []
-
+    def _read_frame(self):
         isCurrent = self._thread.is_current
         inException = isCurrent and self._parent.read_core_register('ipsr') > 0
 
         # If this is the current thread and we're not in an exception, just read the live registers.
         if isCurrent and not inException:
             LOG.debug("Reading live registers")
-            return self._parent.read_core_registers_raw(reg_list)
+            return None
 
         # Because of above tests, from now on, inException implies isCurrent;
         # we are generating the thread view for the RTOS thread where the
@@ -103,46 +93,22 @@ class ZephyrThreadContext(DebugContext):
             sp = self._thread.get_stack_pointer()
         exceptionFrame = 0x20
 
-        for reg in reg_list:
-
-            # If this is a stack pointer register, add an offset to account for the exception stack frame
-            if reg == 13:
-                val = sp + exceptionFrame
-                LOG.debug("Reading register %d = 0x%x", reg, val)
-                reg_vals.append(val)
-                continue
-
-            # If this is a callee-saved register, read it from the thread structure
-            calleeOffset = self.CALLEE_SAVED_OFFSETS.get(reg, None)
-            if calleeOffset is not None:
-                try:
-                    addr = self._thread._base + self._thread._offsets["t_stack_ptr"] + calleeOffset
-                    val = self._parent.read32(addr)
-                    reg_vals.append(val)
-                    LOG.debug("Reading callee-saved register %d at 0x%08x = 0x%x", reg, addr, val)
-                except exceptions.TransferError:
-                    reg_vals.append(0)
-                continue
-
-            # If this is a exception stack frame register, read it from the stack
-            stackFrameOffset = self.STACK_FRAME_OFFSETS.get(reg, None)
-            if stackFrameOffset is not None:
-                try:
-                    addr = sp + stackFrameOffset
-                    val = self._parent.read32(addr)
-                    reg_vals.append(val)
-                    LOG.debug("Reading stack frame register %d at 0x%08x = 0x%x", reg, addr, val)
-                except exceptions.TransferError:
-                    reg_vals.append(0)
-                continue
-
-            # If we get here, this is a register not in any of the dictionaries
-            val = self._parent.read_core_register_raw(reg)
-            LOG.debug("Reading live register %d = 0x%x", reg, val)
-            reg_vals.append(val)
-            continue
-
-        return reg_vals
+        frame = ThreadRegisterFrame()
+
+        # Add an offset to the stack pointer to account for the exception stack frame.
+        frame.set(13, sp + exceptionFrame)
+
+        # Callee-saved registers are read from the thread structure. Offsets are rebased on the
+        # lowest saved register.
+        calleeOffsets = {reg: offset for reg, offset in self.CALLEE_SAVED_OFFSETS.items() if reg != 13}
+        calleeBase = min(calleeOffsets.values())
+        frame.add_saved(self._parent,
+                self._thread._base + self._thread._offsets["t_stack_ptr"] + calleeBase,
+                {reg: offset - calleeBase for reg, offset in calleeOffsets.items()})
+
+        # Exception stack frame registers are read from the stack.
+        frame.add_saved(self._parent, sp, self.STACK_FRAME_OFFSETS)
+        return frame
 
 class ZephyrThread(TargetThread):
     """@brief A Zephyr task."""
@@ -15,18 +15,27 @@
 # limitations under the License.
 
 import argparse
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
+import json
+from typing import (Any, Dict, List, Optional, Tuple, TYPE_CHECKING)
 import logging
 from pathlib import Path
+from time import perf_counter
 
 from .base import SubcommandBase
+from ..core import exceptions
 from ..core.helpers import ConnectHelper
-from ..flash.file_programmer import FileProgrammer
+from ..core.session import Session
+from ..flash.file_programmer import (FileProgrammer, ParsedImage)
 from ..utility.cmdline import (
     convert_session_options,
     int_base_0,
 )
 
+if TYPE_CHECKING:
+    from ..probe.debug_probe import DebugProbe
+
 LOG = logging.getLogger(__name__)
 
 class LoadSubcommand(SubcommandBase):
@@ -64,6 +73,22 @@ class LoadSubcommand(SubcommandBase):
             help="Skip programming the first N bytes. Binary files only.")
         parser_options.add_argument("--no-reset", action="store_true",
             help="Specify to prevent resetting device after programming has finished.")
+        parser_options.add_argument("--verify", action="store_true",
+            help="Check that memory matches the loaded files after programming. Memory is hashed on the "
+                 "target if the flash algorithm supports the CRC analyzer, otherwise it is read back.")
+
+        multi_options = parser.add_argument_group("multiple probe options")
+        multi_group = multi_options.add_mutually_exclusive_group()
+        multi_group.add_argument("--all-probes", action="store_true",
+            help="Program the target of every connected probe concurrently.")
+        multi_group.add_argument("--probe-list", metavar="UID[,UID...]", action="append",
+            help="Program the targets of the listed probes concurrently. Each unique ID may be a substring "
+                 "that matches exactly one connected probe. Can be used multiple times.")
+        multi_options.add_argument("--jobs", metavar="N", type=int,
+            help="Maximum number of targets to program at the same time. Defaults to the number of probes.")
+        multi_options.add_argument("--summary", metavar="PATH",
+            help="Write a JSON summary of the result and timing for each probe to this file. Defaults to "
+                 "printing the summary to stdout.")
 
         parser.add_argument("file", metavar="<file-path>", nargs="+",
             help="File to write to memory. Binary files can have an optional base address appended to the file "
@@ -80,58 +105,207 @@ class LoadSubcommand(SubcommandBase):
             raise ValueError("--base-address cannot be set when loading more than one file; "
                     "use a base address suffix instead")
 
+        files = self._get_files()
+        if files is None:
+            return 1
+
+        if self._args.all_probes or self._args.probe_list:
+            return self._load_multiple(files)
+
         session = ConnectHelper.session_with_chosen_probe(
-                            project_dir=self._args.project_dir,
-                            config_file=self._args.config,
-                            user_script=self._args.script,
-                            no_config=self._args.no_config,
-                            pack=self._args.pack,
                             unique_id=self._args.unique_id,
-                            target_override=self._args.target_override,
-                            frequency=self._args.frequency,
                             blocking=(not self._args.no_wait),
-                            connect_mode=self._args.connect_mode,
-                            options=convert_session_options(self._args.options),
-                            option_defaults=self._modified_option_defaults(),
+                            **self._get_session_args(),
                             )
         if session is None:
             LOG.error("No target device available")
             return 1
         with session:
-            programmer = FileProgrammer(session,
-                            chip_erase=self._args.erase,
-                            trust_crc=self._args.trust_crc,
-                            no_reset=self._args.no_reset)
-            for filename in self._args.file:
-                # Get an initial path with the argument as-is.
-                file_path = Path(filename).expanduser()
-
-                # Look for a base address suffix. If the supplied argument including an address suffix
-                # references an existing file, then the address suffix is not extracted.
-                if "@" in filename and not file_path.exists():
-                    filename, suffix = filename.rsplit("@", 1)
-                    try:
-                        base_address = int_base_0(suffix)
-                    except ValueError:
-                        LOG.error(f'Base address suffix "{suffix}" on file "{filename}" is not a valid integer address')
-                        return 1
-                else:
-                    base_address = self._args.base_address
-
-                # Resolve our path.
-                file_path = Path(filename).expanduser().resolve()
-                filename = str(file_path)
-
+            programmer = self._create_programmer(session)
+            # Parsed images are kept so they can be verified without parsing the files again.
+            images = []
+            for filename, base_address in files:
                 if base_address is None:
                     LOG.info("Loading %s", filename)
                 else:
                     LOG.info("Loading %s at %#010x", filename, base_address)
 
-                programmer.program(filename,
+                image = FileProgrammer.parse(filename,
+                                file_format=self._args.format,
                                 base_address=base_address,
-                                skip=self._args.skip,
-                                file_format=self._args.format)
+                                skip=self._args.skip)
+                programmer.program(image)
+                images.append((filename, image))
+
+            if self._args.verify:
+                for filename, image in images:
+                    error = self._verify(programmer, filename, image)
+                    if error:
+                        LOG.error(error)
+                        return 1
+                self._reset_after_verify(session)
+
+        return 0
+
+    def _create_programmer(self, session: Session) -> FileProgrammer:
+        # When verifying, the target is reset after verification instead of after programming, so
+        # that memory can be hashed while the target is still halted.
+        return FileProgrammer(session,
+                        chip_erase=self._args.erase,
+                        trust_crc=self._args.trust_crc,
+                        no_reset=(self._args.no_reset or self._args.verify))
+
+    def _verify(self, programmer: FileProgrammer, filename: str,
+            image: ParsedImage) -> Optional[str]:
+        """@brief Verify one image.
+        @return An error message if memory does not match the image, otherwise None.
+        """
+        start = perf_counter()
+        address = programmer.verify(image)
+        if address is not None:
+            return "Verify failed for %s: memory differs at %#010x" % (filename, address)
+        LOG.info("Verified %s in %.3f seconds", filename, perf_counter() - start)
+        return None
 
+    def _reset_after_verify(self, session: Session) -> None:
+        if not self._args.no_reset:
+            assert session.target
+            session.target.reset()
+
+    def _get_session_args(self) -> Dict[str, Any]:
+        """@brief Session constructor arguments common to all probes."""
+        return dict(
+                project_dir=self._args.project_dir,
+                config_file=self._args.config,
+                user_script=self._args.script,
+                no_config=self._args.no_config,
+                pack=self._args.pack,
+                target_override=self._args.target_override,
+                frequency=self._args.frequency,
+                connect_mode=self._args.connect_mode,
+                options=convert_session_options(self._args.options),
+                option_defaults=self._modified_option_defaults(),
+                )
+
+    def _get_files(self) -> Optional[List[Tuple[str, Optional[int]]]]:
+        """@brief Resolve file arguments.
+        @return List of (path, base address) tuples, or None if an argument is invalid.
+        """
+        files = []
+        for filename in self._args.file:
+            # Get an initial path with the argument as-is.
+            file_path = Path(filename).expanduser()
+
+            # Look for a base address suffix. If the supplied argument including an address suffix
+            # references an existing file, then the address suffix is not extracted.
+            if "@" in filename and not file_path.exists():
+                filename, suffix = filename.rsplit("@", 1)
+                try:
+                    base_address = int_base_0(suffix)
+                except ValueError:
+                    LOG.error(f'Base address suffix "{suffix}" on file "{filename}" is not a valid integer address')
+                    return None
+            else:
+                base_address = self._args.base_address
+
+            # Resolve our path.
+            file_path = Path(filename).expanduser().resolve()
+            files.append((str(file_path), base_address))
+        return files
+
+    def _get_probes(self) -> Optional[List["DebugProbe"]]:
+        """@brief Look up the probes selected by --all-probes or --probe-list.
+        @return List of probes, or None if a requested probe is missing or ambiguous.
+        """
+        if self._args.all_probes:
+            probes = ConnectHelper.get_all_connected_probes(blocking=False, unique_id=self._args.unique_id)
+            if not probes:
+                LOG.error("No connected probes")
+                return None
+            return probes
+
+        probes = []
+        unique_ids = [uid.strip() for arg in self._args.probe_list for uid in arg.split(',') if uid.strip()]
+        for unique_id in unique_ids:
+            matches = ConnectHelper.get_all_connected_probes(blocking=False, unique_id=unique_id)
+            if len(matches) != 1:
+                LOG.error("Probe ID '%s' matches %d connected probes", unique_id, len(matches))
+                return None
+            if any(probe.unique_id == matches[0].unique_id for probe in probes):
+                LOG.error("Probe %s is listed more than once", matches[0].unique_id)
+                return None
+            probes.append(matches[0])
+        return probes
+
+    def _load_multiple(self, files: List[Tuple[str, Optional[int]]]) -> int:
+        """@brief Program every selected probe's target concurrently."""
+        probes = self._get_probes()
+        if probes is None:
+            return 1
+
+        # Parse each file once for all targets.
+        images = []
+        for filename, base_address in files:
+            images.append((filename, FileProgrammer.parse(filename,
+                            file_format=self._args.format,
+                            base_address=base_address,
+                            skip=self._args.skip)))
+
+        LOG.info("Loading %d file(s) to %d targets", len(images), len(probes))
+
+        jobs = self._args.jobs or len(probes)
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="load") as executor:
+            results = list(executor.map(lambda probe: self._load_probe(probe, images), probes))
+
+        summary = json.dumps(results, indent=2)
+        if self._args.summary:
+            with open(self._args.summary, 'w') as summary_file:
+                summary_file.write(summary + "\n")
+        else:
+            print(summary)
+
+        failed = [result['unique_id'] for result in results if result['status'] != 'ok']
+        if failed:
+            LOG.error("Failed to program %d of %d targets: %s", len(failed), len(results), ", ".join(failed))
+            return 1
         return 0
 
+    def _load_probe(self, probe: "DebugProbe", images: List[Tuple[str, ParsedImage]]) -> Dict[str, Any]:
+        """@brief Program all images into one probe's target.
 
+        Runs on a worker thread. Errors are recorded in the returned result rather than raised.
+        """
+        result: Dict[str, Any] = {
+            'unique_id': probe.unique_id,
+            'description': probe.description,
+            'status': 'ok',
+            'images': [],
+            }
+        start = perf_counter()
+        try:
+            session_args = self._get_session_args()
+            # Progress bars from concurrent targets would be interleaved.
+            session_args['option_defaults']['hide_programming_progress'] = True
+            with Session(probe, **session_args) as session:
+                programmer = self._create_programmer(session)
+                for filename, image in images:
+                    image_start = perf_counter()
+                    infos = programmer.program(image)
+                    result['images'].append({
+                        'file': filename,
+                        'elapsed': perf_counter() - image_start,
+                        'regions': [dataclasses.asdict(info) for info in infos],
+                        })
+                if self._args.verify:
+                    for filename, image in images:
+                        error = self._verify(programmer, filename, image)
+                        if error:
+                            raise exceptions.Error(error)
+                    self._reset_after_verify(session)
+        except Exception as e:
+            LOG.error("Programming target of probe %s failed: %s", probe.unique_id, e,
+                    exc_info=Session.get_current().log_tracebacks)
+            result['status'] = 'error'
+            result['error'] = str(e)
+        result['elapsed'] = perf_counter() - start
+        return result
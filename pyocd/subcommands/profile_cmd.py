@@ -0,0 +1,222 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import logging
+import sys
+from time import (monotonic, sleep)
+from typing import (List, Optional, Tuple, TYPE_CHECKING)
+
+from .base import SubcommandBase
+from ..core import exceptions
+from ..core.helpers import ConnectHelper
+from ..debug.elf.elf import ELFBinaryFile
+from ..trace.profiler import (
+    PCSampleProfile,
+    PCSampler,
+    PCSRSampler,
+    ProfileSymbolizer,
+    write_flat_profile,
+    write_folded_stacks,
+    write_pprof,
+    )
+from ..utility.cmdline import (
+    convert_frequency,
+    convert_session_options,
+    int_base_0,
+    )
+
+if TYPE_CHECKING:
+    from ..core.session import Session
+
+LOG = logging.getLogger(__name__)
+
+class ProfileSubcommand(SubcommandBase):
+    """@brief `pyocd profile` subcommand."""
+
+    NAMES = ['profile']
+    HELP = "Profile a running target by sampling its PC."
+
+    ## Seconds to wait between reads when the probe has no SWO data.
+    POLL_INTERVAL = 0.001
+
+    @classmethod
+    def get_args(cls) -> List[argparse.ArgumentParser]:
+        """@brief Add this subcommand to the subparsers object."""
+        profile_parser = argparse.ArgumentParser(description='profile', add_help=False)
+
+        profile_options = profile_parser.add_argument_group("profile options")
+        profile_options.add_argument("--elf", metavar="PATH",
+            help="ELF file of the running firmware, used to name functions and source lines.")
+        profile_options.add_argument("-d", "--duration", type=float, default=5.0,
+            help="Number of seconds to sample for. Default is 5.")
+        profile_options.add_argument("-m", "--method", choices=("swo", "pcsr"), default="swo",
+            help="How to sample the PC. 'swo' uses DWT periodic PC sampling over SWO. 'pcsr' polls the "
+                "DWT_PCSR register through the debug port, for targets or probes without SWO. "
+                "Default is swo.")
+        profile_options.add_argument("--batch-size", dest="batch_size", type=int, default=PCSRSampler.DEFAULT_BATCH_SIZE,
+            help="Number of DWT_PCSR reads per batch with the pcsr method. Default is %i."
+                % PCSRSampler.DEFAULT_BATCH_SIZE)
+        profile_options.add_argument("--system-clock", dest="system_clock", type=convert_frequency,
+            help="Frequency of the target's system clock. Defaults to the swv_system_clock option, "
+                "which must be set if this argument is not. Only used with the swo method.")
+        profile_options.add_argument("--swo-clock", dest="swo_clock", type=convert_frequency,
+            help="SWO baud rate. Defaults to the swv_clock option.")
+        profile_options.add_argument("-i", "--interval", type=int_base_0, default=1024,
+            help="Number of CPU cycles between samples. Supported values are multiples of 64 up to "
+                "1024, and multiples of 1024 up to 16384. Only used with the swo method. Default is 1024.")
+        profile_options.add_argument("-c", "--core", default=0, type=int_base_0,
+            help="Core number to profile. Default is core 0.")
+        profile_options.add_argument("-l", "--lines", action="store_true",
+            help="Report source lines instead of functions. Requires DWARF debug info in the ELF.")
+        profile_options.add_argument("-n", "--limit", type=int, default=None,
+            help="Maximum number of rows in the flat profile.")
+        profile_options.add_argument("-o", "--output", metavar="PATH",
+            help="Write the flat profile to this file instead of stdout.")
+        profile_options.add_argument("--folded", metavar="PATH",
+            help="Also write folded stacks to this file, for use with flame graph tools.")
+        profile_options.add_argument("--pprof", metavar="PATH",
+            help="Also write the profile to this file in pprof format.")
+
+        return [cls.CommonOptions.COMMON, cls.CommonOptions.CONNECT, profile_parser]
+
+    def invoke(self) -> int:
+        """@brief Handle 'profile' subcommand."""
+        session = ConnectHelper.session_with_chosen_probe(
+                            project_dir=self._args.project_dir,
+                            config_file=self._args.config,
+                            user_script=self._args.script,
+                            no_config=self._args.no_config,
+                            pack=self._args.pack,
+                            unique_id=self._args.unique_id,
+                            target_override=self._args.target_override,
+                            frequency=self._args.frequency,
+                            blocking=(not self._args.no_wait),
+                            connect_mode=self._args.connect_mode,
+                            options=convert_session_options(self._args.options),
+                            option_defaults=self._modified_option_defaults(),
+                            )
+        if session is None:
+            LOG.error("No target device available")
+            return 1
+
+        with session:
+            assert session.target
+            if self._args.core not in session.target.cores:
+                LOG.error("Invalid core number %i", self._args.core)
+                return 1
+            core = session.target.cores[self._args.core]
+            elf = ELFBinaryFile(self._args.elf) if self._args.elf else None
+
+            if core.is_halted():
+                LOG.info("Resuming core %i", self._args.core)
+                core.resume()
+
+            start = monotonic()
+            if self._args.method == 'swo':
+                result = self._sample_swo(session)
+            else:
+                result = self._sample_pcsr(session)
+            if result is None:
+                return 1
+            profile, period = result
+            duration = monotonic() - start
+
+            if profile.overflows:
+                LOG.warning("Trace overflowed %i times; increase the interval or SWO baud rate",
+                        profile.overflows)
+            if not profile.total_samples:
+                LOG.warning("No PC samples were received")
+
+            # Symbolize all distinct PCs in one pass, shared by all outputs.
+            symbolizer = ProfileSymbolizer(elf, lines=self._args.lines)
+            symbolizer.resolve(profile.counts.keys())
+
+            if self._args.output:
+                with open(self._args.output, 'w') as out:
+                    write_flat_profile(out, profile, symbolizer, self._args.lines, self._args.limit)
+            else:
+                write_flat_profile(sys.stdout, profile, symbolizer, self._args.lines, self._args.limit)
+            if self._args.folded:
+                with open(self._args.folded, 'w') as out:
+                    write_folded_stacks(out, profile, symbolizer, self._args.lines)
+            if self._args.pprof:
+                with open(self._args.pprof, 'wb') as pprof_out:
+                    write_pprof(pprof_out, profile, symbolizer, period, duration)
+        return 0
+
+    def _sample_swo(self, session: "Session") -> Optional[Tuple[PCSampleProfile, int]]:
+        """@brief Collect samples with DWT periodic PC sampling over SWO.
+        @return Tuple of the profile and the sample interval in cycles, or None on error.
+        """
+        sys_clock = self._args.system_clock or session.options.get('swv_system_clock')
+        if not sys_clock:
+            LOG.error("The target's system clock frequency must be set with --system-clock "
+                    "or the swv_system_clock option")
+            return None
+        swo_clock = self._args.swo_clock or session.options.get('swv_clock')
+
+        sampler = PCSampler(session, self._args.core)
+        try:
+            interval = sampler.start(sys_clock, swo_clock, self._args.interval)
+        except exceptions.TargetSupportError as err:
+            LOG.error("Cannot profile: %s", err)
+            return None
+
+        sample_rate = sys_clock / interval
+        LOG.info("Sampling the PC every %i cycles (%.0f samples/s) for %g seconds",
+                interval, sample_rate, self._args.duration)
+        # Each sample is a 5 byte packet, sent as 10 bits per byte.
+        if sample_rate * 50 > swo_clock:
+            LOG.warning("The sample rate needs more than the SWO baud rate of %i; samples will be lost",
+                    swo_clock)
+
+        try:
+            end = monotonic() + self._args.duration
+            while monotonic() < end:
+                if not sampler.poll():
+                    sleep(self.POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sampler.stop()
+        return sampler.profile, interval
+
+    def _sample_pcsr(self, session: "Session") -> Optional[Tuple[PCSampleProfile, int]]:
+        """@brief Collect samples by polling DWT_PCSR.
+        @return Tuple of the profile and 0, since the sample interval is not fixed, or None on error.
+        """
+        try:
+            sampler = PCSRSampler(session, self._args.core, self._args.batch_size)
+        except exceptions.TargetSupportError as err:
+            LOG.error("Cannot profile: %s", err)
+            return None
+
+        LOG.info("Polling DWT_PCSR for %g seconds", self._args.duration)
+        start = monotonic()
+        try:
+            end = start + self._args.duration
+            while monotonic() < end:
+                sampler.sample()
+        except KeyboardInterrupt:
+            pass
+        elapsed = monotonic() - start
+        if elapsed > 0:
+            LOG.info("Took %i samples (%.0f samples/s)", sampler.profile.total_samples,
+                    sampler.profile.total_samples / elapsed)
+        if sampler.profile.no_samples == sampler.profile.total_samples:
+            LOG.warning("DWT_PCSR returned no samples; it may not be implemented by this core")
+        return sampler.profile, 0
@@ -15,7 +15,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Optional
+from array import array
+from enum import IntEnum
+from typing import (Callable, Iterator, Optional)
 
 class TraceEvent:
     """@brief Base trace event class."""
@@ -244,3 +246,110 @@ class TraceDataTraceEvent(TraceEvent):
                 msg += " Value={}:{:#010x}".format(rnw, self.value)
         return "[{}] DWT: Data Trace {}".format(self.timestamp, msg.strip())
 
+
+class TraceEventKind(IntEnum):
+    """@brief Event types stored in a TraceEventBatch."""
+    OVERFLOW = 1
+    TIMESTAMP = 2
+    ITM = 3
+    EVENT_COUNTER = 4
+    EXCEPTION = 5
+    PERIODIC_PC = 6
+    DATA_TRACE = 7
+
+class TraceEventBatch:
+    """@brief Trace events stored as columns.
+
+    Creating a TraceEvent object for every packet is too slow for high trace rates. A batch instead
+    stores each field of the events in its own array, all of the same length. The columns are:
+
+    - `kind`: TraceEventKind value.
+    - `timestamp`: Local timestamp when the event was decoded. For a `TIMESTAMP` event, this is the
+        new timestamp value. The timestamp is not applied to earlier events.
+    - `port`: ITM stimulus port number for `ITM` events, comparator number for `DATA_TRACE` events,
+        and the TC field for `TIMESTAMP` events. Otherwise 0.
+    - `payload`: Packet payload.
+    - `size`: Payload size in bytes.
+    - `header`: The packet's header byte, which distinguishes the forms of `DATA_TRACE` events.
+
+    The columns are `array.array` objects, so they can be wrapped without copying with
+    `memoryview` or `numpy.frombuffer()`.
+    """
+
+    def __init__(self) -> None:
+        self.kind = array('B')
+        self.timestamp = array('Q')
+        self.port = array('H')
+        self.payload = array('I')
+        self.size = array('B')
+        self.header = array('B')
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def append(self, kind: int, timestamp: int, port: int, payload: int, size: int, header: int) -> None:
+        """@brief Add one event."""
+        self.kind.append(kind)
+        self.timestamp.append(timestamp)
+        self.port.append(port)
+        self.payload.append(payload)
+        self.size.append(size)
+        self.header.append(header)
+
+    def extend(self, other: "TraceEventBatch") -> None:
+        """@brief Add all events from another batch."""
+        self.kind.extend(other.kind)
+        self.timestamp.extend(other.timestamp)
+        self.port.extend(other.port)
+        self.payload.extend(other.payload)
+        self.size.extend(other.size)
+        self.header.extend(other.header)
+
+    def slice(self, start: int, stop: int) -> "TraceEventBatch":
+        """@brief Return a new batch with the events from index start up to but not including stop."""
+        result = TraceEventBatch()
+        result.kind = self.kind[start:stop]
+        result.timestamp = self.timestamp[start:stop]
+        result.port = self.port[start:stop]
+        result.payload = self.payload[start:stop]
+        result.size = self.size[start:stop]
+        result.header = self.header[start:stop]
+        return result
+
+    def to_events(self, exception_namer: Optional[Callable[[int], Optional[str]]] = None) -> Iterator[TraceEvent]:
+        """@brief Generate a TraceEvent object for each event in the batch.
+        @param self
+        @param exception_namer Optional callable that returns the name of an exception number.
+        """
+        ITM = TraceEventKind.ITM.value
+        TIMESTAMP = TraceEventKind.TIMESTAMP.value
+        OVERFLOW = TraceEventKind.OVERFLOW.value
+        EVENT_COUNTER = TraceEventKind.EVENT_COUNTER.value
+        EXCEPTION = TraceEventKind.EXCEPTION.value
+        PERIODIC_PC = TraceEventKind.PERIODIC_PC.value
+        for kind, ts, port, payload, size, header in zip(self.kind, self.timestamp, self.port,
+                self.payload, self.size, self.header):
+            if kind == ITM:
+                yield TraceITMEvent(port, payload, size, ts)
+            elif kind == TIMESTAMP:
+                yield TraceTimestamp(port, ts)
+            elif kind == OVERFLOW:
+                yield TraceOverflow(ts)
+            elif kind == EVENT_COUNTER:
+                yield TraceEventCounter(payload, ts)
+            elif kind == EXCEPTION:
+                exception_number = payload & 0x1ff
+                exception_name = exception_namer(exception_number) if (exception_namer is not None) else None
+                yield TraceExceptionEvent(exception_number, exception_name, (payload >> 12) & 0x3, ts)
+            elif kind == PERIODIC_PC:
+                yield TracePeriodicPC(payload, ts)
+            else:
+                # Header bit 3 selects an address rather than a PC, or a read rather than a write.
+                bit3 = (header >> 3) & 0x1
+                if (header >> 6) == 0b01:
+                    if bit3 == 0:
+                        yield TraceDataTraceEvent(cmpn=port, pc=payload, ts=ts)
+                    else:
+                        yield TraceDataTraceEvent(cmpn=port, addr=payload, ts=ts)
+                else:
+                    yield TraceDataTraceEvent(cmpn=port, value=payload, rnw=(bit3 == 0), sz=size, ts=ts)
@@ -0,0 +1,471 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Statistical PC sampling profilers.
+
+PC samples can be collected in two ways, neither of which halts or instruments the target:
+- The DWT can output the PC at a fixed interval of CPU cycles as periodic PC sample packets, which
+    are gathered over SWO by PCSampler.
+- On targets without SWO, PCSRSampler polls the DWT_PCSR register through the MEM-AP as fast as the
+    probe allows.
+
+Either way, the samples are collected into a PCSampleProfile histogram, which is symbolized and written
+out as a flat profile, as folded stacks for flame graph tools, or in pprof format.
+"""
+
+import gzip
+import logging
+from collections import Counter
+from typing import (BinaryIO, Dict, IO, Iterable, List, NamedTuple, Optional, Tuple, TYPE_CHECKING)
+
+from ..core import exceptions
+from ..coresight.itm import ITM
+from ..coresight.tpiu import TPIU
+from ..probe.debug_probe import DebugProbe
+from .events import (TraceEventBatch, TraceEventKind)
+from .swo import SWODecoder
+
+if TYPE_CHECKING:
+    from ..core.session import Session
+    from ..debug.elf.elf import ELFBinaryFile
+
+LOG = logging.getLogger(__name__)
+
+## Name used for samples taken while the core was sleeping.
+SLEEP_NAME = "[sleep]"
+
+## Name used for DWT_PCSR reads that returned no sample.
+NO_SAMPLE_NAME = "[no sample]"
+
+## Value read from DWT_PCSR when no sample is available.
+PCSR_NO_SAMPLE = 0xffffffff
+
+class ProfileLocation(NamedTuple):
+    """@brief Symbolic location of a sampled PC."""
+    function: str               # Function name, or the PC in hex if unknown
+    filename: Optional[str]     # Source file name, if line information was requested and found
+    line: Optional[int]         # Source line number
+
+class PCSampleProfile:
+    """@brief Histogram of sampled PC values."""
+
+    def __init__(self) -> None:
+        self._counts: Counter = Counter()
+        self._sleep_samples = 0
+        self._no_samples = 0
+        self._overflows = 0
+
+    @property
+    def counts(self) -> Dict[int, int]:
+        """@brief Dict of number of samples for each sampled PC."""
+        return self._counts
+
+    @property
+    def sleep_samples(self) -> int:
+        """@brief Number of samples taken while the core was sleeping."""
+        return self._sleep_samples
+
+    @property
+    def no_samples(self) -> int:
+        """@brief Number of DWT_PCSR reads that returned no sample, for instance while the core was halted."""
+        return self._no_samples
+
+    @property
+    def total_samples(self) -> int:
+        return sum(self._counts.values()) + self._sleep_samples + self._no_samples
+
+    @property
+    def overflows(self) -> int:
+        """@brief Number of trace overflow packets seen.
+
+        Each overflow means the ITM dropped packets, usually because the SWO baud rate is too low for
+        the sample rate.
+        """
+        return self._overflows
+
+    def add_sample(self, pc: int) -> None:
+        self._counts[pc] += 1
+
+    def add_sleep_sample(self) -> None:
+        self._sleep_samples += 1
+
+    def add_pcsr_samples(self, values: Iterable[int]) -> None:
+        """@brief Add values read from DWT_PCSR."""
+        counts = self._counts
+        for pc in values:
+            if pc == PCSR_NO_SAMPLE:
+                self._no_samples += 1
+            else:
+                counts[pc] += 1
+
+    def add_batch(self, batch: TraceEventBatch) -> None:
+        """@brief Add the PC samples from a batch of decoded trace events.
+
+        A periodic PC packet with a 1-byte payload indicates that the core was sleeping. Other events
+        are ignored, except that overflows are counted.
+        """
+        PERIODIC_PC = TraceEventKind.PERIODIC_PC.value
+        OVERFLOW = TraceEventKind.OVERFLOW.value
+        counts = self._counts
+        for kind, payload, size in zip(batch.kind, batch.payload, batch.size):
+            if kind == PERIODIC_PC:
+                if size == 4:
+                    counts[payload] += 1
+                else:
+                    self._sleep_samples += 1
+            elif kind == OVERFLOW:
+                self._overflows += 1
+
+class ProfileSymbolizer:
+    """@brief Maps sampled PCs to functions and, optionally, source lines.
+
+    Each distinct PC is looked up once, however many samples it has, and the results are cached.
+    Function names come from the ELF symbol table, falling back to DWARF subprograms. Source lines
+    require DWARF debug info, which is only parsed if line information is requested.
+    """
+
+    def __init__(self, elf: Optional["ELFBinaryFile"], lines: bool = False) -> None:
+        """@brief Constructor.
+        @param self
+        @param elf Optional ELF file of the firmware. Without it, locations are the PCs in hex.
+        @param lines Whether to look up the source file and line of each PC.
+        """
+        self._elf = elf
+        self._lines = lines
+        self._cache: Dict[int, ProfileLocation] = {}
+
+    def resolve(self, pcs: Iterable[int]) -> Dict[int, ProfileLocation]:
+        """@brief Look up the locations of a set of PCs.
+        @return Dict mapping each PC to its location.
+        """
+        for pc in set(pcs).difference(self._cache):
+            self._cache[pc] = self._lookup(pc)
+        return self._cache
+
+    def _lookup(self, pc: int) -> ProfileLocation:
+        name = None
+        filename = None
+        line = None
+        if self._elf is not None:
+            # Thumb function symbols have bit 0 set in their value, and so in their address range.
+            symbol = self._elf.symbol_decoder.get_symbol_for_address(pc | 1)
+            if symbol is not None:
+                name = symbol.name
+            if (name is None) or self._lines:
+                decoder = self._elf.address_decoder
+                if name is None:
+                    function = decoder.get_function_for_address(pc)
+                    if function is not None:
+                        name = function.name.decode() if isinstance(function.name, bytes) else function.name
+                if self._lines:
+                    line_info = decoder.get_line_for_address(pc)
+                    if line_info is not None:
+                        filename = line_info.filename
+                        if isinstance(filename, bytes):
+                            filename = filename.decode()
+                        line = line_info.line
+        return ProfileLocation(name if (name is not None) else "0x%08x" % pc, filename, line)
+
+def _location_key(location: ProfileLocation, lines: bool) -> Tuple[str, ...]:
+    """@brief Frames of a location, outermost first."""
+    if lines and (location.filename is not None):
+        return (location.function, "%s:%i" % (location.filename, location.line))
+    return (location.function,)
+
+def aggregate(
+            profile: PCSampleProfile,
+            symbolizer: ProfileSymbolizer,
+            lines: bool = False
+        ) -> List[Tuple[Tuple[str, ...], int]]:
+    """@brief Combine the samples of a profile by location.
+    @param profile The profile.
+    @param symbolizer Symbolizer used to look up the PCs.
+    @param lines Whether to group by source line within each function, instead of by function.
+    @return List of (frames, samples) tuples sorted by decreasing samples. The frames tuple holds the
+        function name and, when grouping by line, the source location.
+    """
+    locations = symbolizer.resolve(profile.counts.keys())
+    totals: Counter = Counter()
+    for pc, count in profile.counts.items():
+        totals[_location_key(locations[pc], lines)] += count
+    if profile.sleep_samples:
+        totals[(SLEEP_NAME,)] += profile.sleep_samples
+    if profile.no_samples:
+        totals[(NO_SAMPLE_NAME,)] += profile.no_samples
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+
+def write_flat_profile(
+            out: IO[str],
+            profile: PCSampleProfile,
+            symbolizer: ProfileSymbolizer,
+            lines: bool = False,
+            limit: Optional[int] = None
+        ) -> None:
+    """@brief Write a table of samples per function or source line.
+    @param out Text file to write to.
+    @param profile The profile.
+    @param symbolizer Symbolizer used to look up the PCs.
+    @param lines Whether to list source lines instead of functions.
+    @param limit Optional maximum number of rows.
+    """
+    total = profile.total_samples
+    rows = aggregate(profile, symbolizer, lines)
+    out.write("%i samples\n" % total)
+    if not total:
+        return
+    out.write("%10s  %7s  %s\n" % ("Samples", "Percent", "Location"))
+    for frames, count in rows[:limit]:
+        out.write("%10i  %6.2f%%  %s\n" % (count, 100.0 * count / total, " ".join(frames)))
+
+def write_folded_stacks(
+            out: IO[str],
+            profile: PCSampleProfile,
+            symbolizer: ProfileSymbolizer,
+            lines: bool = False
+        ) -> None:
+    """@brief Write the profile in the folded stack format used by flame graph tools.
+
+    Each line holds semicolon separated frames followed by a sample count. PC sampling only records
+    the executing function, so the stacks are the function and, with line information, the source
+    line within it.
+    """
+    for frames, count in aggregate(profile, symbolizer, lines):
+        out.write("%s %i\n" % (";".join(frame.replace(" ", "_") for frame in frames), count))
+
+def _varint(value: int) -> bytes:
+    result = bytearray()
+    while value > 0x7f:
+        result.append((value & 0x7f) | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+def _pb_int(field: int, value: int) -> bytes:
+    """@brief Encode a protobuf varint field."""
+    return _varint(field << 3) + _varint(value)
+
+def _pb_bytes(field: int, data: bytes) -> bytes:
+    """@brief Encode a protobuf length delimited field."""
+    return _varint((field << 3) | 2) + _varint(len(data)) + data
+
+def _pb_packed(field: int, values: Iterable[int]) -> bytes:
+    """@brief Encode a packed repeated protobuf varint field."""
+    return _pb_bytes(field, b''.join(_varint(v) for v in values))
+
+def write_pprof(
+            out: BinaryIO,
+            profile: PCSampleProfile,
+            symbolizer: ProfileSymbolizer,
+            period: int = 0,
+            duration: Optional[float] = None
+        ) -> None:
+    """@brief Write the profile as a gzipped pprof protocol buffer.
+
+    Each sampled PC becomes a pprof location with its address, function, and source line if known,
+    so pprof can report by address, line, or function. The file is encoded directly, without needing
+    the protobuf package.
+
+    @param out Binary file to write to.
+    @param profile The profile.
+    @param symbolizer Symbolizer used to look up the PCs.
+    @param period Optional number of CPU cycles between samples.
+    @param duration Optional sampling time in seconds.
+    """
+    strings: Dict[str, int] = {"": 0}
+    def string_index(string: str) -> int:
+        return strings.setdefault(string, len(strings))
+
+    functions: Dict[Tuple[str, str], int] = {}
+    encoded_functions: List[bytes] = []
+    def function_id(name: str, filename: Optional[str]) -> int:
+        key = (name, filename or "")
+        if key not in functions:
+            functions[key] = len(functions) + 1
+            encoded_functions.append(_pb_bytes(5, _pb_int(1, functions[key]) + _pb_int(2, string_index(name))
+                    + _pb_int(3, string_index(name)) + _pb_int(4, string_index(key[1]))))
+        return functions[key]
+
+    locations: List[bytes] = []
+    samples: List[bytes] = []
+    def add_location(address: int, name: str, filename: Optional[str], line: Optional[int], count: int) -> None:
+        location_id = len(locations) + 1
+        line_message = _pb_int(1, function_id(name, filename)) + (_pb_int(2, line) if line else b'')
+        locations.append(_pb_bytes(4, _pb_int(1, location_id) + _pb_int(3, address) + _pb_bytes(4, line_message)))
+        samples.append(_pb_bytes(2, _pb_packed(1, [location_id]) + _pb_packed(2, [count])))
+
+    resolved = symbolizer.resolve(profile.counts.keys())
+    for pc, count in sorted(profile.counts.items()):
+        location = resolved[pc]
+        add_location(pc, location.function, location.filename, location.line, count)
+    if profile.sleep_samples:
+        add_location(0, SLEEP_NAME, None, None, profile.sleep_samples)
+    if profile.no_samples:
+        add_location(0, NO_SAMPLE_NAME, None, None, profile.no_samples)
+
+    message = bytearray(_pb_bytes(1, _pb_int(1, string_index("samples")) + _pb_int(2, string_index("count"))))
+    for part in samples + locations + encoded_functions:
+        message += part
+    if period:
+        message += _pb_bytes(11, _pb_int(1, string_index("cpu")) + _pb_int(2, string_index("cycles")))
+        message += _pb_int(12, period)
+    if duration is not None:
+        message += _pb_int(10, int(duration * 1e9))
+    # String table last, once all strings are known. Dicts keep insertion order, so indices match.
+    for string in strings:
+        message += _pb_bytes(6, string.encode('utf-8'))
+    out.write(gzip.compress(bytes(message)))
+
+class PCSampler:
+    """@brief Collects PC samples from a running target over SWO.
+
+    start() configures the TPIU, ITM, and DWT and starts SWO capture. poll() must then be called
+    regularly to read and decode data from the probe. Each sample is a 5 byte packet, so the SWO
+    baud rate limits the sample rate to about swo_clock / 50 samples per second. stop() disables
+    sampling again.
+    """
+
+    def __init__(self, session: "Session", core_number: int = 0) -> None:
+        """@brief Constructor.
+        @param self
+        @param session The Session instance.
+        @param core_number The number of the core to sample.
+        """
+        target = session.target
+        assert target
+        self._session = session
+        self._target = target
+        self._core = target.cores[core_number]
+        self._decoder = SWODecoder()
+        self._profile = PCSampleProfile()
+        self._dwt = None
+        self._itm: Optional[ITM] = None
+        self._bytes_read = 0
+
+    @property
+    def profile(self) -> PCSampleProfile:
+        return self._profile
+
+    @property
+    def bytes_read(self) -> int:
+        return self._bytes_read
+
+    def start(self, sys_clock: int, swo_clock: int, interval: int) -> int:
+        """@brief Configure PC sampling and start capturing SWO data.
+        @param self
+        @param sys_clock System clock frequency in Hertz, from which the SWO clock is derived.
+        @param swo_clock Desired SWO baud rate in Hertz.
+        @param interval Requested number of CPU cycles between samples.
+        @return The actual number of cycles between samples.
+        @exception TargetSupportError The probe or target doesn't support PC sampling over SWO.
+        """
+        probe = self._session.probe
+        assert probe
+        if DebugProbe.Capability.SWO not in probe.capabilities:
+            raise exceptions.TargetSupportError("probe %s does not support SWO" % probe.unique_id)
+        itm = self._target.get_first_child_of_type(ITM)
+        tpiu = self._target.get_first_child_of_type(TPIU)
+        dwt = getattr(self._core, 'dwt', None)
+        if (itm is None) or (tpiu is None) or (dwt is None):
+            raise exceptions.TargetSupportError("target does not have the ITM, TPIU, and DWT needed for PC sampling")
+
+        self._target.trace_start()
+        itm.init()
+        tpiu.init()
+        if not tpiu.set_swo_clock(swo_clock, sys_clock):
+            raise exceptions.TargetSupportError("failed to set SWO clock to %i Hz" % swo_clock)
+        # Stimulus ports are left disabled so they don't take SWO bandwidth from the samples.
+        itm.enable(enabled_ports=0)
+        self._itm = itm
+        self._dwt = dwt
+        actual_interval = dwt.enable_pc_sampling(interval)
+
+        # Stop SWO first in case the probe already had it started. Ignore if this fails.
+        try:
+            probe.swo_stop()
+        except exceptions.ProbeError:
+            pass
+        probe.swo_start(swo_clock)
+        return actual_interval
+
+    def poll(self) -> int:
+        """@brief Read and decode any SWO data available from the probe.
+        @return Number of bytes read.
+        """
+        assert self._session.probe
+        data = self._session.probe.swo_read()
+        if data:
+            self._bytes_read += len(data)
+            self._profile.add_batch(self._decoder.decode(data))
+        return len(data)
+
+    def stop(self) -> None:
+        """@brief Disable PC sampling and stop SWO capture.
+
+        Samples already buffered by the probe are read before capture is stopped.
+        """
+        assert self._session.probe
+        if self._dwt is not None:
+            self._dwt.disable_pc_sampling()
+        try:
+            while self.poll():
+                pass
+            self._session.probe.swo_stop()
+        finally:
+            if self._itm is not None:
+                self._itm.disable()
+            self._target.trace_stop()
+
+class PCSRSampler:
+    """@brief Collects PC samples by polling DWT_PCSR.
+
+    This works on targets without SWO. DWT_PCSR is read through the MEM-AP while the core runs, so the
+    sample rate is set by the probe's throughput. Each call to sample() issues a batch of repeated
+    reads of the register as a single block transfer, so the rate is not limited by the round trip
+    time of the probe for every sample. The sampling interval is irregular, so the profile shows
+    relative time spent rather than exact cycle counts.
+    """
+
+    ## Default number of reads per batch.
+    DEFAULT_BATCH_SIZE = 256
+
+    def __init__(self, session: "Session", core_number: int = 0, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        """@brief Constructor.
+        @param self
+        @param session The Session instance.
+        @param core_number The number of the core to sample.
+        @param batch_size Number of DWT_PCSR reads per batch.
+        @exception TargetSupportError The core doesn't have a DWT.
+        """
+        target = session.target
+        assert target
+        dwt = getattr(target.cores[core_number], 'dwt', None)
+        if dwt is None:
+            raise exceptions.TargetSupportError("core %i does not have a DWT for PC sampling" % core_number)
+        self._dwt = dwt
+        self._batch_size = batch_size
+        self._profile = PCSampleProfile()
+
+    @property
+    def profile(self) -> PCSampleProfile:
+        return self._profile
+
+    def sample(self) -> int:
+        """@brief Take one batch of samples.
+        @return Number of samples taken.
+        """
+        values = self._dwt.read_pc_samples(self._batch_size)
+        self._profile.add_pcsr_samples(values)
+        return len(values)
@@ -0,0 +1,392 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief pyOCD trace recording format.
+
+A recording holds raw SWO data split into chunks that are compressed separately. Each chunk
+records the local timestamp range it covers and the SWO decoder state at its start, so any chunk
+can be decoded without decoding the ones before it. An index at the end of the file lists the
+chunks, letting a reader find the chunks for a time window directly.
+
+File layout, with all integers little endian:
+
+- File header: magic "PYOCDTRC", uint16 version, uint16 flags (0), uint32 metadata length,
+    followed by the metadata as a UTF-8 JSON object.
+- Chunks, each with a header: magic "CHNK", uint32 flags, uint32 compressed length, uint32 raw
+    length, uint32 CRC-32 of the raw data, uint64 first timestamp, uint64 last timestamp, uint32
+    ITM page, uint8 pending length. The header is followed by the decoder's pending bytes (the
+    start of a packet that continues in this chunk) and then the zlib compressed raw data.
+- Index: magic "INDX", uint32 count, then for each chunk uint64 file offset, uint64 first
+    timestamp, and uint64 last timestamp.
+- Footer: uint64 file offset of the index, magic "PYOCDEND".
+
+If the recording was not closed, for instance because pyOCD was killed, the index and footer are
+missing. The reader then rebuilds the index by walking the chunk headers.
+"""
+
+import json
+import struct
+import zlib
+from bisect import (bisect_left, bisect_right)
+from typing import (Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, TYPE_CHECKING, Union)
+
+from ..core import exceptions
+from .events import (TraceEvent, TraceEventBatch)
+from .sink import TraceEventSink
+from .swo import (SWODecoder, SWODecoderState, SWOParser)
+
+if TYPE_CHECKING:
+    from ..core.core_target import CoreTarget
+
+FILE_MAGIC = b'PYOCDTRC'
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<8sHHI')
+
+CHUNK_MAGIC = b'CHNK'
+CHUNK_HEADER = struct.Struct('<4sIIIIQQIB')
+
+INDEX_MAGIC = b'INDX'
+INDEX_HEADER = struct.Struct('<4sI')
+INDEX_ENTRY = struct.Struct('<QQQ')
+
+FOOTER_MAGIC = b'PYOCDEND'
+FOOTER = struct.Struct('<Q8s')
+
+## Chunk flag set when data was lost before the chunk.
+CHUNK_FLAG_DISCONTINUITY = 0x1
+
+class TraceRecordingError(exceptions.Error):
+    """@brief A trace recording is malformed or corrupt."""
+    pass
+
+class ChunkInfo(NamedTuple):
+    """@brief Index entry for one chunk of a recording."""
+    offset: int             # File offset of the chunk header
+    first_timestamp: int    # Local timestamp at the start of the chunk
+    last_timestamp: int     # Local timestamp at the end of the chunk
+
+class TraceRecordingWriter:
+    """@brief Writes SWO data to a trace recording.
+
+    Data is passed to write() as it's captured. It's tracked by an SWODecoder so the timestamp range
+    and decoder state of each chunk are known. A chunk is compressed and written once it holds
+    `chunk_size` bytes. close() must be called to write the last chunk and the index.
+    """
+
+    ## Default number of raw bytes per chunk.
+    DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+                self,
+                file: Union[str, BinaryIO],
+                metadata: Optional[Dict[str, Any]] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                compression_level: int = 6
+            ) -> None:
+        """@brief Constructor.
+        @param self
+        @param file Path of the file to create, or a binary file object open for writing.
+        @param metadata Optional dict of JSON serializable values to store in the file header, such
+            as the SWO clock frequency.
+        @param chunk_size Number of raw bytes per chunk.
+        @param compression_level zlib compression level.
+        """
+        if isinstance(file, str):
+            self._file: BinaryIO = open(file, 'wb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        self._chunk_size = chunk_size
+        self._compression_level = compression_level
+        self._decoder = SWODecoder()
+        self._chunk = bytearray()
+        self._chunk_state = self._decoder.state
+        self._chunk_flags = 0
+        self._index: List[ChunkInfo] = []
+        self._offset = 0
+        self._is_closed = False
+
+        metadata_bytes = json.dumps(metadata or {}).encode('utf-8')
+        self._write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0, len(metadata_bytes)) + metadata_bytes)
+
+    def __enter__(self) -> "TraceRecordingWriter":
+        return self
+
+    def __exit__(self, exc_type, value, traceback) -> None:
+        self.close()
+
+    @property
+    def chunk_count(self) -> int:
+        """@brief Number of chunks written so far."""
+        return len(self._index)
+
+    def write(self, data: bytes) -> None:
+        """@brief Add captured SWO data."""
+        if not data:
+            return
+        self._decoder.decode(data)
+        self._chunk += data
+        if len(self._chunk) >= self._chunk_size:
+            self._write_chunk()
+
+    def mark_gap(self) -> None:
+        """@brief Record that data was lost at the current point.
+
+        The current chunk is ended, and the next one is flagged as a discontinuity. Its decoder state
+        keeps the timestamp so the index stays ordered, but discards any incomplete packet.
+        """
+        self._write_chunk()
+        self._decoder.restore(SWODecoderState(self._decoder.timestamp, 0, b''))
+        self._chunk_state = self._decoder.state
+        self._chunk_flags |= CHUNK_FLAG_DISCONTINUITY
+
+    def close(self) -> None:
+        """@brief Write the last chunk and the index."""
+        if self._is_closed:
+            return
+        self._write_chunk()
+        index_offset = self._offset
+        self._write(INDEX_HEADER.pack(INDEX_MAGIC, len(self._index)))
+        self._write(b''.join(INDEX_ENTRY.pack(*entry) for entry in self._index))
+        self._write(FOOTER.pack(index_offset, FOOTER_MAGIC))
+        self._file.flush()
+        if self._owns_file:
+            self._file.close()
+        self._is_closed = True
+
+    def _write_chunk(self) -> None:
+        if not self._chunk:
+            return
+        state = self._chunk_state
+        raw = bytes(self._chunk)
+        compressed = zlib.compress(raw, self._compression_level)
+        info = ChunkInfo(self._offset, state.timestamp, self._decoder.timestamp)
+        self._write(CHUNK_HEADER.pack(CHUNK_MAGIC, self._chunk_flags, len(compressed), len(raw),
+                zlib.crc32(raw), info.first_timestamp, info.last_timestamp, state.itm_page,
+                len(state.pending)) + state.pending + compressed)
+        self._index.append(info)
+        self._chunk.clear()
+        self._chunk_state = self._decoder.state
+        self._chunk_flags = 0
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._offset += len(data)
+
+class _TimeWindowSink(TraceEventSink):
+    """@brief Passes on events with a timestamp in a given range."""
+
+    def __init__(self, sink: TraceEventSink, start: int, end: Optional[int]) -> None:
+        self._sink = sink
+        self._start = start
+        self._end = end
+
+    def receive(self, event: TraceEvent) -> None:
+        if (event.timestamp >= self._start) and ((self._end is None) or (event.timestamp <= self._end)):
+            self._sink.receive(event)
+
+class TraceRecordingReader:
+    """@brief Reads a trace recording.
+
+    The index is loaded when the recording is opened. Methods that take a time window only read and
+    decompress the chunks that overlap it. Timestamps are the local timestamp values of the trace
+    stream, the sum of all local timestamp packets since the start of the recording.
+    """
+
+    def __init__(self, file: Union[str, BinaryIO]) -> None:
+        """@brief Constructor.
+        @param self
+        @param file Path of the recording, or a seekable binary file object open for reading.
+        @exception TraceRecordingError The file is not a valid recording.
+        """
+        if isinstance(file, str):
+            self._file: BinaryIO = open(file, 'rb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+
+        header = self._file.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise TraceRecordingError("file is too short to be a trace recording")
+        magic, version, _, metadata_length = FILE_HEADER.unpack(header)
+        if magic != FILE_MAGIC:
+            raise TraceRecordingError("not a trace recording")
+        if version != FILE_VERSION:
+            raise TraceRecordingError("unsupported trace recording version %i" % version)
+        try:
+            self._metadata = json.loads(self._file.read(metadata_length).decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as err:
+            raise TraceRecordingError("invalid trace recording metadata: %s" % err) from err
+        self._data_offset = FILE_HEADER.size + metadata_length
+
+        index = self._read_index()
+        self._chunks = index if (index is not None) else self._scan_chunks()
+        self._first_timestamps = [chunk.first_timestamp for chunk in self._chunks]
+        self._last_timestamps = [chunk.last_timestamp for chunk in self._chunks]
+
+    def __enter__(self) -> "TraceRecordingReader":
+        return self
+
+    def __exit__(self, exc_type, value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._file.close()
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """@brief The metadata dict stored when the recording was created."""
+        return self._metadata
+
+    @property
+    def chunks(self) -> List[ChunkInfo]:
+        """@brief Index of all chunks, in order."""
+        return self._chunks
+
+    @property
+    def start_timestamp(self) -> int:
+        return self._first_timestamps[0] if self._chunks else 0
+
+    @property
+    def end_timestamp(self) -> int:
+        return self._last_timestamps[-1] if self._chunks else 0
+
+    def find_chunks(self, start: Optional[int] = None, end: Optional[int] = None) -> range:
+        """@brief Indices of the chunks that overlap a time window.
+        @param self
+        @param start Optional first timestamp of the window. Defaults to the start of the recording.
+        @param end Optional last timestamp of the window. Defaults to the end of the recording.
+        """
+        first = bisect_left(self._last_timestamps, start) if (start is not None) else 0
+        last = bisect_right(self._first_timestamps, end) if (end is not None) else len(self._chunks)
+        return range(first, max(first, last))
+
+    def read_chunk(self, index: int) -> Tuple[SWODecoderState, int, bytes]:
+        """@brief Read and decompress one chunk.
+        @return Tuple of the decoder state at the start of the chunk, the chunk flags, and the raw
+            SWO data.
+        @exception TraceRecordingError The chunk is corrupt.
+        """
+        self._file.seek(self._chunks[index].offset)
+        magic, flags, compressed_length, raw_length, crc, first_timestamp, _, itm_page, pending_length \
+                = self._read_chunk_header()
+        pending = self._file.read(pending_length)
+        try:
+            raw = zlib.decompress(self._file.read(compressed_length))
+        except zlib.error as err:
+            raise TraceRecordingError("chunk %i is corrupt: %s" % (index, err)) from err
+        if (len(raw) != raw_length) or (zlib.crc32(raw) != crc):
+            raise TraceRecordingError("chunk %i is corrupt: CRC mismatch" % index)
+        return SWODecoderState(first_timestamp, itm_page, pending), flags, raw
+
+    def read_raw(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[bytes]:
+        """@brief Generate the raw SWO data of the chunks that overlap a time window."""
+        for index in self.find_chunks(start, end):
+            yield self.read_chunk(index)[2]
+
+    def read_batches(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[TraceEventBatch]:
+        """@brief Decode the events in a time window.
+
+        Only the chunks that overlap the window are decoded. Each chunk produces one batch, trimmed
+        to the events whose timestamp is within the window.
+
+        @param self
+        @param start Optional first timestamp of the window.
+        @param end Optional last timestamp of the window.
+        """
+        decoder = SWODecoder()
+        for index in self.find_chunks(start, end):
+            state, _, raw = self.read_chunk(index)
+            decoder.restore(state)
+            batch = decoder.decode(raw)
+            # Timestamps never decrease, so the window is a contiguous range of events.
+            first = bisect_left(batch.timestamp, start) if (start is not None) else 0
+            last = bisect_right(batch.timestamp, end) if (end is not None) else len(batch)
+            if (first, last) != (0, len(batch)):
+                batch = batch.slice(first, last)
+            if len(batch):
+                yield batch
+
+    def parse(
+                self,
+                sink: TraceEventSink,
+                start: Optional[int] = None,
+                end: Optional[int] = None,
+                core: Optional["CoreTarget"] = None
+            ) -> None:
+        """@brief Pass the events in a time window through an SWOParser to an event sink.
+
+        The parser applies each timestamp to the events that precede it, so an event is passed to
+        the sink if the timestamp applied to it is within the window.
+
+        @param self
+        @param sink Event sink that receives the events.
+        @param start Optional first timestamp of the window.
+        @param end Optional last timestamp of the window.
+        @param core Optional core used to look up exception names.
+        """
+        parser = SWOParser(core, _TimeWindowSink(sink, start or 0, end))
+        for index in self.find_chunks(start, end):
+            state, _, raw = self.read_chunk(index)
+            parser.decoder.restore(state)
+            parser.parse(raw)
+
+    def _read_chunk_header(self) -> Tuple:
+        header = self._file.read(CHUNK_HEADER.size)
+        if len(header) < CHUNK_HEADER.size:
+            raise TraceRecordingError("truncated chunk header")
+        fields = CHUNK_HEADER.unpack(header)
+        if fields[0] != CHUNK_MAGIC:
+            raise TraceRecordingError("invalid chunk header")
+        return fields
+
+    def _read_index(self) -> Optional[List[ChunkInfo]]:
+        """@brief Load the index using the footer, or return None if it's missing."""
+        end = self._file.seek(0, 2)
+        if end < self._data_offset + FOOTER.size:
+            return None
+        self._file.seek(end - FOOTER.size)
+        index_offset, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+        if (magic != FOOTER_MAGIC) or not (self._data_offset <= index_offset < end):
+            return None
+        self._file.seek(index_offset)
+        magic, count = INDEX_HEADER.unpack(self._file.read(INDEX_HEADER.size))
+        if (magic != INDEX_MAGIC) or (index_offset + INDEX_HEADER.size + count * INDEX_ENTRY.size
+                + FOOTER.size != end):
+            return None
+        data = self._file.read(count * INDEX_ENTRY.size)
+        return [ChunkInfo(*INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)) for i in range(count)]
+
+    def _scan_chunks(self) -> List[ChunkInfo]:
+        """@brief Build the index by walking the chunk headers."""
+        chunks = []
+        offset = self._data_offset
+        end = self._file.seek(0, 2)
+        while offset + CHUNK_HEADER.size <= end:
+            self._file.seek(offset)
+            header = self._file.read(CHUNK_HEADER.size)
+            magic, _, compressed_length, _, _, first_timestamp, last_timestamp, _, pending_length \
+                    = CHUNK_HEADER.unpack(header)
+            next_offset = offset + CHUNK_HEADER.size + pending_length + compressed_length
+            # Stop at the index or at a chunk that was only partly written.
+            if (magic != CHUNK_MAGIC) or (next_offset > end):
+                break
+            chunks.append(ChunkInfo(offset, first_timestamp, last_timestamp))
+            offset = next_offset
+        return chunks
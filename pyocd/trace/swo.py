@@ -15,14 +15,349 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import (TYPE_CHECKING, Generator, Iterable, List, Optional)
+from typing import (NamedTuple, TYPE_CHECKING, Iterable, List, Optional, Tuple, Union)
 
 from . import events
+from .events import (TraceEventBatch, TraceEventKind)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 if TYPE_CHECKING:
     from ..core.core_target import CoreTarget
     from .sink import TraceEventSink
 
+# Packet classes, in addition to the TraceEventKind values used for packets that produce an event.
+# Packets with class 0 are ignored: reserved headers, global timestamps, and invalid DWT packets.
+_IGNORED = 0
+_SYNC = 8
+_EXTENSION = 9
+
+## Payload bytes a continuation packet may have. Global timestamp 2 packets have the most.
+_MAX_CONTINUATION = 6
+
+## Payload bytes of a continuation packet that are decoded. Timestamps and extensions have at most 4.
+_MAX_CONTINUATION_VALUE = 4
+
+def _classify_header(hdr: int) -> Tuple[int, int]:
+    """@brief Return the packet class and length for a header byte.
+
+    A length of 0 means the packet has a variable length.
+    """
+    # Sync packet: a run of zero bytes, and the byte that follows.
+    if hdr == 0:
+        return _SYNC, 0
+    # Overflow packet.
+    elif hdr == 0x70:
+        return TraceEventKind.OVERFLOW, 1
+    # Protocol packet. Bit 7 is the continuation bit.
+    elif (hdr & 0x3) == 0:
+        c = (hdr >> 7) & 0x1
+        # Local timestamp format 1, with a continuation payload.
+        if (hdr & 0xcf) == 0xc0:
+            return TraceEventKind.TIMESTAMP, 0
+        # Local timestamp format 2, with the timestamp in the header.
+        elif (hdr & 0x8f) == 0:
+            return TraceEventKind.TIMESTAMP, 1
+        # Global timestamp.
+        elif hdr in (0b10010100, 0b10110100):
+            return _IGNORED, 0
+        # Extension.
+        elif (hdr & 0x8) == 0x8:
+            return _EXTENSION, (0 if c else 1)
+        # Reserved packet.
+        else:
+            return _IGNORED, 1
+    # Source packet.
+    else:
+        length = 1 + (1 << ((hdr & 0x3) - 1))
+        a = (hdr >> 3) & 0x1f
+        # Instrumentation packet.
+        if (hdr & 0x4) == 0:
+            return TraceEventKind.ITM, length
+        # Hardware source packets...
+        elif a == 0:
+            return TraceEventKind.EVENT_COUNTER, length
+        elif a == 1:
+            return TraceEventKind.EXCEPTION, length
+        elif a == 2:
+            return TraceEventKind.PERIODIC_PC, length
+        # Data trace: PC value or address, or data value.
+        elif 8 <= a <= 23 and ((hdr >> 6) & 0x3) in (0b01, 0b10):
+            return TraceEventKind.DATA_TRACE, length
+        # Invalid DWT packet.
+        else:
+            return _IGNORED, length
+
+_HEADER_CLASSES, _HEADER_LENGTHS = (list(t) for t in zip(*(_classify_header(hdr) for hdr in range(256))))
+
+if NUMPY_AVAILABLE:
+    _NP_HEADER_CLASSES = np.array(_HEADER_CLASSES, dtype=np.uint8)
+    _NP_HEADER_LENGTHS = np.array(_HEADER_LENGTHS, dtype=np.int64)
+
+def _continuation_value(data: Union[bytes, memoryview], start: int, end: int) -> int:
+    """@brief Decode 7-bit groups, least significant first."""
+    value = 0
+    for shift, byte in zip(range(0, 7 * _MAX_CONTINUATION_VALUE, 7), data[start:end]):
+        value |= (byte & 0x7f) << shift
+    return value
+
+class SWODecoderState(NamedTuple):
+    """@brief Everything an SWODecoder carries from one buffer to the next."""
+    timestamp: int      # Current local timestamp
+    itm_page: int       # Current ITM stimulus port page
+    pending: bytes      # Start of a packet that is not yet complete
+
+class SWODecoder:
+    """@brief Batch decoder for SWO trace data.
+
+    The decoder splits whole buffers of SWO data into packets using a table of header bytes,
+    instead of handling one byte at a time. The events are returned as a
+    @ref pyocd.trace.events.TraceEventBatch "TraceEventBatch". Sync, extension, and ignored
+    packets are consumed without producing an event.
+
+    If NumPy is installed, large buffers are decoded with array operations. Otherwise, and for small
+    buffers, the decoder loops over the packets in Python. Both produce the same events.
+
+    A packet split between two buffers is held until the next call to decode(). The reset() method
+    must be called after a break in the SWO data.
+    """
+
+    ## Buffers at least this long are decoded with NumPy, if it's available.
+    NUMPY_THRESHOLD = 1024
+
+    ## Packet chain is walked in jumps of 2 ** JUMP_LEVELS packets when decoding with NumPy.
+    JUMP_LEVELS = 6
+
+    def __init__(self, use_numpy: bool = True) -> None:
+        """@brief Constructor.
+        @param self
+        @param use_numpy Whether to use NumPy for large buffers if it's installed.
+        """
+        self._use_numpy = use_numpy and NUMPY_AVAILABLE
+        self.reset()
+
+    def reset(self) -> None:
+        self._remainder = b''
+        self._itm_page = 0
+        self._timestamp = 0
+
+    @property
+    def timestamp(self) -> int:
+        """@brief Current local timestamp."""
+        return self._timestamp
+
+    @property
+    def state(self) -> SWODecoderState:
+        """@brief The decoder's state between buffers.
+
+        Decoding can be resumed from this point by passing the state to restore(), for instance
+        after seeking within recorded data.
+        """
+        return SWODecoderState(self._timestamp, self._itm_page, self._remainder)
+
+    def restore(self, state: SWODecoderState) -> None:
+        """@brief Set the decoder's state, as previously returned by the state property."""
+        self._timestamp, self._itm_page, self._remainder = state
+
+    def decode(self, data: Union[bytes, bytearray, memoryview, Iterable[int]]) -> TraceEventBatch:
+        """@brief Decode a buffer of SWO data.
+        @param self
+        @param data Bytes-like object, or a sequence of integer byte values.
+        @return TraceEventBatch containing the events from all packets that were completed.
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        if self._remainder:
+            data = self._remainder + bytes(data)
+
+        batch = TraceEventBatch()
+        if self._use_numpy and (len(data) >= self.NUMPY_THRESHOLD):
+            consumed = self._decode_numpy(data, batch)
+        else:
+            consumed = self._decode_python(data, batch)
+
+        self._remainder = bytes(data[consumed:])
+        # Only one byte of an unfinished sync packet is needed.
+        if self._remainder[:1] == b'\x00':
+            self._remainder = b'\x00'
+        return batch
+
+    def _decode_python(self, data: Union[bytes, bytearray, memoryview], batch: TraceEventBatch) -> int:
+        """@brief Decode complete packets one at a time.
+        @return Number of bytes consumed.
+        """
+        n = len(data)
+        i = 0
+        page = self._itm_page
+        timestamp = self._timestamp
+        classes = _HEADER_CLASSES
+        lengths = _HEADER_LENGTHS
+        append = batch.append
+        while i < n:
+            hdr = data[i]
+            cls = classes[hdr]
+            length = lengths[hdr]
+
+            # Find the end of a variable length packet.
+            if length == 0:
+                j = i + 1
+                if cls == _SYNC:
+                    while (j < n) and (data[j] == 0):
+                        j += 1
+                else:
+                    while (j < n) and (j - i < _MAX_CONTINUATION) and (data[j] & 0x80):
+                        j += 1
+                if j >= n:
+                    break
+                length = j + 1 - i
+            elif i + length > n:
+                break
+
+            if cls == TraceEventKind.ITM:
+                append(cls, timestamp, (page * 32 + (hdr >> 3)) & 0xffff,
+                        int.from_bytes(data[i + 1:i + length], 'little'), length - 1, hdr)
+            elif cls == TraceEventKind.TIMESTAMP:
+                if length == 1:
+                    timestamp += (hdr >> 4) & 0x7
+                    tc = 0
+                else:
+                    timestamp += _continuation_value(data, i + 1, i + length)
+                    tc = (hdr >> 4) & 0x3
+                append(cls, timestamp, tc, 0, 0, hdr)
+            elif cls == _EXTENSION:
+                # Extension packet with sh==0 sets ITM stimulus page.
+                if (hdr & 0x4) == 0:
+                    page = ((hdr >> 4) & 0x7) | (_continuation_value(data, i + 1, i + length) << 3)
+            elif cls == _SYNC:
+                page = 0
+            elif cls == TraceEventKind.OVERFLOW:
+                append(cls, timestamp, 0, 0, 0, hdr)
+            elif cls != _IGNORED:
+                payload = int.from_bytes(data[i + 1:i + length], 'little')
+                # Exception trace must have a valid function.
+                if (cls != TraceEventKind.EXCEPTION) or ((payload >> 12) & 0x3):
+                    port = ((hdr >> 4) & 0x3) if (cls == TraceEventKind.DATA_TRACE) else 0
+                    append(cls, timestamp, port, payload, length - 1, hdr)
+            i += length
+
+        self._itm_page = page
+        self._timestamp = timestamp
+        return i
+
+    def _decode_numpy(self, data: Union[bytes, bytearray, memoryview], batch: TraceEventBatch) -> int:
+        """@brief Decode complete packets with array operations.
+        @return Number of bytes consumed.
+        """
+        buf = np.frombuffer(data, dtype=np.uint8)
+        n = len(buf)
+
+        # Packet length for a header at every position in the buffer. Lengths that run past the end
+        # of the buffer mark an incomplete packet.
+        lengths = _NP_HEADER_LENGTHS[buf]
+        variable = np.flatnonzero(lengths == 0)
+        if len(variable):
+            sync_ends = self._next_index(np.flatnonzero(buf), variable, n)
+            continuation_ends = np.minimum(self._next_index(np.flatnonzero(buf < 0x80), variable, n),
+                    variable + _MAX_CONTINUATION)
+            lengths[variable] = np.where(buf[variable] == 0, sync_ends, continuation_ends) + 1 - variable
+
+        start, consumed = self._find_packet_starts(lengths, n)
+        if not len(start):
+            return consumed
+
+        hdr = buf[start].astype(np.int64)
+        cls = _NP_HEADER_CLASSES[hdr]
+        body = lengths[start] - 1
+
+        # Little endian payload and 7-bit continuation value from up to 4 bytes after each header.
+        payload = np.zeros(len(start), dtype=np.int64)
+        value = np.zeros(len(start), dtype=np.int64)
+        for k in range(_MAX_CONTINUATION_VALUE):
+            present = body > k
+            if not present.any():
+                break
+            byte = np.where(present, buf[np.minimum(start + 1 + k, n - 1)], 0).astype(np.int64)
+            payload |= byte << (8 * k)
+            value |= (byte & 0x7f) << (7 * k)
+
+        # Running local timestamp.
+        is_timestamp = cls == TraceEventKind.TIMESTAMP
+        delta = np.where(is_timestamp, np.where(body == 0, (hdr >> 4) & 0x7, value), 0)
+        timestamp = np.cumsum(delta, dtype=np.uint64) + np.uint64(self._timestamp)
+        self._timestamp = int(timestamp[-1])
+
+        # ITM stimulus page, forward filled from extension and sync packets.
+        is_page = (cls == _SYNC) | ((cls == _EXTENSION) & ((hdr & 0x4) == 0))
+        page_value = np.where(cls == _SYNC, 0, ((hdr >> 4) & 0x7) | (value << 3))
+        last_page = np.maximum.accumulate(np.where(is_page, np.arange(len(start)), -1))
+        page = np.where(last_page >= 0, page_value[np.maximum(last_page, 0)], self._itm_page)
+        self._itm_page = int(page[-1])
+
+        port = np.select(
+                [cls == TraceEventKind.ITM, cls == TraceEventKind.DATA_TRACE, is_timestamp & (body > 0)],
+                [(page * 32 + (hdr >> 3)) & 0xffff, (hdr >> 4) & 0x3, (hdr >> 4) & 0x3],
+                0)
+        is_source = (hdr & 0x3) != 0
+        emit = (cls >= TraceEventKind.OVERFLOW) & (cls <= TraceEventKind.DATA_TRACE) \
+                & ((cls != TraceEventKind.EXCEPTION) | (((payload >> 12) & 0x3) != 0))
+
+        batch.kind.frombytes(cls[emit].astype(np.uint8).tobytes())
+        batch.timestamp.frombytes(timestamp[emit].astype(np.uint64).tobytes())
+        batch.port.frombytes(port[emit].astype(np.uint16).tobytes())
+        batch.payload.frombytes(np.where(is_source, payload, 0)[emit].astype(np.uint32).tobytes())
+        batch.size.frombytes(np.where(is_source, body, 0)[emit].astype(np.uint8).tobytes())
+        batch.header.frombytes(hdr[emit].astype(np.uint8).tobytes())
+        return consumed
+
+    @classmethod
+    def _find_packet_starts(cls, lengths: "np.ndarray", n: int) -> Tuple["np.ndarray", int]:
+        """@brief Follow the chain of packets from the start of the buffer.
+
+        Packet boundaries depend on all earlier packets. Rather than visiting each packet in
+        Python, tables of the packet 2, 4, 8, ... positions ahead are built. The chain is walked in
+        Python with the largest jump, and the skipped packets are then filled in from the smaller
+        tables.
+
+        @return Tuple of an array of the start offsets of complete packets, and the number of bytes
+            they occupy.
+        """
+        # Position of the next packet. Position n is the end of the buffer, and n + 1 follows an
+        # incomplete packet.
+        ahead = np.arange(n + 2, dtype=np.int64)
+        ahead[:n] = np.minimum(ahead[:n] + lengths, n + 1)
+        tables = [ahead]
+        for _ in range(cls.JUMP_LEVELS):
+            tables.append(tables[-1][tables[-1]])
+
+        next_start = tables[-1].item
+        starts = []
+        i = 0
+        while i < n:
+            starts.append(i)
+            i = next_start(i)
+
+        start = np.array(starts, dtype=np.int64)
+        for table in reversed(tables[:-1]):
+            start = np.stack((start, table[start]), axis=1).ravel()
+        start = start[start < n]
+
+        # Drop an incomplete packet at the end.
+        if len(start) and (ahead[start[-1]] > n):
+            return start[:-1], int(start[-1])
+        return start, n
+
+    @staticmethod
+    def _next_index(indices: "np.ndarray", positions: "np.ndarray", n: int) -> "np.ndarray":
+        """@brief For each position, the first of the sorted indices after it, or n if none."""
+        if len(indices) == 0:
+            return np.full(len(positions), n, dtype=np.int64)
+        k = np.searchsorted(indices, positions + 1)
+        return np.where(k < len(indices), indices[np.minimum(k, len(indices) - 1)], n)
+
 class SWOParser:
     """@brief SWO data stream parser.
 
@@ -31,24 +366,29 @@ class SWOParser:
     event sink object that is a subclass of TraceEventSink. The event sink must either be provided
     when the SWOParser is constructed, or can be set using the connect() method.
 
+    The data is decoded by an SWODecoder. The parser converts its event batches to TraceEvent
+    objects, applies timestamps to the events preceding them, and merges pairs of data trace
+    events. Consumers that can work with event batches directly should use SWODecoder instead.
+
     A SWOParser instance can be reused for multiple SWO sessions. If a break in SWO data streaming
     occurs, the reset() method should be called before passing further data to parse().
     """
     def __init__(self, core: "CoreTarget", sink: Optional["TraceEventSink"] = None) -> None:
+        self._decoder = SWODecoder()
         self.reset()
         self._core = core
         self._sink = sink
 
+    @property
+    def decoder(self) -> SWODecoder:
+        """@brief The SWODecoder used by the parser."""
+        return self._decoder
+
     def reset(self) -> None:
         self._bytes_parsed = 0
-        self._itm_page = 0
-        self._timestamp = 0
         self._pending_events: List[events.TraceEvent] = []
         self._pending_data_trace = None
-
-        # Get generator instance and prime it.
-        self._parser = self._parse()
-        next(self._parser)
+        self._decoder.reset()
 
     def connect(self, sink: "TraceEventSink") -> None:
         """@brief Connect the downstream trace sink or filter."""
@@ -70,9 +410,15 @@ class SWOParser:
         @param self
         @param data A sequence of integer byte values, usually a bytearray.
         """
-        for value in data:
-            self._parser.send(value)
-            self._bytes_parsed += 1
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        batch = self._decoder.decode(data)
+        self._bytes_parsed += len(data)
+
+        # TODO remove exception name and dependency on core
+        namer = self._core.exception_number_to_name if (self._core is not None) else None
+        for event in batch.to_events(namer):
+            self._send_event(event)
 
     def _flush_events(self) -> None:
         """@brief Send all pending events to event sink."""
@@ -92,14 +438,17 @@ class SWOParser:
                 # we can merge the two events. Otherwise we just add them to the pending event
                 # queue separately.
                 if event.comparator == self._pending_data_trace.comparator:
-                    # Merge the two data trace events.
+                    # Merge the two data trace events. Fields may be 0 or False, so test for None.
+                    def merge(a, b):
+                        return a if (a is not None) else b
+                    pending = self._pending_data_trace
                     ev = events.TraceDataTraceEvent(cmpn=event.comparator,
-                        pc=(event.pc or self._pending_data_trace.pc),
-                        addr=(event.address or self._pending_data_trace.address),
-                        value=(event.value or self._pending_data_trace.value),
-                        rnw=(event.is_read or self._pending_data_trace.is_read),
-                        sz=(event.transfer_size or self._pending_data_trace.transfer_size),
-                        ts=self._pending_data_trace.timestamp)
+                        pc=merge(event.pc, pending.pc),
+                        addr=merge(event.address, pending.address),
+                        value=merge(event.value, pending.value),
+                        rnw=merge(event.is_read, pending.is_read),
+                        sz=merge(event.transfer_size, pending.transfer_size),
+                        ts=pending.timestamp)
                 else:
                     ev = self._pending_data_trace
                 self._pending_events.append(ev)
@@ -137,148 +486,3 @@ class SWOParser:
 
         if flush:
             self._flush_events()
-
-    def _parse(self) -> Generator[None, int, None]:
-        """@brief SWO parser as generator function coroutine.
-
-        The generator yields every time it needs a byte of SWO data. The caller must use the
-        generator's send() method to provide the next byte.
-        """
-        timestamp = 0
-        invalid = False
-        while True:
-            byte = yield
-            hdr = byte
-
-            # Sync packet.
-            if hdr == 0:
-                packets = 0
-                while True:
-                    # Check for final 1 bit after at least 5 all-zero sync packets
-                    if (packets >= 5) and (byte == 0x80):
-                        break
-                    elif byte == 0:
-                        packets += 1
-                    else:
-                        # Get early non-zero packet, reset sync packet counter.
-                        #packets = 0
-                        invalid = True
-                        break
-                    byte = yield
-                self._itm_page = 0
-            # Overflow packet.
-            elif hdr == 0x70:
-                self._send_event(events.TraceOverflow(timestamp))
-            # Protocol packet.
-            elif (hdr & 0x3) == 0:
-                c = (hdr >> 7) & 0x1
-                d = (hdr >> 4) & 0b111
-                # Local timestamp.
-                if (hdr & 0xf) == 0 and d not in (0x0, 0x3):
-                    ts = 0
-                    tc = 0
-                    # Local timestamp packet format 1.
-                    if c == 1:
-                        tc = (hdr >> 4) & 0x3
-                        while c == 1:
-                            byte = yield
-                            ts = (ts << 7) | (byte & 0x7f)
-                            c = (byte >> 7) & 0x1
-                    # Local timestamp packet format 2.
-                    else:
-                        ts = (hdr >> 4) & 0x7
-                    timestamp += ts
-                    self._send_event(events.TraceTimestamp(tc, timestamp))
-                # Global timestamp.
-                elif hdr in (0b10010100, 0b10110100):
-                    # TODO handle global timestamp
-                    # t = (hdr >> 5) & 0x1
-                    pass
-                # Extension.
-                elif (hdr & 0x8) == 0x8:
-                    sh = (hdr >> 2) & 0x1
-                    if c == 0:
-                        ex = (hdr >> 4) & 0x7
-                    else:
-                        ex = 0
-                        while c == 1:
-                            byte = yield
-                            ex = (ex << 7) | (byte & 0x7f)
-                            c = (byte >> 7) & 0x1
-                    if sh == 0:
-                        # Extension packet with sh==0 sets ITM stimulus page.
-                        self._itm_page = ex
-                    else:
-                        #self._send_event(events.TraceEvent("Extension: SH={:d} EX={:#x}\n".format(sh, ex), timestamp))
-                        invalid = True
-                # Reserved packet.
-                else:
-                    invalid = True
-            # Source packet.
-            else:
-                ss = hdr & 0x3
-                l = 1 << (ss - 1)
-                a = (hdr >> 3) & 0x1f
-                if l == 1:
-                    payload = yield
-                elif l == 2:
-                    byte1 = yield
-                    byte2 = yield
-                    payload = (byte1 |
-                                (byte2 << 8))
-                else:
-                    byte1 = yield
-                    byte2 = yield
-                    byte3 = yield
-                    byte4 = yield
-                    payload = (byte1 |
-                                (byte2 << 8) |
-                                (byte3 << 16) |
-                                (byte4 << 24))
-
-                # Instrumentation packet.
-                if (hdr & 0x4) == 0:
-                    port = (self._itm_page * 32) + a
-                    self._send_event(events.TraceITMEvent(port, payload, l, timestamp))
-                # Hardware source packets...
-                # Event counter
-                elif a == 0:
-                    self._send_event(events.TraceEventCounter(payload, timestamp))
-                # Exception trace
-                elif a == 1:
-                    exception_number = payload & 0x1ff
-                    # TODO remove exception name and dependency on core
-                    exception_name = self._core.exception_number_to_name(exception_number)
-                    fn = (payload >> 12) & 0x3
-                    if 1 <= fn <= 3:
-                        self._send_event(events.TraceExceptionEvent(
-                                exception_number, exception_name, fn, timestamp))
-                    else:
-                        invalid = True
-                # Periodic PC
-                elif a == 2:
-                    # A payload of 0 indicates a period PC sleep event.
-                    self._send_event(events.TracePeriodicPC(payload, timestamp))
-                # Data trace
-                elif 8 <= a <= 23:
-                    type = (hdr >> 6) & 0x3
-                    cmpn = (hdr >> 4) & 0x3
-                    bit3 = (hdr >> 3) & 0x1
-                    # PC value
-                    if type == 0b01 and bit3 == 0:
-                        self._send_event(events.TraceDataTraceEvent(cmpn=cmpn, pc=payload, ts=timestamp))
-                    # Address
-                    elif type == 0b01 and bit3 == 1:
-                        self._send_event(events.TraceDataTraceEvent(cmpn=cmpn, addr=payload, ts=timestamp))
-                    # Data value
-                    elif type == 0b10:
-                        self._send_event(events.TraceDataTraceEvent(
-                                cmpn=cmpn, value=payload, rnw=(bit3 == 0), sz=l, ts=timestamp))
-                    else:
-                        invalid = True
-                # Invalid DWT 'a' value.
-                else:
-                    invalid = True
-
-
-
@@ -19,16 +19,18 @@
 import logging
 import threading
 from time import sleep
-from typing import (Optional, TextIO, TYPE_CHECKING)
+from typing import (Any, Dict, Optional, TextIO, TYPE_CHECKING)
 
 from .sink import TraceEventSink
-from .events import (TraceEvent, TraceITMEvent)
+from .events import (TraceEvent, TraceITMEvent, TraceOverflow)
+from .recording import TraceRecordingWriter
 from .swo import SWOParser
 from ..coresight.itm import ITM
 from ..coresight.tpiu import TPIU
 from ..core.target import Target
 from ..core import exceptions
 from ..probe.debug_probe import DebugProbe
+from ..utility.ring_buffer import ByteRingBuffer
 from ..utility.server import StreamServer
 
 if TYPE_CHECKING:
@@ -46,6 +48,12 @@ class SWVEventSink(TraceEventSink):
         @param console File-like object to which SWV data will be written.
         """
         self._console = console
+        self._overflow_count = 0
+
+    @property
+    def overflow_count(self) -> int:
+        """@brief Number of overflow packets in the trace stream."""
+        return self._overflow_count
 
     def receive(self, event: TraceEvent) -> None:
         """@brief Handle an SWV trace event.
@@ -55,6 +63,8 @@ class SWVEventSink(TraceEventSink):
             will be extracted and written to the console.
         """
         if not isinstance(event, TraceITMEvent):
+            if isinstance(event, TraceOverflow):
+                self._overflow_count += 1
             return
 
         # Extract bytes.
@@ -73,7 +83,17 @@ class SWVEventSink(TraceEventSink):
         self._console.write(data)
 
 class SWVReader(threading.Thread):
-    """@brief Sets up SWV and processes data in a background thread."""
+    """@brief Sets up SWV and processes data in background threads.
+
+    Capture is separate from decoding, so that slow decoding or output can't cause the probe's SWO
+    buffer to overrun. The reader thread only drains the probe into a ring buffer. A second thread
+    decodes the data from the ring buffer and writes the raw SWV stream server. If decoding falls
+    so far behind that the ring buffer fills, newer data is dropped and counted, and the parser is
+    reset at the gap.
+    """
+
+    ## Seconds to wait between reads when the probe has no SWO data.
+    POLL_INTERVAL = 0.001
 
     def __init__(self, session: "Session", core_number: int = 0, lock: Optional[threading.Lock] = None) -> None:
         """@brief Constructor.
@@ -87,6 +107,13 @@ class SWVReader(threading.Thread):
         self._shutdown_event = threading.Event()
         self._swo_clock = 0
         self._lock = lock
+        self._ring: Optional[ByteRingBuffer] = None
+        self._decoder_thread: Optional[threading.Thread] = None
+        self._capture_done = threading.Event()
+        self._swv_raw_server: Optional[StreamServer] = None
+        self._recording: Optional[TraceRecordingWriter] = None
+        self._sink: Optional[SWVEventSink] = None
+        self._decoded_bytes = 0
 
         target = self._session.target
         assert target
@@ -101,7 +128,8 @@ class SWVReader(threading.Thread):
         This method performs all steps required to start up SWV. It first calls the target's
         trace_start() method, which allows for target-specific trace initialization. Then it
         configures the TPIU and ITM modules. A simple trace data processing graph is created that
-        connects an SWVEventSink with a SWOParser. Finally, the reader thread is started.
+        connects an SWVEventSink with a SWOParser. Finally, the reader and decoder threads are
+        started.
 
         If the debug probe or target do not support SWO, a warning is printed and False returns,
         but nothing else is done (no exception raised).
@@ -145,7 +173,26 @@ class SWVReader(threading.Thread):
         self._sink = SWVEventSink(console)
         self._parser.connect(self._sink)
 
+        self._ring = ByteRingBuffer(self._session.options.get('swv_buffer_size'))
+        self._swv_raw_server = StreamServer(
+                            self._session.options.get('swv_raw_port'),
+                            serve_local_only=self._session.options.get('serve_local_only'),
+                            name="SWV raw",
+                            is_read_only=True) \
+                         if self._session.options.get('swv_raw_enable') else None
+        recording_path = self._session.options.get('swv_recording')
+        if recording_path:
+            self._recording = TraceRecordingWriter(recording_path, metadata={
+                    'sys_clock': sys_clock,
+                    'swo_clock': swo_clock,
+                    'core': self._core_number,
+                    })
+            LOG.info("Recording SWV data to %s", recording_path)
+        self._capture_done.clear()
+        self._decoder_thread = threading.Thread(target=self._decode, name="SWVDecoder", daemon=True)
+
         self.start()
+        self._decoder_thread.start()
 
         return True
 
@@ -162,6 +209,9 @@ class SWVReader(threading.Thread):
 
         self._shutdown_event.set()
         self.join()
+        assert self._decoder_thread
+        self._decoder_thread.join()
+        LOG.debug("SWV metrics: %s", self.get_metrics())
 
         # init() should never have started the SWV thread unless the target has ITM and TPIU.
         itm = self._target.get_first_child_of_type(ITM)
@@ -170,54 +220,96 @@ class SWVReader(threading.Thread):
 
         self._target.trace_stop()
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """@brief Capture and decode counters.
+
+        Includes the ring buffer's counters, the number of bytes decoded, and the number of overflow
+        packets seen in the trace stream. Overflow packets mean the target's ITM or TPIU dropped
+        data, while dropped bytes were lost on the host.
+        """
+        metrics: Dict[str, Any] = self._ring.get_metrics() if (self._ring is not None) else {}
+        metrics['decoded_bytes'] = self._decoded_bytes
+        metrics['trace_overflows'] = self._sink.overflow_count if (self._sink is not None) else 0
+        return metrics
+
     def run(self) -> None:
         """@brief SWV reader thread routine.
 
         Starts the probe receiving SWO data by calling DebugProbe.swo_start(). For as long as the
-        thread runs, it reads SWO data from the probe and passes it to the SWO parser created in
-        init(). When the thread is signaled to stop, it calls DebugProbe.swo_stop() before exiting.
+        thread runs, it reads SWO data from the probe and adds it to the ring buffer created in
+        init(). The probe is read again immediately while it returns data. When the thread is
+        signaled to stop, it calls DebugProbe.swo_stop() before exiting.
         """
         assert self._session.probe
+        assert self._ring
 
         if self._lock:
             self._lock.acquire()
 
-        swv_raw_server = StreamServer(
-                            self._session.options.get('swv_raw_port'),
-                            serve_local_only=self._session.options.get('serve_local_only'),
-                            name="SWV raw",
-                            is_read_only=True) \
-                         if self._session.options.get('swv_raw_enable') else None
-
-        # Stop SWO first in case the probe already had it started. Ignore if this fails.
         try:
-            self._session.probe.swo_stop()
-        except exceptions.ProbeError:
-            pass
-        self._session.probe.swo_start(self._swo_clock)
+            # Stop SWO first in case the probe already had it started. Ignore if this fails.
+            try:
+                self._session.probe.swo_stop()
+            except exceptions.ProbeError:
+                pass
+            self._session.probe.swo_start(self._swo_clock)
 
-        while not self._shutdown_event.is_set():
-            data = self._session.probe.swo_read()
-            if data:
-                if swv_raw_server:
-                    swv_raw_server.write(data)
-                self._parser.parse(data)
+            while not self._shutdown_event.is_set():
+                data = self._session.probe.swo_read()
+                if data:
+                    self._ring.write(data)
 
-            if self._lock:
-                self._lock.release()
+                if self._lock:
+                    self._lock.release()
 
-            sleep(0.001)
+                # Keep draining while data is arriving, but give other threads a chance to use the probe.
+                sleep(0 if data else self.POLL_INTERVAL)
 
-            if self._lock:
-                self._lock.acquire()
+                if self._lock:
+                    self._lock.acquire()
 
-        self._session.probe.swo_stop()
+            self._session.probe.swo_stop()
+        finally:
+            if self._lock:
+                self._lock.release()
+            self._capture_done.set()
 
-        if swv_raw_server:
-            swv_raw_server.stop()
+    def _decode(self) -> None:
+        """@brief SWV decoder thread routine.
 
-        if self._lock:
-            self._lock.release()
+        Parses data from the ring buffer and writes it to the raw SWV server and the recording until
+        capture has stopped and the ring buffer is empty.
+        """
+        assert self._ring
+        reported_overflows = 0
+        while True:
+            if not self._ring.wait(0.1):
+                if self._capture_done.is_set() and not len(self._ring):
+                    break
+                continue
+
+            data, gap = self._ring.read()
+            if data:
+                if self._swv_raw_server:
+                    self._swv_raw_server.write(data)
+                if self._recording:
+                    self._recording.write(data)
+                self._parser.parse(data)
+                self._decoded_bytes += len(data)
+            if gap:
+                # The packet at the gap is incomplete, so start parsing again from a clean state.
+                self._parser.reset()
+                if self._recording:
+                    self._recording.mark_gap()
+                if self._ring.overflow_count != reported_overflows:
+                    reported_overflows = self._ring.overflow_count
+                    LOG.warning("SWV data lost because decoding fell behind (%i bytes dropped in total)",
+                            self._ring.dropped_bytes)
+
+        if self._swv_raw_server:
+            self._swv_raw_server.stop()
+        if self._recording:
+            self._recording.close()
 
     def _reset_handler(self, notification: "Notification") -> None:
         """@brief Reset notification handler.
@@ -123,7 +123,8 @@ def uint_to_hex_le(value: int, width: int) -> str:
         next whole byte. The bytes represent `value` in little-endian order. That is, the first hex
         byte contains the LSB of `value`, while the last hex byte the MSB.
     """
-    return ''.join("%02x" % ((value >> b) & 0xff) for b in range(0, align_up(width, 8), 8))
+    width = align_up(width, 8)
+    return (value & ((1 << width) - 1)).to_bytes(width // 8, 'little').hex()
 
 def hex_le_to_uint(value: str, width: int) -> int:
     """@brief Create an an integer value from an n-digit hexadecimal string.
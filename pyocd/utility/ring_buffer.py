@@ -0,0 +1,167 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections import deque
+from typing import (Any, Deque, Dict, Optional, Tuple)
+
+class ByteRingBuffer:
+    """@brief Bounded byte FIFO for one producer thread and one consumer thread.
+
+    The producer calls write() and the consumer calls read(). Neither takes a lock. Each side only
+    updates its own running byte count, and the fill level is the difference between the counts.
+    The buffer is intended for streams the producer can't pause, such as SWO data drained from a
+    probe. Data that doesn't fit is dropped, never blocking the producer.
+
+    Each point in the stream where data was dropped is recorded as a gap. read() stops at a gap and
+    reports it, so the consumer can resynchronize its decoder.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """@brief Constructor.
+        @param self
+        @param capacity Maximum number of bytes held.
+        """
+        assert capacity > 0
+        self._capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._data_event = threading.Event()
+        # Updated only by the producer.
+        self._write_count = 0
+        self._dropped_bytes = 0
+        self._overflow_count = 0
+        self._high_water = 0
+        # Stream offsets where data was dropped. Appended by the producer, popped by the consumer.
+        self._gaps: Deque[int] = deque()
+        # Updated only by the consumer.
+        self._read_count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        """@brief Number of bytes waiting to be read."""
+        return self._write_count - self._read_count
+
+    @property
+    def bytes_written(self) -> int:
+        """@brief Total number of bytes accepted by write()."""
+        return self._write_count
+
+    @property
+    def bytes_read(self) -> int:
+        """@brief Total number of bytes returned by read()."""
+        return self._read_count
+
+    @property
+    def dropped_bytes(self) -> int:
+        """@brief Total number of bytes dropped because the buffer was full."""
+        return self._dropped_bytes
+
+    @property
+    def overflow_count(self) -> int:
+        """@brief Number of separate gaps caused by dropped data."""
+        return self._overflow_count
+
+    @property
+    def high_water(self) -> int:
+        """@brief Largest number of bytes that have been waiting to be read."""
+        return self._high_water
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """@brief Counters as a dict, suitable for logging or JSON."""
+        return {
+                'capacity': self._capacity,
+                'bytes_written': self._write_count,
+                'bytes_read': self._read_count,
+                'dropped_bytes': self._dropped_bytes,
+                'overflow_count': self._overflow_count,
+                'high_water': self._high_water,
+            }
+
+    def write(self, data: bytes) -> int:
+        """@brief Add data to the buffer, dropping what doesn't fit.
+
+        Must only be called from the producer thread.
+
+        @return Number of bytes accepted.
+        """
+        size = len(data)
+        write_count = self._write_count
+        count = min(size, self._capacity - (write_count - self._read_count))
+        if count:
+            start = write_count % self._capacity
+            first = min(count, self._capacity - start)
+            self._buffer[start:start + first] = data[:first]
+            if count > first:
+                self._buffer[:count - first] = data[first:count]
+            # Publish the data only after it has been copied.
+            write_count += count
+            self._write_count = write_count
+            self._high_water = max(self._high_water, write_count - self._read_count)
+        if count < size:
+            self._dropped_bytes += size - count
+            # Consecutive drops form a single gap.
+            if not self._gaps or self._gaps[-1] != write_count:
+                self._gaps.append(write_count)
+                self._overflow_count += 1
+        if count:
+            self._data_event.set()
+        return count
+
+    def read(self, max_size: Optional[int] = None) -> Tuple[bytes, bool]:
+        """@brief Remove data from the buffer.
+
+        Must only be called from the consumer thread.
+
+        @param self
+        @param max_size Optional maximum number of bytes to return.
+        @return Tuple of the data, which may be empty, and a bool that is True if data was dropped
+            directly after the returned data.
+        """
+        read_count = self._read_count
+        end = self._write_count
+        gap = False
+        if self._gaps and self._gaps[0] <= end:
+            end = self._gaps[0]
+            gap = True
+        count = end - read_count
+        if (max_size is not None) and (count > max_size):
+            count = max_size
+            gap = False
+        start = read_count % self._capacity
+        first = min(count, self._capacity - start)
+        data = bytes(self._buffer[start:start + first])
+        if count > first:
+            data += bytes(self._buffer[:count - first])
+        # Free the space only after the data has been copied.
+        self._read_count = read_count + count
+        if gap:
+            self._gaps.popleft()
+        return data, gap
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """@brief Wait until there is data or a gap to read.
+
+        Must only be called from the consumer thread.
+
+        @return Whether data or a gap is available.
+        """
+        self._data_event.clear()
+        if len(self) or self._gaps:
+            return True
+        return self._data_event.wait(timeout)
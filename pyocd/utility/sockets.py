@@ -94,6 +94,7 @@ class ClientSocket(object):
 
     def connect(self):
         self._socket = socket.create_connection(self._address, self._timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     def close(self):
         if self._socket is not None:
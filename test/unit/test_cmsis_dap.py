@@ -0,0 +1,373 @@
+# pyOCD debugger
+# Copyright (c) 2023 pyOCD contributors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import pytest
+import random
+
+from pyocd.probe.pydapaccess.dap_access_api import DAPAccessIntf
+from pyocd.probe.pydapaccess.dap_access_cmsis_dap import (
+    DAPAccessCMSISDAP,
+    READ,
+    )
+from pyocd.probe.pydapaccess.cmsis_dap_core import Command
+from pyocd.probe.pydapaccess.interface.interface import Interface
+
+class MockDAPInterface(Interface):
+    """@brief Interface that executes DAP_Transfer and DAP_TransferBlock commands.
+
+    Every read returns the next value of a counter. Written values are recorded in order. Responses
+    are held back until released, to model the probe's processing latency.
+    """
+
+    def __init__(self, packet_count=4, packet_size=64):
+        super().__init__()
+        self.serial_number = "mock"
+        self.packet_count = packet_count
+        self.packet_size = packet_size
+        self.next_value = 0x1000
+        self.writes = []
+        self.commands = []
+        self.pending = collections.deque()
+        self.ready = collections.deque()
+        self.max_outstanding = 0
+        self.max_request_size = 0
+        self.max_response_size = 0
+        self.auto_complete = True
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _read_value(self):
+        value = self.next_value
+        self.next_value += 1
+        return value
+
+    def _execute_one(self, data, pos):
+        cmd = data[pos]
+        response = bytearray([cmd])
+        if cmd == Command.DAP_TRANSFER:
+            count = data[pos + 2]
+            pos += 3
+            words = bytearray()
+            for _ in range(count):
+                request = data[pos]
+                pos += 1
+                if request & READ:
+                    words += self._read_value().to_bytes(4, 'little')
+                else:
+                    self.writes.append((request, int.from_bytes(data[pos:pos + 4], 'little')))
+                    pos += 4
+            response += bytes([count, 1]) + words
+        elif cmd == Command.DAP_TRANSFER_BLOCK:
+            count = data[pos + 2] | (data[pos + 3] << 8)
+            request = data[pos + 4]
+            words = bytearray()
+            pos += 5
+            for _ in range(count):
+                if request & READ:
+                    words += self._read_value().to_bytes(4, 'little')
+                else:
+                    self.writes.append((request, int.from_bytes(data[pos:pos + 4], 'little')))
+                    pos += 4
+            response += bytes([count & 0xff, count >> 8, 1]) + words
+        else:
+            raise AssertionError("unexpected command %02x" % cmd)
+        return response, pos
+
+    def _execute(self, data):
+        assert len(data) <= self.packet_size
+        cmd = data[0]
+        self.commands.append(cmd)
+        if cmd == Command.DAP_EXECUTE_COMMANDS:
+            response = bytearray(data[0:2])
+            pos = 2
+            for _ in range(data[1]):
+                sub_response, pos = self._execute_one(data, pos)
+                response += sub_response
+        else:
+            response, pos = self._execute_one(data, 0)
+        self.max_request_size = max(self.max_request_size, pos)
+        self.max_response_size = max(self.max_response_size, len(response))
+        assert pos <= self.packet_size
+        assert len(response) <= self.packet_size
+        response.extend(bytes(self.packet_size - len(response)))
+        return bytes(response)
+
+    def write(self, data):
+        self.pending.append(self._execute(bytes(data)))
+        outstanding = len(self.pending) + len(self.ready)
+        assert outstanding <= self.packet_count
+        self.max_outstanding = max(self.max_outstanding, outstanding)
+        if self.auto_complete:
+            self.complete()
+
+    def complete(self, count=None):
+        """@brief Make responses for in-flight commands available to read."""
+        if count is None:
+            count = len(self.pending)
+        for _ in range(count):
+            self.ready.append(self.pending.popleft())
+
+    def read(self):
+        if not self.ready:
+            self.complete(1)
+        return self.ready.popleft()
+
+    def has_received_data(self):
+        return len(self.ready) > 0
+
+@pytest.fixture(scope='function')
+def mockif():
+    return MockDAPInterface()
+
+def make_dap(mockif, use_execute_commands=False):
+    d = DAPAccessCMSISDAP(None, interface=mockif)
+    d._packet_size = mockif.packet_size
+    d._use_execute_commands = use_execute_commands
+    d._init_deferred_buffers()
+    d.set_deferred_transfer(True)
+    return d
+
+@pytest.fixture(scope='function')
+def dap(mockif):
+    return make_dap(mockif)
+
+@pytest.fixture(scope='function')
+def dap_exec(mockif):
+    return make_dap(mockif, use_execute_commands=True)
+
+class TestTransfers:
+    def test_read_reg(self, dap):
+        assert dap.read_reg(DAPAccessIntf.REG.AP_0xC) == 0x1000
+        assert dap.read_reg(DAPAccessIntf.REG.DP_0x4) == 0x1001
+
+    def test_write_reg(self, dap, mockif):
+        dap.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        dap.flush()
+        assert mockif.writes == [(0x05, 0x20000000)]
+
+    def test_read_repeat(self, dap):
+        data = dap.reg_read_repeat(100, DAPAccessIntf.REG.AP_0xC)
+        assert data == list(range(0x1000, 0x1000 + 100))
+
+    def test_write_repeat(self, dap, mockif):
+        values = list(range(200))
+        dap.reg_write_repeat(len(values), DAPAccessIntf.REG.AP_0xC, values)
+        dap.flush()
+        assert [v for _, v in mockif.writes] == values
+
+    def test_mixed_transfer(self, dap, mockif):
+        dap.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        cb = dap.read_reg(DAPAccessIntf.REG.AP_0xC, now=False)
+        dap.write_reg(DAPAccessIntf.REG.AP_0x4, 0xfffffffc)
+        dap.flush()
+        assert mockif.commands == [Command.DAP_TRANSFER]
+        assert mockif.writes == [(0x05, 0x20000000), (0x05, 0xfffffffc)]
+        assert cb() == 0x1000
+
+    def test_transfers_spanning_packets(self, dap):
+        # Odd sizes force transfer data to be split across response packets.
+        cbs = [dap.reg_read_repeat(n, DAPAccessIntf.REG.AP_0xC, now=False) for n in (7, 23, 1, 40, 9)]
+        expected = 0x1000
+        for n, cb in zip((7, 23, 1, 40, 9), cbs):
+            assert cb() == list(range(expected, expected + n))
+            expected += n
+
+class TestPipeline:
+    def test_packet_count_honored(self, dap, mockif):
+        mockif.auto_complete = False
+        cbs = [dap.reg_read_repeat(14, DAPAccessIntf.REG.AP_0xC, now=False) for _ in range(20)]
+        dap.flush()
+        assert mockif.max_outstanding == mockif.packet_count
+        expected = 0x1000
+        for cb in cbs:
+            assert cb() == list(range(expected, expected + 14))
+            expected += 14
+
+    def test_completed_responses_decoded_early(self, dap, mockif):
+        # Each call fills exactly one packet, so it is sent immediately.
+        transfers = []
+        for _ in range(mockif.packet_count):
+            dap.reg_read_repeat(15, DAPAccessIntf.REG.AP_0xC, now=False)
+            transfers.append(dap._transfer_list[-1])
+
+        # Responses already received were consumed before each following command was sent, so
+        # only the last command is still in flight and all earlier transfers are complete.
+        assert len(dap._commands_to_read) == 1
+        assert all(t._result is not None for t in transfers[:-1])
+        assert transfers[-1]._result is None
+
+        dap.flush()
+        assert transfers[-1].get_result() == list(range(0x1000 + 45, 0x1000 + 60))
+
+    def test_blocking_read_when_nothing_received(self, dap, mockif):
+        mockif.auto_complete = False
+        for _ in range(mockif.packet_count + 2):
+            dap.reg_read_repeat(15, DAPAccessIntf.REG.AP_0xC, now=False)
+        assert len(dap._commands_to_read) == mockif.packet_count
+        dap.flush()
+        assert not dap._commands_to_read
+
+    def test_error_aborts_pending(self, dap, mockif):
+        mockif.auto_complete = False
+        cb1 = dap.read_reg(DAPAccessIntf.REG.AP_0xC, now=False)
+        dap.flush()
+
+        orig_execute = mockif._execute
+        def fault(data):
+            response = bytearray(orig_execute(data))
+            response[3 if data[0] == Command.DAP_TRANSFER_BLOCK else 2] = 0x04 # ACK_FAULT
+            return bytes(response)
+        mockif._execute = fault
+        cb2 = dap.read_reg(DAPAccessIntf.REG.AP_0xC, now=False)
+        with pytest.raises(DAPAccessIntf.TransferFaultError):
+            dap.flush()
+        with pytest.raises(DAPAccessIntf.TransferFaultError):
+            cb2()
+        assert cb1() == 0x1000
+
+class TestExecuteCommands:
+    def test_single_segment(self, dap_exec, mockif):
+        assert dap_exec.reg_read_repeat(10, DAPAccessIntf.REG.AP_0xC) == list(range(0x1000, 0x1000 + 10))
+        assert mockif.commands == [Command.DAP_TRANSFER_BLOCK]
+
+    def test_block_then_scattered(self, dap_exec, mockif):
+        values = list(range(10))
+        dap_exec.reg_write_repeat(len(values), DAPAccessIntf.REG.AP_0xC, values)
+        dap_exec.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        cb = dap_exec.read_reg(DAPAccessIntf.REG.AP_0xC, now=False)
+        dap_exec.flush()
+        assert mockif.commands == [Command.DAP_EXECUTE_COMMANDS]
+        assert cb() == 0x1000
+        assert mockif.writes == [(0x0d, v) for v in values] + [(0x05, 0x20000000)]
+
+    def test_scattered_then_block(self, dap_exec, mockif):
+        # Like the MEM-AP block write sequence: CSW and TAR writes followed by DRW writes.
+        dap_exec.write_reg(DAPAccessIntf.REG.AP_0x0, 0x23000052)
+        dap_exec.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        values = list(range(8))
+        dap_exec.reg_write_repeat(len(values), DAPAccessIntf.REG.AP_0xC, values)
+        dap_exec.flush()
+        assert mockif.commands == [Command.DAP_EXECUTE_COMMANDS]
+        assert mockif.writes == [(0x01, 0x23000052), (0x05, 0x20000000)] + [(0x0d, v) for v in values]
+
+    def test_short_block_merged(self, dap_exec, mockif):
+        # A single transfer followed by a different request is cheaper as one DAP_Transfer.
+        dap_exec.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        assert dap_exec.read_reg(DAPAccessIntf.REG.AP_0xC) == 0x1000
+        assert mockif.commands == [Command.DAP_TRANSFER]
+
+    def test_order_preserved(self, dap_exec, mockif):
+        expected_writes = []
+        cbs = []
+        for i in range(40):
+            dap_exec.write_reg(DAPAccessIntf.REG.AP_0x4, i * 4)
+            expected_writes.append((0x05, i * 4))
+            values = [i] * (i % 7)
+            if values:
+                dap_exec.reg_write_repeat(len(values), DAPAccessIntf.REG.AP_0xC, values)
+                expected_writes += [(0x0d, v) for v in values]
+            cbs.append((i % 5, dap_exec.reg_read_repeat(i % 5 + 1, DAPAccessIntf.REG.AP_0xC, now=False)))
+        dap_exec.flush()
+        assert mockif.writes == expected_writes
+        read_values = [v for _, cb in cbs for v in cb()]
+        assert read_values == list(range(0x1000, 0x1000 + len(read_values)))
+        assert Command.DAP_EXECUTE_COMMANDS in mockif.commands
+
+    def test_fewer_packets(self):
+        mockif = MockDAPInterface(packet_size=512)
+        def run(use_execute_commands):
+            mockif.commands.clear()
+            d = make_dap(mockif, use_execute_commands)
+            for i in range(20):
+                d.write_reg(DAPAccessIntf.REG.AP_0x4, i * 128)
+                d.reg_write_repeat(32, DAPAccessIntf.REG.AP_0xC, list(range(32)))
+            d.flush()
+            return len(mockif.commands)
+        assert run(True) < run(False)
+
+    def test_reads_not_split(self, dap_exec, mockif):
+        # Reads are limited by response space, so they stay in a single DAP_Transfer.
+        for i in range(4):
+            dap_exec.write_reg(DAPAccessIntf.REG.AP_0x4, i * 4)
+            dap_exec.reg_read_repeat(2, DAPAccessIntf.REG.AP_0xC, now=False)
+        dap_exec.flush()
+        assert mockif.commands == [Command.DAP_TRANSFER]
+
+    def test_no_room_for_block_header(self, dap_exec, mockif):
+        # The write block fills the request, so the reads cannot start a new DAP_TransferBlock
+        # segment even though there is response space for them.
+        cb1 = dap_exec.read_reg(DAPAccessIntf.REG.AP_0x4, now=False)
+        dap_exec.reg_write_repeat(12, DAPAccessIntf.REG.AP_0x4, list(range(12)))
+        cb2 = dap_exec.reg_read_repeat(3, DAPAccessIntf.REG.AP_0x4, now=False)
+        dap_exec.flush()
+        assert cb1() == 0x1000
+        assert cb2() == [0x1001, 0x1002, 0x1003]
+        assert mockif.writes == [(0x05, v) for v in range(12)]
+
+    @pytest.mark.parametrize("packet_size", [64, 512])
+    def test_random_sequences(self, packet_size):
+        rng = random.Random(packet_size)
+        mockif = MockDAPInterface(packet_size=packet_size)
+        dap = make_dap(mockif, use_execute_commands=True)
+        # Register and its write request byte.
+        regs = [(DAPAccessIntf.REG.AP_0x0, 0x01), (DAPAccessIntf.REG.AP_0x4, 0x05), (DAPAccessIntf.REG.AP_0xC, 0x0d)]
+        expected_writes = []
+        cbs = []
+        for _ in range(500):
+            reg, write_request = rng.choice(regs)
+            count = rng.choice([1, 1, 2, 3, rng.randint(1, packet_size // 2)])
+            if rng.random() < 0.5:
+                values = [rng.randint(0, 0xffffffff) for _ in range(count)]
+                if count == 1:
+                    dap.write_reg(reg, values[0])
+                else:
+                    dap.reg_write_repeat(count, reg, values)
+                expected_writes += [(write_request, v) for v in values]
+            elif count == 1:
+                cbs.append(dap.read_reg(reg, now=False))
+            else:
+                cbs.append(dap.reg_read_repeat(count, reg, now=False))
+        dap.flush()
+        assert mockif.writes == expected_writes
+        read_values = []
+        for cb in cbs:
+            result = cb()
+            read_values += result if isinstance(result, list) else [result]
+        assert read_values == list(range(0x1000, 0x1000 + len(read_values)))
+        assert mockif.max_request_size <= packet_size
+        assert mockif.max_response_size <= packet_size
+        assert Command.DAP_EXECUTE_COMMANDS in mockif.commands
+
+    def test_fault_in_segment(self, dap_exec, mockif):
+        orig_execute_one = mockif._execute_one
+        def fault(data, pos):
+            response, pos = orig_execute_one(data, pos)
+            if response[0] == Command.DAP_TRANSFER:
+                response[2] = 0x04 # ACK_FAULT
+            return response, pos
+        mockif._execute_one = fault
+        dap_exec.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        cb1 = dap_exec.read_reg(DAPAccessIntf.REG.AP_0xC, now=False)
+        dap_exec.reg_write_repeat(8, DAPAccessIntf.REG.AP_0xC, list(range(8)))
+        with pytest.raises(DAPAccessIntf.TransferFaultError):
+            dap_exec.flush()
+        with pytest.raises(DAPAccessIntf.TransferFaultError):
+            cb1()
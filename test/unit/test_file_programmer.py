@@ -0,0 +1,190 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import pytest
+import struct
+from intelhex import IntelHex
+
+from pyocd.core.memory_map import (FlashRegion, MemoryMap, RamRegion, RomRegion)
+from pyocd.flash import file_programmer
+from pyocd.flash.file_programmer import (FileProgrammer, MappedImage, ParsedImage)
+
+def make_elf(segments):
+    """@brief Build a minimal little endian ELF32 file with one PT_LOAD segment per (paddr, data) pair."""
+    phoff = 52
+    data_offset = phoff + 32 * len(segments)
+    header = b'\x7fELF' + bytes([1, 1, 1, 0]) + bytes(8)
+    header += struct.pack('<HHIIIIIHHHHHH', 2, 40, 1, 0, phoff, 0, 0, 52, 32, len(segments), 40, 0, 0)
+    program_headers = b''
+    contents = b''
+    for paddr, data in segments:
+        program_headers += struct.pack('<IIIIIIII', 1, data_offset + len(contents), paddr, paddr,
+                len(data), len(data), 5, 4)
+        contents += data
+    return header + program_headers + contents
+
+def image_chunks(image):
+    with image.open() as chunks:
+        return [(address, bytes(data)) for address, data in chunks]
+
+@pytest.fixture(scope='function')
+def hex_file(tmp_path):
+    ih = IntelHex()
+    for offset in range(16):
+        ih[0x1000 + offset] = offset
+    for offset in range(8):
+        ih[0x2000 + offset] = 0x80 + offset
+    path = tmp_path / "image.hex"
+    ih.write_hex_file(str(path))
+    return str(path)
+
+class TestFileProgrammerParse:
+    def test_bin(self, tmp_path):
+        path = tmp_path / "image.bin"
+        path.write_bytes(bytes(range(32)))
+        image = FileProgrammer.parse(str(path), base_address=0x8000, skip=4)
+        assert isinstance(image, MappedImage)
+        assert image.file_format == 'bin'
+        assert not image.ignore_invalid_addresses
+        assert image_chunks(image) == [(0x8000, bytes(range(4, 32)))]
+        assert image.total_size == 28
+
+    def test_bin_default_address(self):
+        image = FileProgrammer.parse(io.BytesIO(bytes(8)), file_format='bin')
+        assert isinstance(image, ParsedImage)
+        assert image_chunks(image) == [(None, bytes(8))]
+
+    def test_mapped_chunks_are_views(self, tmp_path):
+        path = tmp_path / "image.bin"
+        path.write_bytes(bytes(range(32)))
+        image = FileProgrammer.parse(str(path))
+        with image.open() as chunks:
+            assert all(isinstance(data, memoryview) for _, data in chunks)
+        # The image can be opened again.
+        assert image_chunks(image) == [(None, bytes(range(32)))]
+
+    def test_mapped_image_closed(self, tmp_path, monkeypatch):
+        mappings = []
+        orig_mmap = file_programmer.mmap.mmap
+        def mock_mmap(*args, **kwargs):
+            mappings.append(orig_mmap(*args, **kwargs))
+            return mappings[-1]
+        monkeypatch.setattr(file_programmer.mmap, 'mmap', mock_mmap)
+
+        path = tmp_path / "image.elf"
+        path.write_bytes(make_elf([(0x0, bytes(range(64))), (0x100, b'\xaa' * 8)]))
+        image = FileProgrammer.parse(str(path))
+        with image.open() as chunks:
+            # Slices are made and dropped as the data is split into pages.
+            pages = [bytes(data[:16]) for _, data in chunks]
+            assert not mappings[0].closed
+        assert pages == [bytes(range(16)), b'\xaa' * 8]
+        assert mappings[0].closed
+
+    def test_hex(self, hex_file):
+        image = FileProgrammer.parse(hex_file)
+        assert image.file_format == 'hex'
+        assert image.ignore_invalid_addresses
+        assert image_chunks(image) == [
+            (0x1000, bytes(range(16))),
+            (0x2000, bytes(range(0x80, 0x88))),
+            ]
+
+    def test_hex_extended_address(self, tmp_path):
+        ih = IntelHex()
+        for offset in range(40):
+            ih[0x0800fff0 + offset] = offset
+        path = tmp_path / "image.hex"
+        ih.write_hex_file(str(path))
+        image = FileProgrammer.parse(str(path))
+        assert image_chunks(image) == [(0x0800fff0, bytes(range(40)))]
+
+    def test_hex_bad_checksum(self):
+        with pytest.raises(ValueError):
+            FileProgrammer.parse(io.StringIO(":0400000001020304F0\n:00000001FF\n"), file_format='hex')
+
+    def test_hex_overlap(self):
+        # The second data record rewrites the last two bytes of the first.
+        data = ":0400000001020304F2\n:0400020005060708E0\n:00000001FF\n"
+        with pytest.raises(ValueError, match="line 2"):
+            FileProgrammer.parse(io.StringIO(data), file_format='hex')
+
+    def test_elf(self, tmp_path):
+        path = tmp_path / "image.elf"
+        path.write_bytes(make_elf([(0x0, bytes(range(64))), (0x10000000, b'\xaa' * 8)]))
+        image = FileProgrammer.parse(str(path))
+        assert isinstance(image, MappedImage)
+        assert image.total_size == 72
+        assert image_chunks(image) == [(0x0, bytes(range(64))), (0x10000000, b'\xaa' * 8)]
+
+    def test_elf_file_object(self):
+        image = FileProgrammer.parse(io.BytesIO(make_elf([(0x100, b'\x01\x02')])), file_format='elf')
+        assert image_chunks(image) == [(0x100, b'\x01\x02')]
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            FileProgrammer.parse(str(tmp_path / "missing.bin"))
+
+    def test_unknown_format(self, tmp_path):
+        path = tmp_path / "image.srec"
+        path.write_bytes(b"S0")
+        with pytest.raises(ValueError):
+            FileProgrammer.parse(str(path))
+
+    def test_file_object_needs_format(self):
+        with pytest.raises(ValueError):
+            FileProgrammer.parse(io.BytesIO(bytes(8)))
+
+class MockTarget:
+    def __init__(self):
+        self.memory_map = MemoryMap(
+            RomRegion(start=0, length=0x1000, name='rom'),
+            FlashRegion(start=0x1000, length=0x1000, blocksize=0x400, name='flash', is_boot_memory=True),
+            RamRegion(start=0x2000, length=0x1000, name='ram'),
+            )
+
+class MockSession:
+    def __init__(self):
+        self.target = MockTarget()
+
+class TestFileProgrammerVerify:
+    @pytest.fixture(scope='function')
+    def compared(self, monkeypatch):
+        compared = []
+        def mock_compare_memory(target, address, data):
+            compared.append((address, bytes(data)))
+            return None
+        monkeypatch.setattr(file_programmer, 'compare_memory', mock_compare_memory)
+        return compared
+
+    def test_verify(self, compared):
+        image = ParsedImage('bin', [(None, b'\x01\x02')], ignore_invalid_addresses=False)
+        assert FileProgrammer(MockSession()).verify(image) is None
+        assert compared == [(0x1000, b'\x01\x02')]
+
+    def test_skip_invalid_addresses(self, compared):
+        # Chunks in ROM or unmapped memory are skipped, and a chunk running off the end of RAM is truncated,
+        # as when the image is programmed.
+        chunks = [
+            (0x800, b'\x01' * 4),
+            (0x1ffe, b'\x02' * 4),
+            (0x2ffe, b'\x03' * 4),
+            (0x4000, b'\x04' * 4),
+            ]
+        image = ParsedImage('hex', chunks, ignore_invalid_addresses=True)
+        assert FileProgrammer(MockSession()).verify(image) is None
+        assert compared == [(0x1ffe, b'\x02' * 4), (0x2ffe, b'\x03' * 2)]
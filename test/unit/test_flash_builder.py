@@ -0,0 +1,188 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from pyocd.core import memory_map
+from pyocd.core.exceptions import FlashProgramFailure
+from pyocd.flash.builder import (FlashBuilder, _FlashPage)
+from pyocd.flash.flash import (Flash, PageInfo, SectorInfo)
+
+PAGE_SIZE = 256
+SECTOR_SIZE = 1024
+
+class MockFlash:
+    """@brief Flash geometry for building sectors and pages."""
+
+    def __init__(self):
+        self.region = memory_map.FlashRegion(start=0, length=16 * SECTOR_SIZE, blocksize=SECTOR_SIZE,
+                name='flash')
+
+    def get_sector_info(self, addr):
+        if not self.region.contains_address(addr):
+            return None
+        return SectorInfo(base_addr=addr - addr % SECTOR_SIZE, erase_weight=1, size=SECTOR_SIZE)
+
+    def get_page_info(self, addr):
+        if not self.region.contains_address(addr):
+            return None
+        return PageInfo(base_addr=addr - addr % PAGE_SIZE, program_weight=1, size=PAGE_SIZE)
+
+@pytest.fixture(scope='function')
+def builder():
+    return FlashBuilder(MockFlash())
+
+class TestFlashBuilderAddData:
+    def test_sorted(self, builder):
+        builder.add_data(0x800, [1] * 4)
+        builder.add_data(0x100, [2] * 4)
+        builder.add_data(0x400, [3] * 4)
+        assert [op.addr for op in builder.flash_operation_list] == [0x100, 0x400, 0x800]
+        assert builder.buffered_data_size == 12
+
+    def test_adjacent(self, builder):
+        builder.add_data(0x100, [1] * 0x100)
+        builder.add_data(0x0, [2] * 0x100)
+        builder.add_data(0x200, [3] * 0x100)
+        assert len(builder.flash_operation_list) == 3
+
+    def test_overlap_previous(self, builder):
+        builder.add_data(0x100, [1] * 0x100)
+        with pytest.raises(ValueError):
+            builder.add_data(0x1ff, [2] * 4)
+
+    def test_overlap_next(self, builder):
+        builder.add_data(0x100, [1] * 0x100)
+        with pytest.raises(ValueError):
+            builder.add_data(0xfe, [2] * 4)
+        assert len(builder.flash_operation_list) == 1
+
+    def test_outside_region(self, builder):
+        with pytest.raises(ValueError):
+            builder.add_data(16 * SECTOR_SIZE - 2, [1] * 4)
+
+class TestFlashBuilderPages:
+    def test_full_pages_reference_view(self, builder):
+        data = bytes(range(256)) * 2 + bytes(16)
+        builder.add_data(0x400, memoryview(data))
+        builder._build_sectors_and_pages(keep_unwritten=False)
+        pages = builder.page_list
+        assert [page.addr for page in pages] == [0x400, 0x500, 0x600]
+        assert isinstance(pages[0].data, memoryview) and isinstance(pages[1].data, memoryview)
+        assert bytes(pages[0].data) == bytes(range(256))
+        # The partial last page is copied and padded with the erased value.
+        assert bytes(pages[2].data) == bytes(16) + b'\xff' * (PAGE_SIZE - 16)
+
+    def test_list_data(self, builder):
+        builder.add_data(0x10, [0x55] * 8)
+        builder._build_sectors_and_pages(keep_unwritten=False)
+        page = builder.page_list[0]
+        assert bytes(page.data) == b'\xff' * 0x10 + b'\x55' * 8 + b'\xff' * (PAGE_SIZE - 0x18)
+        assert builder.program_byte_count == PAGE_SIZE
+
+class MockBufferedFlash(MockFlash):
+    """@brief Records page buffer loads and simulates a flash algorithm that runs for a few polls."""
+
+    TIMEOUT_ERROR = Flash.TIMEOUT_ERROR
+
+    def __init__(self, buffer_count, polls_per_page=3, results=None):
+        super().__init__()
+        self.page_buffer_count = buffer_count
+        self.polls_per_page = polls_per_page
+        self.results = results or {}
+        self.events = []
+        self.buffers = {}
+        self.running = None
+        self.polls_left = 0
+
+        class MockOptions:
+            def get(self, name):
+                return 1.0
+        class MockSession:
+            options = MockOptions()
+        class MockTarget:
+            session = MockSession()
+        self.target = MockTarget()
+
+    def load_page_buffer(self, buffer_number, address, data):
+        assert buffer_number != self.running, "loaded the buffer being programmed"
+        self.buffers[buffer_number] = (address, bytes(data))
+        self.events.append(('load', buffer_number, address))
+
+    def start_program_page_with_buffer(self, buffer_number, address):
+        assert self.running is None
+        assert self.buffers[buffer_number][0] == address
+        self.running = buffer_number
+        self.polls_left = self.polls_per_page
+        self.events.append(('start', buffer_number, address))
+
+    def poll_completion(self):
+        assert self.running is not None
+        if self.polls_left:
+            self.polls_left -= 1
+            return None
+        address = self.buffers[self.running][0]
+        self.running = None
+        return self.results.get(address, 0)
+
+    def poll_delay(self):
+        return 0.0
+
+    def halt_operation(self):
+        self.running = None
+
+def make_pages(count):
+    pages = []
+    for index in range(count):
+        page = _FlashPage(PageInfo(base_addr=index * PAGE_SIZE, program_weight=1, size=PAGE_SIZE))
+        page.data = bytes([index]) * PAGE_SIZE
+        pages.append(page)
+    return pages
+
+class TestFlashBuilderBufferedProgram:
+    def test_all_buffers_used(self):
+        flash = MockBufferedFlash(3)
+        builder = FlashBuilder(flash)
+        pages = make_pages(5)
+        total_weight = sum(page.get_program_weight() for page in pages)
+        progress = []
+        assert builder._program_pages_with_buffers(pages, 0, total_weight, progress.append) == total_weight
+        assert [event[2] for event in flash.events if event[0] == 'start'] == [n * PAGE_SIZE for n in range(5)]
+        # All buffers are loaded while the first page is programmed.
+        assert flash.events[:4] == [
+            ('load', 0, 0),
+            ('start', 0, 0),
+            ('load', 1, PAGE_SIZE),
+            ('load', 2, 2 * PAGE_SIZE),
+            ]
+        # The next page starts as soon as the previous completes, then a buffer is refilled.
+        assert flash.events[4:6] == [('start', 1, PAGE_SIZE), ('load', 0, 3 * PAGE_SIZE)]
+        assert progress == pytest.approx([0.2, 0.4, 0.6, 0.8, 1.0])
+
+    def test_loading_behind(self):
+        # The algorithm completes before any polling gaps, so each page is loaded just in time.
+        flash = MockBufferedFlash(2, polls_per_page=0)
+        builder = FlashBuilder(flash)
+        builder._program_pages_with_buffers(make_pages(3), 0, 3)
+        assert [event[0] for event in flash.events] == ['load', 'start', 'load', 'start', 'load', 'start']
+
+    def test_failure(self):
+        flash = MockBufferedFlash(2, results={PAGE_SIZE: 1})
+        builder = FlashBuilder(flash)
+        with pytest.raises(FlashProgramFailure) as excinfo:
+            builder._program_pages_with_buffers(make_pages(4), 0, 4)
+        assert excinfo.value.address == PAGE_SIZE
+        assert excinfo.value.result_code == 1
@@ -0,0 +1,209 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+from zlib import crc32
+import pytest
+
+from pyocd.core.target import Target
+from pyocd.flash.checksum import (
+    TargetChecksum,
+    TargetChecksumError,
+    compare_by_reading,
+    compare_memory,
+    find_mismatch,
+    )
+from pyocd.utility import conversion
+
+FLASH_SIZE = 0x10000
+RAM_BASE = 0x20000000
+RAM_SIZE = 0x4000
+LOAD_ADDRESS = RAM_BASE
+BKPT = 0xe00abe00
+
+class MockTarget:
+    def __init__(self):
+        self.flash_mem = bytearray(i * 7 & 0xff for i in range(FLASH_SIZE))
+        self.ram = bytearray(b'\xa5' * RAM_SIZE)
+        self.registers = {name: i for i, name in enumerate(TargetChecksum.SAVED_REGISTERS)}
+        # Interrupts enabled, unprivileged thread mode using PSP.
+        self.registers['cfbp'] = 0x03000000
+        self.state = Target.State.HALTED
+        self.reads = []
+
+    def _mem(self, addr):
+        if addr >= RAM_BASE:
+            return self.ram, addr - RAM_BASE
+        return self.flash_mem, addr
+
+    def read_memory_block8(self, addr, size):
+        self.reads.append((addr, size))
+        mem, offset = self._mem(addr)
+        return list(mem[offset:offset + size])
+
+    def read_memory_block32(self, addr, size):
+        mem, offset = self._mem(addr)
+        return conversion.byte_list_to_u32le_list(mem[offset:offset + size * 4])
+
+    def write_memory_block32(self, addr, data):
+        mem, offset = self._mem(addr)
+        data = conversion.u32le_list_to_byte_list(data)
+        mem[offset:offset + len(data)] = bytes(data)
+
+    def write32(self, addr, value):
+        self.write_memory_block32(addr, [value])
+
+    def _reg_name(self, reg):
+        # SP is banked between MSP and PSP by CONTROL.SPSEL.
+        if reg == 'sp':
+            return 'psp' if (self.registers['cfbp'] & (1 << 25)) else 'msp'
+        return reg
+
+    def read_core_registers_raw(self, reg_list):
+        return [self.registers[self._reg_name(reg)] for reg in reg_list]
+
+    def write_core_registers_raw(self, reg_list, data_list):
+        for reg, data in zip(reg_list, data_list):
+            self.registers[self._reg_name(reg)] = data
+
+    def read_core_register(self, reg):
+        return self.registers[self._reg_name(reg)]
+
+    def get_state(self):
+        return self.state
+
+class MockFlash:
+    """@brief Runs the CRC analyzer by computing the CRCs directly from the mock target's memory."""
+
+    def __init__(self, target):
+        self.target = target
+        self.flash_algo = {
+            'load_address': LOAD_ADDRESS,
+            'instructions': [BKPT],
+            'analyzer_address': RAM_BASE + 0x1000,
+            }
+        self.begin_data = RAM_BASE + 0x2000
+        self.begin_stack = RAM_BASE + 0x3800
+        self.region = SimpleNamespace(page_size=64)
+        self.calls = []
+        self.complete = True
+
+    def compute_crcs(self, sectors):
+        assert self.target.read_core_register('sp') == self.begin_stack
+        assert self.target.registers['msp'] == self.begin_stack
+        # Interrupts are masked with PRIMASK, and the core is privileged and using MSP.
+        assert self.target.registers['cfbp'] == 0x00000001
+        assert self.target.ram[:4] == BKPT.to_bytes(4, 'little')
+        self.calls.append(list(sectors))
+        self.target.registers['r0'] = 0
+        self.target.registers['pc'] = LOAD_ADDRESS if self.complete else LOAD_ADDRESS + 0x100
+        return [crc32(self.target.flash_mem[addr:addr + size]) for addr, size in sectors]
+
+@pytest.fixture(scope='function')
+def target():
+    return MockTarget()
+
+@pytest.fixture(scope='function')
+def checksum(target):
+    return TargetChecksum(target, MockFlash(target))
+
+class TestFindMismatch:
+    @pytest.mark.parametrize("offset", [0, 1, 63, 64, 65, 1000, 4095])
+    def test_offsets(self, offset):
+        a = bytes(range(256)) * 16
+        b = bytearray(a)
+        b[offset] ^= 0xff
+        assert find_mismatch(a, b) == offset
+        assert find_mismatch(memoryview(a), memoryview(b)) == offset
+
+    def test_equal(self):
+        assert find_mismatch(b"abc" * 100, bytearray(b"abc" * 100)) is None
+        assert find_mismatch(b"", b"") is None
+
+    def test_compare_by_reading(self, target):
+        data = bytearray(target.flash_mem[0x100:0x100 + 70000 // 8])
+        assert compare_by_reading(target, 0x100, data) is None
+        data[5000] ^= 1
+        assert compare_by_reading(target, 0x100, data) == 5000
+
+class TestTargetChecksum:
+    def test_block_size(self, checksum):
+        assert checksum.block_size_for(0x10000) == 1024
+        assert checksum.block_size_for(0x08000000 + 0x200000) == 4096
+
+    def test_match(self, target, checksum):
+        data = bytes(target.flash_mem[0x123:0xf456])
+        target.reads = []
+        assert checksum.compare(0x123, data) is None
+        # Only the unaligned head and tail are read back.
+        assert target.reads == [(0x123, 0x400 - 0x123), (0xf400, 0x56)]
+        # 60 blocks in batches of 16, the number that fit in the page buffer.
+        assert [len(call) for call in checksum._flash.calls] == [16, 16, 16, 12]
+
+    def test_mismatch_in_block(self, target, checksum):
+        data = bytearray(target.flash_mem[0x123:0xf456])
+        data[0x3000] ^= 0xff
+        data[0x5000] ^= 0xff
+        target.reads = []
+        assert checksum.compare(0x123, data) == 0x3000
+        assert (0x3000 + 0x123 & ~0x3ff, 0x400) in target.reads
+
+    def test_mismatch_in_tail(self, target, checksum):
+        data = bytearray(target.flash_mem[0x400:0x1010])
+        data[-1] ^= 1
+        assert checksum.compare(0x400, data) == len(data) - 1
+
+    def test_state_restored(self, target, checksum):
+        ram = bytes(target.ram)
+        registers = dict(target.registers)
+        checksum.compare(0, bytes(target.flash_mem[:0x2000]))
+        assert bytes(target.ram) == ram
+        assert target.registers == registers
+
+    def test_interrupts_masked(self, target, checksum):
+        checksum.crc32_blocks([(0, 0x400), (0x400, 0x400)])
+        assert checksum._flash.calls == [[(0, 0x400), (0x400, 0x400)]]
+        # PRIMASK is restored to the program's value afterwards.
+        assert target.registers['cfbp'] == 0x03000000
+
+    def test_incomplete(self, target, checksum):
+        checksum._flash.complete = False
+        ram = bytes(target.ram)
+        with pytest.raises(TargetChecksumError):
+            checksum.crc32_blocks([(0, 0x400)])
+        assert bytes(target.ram) == ram
+
+class TestCompareMemory:
+    def make_target(self, checksum_available, state):
+        target = MockTarget()
+        target.state = state
+        flash = MockFlash(target)
+        target.memory_map = SimpleNamespace(iter_matching_regions=lambda **kwargs: [
+            SimpleNamespace(flash=SimpleNamespace(is_valid=True, use_analyzer=checksum_available,
+                flash_algo=flash.flash_algo))])
+        return target
+
+    def test_running_target_reads(self):
+        target = self.make_target(True, Target.State.RUNNING)
+        data = bytearray(target.flash_mem[:0x1000])
+        data[0x800] = data[0x800] ^ 1
+        assert compare_memory(target, 0, data) == 0x800
+        assert target.reads == [(0, 0x1000)]
+
+    def test_no_analyzer_reads(self):
+        target = self.make_target(False, Target.State.HALTED)
+        assert compare_memory(target, 0, bytes(target.flash_mem[:0x1000])) is None
+        assert target.reads == [(0, 0x1000)]
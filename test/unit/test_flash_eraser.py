@@ -0,0 +1,45 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+from pyocd.core.target import Target
+from pyocd.flash.eraser import FlashEraser
+from pyocd.utility.notification import Notifier
+
+class MockSession(Notifier):
+    def __init__(self):
+        super().__init__()
+        self.target = SimpleNamespace(memory_map=SimpleNamespace(iter_matching_regions=lambda **kwargs: []))
+
+class TestFlashEraserNotifications:
+    def record(self, session):
+        events = []
+        session.subscribe(lambda note: events.append(note.event),
+                [Target.Event.PRE_FLASH_PROGRAM, Target.Event.POST_FLASH_PROGRAM])
+        return events
+
+    def test_chip_erase_notifies(self):
+        session = MockSession()
+        events = self.record(session)
+        FlashEraser(session, FlashEraser.Mode.CHIP).erase()
+        assert events == [Target.Event.PRE_FLASH_PROGRAM, Target.Event.POST_FLASH_PROGRAM]
+
+    def test_no_operation(self):
+        session = MockSession()
+        events = self.record(session)
+        FlashEraser(session, FlashEraser.Mode.SECTOR).erase([])
+        assert events == []
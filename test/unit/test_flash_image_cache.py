@@ -0,0 +1,140 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from binascii import crc32
+import pytest
+
+from pyocd.core import memory_map
+from pyocd.flash.builder import (FlashBuilder, _FlashPage)
+from pyocd.flash.flash import (Flash, FlashInfo, PageInfo)
+from pyocd.flash.image_cache import (FlashImageCache, PageRecord)
+
+PAGE_SIZE = 256
+
+class MockFlash:
+    """@brief Minimal flash with memory that FlashBuilder can analyze through the CRC analyzer."""
+
+    Operation = Flash.Operation
+
+    def __init__(self, crc_supported=True):
+        self.region = memory_map.FlashRegion(start=0, length=16 * PAGE_SIZE, blocksize=PAGE_SIZE, name='flash')
+        self.memory = bytearray([0xff]) * self.region.length
+        self.crc_supported = crc_supported
+        self.crc_requests = []
+
+    def get_flash_info(self):
+        return FlashInfo(rom_start=0, erase_weight=1, crc_supported=self.crc_supported)
+
+    def init(self, operation):
+        pass
+
+    def compute_crcs(self, sectors):
+        self.crc_requests.append(sectors)
+        return [crc32(self.memory[addr:addr + size]) & 0xFFFFFFFF for addr, size in sectors]
+
+def make_pages(data_by_page):
+    pages = []
+    for index, data in enumerate(data_by_page):
+        page = _FlashPage(PageInfo(base_addr=index * PAGE_SIZE, program_weight=1, size=PAGE_SIZE))
+        page.data = list(data)
+        pages.append(page)
+    return pages
+
+@pytest.fixture(scope='function')
+def cache(tmp_path):
+    return FlashImageCache(str(tmp_path), "0240000012345678", "k64f", 0)
+
+class TestFlashImageCache:
+    def test_page_record_crc_padded(self):
+        record = PageRecord.for_data([1, 2, 3], 8)
+        assert record.crc == crc32(bytes([1, 2, 3] + [0xff] * 5)) & 0xFFFFFFFF
+        assert record.digest == PageRecord.for_data(bytes([1, 2, 3]), 8).digest
+
+    def test_no_record(self, cache):
+        assert cache.load() is None
+
+    def test_roundtrip(self, cache):
+        pages = {0: PageRecord.for_data([1] * 16, 16), 16: PageRecord.for_data([2] * 8, 16)}
+        cache.save(pages)
+        assert cache.load() == pages
+
+    def test_keyed_by_probe(self, tmp_path, cache):
+        cache.save({0: PageRecord.for_data([1] * 16, 16)})
+        other = FlashImageCache(str(tmp_path), "0240000087654321", "k64f", 0)
+        assert other.path != cache.path
+        assert other.load() is None
+
+    def test_invalidate(self, cache):
+        cache.save({0: PageRecord.for_data([1] * 16, 16)})
+        cache.invalidate()
+        assert cache.load() is None
+        # Invalidating a missing record is not an error.
+        cache.invalidate()
+
+    def test_corrupt_record(self, cache):
+        with open(cache.path, 'w') as record_file:
+            record_file.write("{not json")
+        assert cache.load() is None
+
+class TestFlashBuilderImageCache:
+    def _make_builder(self, flash, cache, data_by_page):
+        builder = FlashBuilder(flash)
+        builder.page_list = make_pages(data_by_page)
+        builder._image_cache = cache
+        return builder
+
+    def _program(self, flash, data_by_page):
+        for index, data in enumerate(data_by_page):
+            flash.memory[index * PAGE_SIZE:index * PAGE_SIZE + len(data)] = bytes(data)
+
+    def test_classifies_pages(self, cache):
+        flash = MockFlash()
+        old_image = [[n] * PAGE_SIZE for n in range(4)]
+        self._program(flash, old_image)
+        cache.save({page.addr: PageRecord.for_data(page.data, page.size) for page in make_pages(old_image)})
+
+        new_image = [[0] * PAGE_SIZE, [0x55] * PAGE_SIZE, [2] * PAGE_SIZE, [3] * PAGE_SIZE, [4] * 16]
+        builder = self._make_builder(flash, cache, new_image)
+        builder._analyze_pages_with_image_cache()
+        assert [page.same for page in builder.page_list] == [True, False, True, True, None]
+        assert builder.perf.analyze_type == FlashBuilder.FLASH_ANALYSIS_IMAGE_CACHE
+        # Only a sample of the recorded pages was checked on the target.
+        assert len(flash.crc_requests) == 1 and len(flash.crc_requests[0]) == 4
+
+    def test_record_ignored_when_flash_modified(self, cache):
+        flash = MockFlash()
+        old_image = [[n] * PAGE_SIZE for n in range(2)]
+        cache.save({page.addr: PageRecord.for_data(page.data, page.size) for page in make_pages(old_image)})
+        # Flash still erased, so it doesn't match the record.
+        builder = self._make_builder(flash, cache, old_image)
+        builder._analyze_pages_with_image_cache()
+        assert [page.same for page in builder.page_list] == [None, None]
+
+    def test_sample_read_without_analyzer(self, cache):
+        flash = MockFlash(crc_supported=False)
+        image = [[7] * PAGE_SIZE]
+        self._program(flash, image)
+        cache.save({0: PageRecord.for_data(image[0], PAGE_SIZE)})
+
+        class MockTarget:
+            def read_memory_block8(self, addr, size):
+                return list(flash.memory[addr:addr + size])
+        flash.target = MockTarget()
+
+        builder = self._make_builder(flash, cache, image)
+        builder._analyze_pages_with_image_cache()
+        assert builder.page_list[0].same is True
+        assert flash.crc_requests == []
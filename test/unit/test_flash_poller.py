@@ -0,0 +1,129 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from pyocd.flash import poller
+from pyocd.flash.poller import CompletionPoller
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(scope='function')
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(poller, 'perf_counter', fake)
+    return fake
+
+def run_call(p, clock, operation, duration):
+    """@brief Simulate a call that completes after the given duration, returning the delays used."""
+    delays = []
+    p.start(operation)
+    end = clock.now + duration
+    while True:
+        delay = p.delay()
+        delays.append(delay)
+        clock.now += delay
+        p.polled()
+        if clock.now >= end:
+            p.finish()
+            return delays
+
+class TestCompletionPoller:
+    def test_not_started(self):
+        assert CompletionPoller().delay() == 0.0
+
+    def test_unknown_backs_off(self, clock):
+        p = CompletionPoller()
+        delays = run_call(p, clock, 'eraseAll', 1.0)
+        assert delays[0] == 0.0
+        assert delays[1:4] == pytest.approx([0.0002, 0.0004, 0.0008])
+        assert max(delays) == CompletionPoller.MAX_INTERVAL
+        timing = p.timings['eraseAll']
+        assert timing.count == 1
+        assert timing.polls == len(delays)
+
+    def test_predicted_wake(self, clock):
+        p = CompletionPoller()
+        first_delays = run_call(p, clock, 'program_page', 0.004)
+        expected = p.timings['program_page'].expected_time
+        assert expected == pytest.approx(0.004, rel=0.25)
+        delays = run_call(p, clock, 'program_page', 0.004)
+        assert delays[0] == pytest.approx(expected * CompletionPoller.WAKE_FRACTION)
+        assert len(delays) < len(first_delays)
+
+    def test_backoff_capped_by_expected_time(self, clock):
+        p = CompletionPoller()
+        run_call(p, clock, 'program_page', 0.004)
+        expected = p.timings['program_page'].expected_time
+        # A call that takes much longer than expected is still polled frequently.
+        delays = run_call(p, clock, 'program_page', 1.0)
+        assert max(delays[1:]) <= expected * CompletionPoller.INTERVAL_FRACTION
+
+    def test_operations_learned_separately(self, clock):
+        p = CompletionPoller()
+        run_call(p, clock, 'program_page', 0.002)
+        run_call(p, clock, 'erase_sector', 0.5)
+        p.start('program_page')
+        assert p.delay() < 0.003
+        p.start('erase_sector')
+        assert p.delay() > 0.3
+
+    def test_expected_time_smoothed(self, clock):
+        p = CompletionPoller()
+        for duration in (0.010, 0.002):
+            p.start('program_page')
+            clock.now += duration
+            # Still running, then completed.
+            p.polled()
+            p.polled()
+            p.finish()
+        timing = p.timings['program_page']
+        assert timing.expected_time == pytest.approx(0.010 + CompletionPoller.SMOOTHING * (0.002 - 0.010))
+        assert timing.min_time == pytest.approx(0.002)
+        assert timing.max_time == pytest.approx(0.010)
+        assert timing.average_time == pytest.approx(0.006)
+
+    def test_duration_between_polls(self, clock):
+        p = CompletionPoller()
+        p.start('program_page')
+        clock.now += 0.001
+        p.polled()
+        clock.now += 0.002
+        p.polled()
+        p.finish()
+        assert p.timings['program_page'].expected_time == pytest.approx(0.002)
+
+    def test_cancel_not_recorded(self, clock):
+        p = CompletionPoller()
+        p.start('program_page')
+        clock.now += 10.0
+        p.cancel()
+        p.finish()
+        assert p.timings == {}
+        assert p.delay() == 0.0
+
+    def test_metrics(self, clock):
+        p = CompletionPoller()
+        run_call(p, clock, 'init', 0.001)
+        metrics = p.get_metrics()
+        assert set(metrics) == {'init'}
+        assert metrics['init']['count'] == 1
+        assert 'average_time' in metrics['init']
@@ -0,0 +1,103 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from pyocd.debug.cache import CachingDebugContext
+from pyocd.debug.context import DebugContext
+from pyocd.gdbserver.read_ahead import ReadAheadPrefetcher
+
+class RecordingContext(DebugContext):
+    """@brief Context that records the memory reads passed through to the core."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.reads = []
+
+    def read_memory_block8(self, addr, size):
+        self.reads.append((addr, size))
+        return self.parent.read_memory_block8(addr, size)
+
+@pytest.fixture(scope='function')
+def recorder(mockcore):
+    return RecordingContext(mockcore)
+
+@pytest.fixture(scope='function')
+def read_ahead(recorder):
+    return ReadAheadPrefetcher(CachingDebugContext(recorder), 256)
+
+class TestReadAhead:
+    def test_random_access_not_prefetched(self, mockcore, recorder, read_ahead):
+        read_ahead.read_memory_block8(0x20000010, 4)
+        read_ahead.read_memory_block8(0x20000100, 4)
+        read_ahead.read_memory_block8(0x20000040, 4)
+        assert recorder.reads == [(0x20000010, 4), (0x20000100, 4), (0x20000040, 4)]
+
+    def test_sequential_prefetch(self, mockcore, recorder, read_ahead):
+        mockcore.write_memory_block8(0x20000000, list(range(256)))
+        assert read_ahead.read_memory_block8(0x20000000, 4) == [0, 1, 2, 3]
+        assert read_ahead.read_memory_block8(0x20000004, 4) == [4, 5, 6, 7]
+        # The second access is sequential and prefetches an aligned 64 byte chunk.
+        assert recorder.reads == [(0x20000000, 4), (0x20000004, 60)]
+        for addr in range(0x20000008, 0x20000040, 4):
+            assert read_ahead.read_memory_block8(addr, 4) == list(range(addr & 0xff, (addr & 0xff) + 4))
+        assert len(recorder.reads) == 2
+
+    def test_window_grows(self, mockcore, recorder, read_ahead):
+        for addr in range(0x20000000, 0x20000400, 8):
+            read_ahead.read_memory_block8(addr, 8)
+        # The first read, then windows of 64, 128, 256, 256, and the 64 bytes left in the region.
+        assert [size for _, size in recorder.reads] == [8, 56, 128, 256, 256, 256, 64]
+
+    def test_strided_prefetch(self, mockcore, recorder, read_ahead):
+        for addr in range(0x20000000, 0x20000100, 16):
+            read_ahead.read_memory_block8(addr, 4)
+        assert len(recorder.reads) < 16
+
+    def test_backwards_prefetch(self, mockcore, recorder, read_ahead):
+        for addr in range(0x20000200, 0x20000100, -8):
+            read_ahead.read_memory_block8(addr, 8)
+        assert len(recorder.reads) < 16
+        assert all(addr >= 0x20000000 for addr, _ in recorder.reads)
+
+    def test_clipped_to_region(self, mockcore, recorder, read_ahead):
+        read_ahead.read_memory_block8(0x200003f0, 4)
+        read_ahead.read_memory_block8(0x200003f4, 4)
+        assert all((addr + size) <= 0x20000400 for addr, size in recorder.reads)
+
+    def test_noncacheable_region_not_prefetched(self, mockcore, recorder, read_ahead):
+        read_ahead.read_memory_block8(0x20000400, 4)
+        read_ahead.read_memory_block8(0x20000404, 4)
+        assert recorder.reads == [(0x20000400, 4), (0x20000404, 4)]
+
+    def test_unreadable_region_not_prefetched(self, mockcore, recorder, read_ahead):
+        mockcore.ram_region._attributes['access'] = 'w'
+        read_ahead.read_memory_block8(0x20000000, 4)
+        read_ahead.read_memory_block8(0x20000004, 4)
+        assert recorder.reads == [(0x20000000, 4), (0x20000004, 4)]
+
+    def test_reset_on_run(self, mockcore, recorder, read_ahead):
+        read_ahead.read_memory_block8(0x20000000, 4)
+        read_ahead.read_memory_block8(0x20000004, 4)
+        mockcore.run_token += 1
+        read_ahead.read_memory_block8(0x20000008, 4)
+        assert recorder.reads[-1] == (0x20000008, 4)
+
+    def test_disabled(self, mockcore, recorder):
+        read_ahead = ReadAheadPrefetcher(CachingDebugContext(recorder), 0)
+        for addr in range(0x20000000, 0x20000020, 4):
+            read_ahead.read_memory_block8(addr, 4)
+        assert len(recorder.reads) == 8
@@ -14,10 +14,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+from types import SimpleNamespace
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.core.target import Target
+from pyocd.gdbserver import gdbserver
 from pyocd.gdbserver.gdbserver import (
+    GDBServer,
     escape,
+    gdb_crc32,
     unescape,
+    unescape_bytes,
 )
+from pyocd.gdbserver.read_ahead import ReadAheadPrefetcher
 
 # escaped chars: '#$}*'
 # escaped by prefixing with '}' and xor'ing the char with 0x20
@@ -65,3 +76,161 @@ class TestGdbServerEscaping:
     def test_unescape_combined(self):
         assert unescape(b"}\x03}\x04}]}\x0a") == list(b"#$}*")
         assert unescape(b"}]}]}]") == list(b"}}}")
+
+    def test_unescape_bytes(self):
+        assert unescape_bytes(b"hello") == b"hello"
+        assert unescape_bytes(b"}]}]}\x03x}\x0a") == b"}}#x*"
+        assert unescape_bytes(bytearray(b"a}\x04")) == b"a$"
+
+    def test_round_trip(self):
+        data = bytes(range(256)) * 2 + b"}}##"
+        assert unescape_bytes(escape(data)) == data
+        assert len(escape(data)) == len(data) + 12
+
+def reference_crc32(data, crc=0xffffffff):
+    """@brief Bitwise version of the CRC computed by gdb (libiberty xcrc32)."""
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04c11db7 if (crc & 0x80000000) else (crc << 1)) & 0xffffffff
+    return crc
+
+class TestGdbCrc:
+    @pytest.mark.parametrize("data", [b"", b"\x00", b"123456789", bytes(range(256)) * 3])
+    def test_matches_reference(self, data):
+        assert gdb_crc32(data) == reference_crc32(data)
+
+    def test_check_value(self):
+        # Check value of CRC-32/MPEG-2.
+        assert gdb_crc32(b"123456789") == 0x0376e6e7
+
+    def test_chained(self):
+        data = bytes(range(200))
+        assert gdb_crc32(data[100:], gdb_crc32(data[:100])) == reference_crc32(data)
+
+class MockMemory:
+    def __init__(self, data):
+        self.data = data
+        self.reads = []
+        self.writes = []
+
+    def write_memory_block8(self, addr, data):
+        self.writes.append((addr, data))
+
+    def flush(self):
+        pass
+
+    def read_memory_block8(self, addr, size):
+        self.reads.append((addr, size))
+        if addr + size > len(self.data):
+            raise exceptions.TransferFaultError()
+        return list(self.data[addr:addr + size])
+
+class MockElf:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, addr, size):
+        if addr + size <= len(self.data):
+            return self.data[addr:addr + size]
+        return None
+
+class MockChecksum:
+    def __init__(self, target):
+        self.is_available = True
+        self.compared = []
+
+    def compare(self, addr, data, memory):
+        MockChecksum.instance = self
+        self.compared.append((addr, len(data)))
+        return None if (memory.data[addr:addr + len(data)] == data) else 0
+
+class TestQueryCRC:
+    DATA = bytes(i * 13 & 0xff for i in range(0x12000))
+
+    def make_server(self, elf_data=None):
+        server = GDBServer.__new__(GDBServer)
+        server.target_context = MockMemory(self.DATA)
+        server.target = SimpleNamespace(get_state=lambda: Target.State.HALTED)
+        server.board = SimpleNamespace(target=SimpleNamespace(
+                elf=MockElf(elf_data) if (elf_data is not None) else None))
+        return server
+
+    def expected_packet(self, server, addr, size):
+        return server.create_rsp_packet(b"C%08x" % reference_crc32(self.DATA[addr:addr + size]))
+
+    def test_host_crc(self):
+        server = self.make_server()
+        assert server.handle_query(b"CRC:100,11000#00") == self.expected_packet(server, 0x100, 0x11000)
+        assert server.target_context.reads == [(0x100, 0x8000), (0x8100, 0x8000), (0x10100, 0x1000)]
+
+    def test_error(self):
+        server = self.make_server()
+        assert server.handle_query(b"CRC:11000,2000") == server.create_rsp_packet(b"E01")
+
+    def test_on_target_match(self, monkeypatch):
+        monkeypatch.setattr(gdbserver, "TargetChecksum", MockChecksum)
+        server = self.make_server(self.DATA)
+        assert server.handle_query(b"CRC:100,11000") == self.expected_packet(server, 0x100, 0x11000)
+        assert MockChecksum.instance.compared == [(0x100, 0x11000)]
+        assert server.target_context.reads == []
+
+    def test_on_target_mismatch(self, monkeypatch):
+        monkeypatch.setattr(gdbserver, "TargetChecksum", MockChecksum)
+        elf_data = bytearray(self.DATA)
+        elf_data[0x200] ^= 1
+        server = self.make_server(bytes(elf_data))
+        # The CRC of the actual memory contents is returned.
+        assert server.handle_query(b"CRC:100,1000") == self.expected_packet(server, 0x100, 0x1000)
+        assert server.target_context.reads == [(0x100, 0x1000)]
+
+    def test_on_target_fault(self, monkeypatch):
+        class FaultingChecksum(MockChecksum):
+            def compare(self, addr, data, memory):
+                raise exceptions.TransferFaultError()
+        monkeypatch.setattr(gdbserver, "TargetChecksum", FaultingChecksum)
+        server = self.make_server(self.DATA)
+        # The CRC is computed on the host instead.
+        assert server.handle_query(b"CRC:100,1000") == self.expected_packet(server, 0x100, 0x1000)
+        assert server.target_context.reads == [(0x100, 0x1000)]
+
+class TestMemoryPackets:
+    DATA = bytes(range(256)) * 64
+
+    @pytest.fixture(scope='function')
+    def server(self):
+        server = GDBServer.__new__(GDBServer)
+        server.target_context = MockMemory(self.DATA)
+        server.read_ahead = ReadAheadPrefetcher(server.target_context, 0)
+        server.lock = threading.Lock()
+        server.COMMANDS = {
+                b'm' : (server.get_memory,         2   ),
+                b'M' : (server.write_memory_hex,   2   ),
+                b'x' : (server.get_memory_binary,  2   ),
+                b'X' : (server.write_memory,       2   ),
+            }
+        return server
+
+    def packet(self, server, data):
+        return server.create_rsp_packet(data)
+
+    def test_read_hex(self, server):
+        assert server.handle_message(self.packet(server, b"m20,4")) == self.packet(server, b"20212223")
+
+    def test_read_binary(self, server):
+        expected = b"b" + escape(self.DATA[0x10:0x1010])
+        assert server.handle_message(self.packet(server, b"x10,1000")) == self.packet(server, expected)
+        assert server.target_context.reads == [(0x10, 0x1000)]
+
+    def test_read_error(self, server):
+        assert server.handle_message(self.packet(server, b"x3fff0,20")) == self.packet(server, b"E01")
+        assert server.handle_message(self.packet(server, b"m3fff0,20")) == self.packet(server, b"E01")
+
+    def test_write_hex(self, server):
+        assert server.handle_message(self.packet(server, b"M100,3:23247d")) == self.packet(server, b"OK")
+        assert server.target_context.writes == [(0x100, b"#$}")]
+
+    def test_write_binary(self, server):
+        data = bytes(range(256))
+        assert server.handle_message(self.packet(server, b"X100,100:" + escape(data))) == self.packet(server, b"OK")
+        assert server.target_context.writes == [(0x100, data)]
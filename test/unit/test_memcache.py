@@ -180,7 +180,124 @@ class TestMemoryCache:
         block = memcache.read_memory_block8(0x2000007e, 4)
         assert block == data[0x7e:0x82]
 
-
+    def test_27_contiguous_reads_merged(self, mockcore, memcache):
+        mockcore.write_memory_block8(0x20000000, list(range(16)))
+        memcache.read_memory_block8(0x20000000, 4)
+        memcache.read_memory_block8(0x20000008, 4)
+        memcache.read_memory_block8(0x20000004, 4)
+        cached = list(memcache._cache.overlap(0x20000000, 0x20000010))
+        assert len(cached) == 1
+        assert cached[0].begin == 0x20000000 and cached[0].end == 0x2000000c
+        assert memcache.read_memory_block8(0x20000000, 12) == list(range(12))
+
+    def test_28_interval_split_at_page(self, mockcore, memcache):
+        data = list((n % 256) for n in range(MemoryCache.PAGE_SIZE))
+        memcache.write_memory_block8(0x20000100, data[:MemoryCache.PAGE_SIZE - 0x100])
+        assert memcache.read_memory_block8(0x20000100, 0x200) == data[:0x200]
+        assert memcache._cached_size == MemoryCache.PAGE_SIZE - 0x100
+
+class TestMemoryCachePolicy:
+    def test_volatile_invalidated_on_run(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, persist_flash=True)
+        memcache.read_memory_block8(0x20000000, 4)
+        mockcore.run_token += 1
+        mockcore.write_memory_block8(0x20000000, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x20000000, 4) == [1, 2, 3, 4]
+
+    def test_flash_persists_across_run(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, persist_flash=True)
+        assert memcache.read_memory_block8(0x10, 4) == [0xff] * 4
+        mockcore.run_token += 1
+        mockcore.write_memory_block8(0x10, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x10, 4) == [0xff] * 4
+
+    def test_flash_not_persisted_by_default(self, mockcore, memcache):
+        assert memcache.read_memory_block8(0x10, 4) == [0xff] * 4
+        mockcore.run_token += 1
+        mockcore.write_memory_block8(0x10, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x10, 4) == [1, 2, 3, 4]
+
+    def test_region_not_invalidated_on_run(self, mockcore):
+        mockcore.ram_region._attributes['invalidate_cache_on_run'] = False
+        memcache = MemoryCache(DebugContext(mockcore), mockcore)
+        assert memcache.read_memory_block8(0x20000000, 4) == [0] * 4
+        mockcore.run_token += 1
+        mockcore.write_memory_block8(0x20000000, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x20000000, 4) == [0] * 4
+
+    def test_dirty_flash_invalidated_on_run(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, persist_flash=True)
+        memcache.write_memory_block8(0x10, [5, 6, 7, 8])
+        mockcore.run_token += 1
+        mockcore.write_memory_block8(0x10, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x10, 4) == [1, 2, 3, 4]
+
+    def test_invalidate_drops_flash(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, persist_flash=True)
+        memcache.read_memory_block8(0x10, 4)
+        memcache.invalidate()
+        mockcore.write_memory_block8(0x10, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x10, 4) == [1, 2, 3, 4]
+
+    def test_lru_eviction(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore)
+        memcache.read_memory_block8(0x000, 0x200)
+        memcache.read_memory_block8(0x20000000, 0x200)
+        # Touch the flash page so the RAM page becomes least recently used.
+        memcache.read_memory_block8(0x000, 4)
+        assert memcache._cached_size == 0x400
+        memcache._size_limit = 0x300
+        memcache._evict()
+        assert memcache._cache.overlap(0x20000000, 0x20000200) == set()
+        assert len(memcache._cache.overlap(0, 0x200)) == 1
+
+    def test_size_limit_applied(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, size_limit=0x100)
+        memcache.read_memory_block8(0x000, 0x80)
+        memcache.read_memory_block8(0x20000000, 0x100)
+        assert memcache._cached_size <= 0x100
+        assert memcache._cache.overlap(0, 0x80) == set()
+        assert memcache.read_memory_block8(0x20000000, 4) == [0] * 4
+
+    def test_deferred_word_miss(self, mockcore):
+        class DeferredContext(DebugContext):
+            def __init__(self, parent):
+                super().__init__(parent)
+                self.deferred = []
+
+            def read_memory(self, addr, transfer_size=32, now=True):
+                if now:
+                    return super().read_memory(addr, transfer_size)
+                self.deferred.append(addr)
+                value = super().read_memory(addr, transfer_size)
+                return lambda: value
+
+        context = DeferredContext(mockcore)
+        memcache = MemoryCache(context, mockcore)
+        mockcore.write_memory_block32(0x20000000, [0x11223344, 0x55667788])
+        first = memcache.read_memory(0x20000000, now=False)
+        second = memcache.read_memory(0x20000004, now=False)
+        assert context.deferred == [0x20000000, 0x20000004]
+        assert (first(), second()) == (0x11223344, 0x55667788)
+        # Both words are now cached, so a deferred read of them is not passed on.
+        mockcore.write_memory_block32(0x20000000, [0, 0])
+        assert memcache.read_memory(0x20000004, now=False)() == 0x55667788
+        assert context.deferred == [0x20000000, 0x20000004]
+
+    def test_deferred_word_after_invalidate(self, mockcore):
+        class DeferredContext(DebugContext):
+            def read_memory(self, addr, transfer_size=32, now=True):
+                value = super().read_memory(addr, transfer_size)
+                return value if now else (lambda: value)
+
+        memcache = MemoryCache(DeferredContext(mockcore), mockcore)
+        mockcore.write_memory_block32(0x20000000, [1])
+        result = memcache.read_memory(0x20000000, now=False)
+        memcache.invalidate()
+        mockcore.write_memory_block32(0x20000000, [2])
+        assert result() == 1
+        # The stale value isn't added to the cache.
+        assert memcache.read_memory(0x20000000) == 2
 
 # TODO test read32/16/8 with and without callbacks
 
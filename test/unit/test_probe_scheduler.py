@@ -0,0 +1,193 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.probe import probe_scheduler
+from pyocd.probe.probe_scheduler import (ClientPriority, ProbeScheduler)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(scope='function')
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(probe_scheduler, 'perf_counter', fake)
+    return fake
+
+def wait_until(predicate):
+    deadline = time.monotonic() + 5.0
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def start_waiter(scheduler, client, granted):
+    """@brief Acquire from a new thread, recording the client once it has access."""
+    def run():
+        scheduler.acquire(client)
+        granted.append(client)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+class TestProbeScheduler:
+    def test_acquire_release(self, clock):
+        s = ProbeScheduler(0.02)
+        a = s.register("a")
+        s.acquire(a)
+        assert s.owner is a
+        # Acquiring again doesn't wait.
+        s.acquire(a)
+        clock.now += 0.5
+        s.release(a)
+        assert s.owner is None
+        assert a.stats.busy_time == pytest.approx(0.5)
+        assert a.virtual_time == pytest.approx(0.5 / ClientPriority.NORMAL.value)
+
+    def test_waiting_served_by_virtual_time(self, clock):
+        s = ProbeScheduler(0.02)
+        a, b, c = s.register("a"), s.register("b"), s.register("c")
+        s.acquire(a)
+        b.virtual_time = 2.0
+        c.virtual_time = 1.0
+        granted = []
+        threads = [start_waiter(s, b, granted)]
+        wait_until(lambda: len(s._waiting) == 1)
+        threads.append(start_waiter(s, c, granted))
+        wait_until(lambda: len(s._waiting) == 2)
+        s.release(a)
+        wait_until(lambda: len(granted) == 1)
+        assert granted == [c]
+        s.release(c)
+        wait_until(lambda: len(granted) == 2)
+        assert granted == [c, b]
+        s.release(b)
+        for thread in threads:
+            thread.join()
+        assert c.stats.waits == 1
+
+    def test_priority_weight(self, clock):
+        s = ProbeScheduler(0.02)
+        high = s.register("high", ClientPriority.HIGH)
+        low = s.register("low", ClientPriority.LOW)
+        for client in (high, low):
+            s.acquire(client)
+            clock.now += 0.1
+            s.release(client)
+        assert high.virtual_time == pytest.approx(0.1 / 4)
+        assert low.virtual_time == pytest.approx(0.1)
+
+    def test_should_yield(self, clock):
+        s = ProbeScheduler(0.02)
+        a, b = s.register("a"), s.register("b")
+        s.acquire(a)
+        clock.now += 0.05
+        # Nobody is waiting.
+        assert not s.should_yield(a)
+        granted = []
+        thread = start_waiter(s, b, granted)
+        wait_until(lambda: len(s._waiting) == 1)
+        assert s.should_yield(a)
+        assert not s.should_yield(b)
+        s.release(a)
+        thread.join()
+        assert granted == [b]
+        assert b.stats.max_wait == 0.0
+        s.release(b)
+
+    def test_lock_keeps_access(self, clock):
+        s = ProbeScheduler(0.02)
+        a, b = s.register("a"), s.register("b")
+        s.acquire(a)
+        a.lock_depth = 1
+        granted = []
+        thread = start_waiter(s, b, granted)
+        wait_until(lambda: len(s._waiting) == 1)
+        clock.now += 1.0
+        assert not s.should_yield(a)
+        s.release(a)
+        assert s.owner is a
+        a.lock_depth = 0
+        s.release(a)
+        thread.join()
+        assert granted == [b]
+        s.release(b)
+
+    def test_idle_client_has_no_credit(self, clock):
+        s = ProbeScheduler(0.02)
+        a = s.register("a")
+        b = s.register("b")
+        s.acquire(a)
+        clock.now += 1.0
+        s.release(a)
+        s.acquire(a)
+        # b was idle, so it starts from a's virtual time when it queues.
+        granted = []
+        thread = start_waiter(s, b, granted)
+        wait_until(lambda: len(s._waiting) == 1)
+        assert b.virtual_time == pytest.approx(a.virtual_time)
+        s.release(a)
+        thread.join()
+        s.release(b)
+
+    def test_new_client_starts_at_minimum(self, clock):
+        s = ProbeScheduler(0.02)
+        a = s.register("a")
+        s.acquire(a)
+        clock.now += 1.0
+        s.release(a)
+        b = s.register("b")
+        assert b.virtual_time == pytest.approx(a.virtual_time)
+
+    def test_unregister_releases(self, clock):
+        s = ProbeScheduler(0.02)
+        a, b = s.register("a"), s.register("b")
+        s.acquire(a)
+        a.lock_depth = 2
+        granted = []
+        thread = start_waiter(s, b, granted)
+        wait_until(lambda: len(s._waiting) == 1)
+        s.unregister(a)
+        thread.join()
+        assert granted == [b]
+        assert [stats['name'] for stats in s.get_stats()] == ["b"]
+
+    def test_stats(self, clock):
+        s = ProbeScheduler(0.02)
+        a = s.register("a", ClientPriority.LOW)
+        s.acquire(a)
+        a.stats.requests += 10
+        clock.now += 2.0
+        s.set_priority(a, ClientPriority.HIGH)
+        stats, = s.get_stats()
+        assert stats['name'] == "a"
+        assert stats['priority'] == "high"
+        assert stats['requests'] == 10
+        assert stats['requests_per_second'] == pytest.approx(5.0)
+        assert stats['waits'] == 1
+        assert stats['average_wait'] == 0.0
+
+    def test_priority_from_name(self):
+        assert ClientPriority.from_name("High") is ClientPriority.HIGH
+        with pytest.raises(exceptions.Error):
+            ClientPriority.from_name("urgent")
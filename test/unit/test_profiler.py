@@ -0,0 +1,282 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import io
+from collections import namedtuple
+import pytest
+
+from pyocd.coresight.dwt import DWT
+from pyocd.debug.elf.decoder import (FunctionInfo, LineInfo, SymbolInfo)
+from pyocd.trace.profiler import (
+    PCSR_NO_SAMPLE,
+    PCSampleProfile,
+    ProfileSymbolizer,
+    aggregate,
+    write_flat_profile,
+    write_folded_stacks,
+    write_pprof,
+    )
+from pyocd.trace.swo import SWODecoder
+
+def pc_sample(pc):
+    return bytes([0x17]) + pc.to_bytes(4, 'little')
+
+SLEEP_SAMPLE = b'\x15\x00'
+OVERFLOW = b'\x70'
+
+# Thumb functions, so the symbol values have bit 0 set.
+SYMBOLS = [
+    SymbolInfo("main", 0x1001, 0x40, 'STT_FUNC'),
+    SymbolInfo("work", 0x1041, 0x20, 'STT_FUNC'),
+    ]
+
+class MockSymbolDecoder:
+    def __init__(self):
+        self.lookups = []
+
+    def get_symbol_for_address(self, addr):
+        self.lookups.append(addr)
+        for symbol in SYMBOLS:
+            if symbol.address <= addr < symbol.address + symbol.size:
+                return symbol
+        return None
+
+class MockAddressDecoder:
+    def get_function_for_address(self, addr):
+        if 0x2000 <= addr < 0x2010:
+            return FunctionInfo(b"static_fn", None, 0x2000, 0x2010)
+        return None
+
+    def get_line_for_address(self, addr):
+        if 0x1000 <= addr < 0x1060:
+            return LineInfo(None, b"main.c", b"", 10 + (addr - 0x1000) // 0x20)
+        return None
+
+MockElf = namedtuple('MockElf', 'symbol_decoder address_decoder')
+
+@pytest.fixture(scope='function')
+def elf():
+    return MockElf(MockSymbolDecoder(), MockAddressDecoder())
+
+@pytest.fixture(scope='function')
+def profile():
+    p = PCSampleProfile()
+    data = (pc_sample(0x1000) * 3 + pc_sample(0x1022) + pc_sample(0x1040) * 5 + pc_sample(0x2004) * 2
+            + pc_sample(0x3000) + SLEEP_SAMPLE * 4 + OVERFLOW)
+    p.add_batch(SWODecoder().decode(data))
+    return p
+
+def parse_protobuf(data):
+    """@brief Decode a protobuf message into a dict of field number to list of raw values."""
+    fields = {}
+    i = 0
+    def varint():
+        nonlocal i
+        value = shift = 0
+        while True:
+            byte = data[i]
+            i += 1
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not (byte & 0x80):
+                return value
+    while i < len(data):
+        key = varint()
+        if key & 7 == 0:
+            value = varint()
+        else:
+            assert key & 7 == 2
+            length = varint()
+            value = data[i:i + length]
+            i += length
+        fields.setdefault(key >> 3, []).append(value)
+    return fields
+
+def parse_packed(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not (byte & 0x80):
+            values.append(value)
+            value = shift = 0
+    return values
+
+class MockAP:
+    def __init__(self):
+        self.regs = {}
+        self.writes = []
+
+    def read32(self, addr):
+        return self.regs.get(addr, 0)
+
+    def write32(self, addr, value):
+        self.regs[addr] = value
+        self.writes.append((addr, value))
+
+    read_memory = read32
+    write_memory = write32
+
+class TestPCSampleProfile:
+    def test_counts(self, profile):
+        assert profile.counts == {0x1000: 3, 0x1022: 1, 0x1040: 5, 0x2004: 2, 0x3000: 1}
+        assert profile.sleep_samples == 4
+        assert profile.total_samples == 16
+        assert profile.overflows == 1
+
+    def test_pcsr_samples(self):
+        p = PCSampleProfile()
+        p.add_pcsr_samples([0x1000, PCSR_NO_SAMPLE, 0x1000, 0x2000])
+        assert p.counts == {0x1000: 2, 0x2000: 1}
+        assert p.no_samples == 1
+        assert p.total_samples == 4
+        assert aggregate(p, ProfileSymbolizer(None))[-1] == (("[no sample]",), 1)
+
+class TestProfileSymbolizer:
+    def test_functions(self, elf, profile):
+        assert aggregate(profile, ProfileSymbolizer(elf)) == [
+                (("work",), 5),
+                (("[sleep]",), 4),
+                (("main",), 4),
+                (("static_fn",), 2),
+                (("0x00003000",), 1),
+            ]
+
+    def test_each_pc_looked_up_once(self, elf, profile):
+        symbolizer = ProfileSymbolizer(elf)
+        aggregate(profile, symbolizer)
+        aggregate(profile, symbolizer)
+        assert sorted(elf.symbol_decoder.lookups) == [0x1001, 0x1023, 0x1041, 0x2005, 0x3001]
+
+    def test_lines(self, elf, profile):
+        rows = aggregate(profile, ProfileSymbolizer(elf, lines=True), lines=True)
+        assert rows[:3] == [
+                (("work", "main.c:12"), 5),
+                (("[sleep]",), 4),
+                (("main", "main.c:10"), 3),
+            ]
+        assert (("main", "main.c:11"), 1) in rows
+
+    def test_no_elf(self, profile):
+        rows = aggregate(profile, ProfileSymbolizer(None))
+        assert rows[0] == (("0x00001040",), 5)
+
+class TestProfileOutput:
+    def test_flat(self, elf, profile):
+        out = io.StringIO()
+        write_flat_profile(out, profile, ProfileSymbolizer(elf), limit=2)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "16 samples"
+        assert lines[2].split() == ["5", "31.25%", "work"]
+        assert lines[3].split() == ["4", "25.00%", "[sleep]"]
+        assert len(lines) == 4
+
+    def test_flat_empty(self):
+        out = io.StringIO()
+        write_flat_profile(out, PCSampleProfile(), ProfileSymbolizer(None))
+        assert out.getvalue() == "0 samples\n"
+
+    def test_folded(self, elf, profile):
+        out = io.StringIO()
+        write_folded_stacks(out, profile, ProfileSymbolizer(elf, lines=True), lines=True)
+        lines = out.getvalue().splitlines()
+        assert lines[0] == "work;main.c:12 5"
+        assert "main;main.c:11 1" in lines
+        assert "[sleep] 4" in lines
+
+    def test_pprof(self, elf, profile):
+        out = io.BytesIO()
+        write_pprof(out, profile, ProfileSymbolizer(elf, lines=True), period=1024, duration=2.5)
+        message = parse_protobuf(gzip.decompress(out.getvalue()))
+        strings = [s.decode() for s in message[6]]
+        assert strings[0] == ""
+        assert message[12] == [1024]
+        assert message[10] == [2500000000]
+        sample_type = parse_protobuf(message[1][0])
+        assert (strings[sample_type[1][0]], strings[sample_type[2][0]]) == ("samples", "count")
+
+        functions = {}
+        for encoded in message[5]:
+            function = parse_protobuf(encoded)
+            functions[function[1][0]] = (strings[function[2][0]], strings[function[4][0]])
+        locations = {}
+        for encoded in message[4]:
+            location = parse_protobuf(encoded)
+            line = parse_protobuf(location[4][0])
+            locations[location[1][0]] = (location[3][0], functions[line[1][0]], line.get(2, [0])[0])
+        samples = {}
+        for encoded in message[2]:
+            sample = parse_protobuf(encoded)
+            location_id, = parse_packed(sample[1][0])
+            value, = parse_packed(sample[2][0])
+            samples[locations[location_id]] = value
+
+        assert samples[(0x1040, ("work", "main.c"), 12)] == 5
+        assert samples[(0x1022, ("main", "main.c"), 11)] == 1
+        assert samples[(0x2004, ("static_fn", ""), 0)] == 2
+        assert samples[(0, ("[sleep]", ""), 0)] == 4
+        assert sum(samples.values()) == profile.total_samples
+
+class TestDWTPCSampling:
+    BASE = 0xE0001000
+
+    @pytest.mark.parametrize(("requested", "actual", "cyctap", "postpreset"), [
+            (1, 64, 0, 0),
+            (64, 64, 0, 0),
+            (1000, 960, 0, 14),
+            (1024, 1024, 0, 15),
+            (2047, 1024, 0, 15),
+            (2048, 2048, 1, 1),
+            (16384, 16384, 1, 15),
+            (100000, 16384, 1, 15),
+        ])
+    def test_interval(self, requested, actual, cyctap, postpreset):
+        ap = MockAP()
+        dwt = DWT(ap, addr=self.BASE)
+        assert dwt.enable_pc_sampling(requested) == actual
+        ctrl = ap.regs[self.BASE + DWT.DWT_CTRL]
+        assert ctrl & DWT.DWT_CTRL_PCSAMPLENA_MASK
+        assert ctrl & DWT.DWT_CTRL_CYCCNTENA_MASK
+        assert bool(ctrl & DWT.DWT_CTRL_CYCTAP_MASK) == bool(cyctap)
+        assert (ctrl & DWT.DWT_CTRL_POSTRESET_MASK) >> DWT.DWT_CTRL_POSTRESET_SHIFT == postpreset
+
+    def test_disable(self):
+        ap = MockAP()
+        dwt = DWT(ap, addr=self.BASE)
+        dwt.enable_pc_sampling(1024)
+        dwt.disable_pc_sampling()
+        ctrl = ap.regs[self.BASE + DWT.DWT_CTRL]
+        assert not (ctrl & DWT.DWT_CTRL_PCSAMPLENA_MASK)
+        assert ctrl & DWT.DWT_CTRL_CYCCNTENA_MASK
+
+    def test_read_pc_samples_repeated(self):
+        ap = MockAP()
+        calls = []
+        def read_repeated32(addr, count):
+            calls.append((addr, count))
+            return [0x1000 + 2 * i for i in range(count)]
+        ap.read_repeated32 = read_repeated32
+        dwt = DWT(ap, addr=self.BASE)
+        assert dwt.read_pc_samples(3) == [0x1000, 0x1002, 0x1004]
+        assert calls == [(self.BASE + DWT.DWT_PCSR, 3)]
+
+    def test_read_pc_samples_fallback(self):
+        ap = MockAP()
+        ap.regs[self.BASE + DWT.DWT_PCSR] = 0x1234
+        dwt = DWT(ap, addr=self.BASE)
+        assert dwt.read_pc_samples(2) == [0x1234, 0x1234]
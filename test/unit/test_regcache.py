@@ -18,6 +18,7 @@ import pytest
 import logging
 
 from pyocd.cache.register import RegisterCache
+from pyocd.core import exceptions
 from pyocd.debug.context import DebugContext
 from pyocd.coresight.cortex_m import CortexM
 from pyocd.coresight.cortex_m_core_registers import CortexMCoreRegisterInfo
@@ -209,3 +210,114 @@ class TestRegisterCache:
 
 
 
+
+class CountingContext(DebugContext):
+    """@brief Debug context that records each register read call."""
+
+    def __init__(self, core):
+        super().__init__(core)
+        self.reads = []
+        self.fail = False
+
+    def read_core_registers_raw(self, reg_list):
+        self.reads.append(list(reg_list))
+        if self.fail and len(reg_list) > 1:
+            raise exceptions.CoreRegisterAccessError("failed")
+        return super().read_core_registers_raw(reg_list)
+
+class TestRegisterSnapshot:
+    @pytest.fixture(scope='function')
+    def context(self, mockcore):
+        return CountingContext(mockcore)
+
+    @pytest.fixture(scope='function')
+    def snapcache(self, context, mockcore):
+        return RegisterCache(context, mockcore)
+
+    def test_single_read(self, mockcore, context, snapcache):
+        TestRegisterCache().set_core_regs(mockcore)
+        assert snapcache.read_core_registers_raw(['pc', 'sp']) == [get_expected_reg_value('pc'),
+                get_expected_reg_value('sp')]
+        assert len(context.reads) == 1
+        # Every register, including subregisters and doubles, is served from the snapshot.
+        for r in core_regs_composite_regs(mockcore) + COMPOSITES:
+            snapcache.read_core_registers_raw([r])
+        assert snapcache.read_core_registers_raw(['cfbp', 'ipsr']) == [get_expected_cfbp(),
+                get_expected_reg_value('ipsr')]
+        assert len(context.reads) == 1
+
+    def test_skips_running_check(self, mockcore, snapcache):
+        calls = []
+        mockcore.is_running = lambda: calls.append(1) or False
+        snapcache.read_core_registers_raw(['r0'])
+        snapcache.read_core_registers_raw(['r1'])
+        snapcache.read_core_registers_raw(['r2'])
+        assert len(calls) == 1
+
+    def test_run_token(self, mockcore, context, snapcache):
+        snapcache.read_core_registers_raw(['r0'])
+        mockcore.write_core_registers_raw(['r1'], [1234])
+        assert snapcache.read_core_registers_raw(['r1']) == [0]
+        mockcore.run_token += 1
+        assert snapcache.read_core_registers_raw(['r1']) == [1234]
+        assert len(context.reads) == 2
+
+    def test_write(self, mockcore, context, snapcache):
+        snapcache.read_core_registers_raw(['r0'])
+        snapcache.write_core_registers_raw(['control'], [2])
+        assert snapcache.read_core_registers_raw(['control', 'r0']) == [2, 0]
+        # Only the invalidated CFBP registers are read again.
+        assert len(context.reads) == 2
+        assert RegisterCache.CFBP_INDEX in context.reads[1]
+
+    def test_snapshot_failure(self, context, snapcache):
+        context.fail = True
+        assert snapcache.read_core_registers_raw(['r0']) == [0]
+        assert snapcache.read_core_registers_raw(['r1']) == [0]
+        # The snapshot is only attempted once.
+        assert len(context.reads) == 3
+
+class TestCortexMRegisterRead:
+    @pytest.fixture(scope='function')
+    def core(self):
+        core = CortexM.__new__(CortexM)
+        core.is_halted = lambda: True
+        core.selectors = []
+        core.failing = set()
+        core.values = {}
+
+        def write_memory(addr, value, transfer_size=32):
+            assert addr == CortexM.DCRSR
+            core.selectors.append(value)
+
+        def read32(addr, now=True):
+            assert not now
+            selector = core.selectors[-1]
+            if addr == CortexM.DHCSR:
+                return lambda: 0 if (selector in core.failing) else CortexM.S_REGRDY
+            assert addr == CortexM.DCRDR
+            return lambda: core.values.get(selector, selector + 0x1000)
+
+        core.write_memory = write_memory
+        core.read32 = read32
+        return core
+
+    def index(self, name):
+        return CortexMCoreRegisterInfo.register_name_to_index(name)
+
+    def test_single_batch(self, core):
+        core.values[self.index('cfbp')] = 0x01020304
+        core.values[self.index('xpsr')] = 0x21000003
+        core.values[self.index('s0')] = 0x11111111
+        core.values[self.index('s1')] = 0x22222222
+        names = ['r0', 'd0', 's1', 'control', 'primask', 'cfbp', 'ipsr', 'xpsr']
+        values = core._base_read_core_registers_raw([self.index(r) for r in names])
+        assert values == [0x1000, 0x2222222211111111, 0x22222222, 0x01, 0x04, 0x01020304, 0x03, 0x21000003]
+        # Each DCRSR selector is read once.
+        assert core.selectors == [self.index(r) for r in ['r0', 's0', 's1', 'cfbp', 'xpsr']]
+
+    def test_failure(self, core):
+        core.failing.add(self.index('s1'))
+        with pytest.raises(exceptions.CoreRegisterAccessError) as err:
+            core._base_read_core_registers_raw([self.index(r) for r in ['r0', 'd0']])
+        assert "s1" in str(err.value)
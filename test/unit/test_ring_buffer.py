@@ -0,0 +1,90 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from pyocd.utility.ring_buffer import ByteRingBuffer
+
+class TestByteRingBuffer:
+    def test_empty(self):
+        ring = ByteRingBuffer(8)
+        assert len(ring) == 0
+        assert ring.read() == (b'', False)
+        assert not ring.wait(0)
+
+    def test_write_read(self):
+        ring = ByteRingBuffer(8)
+        assert ring.write(b'abc') == 3
+        assert len(ring) == 3
+        assert ring.wait(0)
+        assert ring.read() == (b'abc', False)
+        assert ring.bytes_read == 3
+
+    def test_wraparound(self):
+        ring = ByteRingBuffer(8)
+        ring.write(b'123456')
+        assert ring.read(4) == (b'1234', False)
+        assert ring.write(b'abcdef') == 6
+        assert ring.read() == (b'56abcdef', False)
+        assert ring.high_water == 8
+
+    def test_drop_when_full(self):
+        ring = ByteRingBuffer(8)
+        ring.write(b'123456')
+        assert ring.write(b'abcd') == 2
+        # Further drops before the consumer catches up are part of the same gap.
+        assert ring.write(b'xyz') == 0
+        assert ring.dropped_bytes == 5
+        assert ring.overflow_count == 1
+        # Data up to the gap is returned, then the gap is reported.
+        assert ring.read(4) == (b'1234', False)
+        assert ring.read() == (b'56ab', True)
+        ring.write(b'new')
+        assert ring.read() == (b'new', False)
+
+    def test_gap_when_empty(self):
+        ring = ByteRingBuffer(4)
+        ring.write(b'123456')
+        assert ring.read() == (b'1234', True)
+        ring.write(b'ab')
+        ring.write(b'cde')
+        assert ring.overflow_count == 2
+        assert ring.read() == (b'abcd', True)
+        assert ring.get_metrics()['dropped_bytes'] == 3
+
+    def test_threads(self):
+        ring = ByteRingBuffer(64)
+        data = bytes(range(256)) * 64
+        received = bytearray()
+        done = threading.Event()
+
+        def consume():
+            while not (done.is_set() and not len(ring)):
+                if ring.wait(0.01):
+                    chunk, gap = ring.read()
+                    assert not gap
+                    received.extend(chunk)
+
+        thread = threading.Thread(target=consume)
+        thread.start()
+        offset = 0
+        while offset < len(data):
+            # Only write what fits, so nothing is dropped.
+            size = min(50, ring.capacity - len(ring))
+            offset += ring.write(data[offset:offset + size])
+        done.set()
+        thread.join()
+        assert bytes(received) == data
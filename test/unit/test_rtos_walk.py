@@ -0,0 +1,358 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from types import SimpleNamespace
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.rtos.common import (
+    read_c_string,
+    read_words,
+    walk_lists,
+    ListWalk,
+    RTOSStructCache,
+    )
+from pyocd.rtos.freertos import (
+    FreeRTOSThread,
+    FreeRTOSThreadProvider,
+    LIST_SIZE,
+    THREAD_NAME_OFFSET,
+    THREAD_PRIORITY_OFFSET,
+    )
+
+class MockContext:
+    """@brief Memory-only debug context that counts round trips.
+
+    A round trip is counted for each block read, for each immediate word read, and for each batch of
+    deferred word reads that is resolved.
+    """
+
+    def __init__(self):
+        self.memory = {}
+        self.core = SimpleNamespace(has_fpu=False, run_token=0)
+        self.round_trips = 0
+        self.block_reads = 0
+        self.word_reads = []
+        self.bad_addresses = set()
+        self._queued = False
+
+    def write32(self, addr, value):
+        for i in range(4):
+            self.memory[addr + i] = (value >> (8 * i)) & 0xff
+
+    def write_bytes(self, addr, data):
+        for i, b in enumerate(data):
+            self.memory[addr + i] = b
+
+    def _word(self, addr):
+        if addr in self.bad_addresses:
+            raise exceptions.TransferFaultError()
+        return int.from_bytes(bytes(self.memory.get(addr + i, 0) for i in range(4)), 'little')
+
+    def read32(self, addr, now=True):
+        self.word_reads.append(addr)
+        if now:
+            self.round_trips += 1
+            return self._word(addr)
+        self._queued = True
+        def read_cb():
+            if self._queued:
+                self.round_trips += 1
+                self._queued = False
+            return self._word(addr)
+        return read_cb
+
+    def read_memory_block8(self, addr, size):
+        self.round_trips += 1
+        self.block_reads += 1
+        return [self.memory.get(addr + i, 0) for i in range(size)]
+
+    def read_core_register(self, reg):
+        return 0
+
+    def read_core_registers_raw(self, reg_list):
+        self.round_trips += 1
+        return [0xc0de0000 + reg for reg in reg_list]
+
+class MockTarget:
+    def __init__(self, context):
+        self.context = context
+        self.run_token = 0
+        self.elf = None
+        self.session = SimpleNamespace(subscribe=lambda *args: None)
+
+    def get_target_context(self):
+        return self.context
+
+SYMBOLS = {
+    'uxCurrentNumberOfTasks': 0x100,
+    'pxCurrentTCB': 0x104,
+    'uxTopReadyPriority': 0x108,
+    'xSchedulerRunning': 0x10c,
+    'pxReadyTasksLists': 0x200,
+    'xDelayedTaskList1': 0x200 + 4 * LIST_SIZE,
+    'xDelayedTaskList2': 0x200 + 5 * LIST_SIZE,
+    'xPendingReadyList': 0x200 + 6 * LIST_SIZE,
+    'xSuspendedTaskList': 0x200 + 7 * LIST_SIZE,
+    'xTasksWaitingTermination': 0x200 + 8 * LIST_SIZE,
+    }
+
+## Offset of xStateListItem within the TCB.
+STATE_ITEM_OFFSET = 4
+
+def tcb_addr(n):
+    return 0x1000 + n * 0x100
+
+class FreeRTOSTarget:
+    """@brief Builds FreeRTOS task lists in a MockContext."""
+
+    def __init__(self, threads=20):
+        self.context = MockContext()
+        self.target = MockTarget(self.context)
+        for n in range(threads):
+            base = tcb_addr(n)
+            self.context.write32(base, 0x20000000 + n * 0x100)
+            self.context.write32(base + THREAD_PRIORITY_OFFSET, n % 4)
+            self.context.write_bytes(base + THREAD_NAME_OFFSET, b"task%d\0" % n)
+        self.context.write32(SYMBOLS['uxCurrentNumberOfTasks'], threads)
+        self.context.write32(SYMBOLS['pxCurrentTCB'], tcb_addr(0))
+        self.context.write32(SYMBOLS['uxTopReadyPriority'], 3)
+        self.context.write32(SYMBOLS['xSchedulerRunning'], 1)
+        for name in ('xDelayedTaskList1', 'xDelayedTaskList2', 'xPendingReadyList',
+                'xSuspendedTaskList', 'xTasksWaitingTermination'):
+            self.set_list(SYMBOLS[name], [])
+        for priority in range(4):
+            self.set_list(SYMBOLS['pxReadyTasksLists'] + priority * LIST_SIZE, [])
+
+    def set_list(self, list_ptr, threads):
+        """@brief Write a List_t at @a list_ptr containing the TCBs of @a threads."""
+        end = list_ptr + 8
+        items = [tcb_addr(n) + STATE_ITEM_OFFSET for n in threads]
+        self.context.write32(list_ptr, len(items))
+        self.context.write32(list_ptr + 4, end)
+        self.context.write32(end, 0xffffffff)
+        self.context.write32(end + 4, items[0] if items else end)
+        self.context.write32(end + 8, items[-1] if items else end)
+        for i, (n, item) in enumerate(zip(threads, items)):
+            self.context.write32(item + 4, items[i + 1] if i + 1 < len(items) else end)
+            self.context.write32(item + 8, items[i - 1] if i > 0 else end)
+            self.context.write32(item + 12, tcb_addr(n))
+            self.context.write32(item + 16, list_ptr)
+
+    def provider(self):
+        provider = FreeRTOSThreadProvider(self.target)
+        provider._symbols = dict(SYMBOLS)
+        provider._total_priorities = 4
+        provider._read_from_target = True
+        return provider
+
+    def run(self):
+        self.target.run_token += 1
+        self.context.core.run_token += 1
+        self.context.round_trips = 0
+        self.context.block_reads = 0
+        self.context.word_reads = []
+
+@pytest.fixture(scope='function')
+def freertos():
+    # 20 threads: 0-3 ready at priorities 0-3, 4-11 in the two delayed lists, 12-15 suspended,
+    # 16-19 waiting for termination.
+    rtos = FreeRTOSTarget(20)
+    for priority in range(4):
+        rtos.set_list(SYMBOLS['pxReadyTasksLists'] + priority * LIST_SIZE, [priority])
+    rtos.set_list(SYMBOLS['xDelayedTaskList1'], list(range(4, 8)))
+    rtos.set_list(SYMBOLS['xDelayedTaskList2'], list(range(8, 12)))
+    rtos.set_list(SYMBOLS['xSuspendedTaskList'], list(range(12, 16)))
+    rtos.set_list(SYMBOLS['xTasksWaitingTermination'], list(range(16, 20)))
+    return rtos
+
+class TestWalkLists:
+    def make_list(self, context, nodes, next_offset=8):
+        for node, next_node in zip(nodes, nodes[1:] + [0]):
+            context.write32(node + next_offset, next_node)
+
+    def test_lockstep(self):
+        context = MockContext()
+        lists = [[0x1000 + 0x100 * i + 0x10 * j for j in range(length)] for i, length in enumerate((5, 3, 0, 8))]
+        for nodes in lists:
+            self.make_list(context, nodes)
+        walks = [ListWalk(nodes[0] if nodes else 0, 8) for nodes in lists]
+        walk_lists(context, walks)
+        assert [w.objects for w in walks] == lists
+        # One round per node of the longest list.
+        assert context.round_trips == 8
+
+    def test_object_offset_and_limit(self):
+        context = MockContext()
+        nodes = [0x100, 0x200, 0x300]
+        self.make_list(context, nodes)
+        for node in nodes:
+            context.write32(node + 12, node + 0x5000)
+        walk = ListWalk(0x100, 8, object_offset=12, limit=2)
+        walk_lists(context, [walk])
+        assert walk.objects == [0x5100, 0x5200]
+
+    def test_cycle(self):
+        context = MockContext()
+        self.make_list(context, [0x100, 0x200, 0x300])
+        context.write32(0x300 + 8, 0x200)
+        walk = ListWalk(0x100, 8)
+        walk_lists(context, [walk])
+        assert walk.objects == [0x100, 0x200, 0x300]
+
+    def test_end_node(self):
+        context = MockContext()
+        self.make_list(context, [0x100, 0x200, 0x300])
+        walk = ListWalk(0x100, 8, end=0x300)
+        walk_lists(context, [walk])
+        assert walk.objects == [0x100, 0x200]
+
+    def test_transfer_error(self, caplog):
+        context = MockContext()
+        self.make_list(context, [0x100, 0x200, 0x300])
+        context.bad_addresses.add(0x200 + 8)
+        walks = [ListWalk(0x100, 8), ListWalk(0x100, 8, name="other")]
+        with caplog.at_level(logging.WARNING):
+            walk_lists(context, walks)
+        assert walks[0].objects == [0x100, 0x200]
+        assert "terminating list" in caplog.text
+
+    def test_read_words(self):
+        context = MockContext()
+        context.write32(0x10, 1)
+        context.write32(0x20, 2)
+        assert read_words(context, [0x10, 0x20, 0x30]) == [1, 2, 0]
+        assert context.round_trips == 1
+
+    def test_read_c_string_prefix(self):
+        context = MockContext()
+        context.write_bytes(0x100, b"tail\0")
+        assert read_c_string(context, 0x100, "head-") == "head-tail"
+        assert read_c_string(context, 0, "head") == "head"
+
+class TestRTOSStructCache:
+    def test_cached_per_run_token(self):
+        context = MockContext()
+        target = MockTarget(context)
+        context.write32(0x104, 0x12345678)
+        cache = RTOSStructCache(context, target)
+        assert cache.read32(0x100, 16, 4) == 0x12345678
+        assert cache.read(0x100, 16)[4:8] == bytes([0x78, 0x56, 0x34, 0x12])
+        assert context.block_reads == 1
+        context.write32(0x104, 1)
+        target.run_token += 1
+        assert cache.read32(0x100, 16, 4) == 1
+        assert context.block_reads == 2
+        cache.invalidate()
+        cache.read(0x100, 16)
+        assert context.block_reads == 3
+
+class TestFreeRTOSWalk:
+    def test_threads(self, freertos):
+        provider = freertos.provider()
+        provider.update_threads()
+        threads = provider._threads
+        assert sorted(threads) == [tcb_addr(n) for n in range(20)]
+        t = threads[tcb_addr(5)]
+        assert t.name == "task5"
+        assert t.priority == 1
+        assert t.state == FreeRTOSThread.BLOCKED
+        assert t.get_stack_pointer() == 0x20000500
+        assert threads[tcb_addr(0)].state == FreeRTOSThread.RUNNING
+        assert threads[tcb_addr(3)].state == FreeRTOSThread.READY
+        assert threads[tcb_addr(12)].state == FreeRTOSThread.SUSPENDED
+        assert threads[tcb_addr(19)].state == FreeRTOSThread.DELETED
+
+    def test_round_trips(self, freertos):
+        provider = freertos.provider()
+        freertos.run()
+        provider.update_threads()
+        # One block read per TCB. The longest list has 4 threads, so the lists take 4 rounds after
+        # reading the globals and the list headers.
+        assert freertos.context.block_reads == 20
+        assert freertos.context.round_trips == 20 + 2 + 4
+
+    def test_incremental_refresh(self, freertos):
+        provider = freertos.provider()
+        provider.update_threads()
+        freertos.context.write32(tcb_addr(2) + THREAD_PRIORITY_OFFSET, 7)
+        freertos.run()
+        provider.update_threads()
+        # TCBs are not read again, and the suspended and deleted lists are not walked.
+        assert freertos.context.block_reads == 0
+        suspended_items = {tcb_addr(n) + STATE_ITEM_OFFSET + 8 for n in range(12, 20)}
+        assert not suspended_items.intersection(freertos.context.word_reads)
+        assert provider._threads[tcb_addr(2)].priority == 7
+        assert len(provider._threads) == 20
+        assert provider._threads[tcb_addr(14)].state == FreeRTOSThread.SUSPENDED
+
+    def test_stale_suspended_list(self, freertos):
+        provider = freertos.provider()
+        provider.update_threads()
+        # Swap thread 13 in the middle of the suspended list with delayed thread 4. The suspended
+        # list's header is unchanged.
+        freertos.set_list(SYMBOLS['xSuspendedTaskList'], [12, 4, 14, 15])
+        freertos.set_list(SYMBOLS['xDelayedTaskList1'], [13, 5, 6, 7])
+        freertos.run()
+        provider.update_threads()
+        threads = provider._threads
+        assert len(threads) == 20
+        assert threads[tcb_addr(4)].state == FreeRTOSThread.SUSPENDED
+        assert threads[tcb_addr(13)].state == FreeRTOSThread.BLOCKED
+
+    def test_new_thread(self, freertos):
+        provider = freertos.provider()
+        provider.update_threads()
+        freertos.context.write32(tcb_addr(20) + THREAD_PRIORITY_OFFSET, 2)
+        freertos.context.write_bytes(tcb_addr(20) + THREAD_NAME_OFFSET, b"a long task name here\0")
+        freertos.context.write32(SYMBOLS['uxCurrentNumberOfTasks'], 21)
+        freertos.set_list(SYMBOLS['xSuspendedTaskList'], list(range(12, 16)) + [20])
+        freertos.run()
+        provider.update_threads()
+        t = provider._threads[tcb_addr(20)]
+        assert t.name == "a long task name here"
+        assert t.state == FreeRTOSThread.SUSPENDED
+        assert len(provider._threads) == 21
+
+class TestThreadContext:
+    def test_saved_frame_snapshot(self, freertos):
+        provider = freertos.provider()
+        provider.update_threads()
+        sp = 0x20000500
+        # r4-r11, then r0-r3, r12, lr, pc, xpsr.
+        for i in range(16):
+            freertos.context.write32(sp + 4 * i, 0x100 + i)
+        context = provider._threads[tcb_addr(5)].context
+
+        freertos.context.round_trips = 0
+        freertos.context.block_reads = 0
+        assert context.read_core_registers_raw([0, 4, 13, 15, 'msp']) == [
+                0x108, 0x100, sp + 0x40, 0x10e, 0xc0de0000 + 17]
+        assert context.read_core_registers_raw(['r11', 'r3']) == [0x107, 0x10b]
+        # The frame is read with a single block read, and not read again for the same halt.
+        assert freertos.context.block_reads == 1
+
+        freertos.context.write32(sp + 56, 0x2000)
+        freertos.run()
+        assert context.read_core_registers_raw([15]) == [0x2000]
+        assert freertos.context.block_reads == 2
+
+    def test_current_thread_is_live(self, freertos):
+        provider = freertos.provider()
+        provider.update_threads()
+        context = provider._threads[tcb_addr(0)].context
+        assert context.read_core_registers_raw([0, 15]) == [0xc0de0000, 0xc0de000f]
@@ -0,0 +1,164 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from time import sleep
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.core.target import Target
+from pyocd.debug.state_monitor import TargetStateMonitor
+from pyocd.utility.notification import Notifier
+
+class MockSession(Notifier):
+    def __init__(self, min_interval=0.001, max_interval=0.004):
+        super().__init__()
+        self.options = {
+            'debug.state_poll_min_interval': min_interval,
+            'debug.state_poll_max_interval': max_interval,
+            }
+
+class MockTarget:
+    def __init__(self, halt_after=None):
+        self.halt_after = halt_after
+        self.polls = 0
+        self.fail = False
+        self.lock = threading.Lock()
+
+    def get_state(self):
+        with self.lock:
+            self.polls += 1
+            if self.fail:
+                raise exceptions.TransferFaultError()
+            if (self.halt_after is not None) and self.polls >= self.halt_after:
+                return Target.State.HALTED
+            return Target.State.RUNNING
+
+    def get_halt_reason(self):
+        return Target.HaltReason.BREAKPOINT
+
+@pytest.fixture(scope='function')
+def session():
+    return MockSession()
+
+@pytest.fixture(scope='function')
+def make_monitor(session):
+    monitors = []
+    def make(target, lock=None):
+        monitor = TargetStateMonitor(session, target, lock)
+        monitor.start()
+        monitors.append(monitor)
+        return monitor
+    yield make
+    for monitor in monitors:
+        monitor.stop()
+
+class TestTargetStateMonitor:
+    def test_idle_does_not_poll(self, make_monitor):
+        target = MockTarget()
+        make_monitor(target)
+        sleep(0.02)
+        assert target.polls == 0
+
+    def test_halt_wakes_and_notifies(self, session, make_monitor):
+        notes = []
+        session.subscribe(notes.append, Target.Event.POST_HALT)
+        target = MockTarget(halt_after=3)
+        monitor = make_monitor(target)
+        monitor.start_watching()
+        assert monitor.wait(5)
+        assert not monitor.is_watching
+        assert target.polls == 3
+        assert len(notes) == 1
+        assert notes[0].source is target
+        assert notes[0].data == Target.HaltReason.BREAKPOINT
+
+        # Polling stops once the halt is seen.
+        sleep(0.02)
+        assert target.polls == 3
+
+    def test_lock_held_while_polling(self, make_monitor):
+        lock = threading.Lock()
+        target = MockTarget(halt_after=1)
+        monitor = make_monitor(target, lock)
+        with lock:
+            monitor.start_watching()
+            sleep(0.02)
+            assert target.polls == 0
+        assert monitor.wait(5)
+        assert target.polls == 1
+
+    def test_poll_hooks(self, make_monitor):
+        hook_calls = []
+        monitor = make_monitor(MockTarget(halt_after=2))
+        monitor.add_poll_hook(lambda: hook_calls.append(1))
+        monitor.start_watching()
+        assert monitor.wait(5)
+        assert len(hook_calls) == 2
+
+    def test_stop_watching(self, make_monitor):
+        target = MockTarget()
+        monitor = make_monitor(target)
+        monitor.start_watching()
+        sleep(0.02)
+        monitor.stop_watching()
+        polls = target.polls
+        assert polls > 0
+        sleep(0.02)
+        assert target.polls <= polls + 1
+        assert not monitor.wait(0)
+
+    def test_backoff(self):
+        session = MockSession(min_interval=0.01, max_interval=0.04)
+        monitor = TargetStateMonitor(session, MockTarget())
+        monitor.start_watching()
+        intervals = []
+        for _ in range(5):
+            intervals.append(monitor._interval)
+            monitor._poll(monitor._generation, monitor._interval)
+        assert intervals == [0.01, 0.02, 0.04, 0.04, 0.04]
+
+        monitor.start_watching(max_interval=0.015)
+        monitor._poll(monitor._generation, monitor._interval)
+        assert monitor._interval == 0.015
+
+    def test_errors_wake_on_change(self):
+        target = MockTarget()
+        monitor = TargetStateMonitor(MockSession(), target)
+        monitor.start_watching()
+        target.fail = True
+        monitor._poll(monitor._generation, monitor._interval)
+        assert monitor.wait(0)
+        monitor._poll(monitor._generation, monitor._interval)
+        assert not monitor.wait(0)
+        target.fail = False
+        monitor._poll(monitor._generation, monitor._interval)
+        assert monitor.wait(0)
+        assert monitor.is_watching
+
+    def test_stale_result_discarded(self):
+        target = MockTarget(halt_after=1)
+        monitor = TargetStateMonitor(MockSession(), target)
+        monitor.start_watching()
+        generation = monitor._generation
+        monitor.stop_watching()
+        monitor._poll(generation, monitor._interval)
+        assert not monitor.wait(0)
+
+    def test_wake(self, make_monitor):
+        monitor = make_monitor(MockTarget())
+        threading.Timer(0.01, monitor.wake).start()
+        assert monitor.wait(5)
@@ -0,0 +1,201 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import pytest
+
+from pyocd.trace import events
+from pyocd.trace.events import (TraceEventBatch, TraceEventKind)
+from pyocd.trace.sink import TraceEventSink
+from pyocd.trace.swo import (NUMPY_AVAILABLE, SWODecoder, SWOParser)
+
+SYNC = bytes(5) + b'\x80'
+OVERFLOW = b'\x70'
+
+def itm(port, data, size):
+    ss = {1: 1, 2: 2, 4: 3}[size]
+    return bytes([(port << 3) | ss]) + data.to_bytes(size, 'little')
+
+def dwt(a, data, size=4):
+    ss = {1: 1, 2: 2, 4: 3}[size]
+    return bytes([(a << 3) | 0x4 | ss]) + data.to_bytes(size, 'little')
+
+def continuation(first, value, groups):
+    result = [first | 0x80]
+    for i in range(groups):
+        result.append(((value >> (7 * i)) & 0x7f) | (0x80 if i < groups - 1 else 0))
+    return bytes(result)
+
+def local_timestamp(value, tc=0):
+    if value < 7 and tc == 0:
+        return bytes([value << 4])
+    return continuation(0x40 | (tc << 4), value, 4)
+
+def page_extension(page):
+    if page < 8:
+        return bytes([(page << 4) | 0x8])
+    return continuation(((page & 0x7) << 4) | 0x8, page >> 3, 1)
+
+def rows(batch):
+    return list(zip(batch.kind, batch.timestamp, batch.port, batch.payload, batch.size))
+
+class RecordingSink(TraceEventSink):
+    def __init__(self):
+        self.events = []
+
+    def receive(self, event):
+        self.events.append(event)
+
+class MockCore:
+    def exception_number_to_name(self, number):
+        return "Exc%d" % number
+
+@pytest.fixture(params=[False, True] if NUMPY_AVAILABLE else [False], ids=["python", "numpy"][:2 if NUMPY_AVAILABLE else 1])
+def decoder(request):
+    d = SWODecoder(use_numpy=request.param)
+    if request.param:
+        d.NUMPY_THRESHOLD = 0
+    return d
+
+def random_stream(rng, count):
+    packets = [SYNC]
+    for _ in range(count):
+        choice = rng.randrange(8)
+        if choice < 3:
+            size = rng.choice((1, 2, 4))
+            packets.append(itm(rng.randrange(32), rng.getrandbits(8 * size), size))
+        elif choice == 3:
+            packets.append(local_timestamp(rng.randrange(1 << 20), rng.randrange(4)))
+        elif choice == 4:
+            packets.append(page_extension(rng.randrange(8)))
+        elif choice == 5:
+            packets.append(dwt(1, (rng.randrange(4) << 12) | rng.randrange(512), 2))
+        elif choice == 6:
+            packets.append(dwt(rng.choice((8, 9, 16, 23)), rng.getrandbits(32)))
+        else:
+            packets.append(rng.choice((OVERFLOW, SYNC, dwt(2, rng.getrandbits(32)), bytes([0x94, 0x81, 0x01]))))
+    return b''.join(packets)
+
+class TestSWODecoder:
+    def test_itm(self, decoder):
+        batch = decoder.decode(itm(1, 0x41, 1) + itm(2, 0x1234, 2) + itm(31, 0xdeadbeef, 4))
+        assert rows(batch) == [
+                (TraceEventKind.ITM, 0, 1, 0x41, 1),
+                (TraceEventKind.ITM, 0, 2, 0x1234, 2),
+                (TraceEventKind.ITM, 0, 31, 0xdeadbeef, 4),
+            ]
+
+    def test_page_extension(self, decoder):
+        batch = decoder.decode(page_extension(2) + itm(3, 1, 1) + page_extension(7) + itm(0, 2, 1)
+                + SYNC + itm(5, 3, 1))
+        assert list(batch.port) == [67, 224, 5]
+
+    def test_long_page_extension(self, decoder):
+        assert list(decoder.decode(page_extension(9) + itm(1, 0, 1)).port) == [9 * 32 + 1]
+
+    def test_timestamps(self, decoder):
+        batch = decoder.decode(itm(0, 1, 1) + local_timestamp(3) + itm(0, 2, 1)
+                + local_timestamp(1000, tc=2) + OVERFLOW)
+        assert rows(batch) == [
+                (TraceEventKind.ITM, 0, 0, 1, 1),
+                (TraceEventKind.TIMESTAMP, 3, 0, 0, 0),
+                (TraceEventKind.ITM, 3, 0, 2, 1),
+                (TraceEventKind.TIMESTAMP, 1003, 2, 0, 0),
+                (TraceEventKind.OVERFLOW, 1003, 0, 0, 0),
+            ]
+        assert decoder.timestamp == 1003
+
+    def test_dwt(self, decoder):
+        batch = decoder.decode(dwt(0, 0x20, 1) + dwt(1, 0x1010, 2) + dwt(1, 0x0010, 2)
+                + dwt(2, 0x08001234) + dwt(11, 0x2000, 2) + dwt(3, 0))
+        assert rows(batch) == [
+                (TraceEventKind.EVENT_COUNTER, 0, 0, 0x20, 1),
+                (TraceEventKind.EXCEPTION, 0, 0, 0x1010, 2),
+                (TraceEventKind.PERIODIC_PC, 0, 0, 0x08001234, 4),
+                (TraceEventKind.DATA_TRACE, 0, 1, 0x2000, 2),
+            ]
+
+    def test_ignored_packets(self, decoder):
+        # Global timestamp with payload, reserved header, invalid data trace type.
+        batch = decoder.decode(bytes([0x94, 0x85, 0x83, 0x01]) + b'\x04' + dwt(24, 0)
+                + itm(4, 9, 1))
+        assert rows(batch) == [(TraceEventKind.ITM, 0, 4, 9, 1)]
+
+    def test_split_packets(self, decoder):
+        stream = random_stream(random.Random(1), 200)
+        expected = rows(decoder.decode(stream))
+        decoder.reset()
+        batch = TraceEventBatch()
+        for i in range(len(stream)):
+            batch.extend(decoder.decode(stream[i:i + 1]))
+        assert rows(batch) == expected
+
+    def test_sync_remainder_bounded(self, decoder):
+        decoder.decode(bytes(1000))
+        assert decoder._remainder == b'\x00'
+        assert rows(decoder.decode(b'\x80' + itm(1, 7, 1))) == [(TraceEventKind.ITM, 0, 1, 7, 1)]
+
+    def test_accepts_list(self, decoder):
+        assert len(decoder.decode(list(itm(1, 7, 1)))) == 1
+
+    @pytest.mark.skipif(not NUMPY_AVAILABLE, reason="requires numpy")
+    def test_numpy_matches_python(self):
+        rng = random.Random(2)
+        python = SWODecoder(use_numpy=False)
+        vectorized = SWODecoder()
+        vectorized.NUMPY_THRESHOLD = 0
+        for _ in range(20):
+            chunk = random_stream(rng, 300)
+            # Cut at an arbitrary point so packets are split between buffers.
+            cut = rng.randrange(len(chunk))
+            for data in (chunk[:cut], chunk[cut:]):
+                a = python.decode(data)
+                b = vectorized.decode(data)
+                assert rows(a) == rows(b)
+                assert list(a.header) == list(b.header)
+        assert python.timestamp == vectorized.timestamp
+
+class TestSWOParser:
+    def test_events(self):
+        sink = RecordingSink()
+        parser = SWOParser(MockCore(), sink)
+        parser.parse(bytearray(itm(1, 0x41, 1) + dwt(1, 0x1010, 2) + local_timestamp(5)))
+        assert parser.bytes_parsed == 6
+        itm_event, exc_event = sink.events
+        assert isinstance(itm_event, events.TraceITMEvent)
+        assert (itm_event.port, itm_event.data, itm_event.width) == (1, 0x41, 1)
+        assert isinstance(exc_event, events.TraceExceptionEvent)
+        assert (exc_event.exception_number, exc_event.exception_name, exc_event.action) == (16, "Exc16", 1)
+        # The timestamp is applied to the preceding events.
+        assert [e.timestamp for e in sink.events] == [5, 5]
+
+    def test_data_trace_merged(self):
+        sink = RecordingSink()
+        parser = SWOParser(None, sink)
+        parser.parse(dwt(8, 0x08000100) + dwt(17, 0x55, 1) + OVERFLOW)
+        merged, overflow = sink.events
+        assert isinstance(merged, events.TraceDataTraceEvent)
+        assert (merged.pc, merged.value, merged.is_read, merged.transfer_size) == (0x08000100, 0x55, False, 1)
+        assert isinstance(overflow, events.TraceOverflow)
+
+    def test_split_across_calls(self):
+        sink = RecordingSink()
+        parser = SWOParser(None, sink)
+        data = itm(3, 0x12345678, 4) + OVERFLOW
+        parser.parse(data[:2])
+        parser.parse(data[2:])
+        assert [type(e) for e in sink.events] == [events.TraceITMEvent, events.TraceOverflow]
+        assert sink.events[0].data == 0x12345678
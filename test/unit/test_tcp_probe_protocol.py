@@ -0,0 +1,308 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import threading
+
+from pyocd.core import exceptions
+from pyocd.core.memory_interface import MemoryInterface
+from pyocd.core.session import Session
+from pyocd.coresight.ap import APv1Address
+from pyocd.probe.debug_probe import DebugProbe
+from pyocd.probe.tcp_client_probe import TCPClientProbe
+from pyocd.probe.tcp_probe_protocol import (FrameReader, bytes_to_words, encode_frame, words_to_bytes)
+from pyocd.probe.tcp_probe_server import (DebugProbeRequestHandler, DebugProbeServer)
+
+class MockMemoryInterface(MemoryInterface):
+    def __init__(self):
+        self.memory = bytearray(0x1000)
+
+    def write_memory(self, addr, data, transfer_size=32, **attrs):
+        self.memory[addr:addr + transfer_size // 8] = data.to_bytes(transfer_size // 8, 'little')
+
+    def read_memory(self, addr, transfer_size=32, now=True, **attrs):
+        value = int.from_bytes(self.memory[addr:addr + transfer_size // 8], 'little')
+        return value if now else (lambda: value)
+
+    def write_memory_block32(self, addr, data, **attrs):
+        self.memory[addr:addr + len(data) * 4] = words_to_bytes(data)
+
+    def read_memory_block32(self, addr, size, **attrs):
+        return bytes_to_words(self.memory[addr:addr + size * 4])
+
+    def write_memory_block8(self, addr, data, **attrs):
+        self.memory[addr:addr + len(data)] = bytes(data)
+
+    def read_memory_block8(self, addr, size, **attrs):
+        return list(self.memory[addr:addr + size])
+
+class MockProbe(DebugProbe):
+    """@brief Probe with AP registers that defers reads until flushed."""
+
+    def __init__(self):
+        super().__init__()
+        self.dp_regs = {}
+        self.ap_regs = {}
+        self.pending_reads = 0
+        self.max_pending_reads = 0
+        self.memif = MockMemoryInterface()
+
+    @property
+    def unique_id(self):
+        return "mock"
+
+    @property
+    def description(self):
+        return "mock probe"
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def flush(self):
+        self.pending_reads = 0
+
+    def write_dp(self, addr, data):
+        self.dp_regs[addr] = data
+
+    def read_dp(self, addr, now=True):
+        value = self.dp_regs.get(addr, 0)
+        return value if now else (lambda: value)
+
+    def write_ap(self, addr, data):
+        if addr == 0xbad:
+            raise exceptions.TransferFaultError("write fault")
+        self.ap_regs[addr] = data
+
+    def read_ap(self, addr, now=True):
+        value = self.ap_regs.get(addr, 0)
+        if now:
+            return value
+        self.pending_reads += 1
+        self.max_pending_reads = max(self.max_pending_reads, self.pending_reads)
+
+        def read_ap_cb():
+            self.flush()
+            return value
+        return read_ap_cb
+
+    def get_memory_interface_for_ap(self, ap_address):
+        return self.memif
+
+@pytest.fixture(scope='function')
+def server():
+    session = Session(None)
+    probe = MockProbe()
+    server = DebugProbeServer(session, probe, port=0, serve_local_only=True)
+    server.start()
+    port = server._server.socket.getsockname()[1]
+    yield port, probe
+    server.stop()
+
+@pytest.fixture(scope='function')
+def client(server):
+    client = TCPClientProbe(f"127.0.0.1:{server[0]}")
+    client.open()
+    yield client
+    client.close()
+
+class TestFrameReader:
+    def test_roundtrip(self):
+        reader = FrameReader()
+        frame = encode_frame(7, {"request": "write_block8", "arguments": [0, 16]}, b'\x01\x02\x03')
+        # Feed one byte at a time to check partial frames.
+        for i, b in enumerate(frame):
+            assert reader.next_frame() is None
+            reader.feed(bytes([b]))
+        assert reader.next_frame() == (7, {"request": "write_block8", "arguments": [0, 16]}, b'\x01\x02\x03')
+        assert reader.next_frame() is None
+
+    def test_multiple_frames(self):
+        reader = FrameReader()
+        reader.feed(encode_frame(1, {"status": 0}) + encode_frame(2, {"status": 0, "result": 5}))
+        assert reader.next_frame() == (1, {"status": 0}, b'')
+        assert reader.next_frame() == (2, {"status": 0, "result": 5}, b'')
+
+    def test_bytes_in_json_arguments(self):
+        reader = FrameReader()
+        reader.feed(encode_frame(1, {"arguments": [memoryview(b'\x05\x06')]}))
+        assert reader.next_frame()[1] == {"arguments": [[5, 6]]}
+
+    def test_invalid_length(self):
+        reader = FrameReader()
+        reader.feed(b'\x02\x00\x00\x00' + bytes(8))
+        with pytest.raises(exceptions.ProbeError):
+            reader.next_frame()
+
+    def test_words(self):
+        assert words_to_bytes([0x04030201, 0x08070605]) == bytes(range(1, 9))
+        assert bytes_to_words(bytes(range(1, 9))) == [0x04030201, 0x08070605]
+
+class TestRemoteProbeProtocol:
+    def test_negotiates_binary(self, client):
+        assert client._protocol_version == 2
+
+    def test_falls_back_to_v1(self, server, monkeypatch):
+        monkeypatch.setattr(DebugProbeRequestHandler, 'SUPPORTED_PROTOCOL_VERSIONS', (1,))
+        client = TCPClientProbe(f"127.0.0.1:{server[0]}")
+        client.open()
+        try:
+            assert client._protocol_version == 1
+            client.write_ap(0x10, 0x1234)
+            assert client.read_ap(0x10) == 0x1234
+            memif = client.get_memory_interface_for_ap(APv1Address(0))
+            memif.write_memory_block8(0x11, b'\x01\x02\x03')
+            assert memif.read_memory_block8(0x10, 4) == [0, 1, 2, 3]
+        finally:
+            client.close()
+
+    def test_deferred_reads_batched(self, server, client):
+        _, probe = server
+        for i in range(8):
+            client.write_ap(i * 4, i + 100)
+        callbacks = [client.read_ap(i * 4, now=False) for i in range(8)]
+        # Nothing is sent until a result is needed.
+        assert len(client._batch) == 16
+        assert len(client._send_buffer) == 0
+        assert [cb() for cb in callbacks] == list(range(100, 108))
+        # All reads were queued by the server before any was completed.
+        assert probe.max_pending_reads == 8
+
+    def test_batch_sent_as_one_request(self, server, monkeypatch):
+        batches = []
+        original = DebugProbeRequestHandler._request__batch
+        def record_batch(handler, requests):
+            batches.append([request for request, _ in requests])
+            return original(handler, requests)
+        # The handler table is built when the client connects.
+        monkeypatch.setattr(DebugProbeRequestHandler, '_request__batch', record_batch)
+        client = TCPClientProbe(f"127.0.0.1:{server[0]}")
+        client.open()
+        try:
+            client.write_dp(0x8, 0x10)
+            client.write_ap(0x0, 0x55)
+            value = client.read_ap(0x0, now=False)
+            client.flush()
+            assert batches == [['write_dp', 'write_ap', 'read_ap']]
+            assert value() == 0x55
+        finally:
+            client.close()
+
+    def test_batch_order_kept_with_block_request(self, client):
+        memif = client.get_memory_interface_for_ap(APv1Address(0))
+        memif.write_memory(0x10, 0x12345678)
+        memif.write_memory_block8(0x10, b'\xaa')
+        # The batched write is sent before the block write.
+        assert memif.read_memory(0x10) == 0x123456aa
+
+    def test_batch_entry_error(self, client):
+        client.write_ap(0x0, 7)
+        client.write_ap(0xbad, 1)
+        value = client.read_ap(0x0, now=False)
+        with pytest.raises(exceptions.TransferFaultError):
+            value()
+        assert client.read_ap(0x0) == 7
+
+    def test_max_batch_size(self, client):
+        for i in range(TCPClientProbe.MAX_BATCH_SIZE + 1):
+            client.write_ap(i * 4, i)
+        assert len(client._batch) == 1
+        assert client.read_ap(0x10) == 4
+
+    def test_callbacks_out_of_order(self, client):
+        client.write_ap(0x0, 1)
+        client.write_ap(0x4, 2)
+        first = client.read_ap(0x0, now=False)
+        second = client.read_ap(0x4, now=False)
+        assert second() == 2
+        assert first() == 1
+
+    def test_write_error_deferred(self, client):
+        client.write_ap(0xbad, 1)
+        with pytest.raises(exceptions.TransferFaultError):
+            client.read_ap(0x0)
+        # The error is only reported once.
+        assert client.read_ap(0x0) == 0
+
+    def test_block_data(self, client):
+        memif = client.get_memory_interface_for_ap(APv1Address(0))
+        memif.write_memory_block32(0x100, [0x11223344, 0x55667788])
+        assert memif.read_memory_block32(0x100, 2) == [0x11223344, 0x55667788]
+        memif.write_memory_block8(0x201, memoryview(bytes(range(1, 6))))
+        assert memif.read_memory_block8(0x200, 7) == [0, 1, 2, 3, 4, 5, 0]
+        memif.write_memory(0x300, 0xabcd, transfer_size=16)
+        assert memif.read_memory(0x300, transfer_size=16, now=False)() == 0xabcd
+
+    def test_many_outstanding_writes(self, client):
+        for i in range(TCPClientProbe.MAX_OUTSTANDING_REQUESTS * 2):
+            client.write_ap(i * 4, i)
+        assert client.read_ap((TCPClientProbe.MAX_OUTSTANDING_REQUESTS * 2 - 1) * 4) \
+                == TCPClientProbe.MAX_OUTSTANDING_REQUESTS * 2 - 1
+        assert len(client._outstanding) == 0
+
+    def test_set_priority_and_stats(self, client):
+        client._perform_request('set_priority', 'high')
+        with pytest.raises(exceptions.Error):
+            client._perform_request('set_priority', 'urgent')
+        client.write_ap(0x0, 1)
+        client.read_ap(0x0)
+        stats, = client._perform_request('client_stats')
+        assert stats['priority'] == "high"
+        assert stats['requests'] >= 4
+        assert stats['waits'] >= 1
+
+    def test_clients_share_probe(self, server, client):
+        other = TCPClientProbe(f"127.0.0.1:{server[0]}")
+        other.open()
+        try:
+            errors = []
+            def run(probe, base):
+                try:
+                    for i in range(200):
+                        probe.write_ap(base + i * 4, i)
+                        assert probe.read_ap(base + i * 4) == i
+                except Exception as err:
+                    errors.append(err)
+            threads = [threading.Thread(target=run, args=(probe, base))
+                    for probe, base in ((client, 0x1000), (other, 0x2000))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert errors == []
+            assert all(stats['requests'] >= 400 for stats in client._perform_request('client_stats'))
+        finally:
+            other.close()
+
+    def test_lock_keeps_access(self, server, client):
+        other = TCPClientProbe(f"127.0.0.1:{server[0]}")
+        other.open()
+        client.lock()
+        try:
+            result = []
+            thread = threading.Thread(target=lambda: result.append(other.read_ap(0x0)), daemon=True)
+            thread.start()
+            # The other client waits until the lock is released.
+            thread.join(0.2)
+            assert result == []
+            client.write_ap(0x0, 9)
+            client.unlock()
+            thread.join(5.0)
+            assert result == [9]
+        finally:
+            other.close()
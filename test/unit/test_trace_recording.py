@@ -0,0 +1,155 @@
+# pyOCD debugger
+# Copyright (c) 2026 PyOCD Authors
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import pytest
+
+from pyocd.trace import events
+from pyocd.trace.events import TraceEventKind
+from pyocd.trace.recording import (
+    CHUNK_FLAG_DISCONTINUITY,
+    FOOTER,
+    TraceRecordingError,
+    TraceRecordingReader,
+    TraceRecordingWriter,
+    )
+from pyocd.trace.sink import TraceEventSink
+from pyocd.trace.swo import SWODecoder
+
+def itm(port, data):
+    return bytes([(port << 3) | 3]) + data.to_bytes(4, 'little')
+
+def local_timestamp(value):
+    # Format 1 local timestamp with 4 continuation bytes.
+    return bytes([0xc0]) + bytes(((value >> (7 * i)) & 0x7f) | (0x80 if i < 3 else 0) for i in range(4))
+
+def make_stream(count):
+    """@brief Stream of ITM writes on port 1 with data i, each followed by a timestamp delta of 10."""
+    return b''.join(itm(1, i) + local_timestamp(10) for i in range(count))
+
+def itm_rows(batches):
+    return [(t, p) for batch in batches
+            for k, t, p in zip(batch.kind, batch.timestamp, batch.payload)
+            if k == TraceEventKind.ITM]
+
+def record(data, step=7, chunk_size=256, **kwargs):
+    f = io.BytesIO()
+    writer = TraceRecordingWriter(f, chunk_size=chunk_size, **kwargs)
+    # Write in small pieces that don't align with packets or chunks.
+    for i in range(0, len(data), step):
+        writer.write(data[i:i + step])
+    writer.close()
+    f.seek(0)
+    return f
+
+class RecordingSink(TraceEventSink):
+    def __init__(self):
+        self.events = []
+
+    def receive(self, event):
+        self.events.append(event)
+
+class TestTraceRecording:
+    def test_round_trip(self):
+        data = make_stream(500)
+        reader = TraceRecordingReader(record(data, metadata={'swo_clock': 1000000}))
+        assert reader.metadata == {'swo_clock': 1000000}
+        assert len(reader.chunks) > 5
+        assert b''.join(reader.read_raw()) == data
+        assert reader.start_timestamp == 0
+        assert reader.end_timestamp == 5000
+        expected = itm_rows([SWODecoder(use_numpy=False).decode(data)])
+        assert itm_rows(reader.read_batches()) == expected
+        assert expected[3] == (30, 3)
+
+    def test_window_decodes_only_overlapping_chunks(self):
+        reader = TraceRecordingReader(record(make_stream(500)))
+        chunks = reader.find_chunks(2000, 2100)
+        assert 0 < len(chunks) <= 2
+        assert chunks.start > 0
+        read = []
+        original = reader.read_chunk
+        def read_chunk(index):
+            read.append(index)
+            return original(index)
+        reader.read_chunk = read_chunk
+        rows = itm_rows(reader.read_batches(2000, 2100))
+        assert read == list(chunks)
+        assert rows == [(10 * i, i) for i in range(200, 211)]
+
+    def test_window_outside_recording(self):
+        reader = TraceRecordingReader(record(make_stream(50)))
+        assert len(reader.find_chunks(10000, 20000)) == 0
+        assert list(reader.read_batches(10000, 20000)) == []
+
+    def test_missing_index(self):
+        f = record(make_stream(500))
+        full = f.getvalue()
+        expected = TraceRecordingReader(io.BytesIO(full)).chunks
+        # Drop the footer, and also cut the last chunk short.
+        truncated = TraceRecordingReader(io.BytesIO(full[:-FOOTER.size]))
+        assert truncated.chunks == expected
+        last_offset = expected[-1].offset
+        truncated = TraceRecordingReader(io.BytesIO(full[:last_offset + 40]))
+        assert truncated.chunks == expected[:-1]
+
+    def test_crc_error(self):
+        data = bytearray(record(make_stream(100), compression_level=0).getvalue())
+        reader = TraceRecordingReader(io.BytesIO(bytes(data)))
+        # Corrupt a data byte in the middle of the second chunk.
+        offset = reader.chunks[1].offset + (reader.chunks[2].offset - reader.chunks[1].offset) // 2
+        data[offset] ^= 0xff
+        reader = TraceRecordingReader(io.BytesIO(bytes(data)))
+        reader.read_chunk(0)
+        with pytest.raises(TraceRecordingError):
+            reader.read_chunk(1)
+
+    def test_invalid_file(self):
+        with pytest.raises(TraceRecordingError):
+            TraceRecordingReader(io.BytesIO(b'not a trace recording at all'))
+
+    def test_gap(self):
+        f = io.BytesIO()
+        with TraceRecordingWriter(f, chunk_size=1 << 20) as writer:
+            writer.write(make_stream(10))
+            # Incomplete packet followed by lost data.
+            writer.write(itm(2, 0)[:3])
+            writer.mark_gap()
+            writer.write(make_stream(10))
+        f.seek(0)
+        reader = TraceRecordingReader(f)
+        assert len(reader.chunks) == 2
+        state, flags, _ = reader.read_chunk(1)
+        assert flags & CHUNK_FLAG_DISCONTINUITY
+        assert state.pending == b''
+        assert state.timestamp == 100
+        assert [row[1] for row in itm_rows(reader.read_batches())] == list(range(10)) * 2
+        assert reader.end_timestamp == 200
+
+    def test_parse_window(self):
+        reader = TraceRecordingReader(record(make_stream(500)))
+        sink = RecordingSink()
+        reader.parse(sink, 3000, 3050)
+        assert all(isinstance(e, events.TraceITMEvent) for e in sink.events)
+        assert [(e.timestamp, e.data) for e in sink.events] == [(10 * i + 10, i) for i in range(299, 305)]
+
+    def test_path(self, tmp_path):
+        path = str(tmp_path / "trace.pyocdtrc")
+        data = make_stream(20)
+        with TraceRecordingWriter(path) as writer:
+            writer.write(data)
+        with TraceRecordingReader(path) as reader:
+            assert b''.join(reader.read_raw()) == data